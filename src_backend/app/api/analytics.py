@@ -3,14 +3,16 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-from fastapi import APIRouter, HTTPException, Depends
+import json
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field, ValidationError
+from typing import List, Optional
 
 from app.db.database import get_db
 from app.models.models import User
-from app.utils.auth import get_current_active_user
+from app.utils.auth import get_current_active_user, verify_token
 from app.services.analytics_service import AnalyticsService
 
 router = APIRouter(prefix="/api/v1/analytics", tags=["analytics"])
@@ -23,6 +25,47 @@ class SparkClickRequest(BaseModel):
     article_id: Optional[int] = None
 
 
+class SparkClickEvent(BaseModel):
+    """批量上报中的单个点击事件"""
+    spark_type: str = Field(..., max_length=50)
+    spark_text: str
+    article_id: Optional[int] = None
+    clicked_at: Optional[datetime] = None  # 客户端点击时间（缓存后延迟上报时使用）
+
+
+class SparkClickBatchRequest(BaseModel):
+    """批量火花点击请求"""
+    events: List[SparkClickEvent] = Field(..., max_length=500)
+
+
+def _resolve_beacon_user_id(request: Request, token: Optional[str], db: Session) -> int:
+    """
+    从 Authorization 头或 token 查询参数解析用户 ID
+
+    navigator.sendBeacon 无法设置请求头，因此同时支持 ?token=（与 SSE 端点一致）。
+    与 get_current_active_user 一致：用户必须存在且已激活。
+    """
+    auth_header = request.headers.get("authorization", "")
+    if auth_header.lower().startswith("bearer "):
+        token = auth_header[7:]
+
+    payload = verify_token(token) if token else None
+    if not payload or not payload.get("sub"):
+        raise HTTPException(status_code=401, detail="无法验证凭证")
+
+    try:
+        user_id = int(payload["sub"])
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=401, detail="无效的用户ID格式")
+
+    is_active = db.query(User.is_active).filter(User.id == user_id).scalar()
+    if is_active is None:
+        raise HTTPException(status_code=401, detail="无法验证凭证")
+    if not is_active:
+        raise HTTPException(status_code=400, detail="用户未激活")
+    return user_id
+
+
 @router.post("/spark-click")
 async def record_spark_click(
     request: SparkClickRequest,
@@ -42,7 +85,7 @@ async def record_spark_click(
     """
     try:
         service = AnalyticsService(db)
-        click = service.record_spark_click(
+        service.record_spark_click(
             user_id=current_user.id,
             spark_type=request.spark_type,
             spark_text=request.spark_text,
@@ -51,7 +94,7 @@ async def record_spark_click(
 
         return {
             "success": True,
-            "clickId": click.id,
+            "queued": 1,
             "message": "火花点击已记录"
         }
 
@@ -60,6 +103,47 @@ async def record_spark_click(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/spark-clicks/batch")
+async def record_spark_clicks_batch(
+    request: Request,
+    token: Optional[str] = Query(None, description="JWT 认证 token（sendBeacon 无法设置请求头时使用）"),
+    db: Session = Depends(get_db)
+):
+    """
+    批量记录火花点击事件（兼容 navigator.sendBeacon）
+
+    请求体为 JSON：{"events": [...]} 或直接为事件数组。
+    sendBeacon 发送字符串时 Content-Type 为 text/plain，因此不依赖请求头解析。
+
+    Args:
+        request: 原始请求
+        token: JWT 认证 token（可选，优先使用 Authorization 头）
+        db: 数据库会话
+
+    Returns:
+        入队数量
+    """
+    user_id = _resolve_beacon_user_id(request, token, db)
+
+    try:
+        body = json.loads(await request.body() or b"null")
+        if isinstance(body, list):
+            body = {"events": body}
+        batch = SparkClickBatchRequest.model_validate(body)
+    except (ValueError, ValidationError) as e:
+        raise HTTPException(status_code=422, detail=f"无效的点击事件: {str(e)}")
+
+    queued = AnalyticsService(db).record_spark_clicks(
+        user_id,
+        [event.model_dump() for event in batch.events]
+    )
+    return {
+        "success": True,
+        "queued": queued,
+        "message": "火花点击已记录"
+    }
+
+
 @router.get("/spark-stats")
 async def get_spark_stats(
     days: int = 30,
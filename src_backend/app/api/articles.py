@@ -7,6 +7,7 @@ from sqlalchemy.orm import Session
 from app.db.database import get_db
 from app.models.models import Article, User
 from app.utils.auth import get_current_active_user, get_current_user_optional
+from app.services.article_search_service import ArticleSearchService
 from typing import Optional, List
 from datetime import datetime
 
@@ -65,6 +66,42 @@ async def get_articles(
     }
 
 
+@router.get("/api/v1/articles/search")
+async def search_articles(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    在当前用户的文章库中检索
+
+    按句子匹配：同一句子必须包含全部检索词元。返回命中文章及其句子序号，
+    前端可通过 dom_path（#sentence-{idx}）直接定位。
+
+    Args:
+        q: 检索词
+        limit: 每页数量
+        offset: 偏移量
+        current_user: 当前用户（从 JWT 获取）
+        db: 数据库会话
+
+    Returns:
+        命中文章列表（按命中句子数排序）
+    """
+    service = ArticleSearchService(db)
+    result = service.search(current_user.id, q, skip=offset, limit=limit)
+
+    return {
+        "total": result["total"],
+        "limit": limit,
+        "offset": offset,
+        "query": q,
+        "articles": result["articles"]
+    }
+
+
 @router.get("/api/v1/articles/{article_id}")
 async def get_article(
     article_id: int,
@@ -148,6 +185,9 @@ async def delete_article(
     if article.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="无权删除此文章")
 
+    # 同步清理检索索引
+    ArticleSearchService(db).remove_article(article)
+
     db.delete(article)
     db.commit()
 
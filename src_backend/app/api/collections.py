@@ -13,6 +13,7 @@ from app.schemas.insight_card import (
     InsightCardListResponse
 )
 from app.utils.auth import get_current_active_user
+from app.services.search_service import InsightSearchService
 
 router = APIRouter()
 
@@ -24,8 +25,8 @@ async def create_insight_card(
     db: Session = Depends(get_db)
 ):
     """创建洞察卡片（收藏）"""
-    # 将标签列表转换为JSON字符串存储
-    tags_json = json.dumps(card_data.tags) if card_data.tags else None
+    # 将标签列表转换为JSON字符串存储（保留中文原文，全文索引按原文分词）
+    tags_json = json.dumps(card_data.tags, ensure_ascii=False) if card_data.tags else None
 
     new_card = InsightCard(
         user_id=current_user.id,
@@ -42,6 +43,11 @@ async def create_insight_card(
     )
 
     db.add(new_card)
+    db.flush()
+
+    # 增量更新全文索引
+    InsightSearchService(db).index_card(new_card)
+
     db.commit()
     db.refresh(new_card)
 
@@ -62,7 +68,33 @@ async def get_insight_cards(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """获取用户的洞察卡片列表"""
+    """
+    获取用户的洞察卡片列表
+
+    传入 search 时使用全文索引检索，结果按相关性排序并附带高亮片段；
+    否则按创建时间倒序分页。
+    """
+    # 搜索：全文索引 + 相关性排序
+    if search:
+        search_service = InsightSearchService(db)
+        total, results = search_service.search(
+            user_id=current_user.id,
+            query=search,
+            intent=intent,
+            skip=skip,
+            limit=limit
+        )
+
+        items = []
+        for card, highlight in results:
+            response = InsightCardResponse.model_validate(card)
+            if card.tags:
+                response.tags = json.loads(card.tags)
+            response.highlight = highlight
+            items.append(response)
+
+        return InsightCardListResponse(total=total, items=items)
+
     # 基础查询
     query = db.query(InsightCard).filter(InsightCard.user_id == current_user.id)
 
@@ -70,15 +102,6 @@ async def get_insight_cards(
     if intent:
         query = query.filter(InsightCard.intent == intent)
 
-    # 搜索
-    if search:
-        search_pattern = f"%{search}%"
-        query = query.filter(
-            (InsightCard.selected_text.like(search_pattern)) |
-            (InsightCard.insight.like(search_pattern)) |
-            (InsightCard.article_title.like(search_pattern))
-        )
-
     # 总数
     total = query.count()
 
@@ -142,7 +165,10 @@ async def update_insight_card(
 
     # 更新标签
     if card_update.tags is not None:
-        card.tags = json.dumps(card_update.tags) if card_update.tags else None
+        card.tags = json.dumps(card_update.tags, ensure_ascii=False) if card_update.tags else None
+
+    # 标签参与检索，同步更新索引
+    InsightSearchService(db).index_card(card)
 
     db.commit()
     db.refresh(card)
@@ -172,6 +198,7 @@ async def delete_insight_card(
             detail="未找到该洞察卡片"
         )
 
+    InsightSearchService(db).remove_card(card.id)
     db.delete(card)
     db.commit()
 
@@ -1,17 +1,22 @@
 """仪表盘 (Dashboard) 相关 API 端点"""
+import json
 import logging
 
 logger = logging.getLogger(__name__)
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import Dict
+from typing import Dict, Optional
 
-from app.db.database import get_db
+from app.db.database import SessionLocal, get_db
 from app.models.models import User
 from app.utils.auth import get_current_active_user
 from app.services.analytics_service import AnalyticsService
 from app.services.knowledge_graph_service import KnowledgeGraphService
+from app.services.dashboard_service import DashboardService
+from app.services.graph_engine import METRIC_DEGREE, METRIC_PAGERANK, GraphEngine
+from app.services.graph_layout_service import submit_layout_refresh
 
 router = APIRouter(prefix="/api/v1/dashboard", tags=["dashboard"])
 
@@ -32,40 +37,8 @@ async def get_dashboard_overview(
         仪表盘总览数据
     """
     try:
-        analytics_service = AnalyticsService(db)
-        graph_service = KnowledgeGraphService(db)
-
-        # 获取知识图谱统计
-        graph_data = graph_service.get_knowledge_graph(current_user.id)
-
-        # 获取好奇心指纹
-        fingerprint = analytics_service.get_curiosity_fingerprint(current_user.id)
-
-        # 获取火花统计
-        spark_stats = analytics_service.get_spark_stats(current_user.id, days=30)
-
-        # 获取盲区
-        blind_spots = graph_service.get_blind_spots(current_user.id)
-
-        return {
-            "knowledgeGraph": {
-                "totalNodes": graph_data["stats"]["totalNodes"],
-                "totalEdges": graph_data["stats"]["totalEdges"],
-                "domains": graph_data["stats"]["domains"]
-            },
-            "curiosityFingerprint": {
-                "sparkDistribution": fingerprint["spark_distribution"],
-                "dominantType": spark_stats["dominant_type"]
-            },
-            "blindSpots": {
-                "missingDomains": blind_spots["missingDomains"],
-                "knowledgeIslands": len(blind_spots["knowledgeIslands"])
-            },
-            "stats": {
-                "totalSparkClicks": spark_stats["total_clicks"],
-                "activeDays": 30
-            }
-        }
+        # 读取预计算快照（失效部分在后台刷新）
+        return DashboardService(db).get_overview(current_user.id)
 
     except Exception as e:
         logger.error(f" 仪表盘总览获取失败: {e}")
@@ -74,6 +47,8 @@ async def get_dashboard_overview(
 
 @router.get("/knowledge-graph")
 async def get_knowledge_graph(
+    limit: Optional[int] = Query(None, ge=1, le=5000, description="每页节点数（按 size 降序，不传则返回全部）"),
+    cursor: Optional[str] = Query(None, description="上一页返回的 nextCursor"),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ) -> Dict:
@@ -81,21 +56,65 @@ async def get_knowledge_graph(
     获取用户的知识图谱数据
 
     Args:
+        limit: 每页节点数（视口分页：先返回最重要的节点）
+        cursor: 分页游标
         current_user: 当前用户（从 JWT 获取）
         db: 数据库会话
 
     Returns:
-        知识图谱数据（nodes + edges）
+        知识图谱数据（nodes + edges，分页时另有 nextCursor）
     """
     try:
         service = KnowledgeGraphService(db)
-        return service.get_knowledge_graph(current_user.id)
+        result = service.get_knowledge_graph(current_user.id, limit, cursor)
+        # 存在尚未布局的节点（新数据库迁移后、布局任务丢失等）时补算坐标
+        if any(node["x"] is None for node in result["nodes"]):
+            submit_layout_refresh(current_user.id)
+        return result
 
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f" 知识图谱获取失败: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/knowledge-graph/stream")
+async def stream_knowledge_graph(
+    current_user: User = Depends(get_current_active_user)
+) -> StreamingResponse:
+    """
+    以 NDJSON 流式导出完整知识图谱（每行一个节点 / 边，最后一行为统计）
+
+    Args:
+        current_user: 当前用户（从 JWT 获取）
+
+    Returns:
+        application/x-ndjson 流
+    """
+    user_id = current_user.id
+
+    def ndjson_stream():
+        # 响应发送期间依赖注入的会话已关闭，流内单独打开会话
+        db = SessionLocal()
+        try:
+            yield from KnowledgeGraphService(db).iter_knowledge_graph_ndjson(user_id)
+        except Exception as e:
+            logger.error(f" 知识图谱导出失败: {e}")
+            yield json.dumps({"kind": "error", "message": str(e)}, ensure_ascii=False) + "\n"
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        ndjson_stream(),
+        media_type="application/x-ndjson",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # 禁用 Nginx 缓冲
+        }
+    )
+
+
 @router.post("/knowledge-graph/rebuild")
 async def rebuild_knowledge_graph(
     current_user: User = Depends(get_current_active_user),
@@ -114,6 +133,7 @@ async def rebuild_knowledge_graph(
     try:
         service = KnowledgeGraphService(db)
         result = service.rebuild_graph(current_user.id)
+        submit_layout_refresh(current_user.id, full=True)
         return result
 
     except Exception as e:
@@ -121,8 +141,107 @@ async def rebuild_knowledge_graph(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/knowledge-graph/neighbors")
+async def get_concept_neighbors(
+    concept: str = Query(..., description="中心概念"),
+    hops: int = Query(1, ge=1, le=3, description="最大跳数"),
+    limit: int = Query(200, ge=1, le=2000, description="最多返回的节点数"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+) -> Dict:
+    """
+    获取概念的 k 跳邻域（不需要下载整张图）
+
+    Args:
+        concept: 中心概念名称
+        hops: 最大跳数（1-3）
+        limit: 最多返回的节点数
+        current_user: 当前用户（从 JWT 获取）
+        db: 数据库会话
+
+    Returns:
+        邻域子图（center + nodes + edges）
+    """
+    try:
+        result = GraphEngine(db).neighbors(current_user.id, concept, hops, limit)
+        if result is None:
+            raise HTTPException(status_code=404, detail=f"概念不存在: {concept}")
+        return result
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f" 概念邻域查询失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/knowledge-graph/path")
+async def get_concept_path(
+    source: str = Query(..., description="起点概念"),
+    target: str = Query(..., description="终点概念"),
+    max_hops: Optional[int] = Query(None, ge=1, le=20, description="最大跳数"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+) -> Dict:
+    """
+    获取两个概念之间的最短路径
+
+    Args:
+        source: 起点概念名称
+        target: 终点概念名称
+        max_hops: 最大跳数（不限制时为 None）
+        current_user: 当前用户（从 JWT 获取）
+        db: 数据库会话
+
+    Returns:
+        路径（found + length + nodes）
+    """
+    try:
+        result = GraphEngine(db).shortest_path(current_user.id, source, target, max_hops)
+        if result is None:
+            raise HTTPException(status_code=404, detail="概念不存在")
+        return result
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f" 概念路径查询失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/knowledge-graph/top")
+async def get_top_concepts(
+    metric: str = Query(METRIC_PAGERANK, pattern=f"^({METRIC_PAGERANK}|{METRIC_DEGREE})$", description="排序指标"),
+    limit: int = Query(20, ge=1, le=200, description="返回数量"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+) -> Dict:
+    """
+    获取核心概念（按 PageRank 或度排序）
+
+    Args:
+        metric: pagerank / degree
+        limit: 返回数量
+        current_user: 当前用户（从 JWT 获取）
+        db: 数据库会话
+
+    Returns:
+        核心概念列表
+    """
+    try:
+        return {
+            "metric": metric,
+            "nodes": GraphEngine(db).top_nodes(current_user.id, metric, limit)
+        }
+
+    except Exception as e:
+        logger.error(f" 核心概念查询失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/curiosity-fingerprint")
 async def get_curiosity_fingerprint(
+    days: int = Query(30, ge=1, le=365, description="统计天数（如 30 / 90 / 365）"),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ) -> Dict:
@@ -130,6 +249,7 @@ async def get_curiosity_fingerprint(
     获取用户的好奇心指纹
 
     Args:
+        days: 统计天数（默认 30 天）
         current_user: 当前用户（从 JWT 获取）
         db: 数据库会话
 
@@ -138,7 +258,7 @@ async def get_curiosity_fingerprint(
     """
     try:
         service = AnalyticsService(db)
-        return service.get_curiosity_fingerprint(current_user.id)
+        return service.get_curiosity_fingerprint(current_user.id, days)
 
     except Exception as e:
         logger.error(f" 好奇心指纹获取失败: {e}")
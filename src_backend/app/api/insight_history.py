@@ -8,6 +8,8 @@ from sqlalchemy import desc
 from app.db.database import get_db
 from app.models.models import Article, InsightHistory, User
 from app.utils.auth import get_current_active_user, get_current_user_optional
+from app.services.article_search_service import submit_article_indexing
+from app.services.near_duplicate_service import NearDuplicateService
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime
@@ -105,6 +107,13 @@ async def save_article(
             db.commit()
             db.refresh(new_article)
 
+            # 内容指纹（用于查找近似重复的文章）
+            NearDuplicateService(db).fingerprint_article(new_article)
+            db.commit()
+
+            # 后台建立句子级检索索引
+            submit_article_indexing(new_article.id)
+
             return {
                 "status": "success",
                 "article": {
@@ -15,6 +15,7 @@ from app.schemas.insight import (
 )
 from app.services.ai_service import AIService
 from app.core.task_manager import task_manager
+from app.core.token_estimator import token_estimator
 from app.utils.auth import get_current_active_user
 from app.models.models import User
 
@@ -22,6 +23,14 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+def _completion_tokens(ai_service: AIService, text: str) -> int:
+    """输出 token 数：优先使用流式响应最后返回的 usage，服务端不返回时按字符类别估算"""
+    usage = ai_service.last_usage
+    if usage is not None and usage.completion_tokens:
+        return usage.completion_tokens
+    return token_estimator.estimate(text, ai_service.model_used)
+
+
 @router.post("/insights/generate")
 async def generate_insight(request: InsightRequest):
     """
@@ -76,9 +85,7 @@ async def generate_insight(request: InsightRequest):
             # 3. 计算元数据
             duration_ms = int((time.time() - start_time) * 1000)
 
-            # 简化的 token 计数（实际应该使用 tiktoken）
-            # 中文：1字≈1.5tokens，英文：1词≈1.3tokens
-            estimated_tokens = int((len(full_content) + len(full_reasoning)) * 1.5)
+            estimated_tokens = _completion_tokens(ai_service, full_content + full_reasoning)
 
             metadata = InsightMetadata(
                 model=ai_service.model_used,
@@ -297,7 +304,7 @@ async def generate_follow_up_answer(request: FollowUpRequest):
 
             # 3. 计算元数据
             duration_ms = int((time.time() - start_time) * 1000)
-            estimated_tokens = int((len(full_content) + len(full_reasoning)) * 1.5)
+            estimated_tokens = _completion_tokens(ai_service, full_content + full_reasoning)
 
             metadata = InsightMetadata(
                 model=ai_service.model_used,
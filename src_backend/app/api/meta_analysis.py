@@ -8,6 +8,8 @@ from sqlalchemy.orm import Session
 from app.db.database import get_db, SessionLocal
 from app.services.meta_analysis_service import MetaAnalysisService
 from app.core.task_manager import task_manager
+from app.services.article_search_service import submit_article_indexing
+from app.services.near_duplicate_service import NearDuplicateService
 from app.utils.auth import get_current_active_user, get_current_user_optional
 from app.models.models import User, Article
 from pydantic import BaseModel
@@ -153,7 +155,10 @@ async def analyze_article(
         import hashlib
 
         content_hash = hashlib.md5(request.full_text.encode('utf-8')).hexdigest()
-        article = db.query(Article).filter(Article.content_hash == content_hash).first()
+        article = db.query(Article).filter(
+            Article.content_hash == content_hash,
+            Article.user_id == current_user.id
+        ).first()
 
         if not article:
             article = Article(
@@ -170,6 +175,13 @@ async def analyze_article(
             db.refresh(article)
             logger.info(f"[API] 新文章已保存用于元视角分析，ID: {article.id}")
 
+            # 内容指纹（分析任务据此复用近似重复文章的结果）
+            NearDuplicateService(db).fingerprint_article(article)
+            db.commit()
+
+            # 后台建立句子级检索索引
+            submit_article_indexing(article.id)
+
         # 提交异步分析任务
         task_id = task_manager.submit_task(
             "meta_analysis",
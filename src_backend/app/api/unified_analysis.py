@@ -8,13 +8,18 @@ import logging
 import hashlib
 from datetime import datetime
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from app.db.database import get_db, SessionLocal
 from app.models.models import Article, AnalysisReport, User
-from app.services.unified_analysis_service import UnifiedAnalysisService
+from app.services.unified_analysis_service import ANALYSIS_VERSION, UnifiedAnalysisService, report_artifact_version
+from app.services.analysis_artifact_service import AnalysisArtifactService, UNIFIED_REPORT
+from app.services.article_sentence_service import ArticleSentenceService
 from app.core.task_manager import task_manager
+from app.services.article_search_service import submit_article_indexing
+from app.services.incremental_analysis_service import IncrementalAnalysisService, incremental_analysis_task
+from app.services.near_duplicate_service import NearDuplicateService
 from app.utils.auth import get_current_active_user, get_current_user_optional
 
 logger = logging.getLogger(__name__)
@@ -30,6 +35,12 @@ class SaveArticleWithAnalysisRequest(BaseModel):
     content: str
 
 
+class UpdateArticleContentRequest(BaseModel):
+    """修改文章内容的请求"""
+    content: str
+    title: Optional[str] = None
+
+
 class AnalysisStatusResponse(BaseModel):
     """分析状态响应"""
     status: str  # pending, processing, completed, failed
@@ -39,12 +50,15 @@ class AnalysisStatusResponse(BaseModel):
 
 # ============= 后台任务函数 =============
 
-async def analyze_article_task(article_id: int):
+async def analyze_article_task(article_id: int, force: bool = False):
     """
     后台分析文章任务
 
+    相同内容已有共享的分析结果（AnalysisArtifact）时直接使用，不调用 LLM。
+
     Args:
         article_id: 文章ID
+        force: 忽略共享的分析结果，重新调用 LLM（结果覆盖共享结果）
 
     Returns:
         分析结果字典
@@ -75,26 +89,53 @@ async def analyze_article_task(article_id: int):
 
         db.commit()
 
+        # 相同内容已由其他用户分析过：直接复用
+        artifact_service = AnalysisArtifactService(db)
+        if not force:
+            artifact = artifact_service.get(article.content_hash, UNIFIED_REPORT, report_artifact_version(article.title))
+            if artifact is not None:
+                artifact_service.apply_unified_report(report, artifact)
+                db.commit()
+                logger.info(f"[后台任务] 复用共享的分析结果，ID: {article_id}, artifact_id: {artifact.id}")
+                return {
+                    "article_id": article_id,
+                    "status": "completed",
+                    "report_data": report.report_data
+                }
+
+        # 分句结果按内容哈希共享（进程内缓存 + article_sentences 表），调用 LLM 前先提交
+        segmentation = ArticleSentenceService(db).segment(article.content, article.content_hash)
+        db.commit()
+
         # 执行分析
         analysis_service = UnifiedAnalysisService()
         start_time = datetime.utcnow()
 
         result = await analysis_service.analyze_article(
             article_content=article.content,
-            article_title=article.title or ""
+            article_title=article.title or "",
+            segmentation=segmentation
         )
 
         # 计算处理时间
         processing_time_ms = int((datetime.utcnow() - start_time).total_seconds() * 1000)
 
-        # 保存分析结果
+        # 保存分析结果，并按内容哈希共享给其他用户
+        artifact = artifact_service.put(
+            article.content_hash,
+            UNIFIED_REPORT,
+            report_artifact_version(article.title),
+            {"report": result['report'], "metadata": result['metadata']},
+            tokens_used=result['metadata'].get('tokens')
+        )
         report.status = 'completed'
         report.report_data = result['report']
-        report.metadata = result['metadata']
-        report.model_used = result['metadata'].get('model_used')
-        report.tokens_used = result['metadata'].get('tokens_used')
+        report.analysis_version = ANALYSIS_VERSION
+        report.model_used = result['metadata'].get('model')
+        report.tokens_used = result['metadata'].get('tokens')
         report.processing_time_ms = processing_time_ms
         report.completed_at = datetime.utcnow()
+        report.artifact_id = artifact.id
         db.commit()
 
         logger.info(f"[后台任务] 文章分析完成，ID: {article_id}, 耗时: {processing_time_ms}ms")
@@ -157,8 +198,11 @@ async def save_article_with_analysis(
     # 1. 计算内容哈希
     content_hash = hashlib.md5(request.content.encode('utf-8')).hexdigest()
 
-    # 2. 检查文章是否已存在
-    article = db.query(Article).filter(Article.content_hash == content_hash).first()
+    # 2. 检查当前用户是否已保存过该文章（文章按用户各自保存，分析结果按内容哈希共享）
+    article = db.query(Article).filter(
+        Article.content_hash == content_hash,
+        Article.user_id == current_user.id
+    ).first()
     is_new_article = False
 
     if article:
@@ -218,6 +262,61 @@ async def save_article_with_analysis(
 
         logger.info(f"[API] 新文章已保存，ID: {article.id}")
 
+        # 后台建立句子级检索索引
+        submit_article_indexing(article.id)
+
+        # 相同内容已由其他用户分析过：直接复用，不调用 LLM
+        artifact_service = AnalysisArtifactService(db)
+        artifact = artifact_service.get(content_hash, UNIFIED_REPORT, report_artifact_version(article.title))
+        if artifact is not None:
+            report = AnalysisReport(article_id=article.id)
+            db.add(report)
+            artifact_service.apply_unified_report(report, artifact)
+            db.commit()
+            logger.info(f"[API] 复用共享的分析结果，ID: {article.id}, artifact_id: {artifact.id}")
+            return {
+                "article": {
+                    "id": article.id,
+                    "is_new": True
+                },
+                "analysis": {
+                    "status": "completed",
+                    "task_id": None
+                }
+            }
+
+        # 近似重复的文章（转载、页脚不同等）已有报告时直接复用，只对不同的句子做局部分析
+        reuse = NearDuplicateService(db).reuse_report(article)
+        db.commit()
+        if reuse:
+            task_id = None
+            if reuse["mode"] == "patched":
+                task_id = task_manager.submit_task(
+                    "article_incremental_analysis",
+                    incremental_analysis_task,
+                    {
+                        "article_id": article.id,
+                        "user_id": current_user.id,
+                        "changed_sentences": len(reuse["changed_sentences"])
+                    },
+                    article.id,
+                    article.content_hash,
+                    reuse["regions"],
+                    reuse["changed_sentences"]
+                )
+            logger.info(f"[API] 复用近似重复文章的分析报告，ID: {article.id}, 来源: {reuse['source_article_id']}")
+            return {
+                "article": {
+                    "id": article.id,
+                    "is_new": True
+                },
+                "analysis": {
+                    "status": "completed",
+                    "task_id": task_id,
+                    "reused_from": reuse["source_article_id"]
+                }
+            }
+
     # 3. 创建或获取分析报告记录
     report = db.query(AnalysisReport).filter(
         AnalysisReport.article_id == article.id
@@ -294,6 +393,7 @@ async def get_analysis_status(
 @router.get("/api/v1/articles/{article_id}/analysis-report")
 async def get_analysis_report(
     article_id: int,
+    exclude: Optional[str] = Query(None, description="逗号分隔的省略内容，目前支持 sentences"),
     current_user: Optional[User] = Depends(get_current_user_optional),
     db: Session = Depends(get_db)
 ):
@@ -304,9 +404,15 @@ async def get_analysis_report(
     - 示例文章（is_demo=True）：任何人都可以访问，无需登录
     - 普通文章：需要登录且是文章所有者
 
+    **分句结果：**
+    分句数组默认附带在 report_data.sentences 中（前端按它渲染句子，sentence_index 与之对应）；
+    传入 ?exclude=sentences 时省略，只返回 sentences_ref 引用，
+    之后可以通过 /api/v1/articles/{article_id}/sentences 单独获取。
+
     Returns:
         {
             "report_data": {...},  # 完整的JSON报告
+            "sentences_ref": {"content_hash": str, "sentence_count": int | null},
             "metadata": {
                 "model_used": str,
                 "tokens_used": int,
@@ -340,8 +446,31 @@ async def get_analysis_report(
             detail="分析报告不存在或尚未完成"
         )
 
+    # 旧报告内嵌了分句，读取时顺带迁移到分句表
+    sentence_service = ArticleSentenceService(db)
+    if sentence_service.detach_from_report(report, article.content_hash, article.content):
+        db.commit()
+
+    report_data = dict(report.report_data)
+    excludes = {item.strip() for item in exclude.split(",")} if exclude else set()
+
+    # 内嵌分句与已保存的分句不同的旧报告保留自己的分句（见 detach_from_report）
+    sentences = report_data.pop("sentences", None)
+    if sentences is None:
+        if "sentences" in excludes:
+            sentences = sentence_service.get(article.content_hash)
+        else:
+            sentences = sentence_service.get_or_split(article.content_hash, article.content)
+            db.commit()
+    if "sentences" not in excludes:
+        report_data["sentences"] = sentences
+
     return {
-        "report_data": report.report_data,
+        "report_data": report_data,
+        "sentences_ref": {
+            "content_hash": article.content_hash,
+            "sentence_count": len(sentences) if sentences is not None else None
+        },
         "metadata": {
             "model_used": report.model_used,
             "tokens_used": report.tokens_used,
@@ -351,6 +480,45 @@ async def get_analysis_report(
     }
 
 
+@router.get("/api/v1/articles/{article_id}/sentences")
+async def get_article_sentences(
+    article_id: int,
+    current_user: Optional[User] = Depends(get_current_user_optional),
+    db: Session = Depends(get_db)
+):
+    """
+    获取文章的分句结果（与分析报告中的 sentence_index 对应）
+
+    **权限控制：** 与分析报告接口一致
+
+    Returns:
+        {
+            "content_hash": str,
+            "sentences": [str, ...],
+            "offsets": [[start, end], ...]  # 句子在文章内容中的字符偏移
+        }
+    """
+    article = db.query(Article).filter(Article.id == article_id).first()
+
+    if not article:
+        raise HTTPException(status_code=404, detail="文章不存在")
+
+    if not article.is_demo:
+        if not current_user:
+            raise HTTPException(status_code=401, detail="需要登录")
+        if article.user_id != current_user.id:
+            raise HTTPException(status_code=403, detail="无权访问此文章")
+
+    segmentation = ArticleSentenceService(db).segment(article.content, article.content_hash)
+    db.commit()
+
+    return {
+        "content_hash": article.content_hash,
+        "sentences": segmentation.sentences,
+        "offsets": segmentation.offsets
+    }
+
+
 @router.post("/api/v1/articles/{article_id}/reanalyze")
 async def reanalyze_article(
     article_id: int,
@@ -373,11 +541,18 @@ async def reanalyze_article(
     if not article:
         raise HTTPException(status_code=404, detail="文章不存在")
 
+    # 权限检查：只能重新分析自己的文章（强制重新分析会覆盖按内容共享的结果）
+    if article.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="无权重新分析此文章")
+
     # 重置分析报告状态
     report = db.query(AnalysisReport).filter(
         AnalysisReport.article_id == article_id
     ).first()
 
+    # 已完成的报告重新分析时重新调用 LLM（并覆盖共享结果）；分析失败等情况优先使用共享结果
+    force = report is not None and report.status == 'completed'
+
     if report:
         report.status = 'pending'
         report.error_message = None
@@ -399,7 +574,8 @@ async def reanalyze_article(
             "user_id": current_user.id,
             "article_title": article.title
         },
-        article_id  # 传递给任务函数的参数
+        article_id,  # 传递给任务函数的参数
+        force
     )
 
     logger.info(f"[API] 重新分析任务已提交，文章ID: {article_id}, 任务ID: {task_id}")
@@ -408,3 +584,82 @@ async def reanalyze_article(
         "task_id": task_id,
         "message": "重新分析已开始"
     }
+
+
+@router.patch("/api/v1/articles/{article_id}/content")
+async def update_article_content(
+    article_id: int,
+    request: UpdateArticleContentRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    修改文章内容并增量重新分析
+
+    按句子哈希对齐新旧内容：未修改句子上的火花和透镜高亮沿用（句子编号按新内容调整），
+    只把修改过的句子连同上下文发给 LLM；修改较多或尚无完成的报告时全量重新分析。
+
+    Returns:
+        {
+            "mode": "unchanged" | "remapped" | "incremental" | "full",
+            "content_hash": str,
+            "sentence_count": int | null,
+            "changed_sentences": int,
+            "carried_sparks": int,
+            "carried_highlights": int,
+            "task_id": str | null
+        }
+    """
+    article = db.query(Article).filter(Article.id == article_id).first()
+    if not article:
+        raise HTTPException(status_code=404, detail="文章不存在")
+    if article.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="无权修改此文章")
+    if not request.content.strip():
+        raise HTTPException(status_code=400, detail="文章内容不能为空")
+
+    result = IncrementalAnalysisService(db).update_content(article, request.content, request.title)
+    mode = result["mode"]
+
+    task_id = None
+    if mode != "unchanged":
+        # 后台重建句子级检索索引
+        submit_article_indexing(article_id)
+
+    if mode == "incremental":
+        task_id = task_manager.submit_task(
+            "article_incremental_analysis",
+            incremental_analysis_task,
+            {
+                "article_id": article_id,
+                "user_id": current_user.id,
+                "changed_sentences": len(result["changed_sentences"])
+            },
+            article_id,
+            result["content_hash"],
+            result["regions"],
+            result["changed_sentences"]
+        )
+    elif mode == "full":
+        task_id = task_manager.submit_task(
+            "article_reanalysis",
+            analyze_article_task,
+            {
+                "article_id": article_id,
+                "user_id": current_user.id,
+                "article_title": article.title
+            },
+            article_id
+        )
+
+    logger.info(f"[API] 文章内容已修改，ID: {article_id}, 模式: {mode}, 任务ID: {task_id}")
+
+    return {
+        "mode": mode,
+        "content_hash": result["content_hash"],
+        "sentence_count": result["sentence_count"],
+        "changed_sentences": len(result["changed_sentences"]),
+        "carried_sparks": result["carried_sparks"],
+        "carried_highlights": result["carried_highlights"],
+        "task_id": task_id
+    }
@@ -36,6 +36,16 @@ class Settings(BaseSettings):
     max_tokens: int = 1000
     temperature: float = 0.7
 
+    # LLM token 预算（见 app/utils/token_budget.py）
+    llm_context_tokens: dict[str, int] = {
+        "gpt-4o": 128000,
+        "gpt-4o-mini": 128000,
+        "deepseek-chat": 64000,
+        "deepseek-reasoner": 64000,
+    }
+    llm_default_context_tokens: int = 32000  # 未配置的模型按该上下文窗口处理
+    token_estimator_save_every: int = 20  # token 估算器每收到多少次实际用量写入一次数据库（见 app/core/token_estimator.py）
+
     # CORS
     cors_origins: list[str] = []
 
@@ -62,6 +72,18 @@ class Settings(BaseSettings):
     mail_tls: bool = True
     mail_ssl: bool = False
 
+    # 火花点击写缓冲（批量写入 + 好奇心指纹延迟刷新）
+    click_buffer_max_events: int = 200  # 缓冲达到该条数立即写入（设为 1 则在请求内同步写入）
+    click_buffer_flush_interval_ms: int = 2000  # 最长写入间隔（毫秒）
+    fingerprint_debounce_seconds: int = 30  # 点击后延迟多久刷新好奇心指纹（窗口内合并）
+
+    # 知识图谱分析（进程内缓存的邻接数组）
+    graph_cache_max_users: int = 32  # 最多缓存多少个用户的图（LRU 淘汰）
+    layout_debounce_seconds: int = 60  # 图谱变化后延迟多久重新计算布局（窗口内合并）
+
+    # 文章分句缓存（按 content_hash 共享，进程内 LRU + article_sentences 表）
+    sentence_cache_max_articles: int = 256  # 进程内最多缓存多少篇文章的分句结果
+
     # Magic Link Settings
     magic_link_expiration_minutes: int = 15
     frontend_url: str = "http://localhost:3000"
@@ -0,0 +1,384 @@
+"""
+火花点击写缓冲
+
+点击事件先进入进程内缓冲（仅一次加锁追加），由后台线程批量写入：
+- 缓冲达到 max_events 条时立即写入
+- 否则每 flush_interval_ms 毫秒写入一次
+- 使用 bulk_insert_mappings 一次提交整批数据；同一事务中依次调用各服务登记的写入回调
+  （register_write_handler：日汇总、知识图谱增量更新、仪表盘快照失效等），缓冲本身不依赖任何服务
+
+写入失败时整批放回缓冲重试；连续失败 MAX_FLUSH_RETRIES 次且数据库可用时，
+改为逐条写入，丢弃出错的事件，避免一条坏数据阻塞全部点击。
+
+写入后的延迟任务（register_user_job）按用户合并：好奇心指纹在 debounce_seconds 秒后统一刷新，
+同一窗口内的多次点击只触发一次重新计算；知识图谱有变化的用户在 layout_debounce_seconds 秒后
+提交后台布局任务（见 graph_layout_service）。
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+logger = logging.getLogger(__name__)
+
+# 缓冲上限：数据库长时间不可用时丢弃最旧的事件，避免内存无限增长
+MAX_BUFFERED_EVENTS = 10000
+
+# 整批连续写入失败该次数后逐条写入，隔离出错的事件
+MAX_FLUSH_RETRIES = 3
+
+# 延迟任务名称
+FINGERPRINT_JOB = "fingerprint"
+LAYOUT_JOB = "layout"
+
+# 写入回调：handler(db, events) 在写入原始点击的同一事务中调用（不提交事务），
+# 可返回一个在提交后执行的回调 after_commit(buffer)，用于清理进程内缓存、登记延迟任务等
+WriteHandler = Callable[[Any, List[Dict[str, Any]]], Optional[Callable[["ClickBuffer"], None]]]
+
+# 延迟任务：job(db, user_id)
+UserJob = Callable[[Any, int], None]
+
+_write_handlers: List[WriteHandler] = []
+_user_jobs: Dict[str, UserJob] = {}
+
+
+def register_write_handler(handler: WriteHandler) -> WriteHandler:
+    """登记点击写入回调（按登记顺序调用，可用作装饰器）"""
+    if handler not in _write_handlers:
+        _write_handlers.append(handler)
+    return handler
+
+
+def register_user_job(name: str, job: UserJob) -> None:
+    """登记延迟任务（FINGERPRINT_JOB / LAYOUT_JOB）"""
+    _user_jobs[name] = job
+
+
+class ClickBuffer:
+    """火花点击写缓冲"""
+
+    def __init__(
+        self,
+        max_events: int = 200,
+        flush_interval_ms: int = 2000,
+        debounce_seconds: float = 30,
+        layout_debounce_seconds: float = 60,
+        session_factory: Optional[Callable] = None
+    ):
+        self.max_events = max_events
+        self.flush_interval = flush_interval_ms / 1000
+        self.debounce_seconds = debounce_seconds
+        self.layout_debounce_seconds = layout_debounce_seconds
+        self._session_factory = session_factory
+
+        self._events: List[Dict[str, Any]] = []
+        # 任务名称 -> {user_id: 执行时间（time.monotonic）}
+        self._pending_jobs: Dict[str, Dict[int, float]] = {}
+        # 整批写入连续失败次数
+        self._failures = 0
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+    # ==================== 写入 ====================
+
+    def enqueue(self, events: List[Dict[str, Any]]) -> int:
+        """
+        追加点击事件（不访问数据库）
+
+        Args:
+            events: SparkClick 列字典列表（user_id, spark_type, spark_text, article_id, clicked_at）
+
+        Returns:
+            入队数量
+        """
+        if self.max_events <= 1:
+            # 同步模式（Serverless）：请求结束后进程可能被冻结，直接在请求内写入
+            with self._lock:
+                self._events.extend(events)
+            self.flush()
+            self.refresh_due_fingerprints()
+            self.refresh_due_layouts()
+            return len(events)
+
+        with self._lock:
+            self._events.extend(events)
+            overflow = len(self._events) - MAX_BUFFERED_EVENTS
+            if overflow > 0:
+                del self._events[:overflow]
+                logger.warning(f"[ClickBuffer] 缓冲已满，丢弃最旧的 {overflow} 条点击")
+            size = len(self._events)
+            self._ensure_worker()
+
+        if size >= self.max_events:
+            self._wakeup.set()
+        return len(events)
+
+    def flush(self) -> int:
+        """
+        立即写入缓冲中的全部事件
+
+        Returns:
+            写入数量
+        """
+        with self._flush_lock:
+            with self._lock:
+                events, self._events = self._events, []
+            if not events:
+                return 0
+
+            db = self._open_session()
+            try:
+                try:
+                    events, after_commit = self._write_batch(db, events)
+                    self._failures = 0
+                except Exception as e:
+                    db.rollback()
+                    self._failures += 1
+                    if self._failures < MAX_FLUSH_RETRIES or not self._database_available(db):
+                        self._requeue(events)
+                        logger.error(
+                            f"[ClickBuffer] 批量写入失败（第 {self._failures} 次），{len(events)} 条点击将重试: {str(e)}"
+                        )
+                        return 0
+                    # 数据库可用但整批反复失败：逐条写入，丢弃出错的事件
+                    logger.error(f"[ClickBuffer] 批量写入连续失败 {self._failures} 次，改为逐条写入: {str(e)}")
+                    events, after_commit = self._write_each(db, events)
+                    self._failures = 0
+            finally:
+                db.close()
+
+            for callback in after_commit:
+                callback(self)
+
+            logger.info(f"[ClickBuffer] 批量写入 {len(events)} 条点击")
+            return len(events)
+
+    def _write_batch(self, db, events: List[Dict[str, Any]]):
+        """
+        整批写入。返回 (写入的事件, 提交后回调)
+
+        违反约束时：确有用户在点击入队后被删除则丢弃这些点击后重试一次；
+        否则是事件本身的问题（字段缺失、汇总表冲突等），整批重试同样会失败，直接逐条写入。
+        """
+        from app.models.models import User
+
+        try:
+            return events, self._write(db, events)
+        except IntegrityError as e:
+            db.rollback()
+            user_ids = {event["user_id"] for event in events}
+            existing = {
+                row[0] for row in db.query(User.id).filter(User.id.in_(user_ids))
+            }
+            missing = user_ids - existing
+            if not missing:
+                logger.error(f"[ClickBuffer] 批量写入违反约束，改为逐条写入: {str(e)}")
+                return self._write_each(db, events)
+
+            events = [event for event in events if event["user_id"] in existing]
+            logger.warning(f"[ClickBuffer] 丢弃不存在用户的点击: {sorted(missing)}")
+            return events, self._write(db, events)
+
+    def _write_each(self, db, events: List[Dict[str, Any]]):
+        """逐条写入，丢弃出错的事件。返回 (写入的事件, 提交后回调)"""
+        written = []
+        after_commit = []
+        for event in events:
+            try:
+                after_commit.extend(self._write(db, [event]))
+                written.append(event)
+            except Exception as e:
+                db.rollback()
+                logger.error(f"[ClickBuffer] 丢弃无法写入的点击: {event!r}, error={str(e)}")
+        return written, after_commit
+
+    @staticmethod
+    def _write(db, events: List[Dict[str, Any]]) -> List[Callable[["ClickBuffer"], None]]:
+        """
+        在同一事务中写入原始点击并调用各写入回调，然后提交
+
+        Returns:
+            提交后执行的回调
+        """
+        from app.models.models import SparkClick
+
+        if not events:
+            return []
+        db.bulk_insert_mappings(SparkClick, events)
+        after_commit = [handler(db, events) for handler in list(_write_handlers)]
+        db.commit()
+        return [callback for callback in after_commit if callback is not None]
+
+    def _requeue(self, events: List[Dict[str, Any]]) -> None:
+        """写入失败的事件放回缓冲头部（同样受 MAX_BUFFERED_EVENTS 限制）"""
+        with self._lock:
+            self._events[:0] = events
+            overflow = len(self._events) - MAX_BUFFERED_EVENTS
+            if overflow > 0:
+                del self._events[:overflow]
+                logger.warning(f"[ClickBuffer] 缓冲已满，丢弃最旧的 {overflow} 条点击")
+
+    @staticmethod
+    def _database_available(db) -> bool:
+        """数据库不可用时整批失败与事件内容无关，不应逐条丢弃"""
+        try:
+            db.execute(text("SELECT 1"))
+            return True
+        except Exception:
+            db.rollback()
+            return False
+
+    # ==================== 延迟任务 ====================
+
+    def schedule(self, job: str, user_ids: Iterable[int], delay: float) -> None:
+        """
+        登记延迟任务
+
+        Args:
+            job: 任务名称
+            user_ids: 用户 ID
+            delay: 延迟秒数；已在等待的用户不推迟，保证任务最迟 delay 秒后执行
+        """
+        due = time.monotonic() + delay
+        with self._lock:
+            pending = self._pending_jobs.setdefault(job, {})
+            for user_id in user_ids:
+                pending.setdefault(user_id, due)
+
+    def run_due_jobs(self, job: str, force: bool = False) -> int:
+        """
+        执行已到期的延迟任务
+
+        Args:
+            job: 任务名称
+            force: 忽略等待时间，执行全部待处理用户
+
+        Returns:
+            执行的用户数量
+        """
+        now = time.monotonic()
+        with self._lock:
+            pending = self._pending_jobs.get(job, {})
+            due_users = [user_id for user_id, due in pending.items() if force or due <= now]
+            for user_id in due_users:
+                del pending[user_id]
+
+        if not due_users:
+            return 0
+        handler = _user_jobs.get(job)
+        if handler is None:
+            logger.warning(f"[ClickBuffer] 未登记的延迟任务: {job}，跳过 {len(due_users)} 个用户")
+            return 0
+
+        db = self._open_session()
+        try:
+            for user_id in due_users:
+                try:
+                    handler(db, user_id)
+                except Exception as e:
+                    db.rollback()
+                    logger.error(f"[ClickBuffer] 用户 {user_id} 延迟任务 {job} 失败: {str(e)}")
+        finally:
+            db.close()
+
+        return len(due_users)
+
+    # ==================== 好奇心指纹 ====================
+
+    def schedule_fingerprints(self, user_ids: Iterable[int]) -> None:
+        """登记需要刷新好奇心指纹的用户（debounce_seconds 秒后刷新）"""
+        self.schedule(FINGERPRINT_JOB, user_ids, self.debounce_seconds)
+
+    def refresh_due_fingerprints(self, force: bool = False) -> int:
+        """
+        刷新已到期的好奇心指纹
+
+        Args:
+            force: 忽略等待时间，刷新全部待处理用户
+
+        Returns:
+            刷新的用户数量
+        """
+        return self.run_due_jobs(FINGERPRINT_JOB, force)
+
+    # ==================== 图谱布局 ====================
+
+    def schedule_layouts(self, user_ids: Iterable[int], delay: Optional[float] = None) -> None:
+        """
+        登记需要重新布局的用户
+
+        Args:
+            user_ids: 用户 ID
+            delay: 延迟秒数（默认 layout_debounce_seconds）；已在等待的用户不推迟
+        """
+        self.schedule(LAYOUT_JOB, user_ids, self.layout_debounce_seconds if delay is None else delay)
+
+    def refresh_due_layouts(self) -> int:
+        """
+        为已到期的用户提交后台布局任务
+
+        Returns:
+            提交的用户数量
+        """
+        return self.run_due_jobs(LAYOUT_JOB)
+
+    def pending_count(self) -> int:
+        """缓冲中尚未写入的事件数量"""
+        with self._lock:
+            return len(self._events)
+
+    def shutdown(self) -> None:
+        """写入剩余事件并刷新全部待处理指纹（应用关闭时调用）"""
+        self.flush()
+        self.refresh_due_fingerprints(force=True)
+
+    # ==================== 后台线程 ====================
+
+    def _ensure_worker(self) -> None:
+        """按需启动后台写入线程（调用方需持有 self._lock）"""
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name="click-buffer", daemon=True)
+            self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+                self.refresh_due_fingerprints()
+                self.refresh_due_layouts()
+            except Exception as e:
+                logger.error(f"[ClickBuffer] 后台写入异常: {str(e)}", exc_info=True)
+
+    def _open_session(self):
+        if self._session_factory is None:
+            from app.db.database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+
+def _create_default_buffer() -> ClickBuffer:
+    from app.config import settings
+
+    # Vercel 等 Serverless 环境没有常驻后台线程，使用同步模式
+    max_events = 1 if os.environ.get("VERCEL") else settings.click_buffer_max_events
+
+    return ClickBuffer(
+        max_events=max_events,
+        flush_interval_ms=settings.click_buffer_flush_interval_ms,
+        debounce_seconds=settings.fingerprint_debounce_seconds,
+        layout_debounce_seconds=settings.layout_debounce_seconds
+    )
+
+
+# 全局单例
+click_buffer = _create_default_buffer()
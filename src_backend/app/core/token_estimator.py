@@ -0,0 +1,318 @@
+"""
+自校准的 token 估算器
+
+不依赖分词器：把文本按字符类别计数（CJK、拉丁字母、数字、标点符号、空白、其他），
+token 数估算为各类字符数的线性组合，再加上每条消息的格式开销：
+
+    tokens ≈ Σ 系数[类别] × 字符数[类别] + 系数[消息] × 消息数
+
+系数按模型分别拟合：每次 LLM 调用返回的 response.usage（prompt_tokens / completion_tokens）
+作为一个观测，在线累加最小二乘的正规方程 XᵀX、Xᵀy，再求解
+(XᵀX + Λ) w = Xᵀy + Λ w₀ —— Λ 相当于几次按默认系数 w₀ 的虚拟观测，
+观测很少时估算接近默认值，观测增多后由实际用量决定。
+
+统计量保存在 token_estimator_stats 表：进程内只记录增量，每 save_every 次观测（以及应用关闭时）
+把增量累加到数据库再读回合计，多个进程共享同一份统计。应用启动时加载已有统计。
+observe 通常在事件循环中调用，达到 save_every 时在后台线程中保存，不阻塞请求。
+"""
+
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FEATURES = ("cjk", "latin", "digit", "punct", "space", "other", "messages")
+
+# 默认系数（每个字符 / 每条消息的 token 数），未观测到实际用量前使用
+DEFAULT_COEFFICIENTS = np.array([0.7, 0.25, 0.35, 0.5, 0.1, 1.0, 4.0])
+
+# 先验强度：相当于 PRIOR_SAMPLES 次各类字符数为 PRIOR_SCALE 的虚拟观测
+PRIOR_SAMPLES = 2
+PRIOR_SCALE = np.array([100.0, 100.0, 20.0, 20.0, 20.0, 10.0, 1.0])
+
+# 每次回复的固定开销（回复起始标记）
+REPLY_OVERHEAD_TOKENS = 3
+
+_DIMENSIONS = len(FEATURES)
+_PRIOR = np.diag(PRIOR_SAMPLES * PRIOR_SCALE ** 2)
+
+_CJK_RANGES = (
+    (0x3040, 0x30ff),    # 日文假名
+    (0x3400, 0x4dbf),    # CJK 扩展 A
+    (0x4e00, 0x9fff),    # CJK 统一表意文字
+    (0xac00, 0xd7af),    # 韩文音节
+    (0xf900, 0xfaff),    # CJK 兼容表意文字
+    (0x20000, 0x2fa1f),  # CJK 扩展 B 及以后
+)
+_LATIN_RANGES = ((0x41, 0x5a), (0x61, 0x7a), (0xc0, 0x24f))
+_PUNCT_RANGES = (
+    (0x21, 0x2f), (0x3a, 0x40), (0x5b, 0x60), (0x7b, 0x7e),
+    (0x2000, 0x206f),  # 通用标点
+    (0x3000, 0x303f),  # CJK 标点
+    (0xff00, 0xffef),  # 全角字符
+)
+
+
+def _in_ranges(codes: np.ndarray, ranges) -> np.ndarray:
+    mask = np.zeros(len(codes), dtype=bool)
+    for low, high in ranges:
+        mask |= (codes >= low) & (codes <= high)
+    return mask
+
+
+def script_counts(text: str) -> np.ndarray:
+    """各类字符数（不含消息数），长度为 len(FEATURES) - 1"""
+    if not text:
+        return np.zeros(_DIMENSIONS - 1)
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+    cjk = _in_ranges(codes, _CJK_RANGES)
+    latin = _in_ranges(codes, _LATIN_RANGES)
+    digit = (codes >= 0x30) & (codes <= 0x39)
+    space = (codes == 0x20) | (codes == 0x09) | (codes == 0x0a) | (codes == 0x0d) | (codes == 0x3000)
+    punct = _in_ranges(codes, _PUNCT_RANGES) & ~space
+    counts = np.array([cjk.sum(), latin.sum(), digit.sum(), punct.sum(), space.sum()], dtype=np.float64)
+    return np.append(counts, len(codes) - counts.sum())
+
+
+def message_features(messages: Sequence[Dict]) -> np.ndarray:
+    """消息列表的特征（各类字符数 + 消息数）"""
+    counts = np.zeros(_DIMENSIONS - 1)
+    for message in messages:
+        counts += script_counts(message.get("content") or "")
+    return np.append(counts, len(messages))
+
+
+def text_features(text: str) -> np.ndarray:
+    """单段文本的特征（消息数为 0）"""
+    return np.append(script_counts(text), 0.0)
+
+
+class _ModelStats:
+    """一个模型的正规方程统计量"""
+
+    def __init__(self):
+        self.xtx = np.zeros((_DIMENSIONS, _DIMENSIONS))
+        self.xty = np.zeros(_DIMENSIONS)
+        self.samples = 0
+
+    def add(self, features: np.ndarray, tokens: float) -> None:
+        self.xtx += np.outer(features, features)
+        self.xty += features * tokens
+        self.samples += 1
+
+    def merge(self, other: "_ModelStats") -> None:
+        self.xtx += other.xtx
+        self.xty += other.xty
+        self.samples += other.samples
+
+    def solve(self) -> np.ndarray:
+        coefficients = np.linalg.solve(self.xtx + _PRIOR, self.xty + _PRIOR @ DEFAULT_COEFFICIENTS)
+        return np.clip(coefficients, 0.0, None)
+
+
+class TokenEstimator:
+    """按模型在线校准的 token 估算器（线程安全）"""
+
+    def __init__(self, save_every: int = 20, session_factory: Optional[Callable] = None, background: bool = True):
+        self.save_every = save_every
+        self.background = background
+        self._session_factory = session_factory
+
+        self._totals: Dict[str, _ModelStats] = {}
+        self._pending: Dict[str, _ModelStats] = {}
+        self._coefficients: Dict[str, np.ndarray] = {}
+        self._pending_samples = 0
+        self._save_thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    # ==================== 估算 ====================
+
+    def coefficients(self, model: str) -> np.ndarray:
+        """当前系数（顺序同 FEATURES）"""
+        with self._lock:
+            return self._coefficients.get(model, DEFAULT_COEFFICIENTS)
+
+    def estimate(self, text: str, model: str) -> int:
+        """估算文本的 token 数"""
+        if not text:
+            return 0
+        return int(np.ceil(text_features(text) @ self.coefficients(model)))
+
+    def estimate_messages(self, messages: Sequence[Dict], model: str) -> int:
+        """估算消息列表（含格式开销）的 token 数"""
+        return int(np.ceil(message_features(messages) @ self.coefficients(model))) + REPLY_OVERHEAD_TOKENS
+
+    # ==================== 校准 ====================
+
+    def observe(self, model: str, features: np.ndarray, tokens: int) -> None:
+        """记录一次实际用量"""
+        with self._lock:
+            self._pending.setdefault(model, _ModelStats()).add(features, tokens)
+            stats = _ModelStats()
+            stats.merge(self._totals.get(model, _ModelStats()))
+            stats.merge(self._pending[model])
+            self._coefficients[model] = stats.solve()
+            self._pending_samples += 1
+            should_save = self.save_every > 0 and self._pending_samples >= self.save_every
+        if should_save:
+            if self.background:
+                self._save_in_background()
+            else:
+                self.save()
+
+    def observe_response(self, model: str, messages: Sequence[Dict], response) -> None:
+        """
+        用 LLM 非流式响应的 usage 校准（不影响调用方：缺少 usage 或出错时忽略）
+
+        Args:
+            model: 调用时指定的模型
+            messages: 发送的消息列表
+            response: chat.completions.create 的非流式响应
+        """
+        try:
+            usage = getattr(response, "usage", None)
+            if usage is None:
+                return
+            self.observe_usage(model, messages, response.choices[0].message.content, usage)
+        except Exception as e:
+            logger.warning(f"[TokenEstimator] 记录用量失败: model={model}, error={str(e)}")
+
+    def observe_usage(self, model: str, messages: Sequence[Dict], content: Optional[str], usage) -> None:
+        """
+        用一次调用的 usage 校准（不影响调用方：缺少 usage 或出错时忽略）
+
+        Args:
+            model: 调用时指定的模型
+            messages: 发送的消息列表
+            content: 返回的文本（流式调用为全部片段拼接的结果）
+            usage: 响应的 usage（流式调用指定 stream_options={"include_usage": True} 时由最后一个片段返回）
+        """
+        try:
+            if usage is None:
+                return
+            if usage.prompt_tokens:
+                self.observe(model, message_features(messages), usage.prompt_tokens - REPLY_OVERHEAD_TOKENS)
+            details = getattr(usage, "completion_tokens_details", None)
+            reasoning_tokens = getattr(details, "reasoning_tokens", 0) or 0
+            # 推理模型的思考 token 不在返回的文本里，不参与校准
+            if content and usage.completion_tokens and not reasoning_tokens:
+                self.observe(model, text_features(content), usage.completion_tokens)
+        except Exception as e:
+            logger.warning(f"[TokenEstimator] 记录用量失败: model={model}, error={str(e)}")
+
+    # ==================== 持久化 ====================
+
+    def load(self) -> int:
+        """从数据库加载各模型的统计量，返回模型数"""
+        from app.models.models import TokenEstimatorStats
+
+        db = self._open_session()
+        try:
+            rows = db.query(TokenEstimatorStats).all()
+            with self._lock:
+                for row in rows:
+                    self._set_totals(row)
+            logger.info(f"[TokenEstimator] 已加载 {len(rows)} 个模型的校准数据")
+            return len(rows)
+        finally:
+            db.close()
+
+    def save(self) -> int:
+        """把未保存的观测累加到数据库，并读回合计（多个进程共享统计），返回写入的观测数"""
+        from app.models.models import TokenEstimatorStats
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._pending_samples = 0
+        if not pending:
+            return 0
+
+        db = self._open_session()
+        try:
+            rows = []
+            for model, stats in pending.items():
+                row = db.query(TokenEstimatorStats).filter(
+                    TokenEstimatorStats.model == model
+                ).with_for_update().first()
+                if row is None:
+                    row = TokenEstimatorStats(model=model, xtx=np.zeros((_DIMENSIONS, _DIMENSIONS)).tolist(),
+                                              xty=[0.0] * _DIMENSIONS, sample_count=0)
+                    db.add(row)
+                xtx = np.asarray(row.xtx, dtype=np.float64) + stats.xtx
+                xty = np.asarray(row.xty, dtype=np.float64) + stats.xty
+                # 整体赋值，确保 JSON 列的变更被 ORM 检测到
+                row.xtx = xtx.tolist()
+                row.xty = xty.tolist()
+                row.sample_count = (row.sample_count or 0) + stats.samples
+                row.updated_at = datetime.utcnow()
+                rows.append(row)
+            for row in rows:
+                totals = _ModelStats()
+                totals.xtx, totals.xty, totals.samples = np.asarray(row.xtx), np.asarray(row.xty), row.sample_count
+                row.coefficients = dict(zip(FEATURES, totals.solve().round(4).tolist()))
+            db.commit()
+
+            with self._lock:
+                for row in rows:
+                    self._set_totals(row)
+            samples = sum(stats.samples for stats in pending.values())
+            logger.info(f"[TokenEstimator] 已保存 {samples} 次观测（{len(pending)} 个模型）")
+            return samples
+        except Exception as e:
+            db.rollback()
+            # 放回未保存的观测，下次再试
+            with self._lock:
+                for model, stats in pending.items():
+                    self._pending.setdefault(model, _ModelStats()).merge(stats)
+                    self._pending_samples += stats.samples
+            logger.error(f"[TokenEstimator] 保存校准数据失败: {str(e)}")
+            return 0
+        finally:
+            db.close()
+
+    def _save_in_background(self) -> None:
+        """在后台线程中保存（已有保存线程在运行时跳过，剩余的观测下次再保存）"""
+        with self._lock:
+            if self._save_thread is not None and self._save_thread.is_alive():
+                return
+            self._save_thread = threading.Thread(target=self.save, name="token-estimator-save", daemon=True)
+            self._save_thread.start()
+
+    def _set_totals(self, row) -> None:
+        """用数据库中的合计更新进程内统计（调用方需持有 self._lock）"""
+        totals = _ModelStats()
+        totals.xtx = np.asarray(row.xtx, dtype=np.float64)
+        totals.xty = np.asarray(row.xty, dtype=np.float64)
+        totals.samples = row.sample_count
+        self._totals[row.model] = totals
+
+        combined = _ModelStats()
+        combined.merge(totals)
+        if row.model in self._pending:
+            combined.merge(self._pending[row.model])
+        self._coefficients[row.model] = combined.solve()
+
+    def _open_session(self):
+        if self._session_factory is None:
+            from app.db.database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+
+def _create_default_estimator() -> TokenEstimator:
+    from app.config import settings
+
+    # Vercel 等 Serverless 环境没有常驻后台线程，同步保存
+    return TokenEstimator(
+        save_every=settings.token_estimator_save_every,
+        background=not os.environ.get("VERCEL")
+    )
+
+
+# 全局单例
+token_estimator = _create_default_estimator()
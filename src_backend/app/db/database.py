@@ -41,6 +41,16 @@ def init_db():
     try:
         Base.metadata.create_all(bind=engine)
         logger.info(f"[OK] Database tables initialized successfully")
+
+        # PostgreSQL：压缩列（bytea）替换旧的 TEXT/JSON 列，必须在写入前完成
+        from app.db.migrate_compress_blobs import convert_compressed_columns
+        altered = convert_compressed_columns(engine)
+        if altered:
+            logger.info(f"[OK] Converted {altered} legacy columns to BYTEA")
+
+        # 全文检索索引（FTS5 / tsvector 不能通过 ORM 声明）
+        from app.services.search_service import init_search_index
+        init_search_index(engine)
     except Exception as e:
         logger.error(f"[ERROR] Failed to initialize database: {str(e)}")
         raise
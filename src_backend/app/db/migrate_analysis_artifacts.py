@@ -0,0 +1,46 @@
+"""
+创建 analysis_artifacts 表（按内容哈希跨用户共享的分析结果），
+并为 analysis_reports / meta_analyses / thinking_lens_results 添加 artifact_id 字段
+
+新建数据库由 init_db 自动创建；此脚本用于已有数据库，可重复执行。
+历史分析结果不回填：下一次分析相同内容时写入共享表。
+
+运行方式：
+python -m app.db.migrate_analysis_artifacts
+"""
+
+import logging
+
+from sqlalchemy import inspect, text
+
+from app.db.database import engine, init_db
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TABLES = ("analysis_reports", "meta_analyses", "thinking_lens_results")
+
+
+def migrate():
+    try:
+        # 确保 analysis_artifacts 表已创建
+        init_db()
+
+        inspector = inspect(engine)
+        with engine.begin() as conn:
+            for table in TABLES:
+                columns = {column["name"] for column in inspector.get_columns(table)}
+                if "artifact_id" in columns:
+                    continue
+                logger.info(f"🔄 添加字段 {table}.artifact_id ...")
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN artifact_id INTEGER REFERENCES analysis_artifacts(id)"))
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table}_artifact_id ON {table} (artifact_id)"))
+
+        logger.info("✅ 迁移完成！")
+    except Exception as e:
+        logger.error(f"❌ 迁移失败: {str(e)}")
+        raise
+
+
+if __name__ == "__main__":
+    migrate()
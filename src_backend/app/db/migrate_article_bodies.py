@@ -0,0 +1,74 @@
+"""
+创建 article_bodies 表（按 SHA-256 内容寻址的文章正文），并把历史文章的正文迁入
+
+迁移后 articles.content 只保留空字符串，相同正文在 article_bodies 中只存一份，
+ref_count 记录引用它的文章数。按主键分批处理，每批单独提交；中断后重新运行会跳过已迁移的文章。
+
+运行方式：
+python -m app.db.migrate_article_bodies [--batch-size 200]
+"""
+
+import argparse
+import logging
+
+from sqlalchemy import func, inspect, text
+
+from app.db.database import SessionLocal, engine, init_db
+from app.models.models import Article, ArticleBody, collect_article_bodies
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def migrate(batch_size: int = 200):
+    # 确保 article_bodies 表已创建
+    init_db()
+
+    columns = {column["name"] for column in inspect(engine).get_columns("articles")}
+    if "body_sha256" not in columns:
+        logger.info("🔄 添加字段 articles.body_sha256 ...")
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE articles ADD COLUMN body_sha256 VARCHAR(64) REFERENCES article_bodies(sha256)"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_articles_body_sha256 ON articles (body_sha256)"))
+
+    db = SessionLocal()
+    try:
+        logger.info("🔄 开始迁移文章正文...")
+        count = 0
+        last_id = 0
+        while True:
+            articles = db.query(Article).filter(
+                Article.body_sha256.is_(None),
+                Article.id > last_id
+            ).order_by(Article.id).limit(batch_size).all()
+            if not articles:
+                break
+            for article in articles:
+                # 重新赋值即写入正文表（见 Article.content）
+                article.content = article.content
+            last_id = articles[-1].id
+            db.commit()
+            count += len(articles)
+            logger.info(f"   已迁移 {count} 篇文章")
+
+        # 回收计数归零的正文（修复中断的回收）
+        collected = collect_article_bodies(db)
+        db.commit()
+        if collected:
+            logger.info(f"   回收 {collected} 份无引用的正文")
+
+        bodies, total_size = db.query(func.count(ArticleBody.sha256), func.sum(ArticleBody.size)).one()
+        logger.info(f"✅ 迁移完成！共迁移 {count} 篇文章，正文表 {bodies} 条，约 {(total_size or 0) / 1024 / 1024:.1f} MB")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ 迁移失败: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="迁移文章正文到 article_bodies 表")
+    parser.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args()
+    migrate(batch_size=args.batch_size)
@@ -0,0 +1,37 @@
+"""
+为已有文章计算 SimHash 内容指纹（近似重复检测）
+
+创建 article_fingerprints 表并为历史文章回填指纹；新保存的文章会自动计算指纹。
+
+运行方式：
+python -m app.db.migrate_article_fingerprints
+"""
+
+import logging
+
+from app.db.database import SessionLocal, init_db
+from app.services.near_duplicate_service import NearDuplicateService
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def migrate():
+    # 确保 article_fingerprints 表已创建
+    init_db()
+
+    db = SessionLocal()
+    try:
+        logger.info("🔄 开始为没有指纹的文章计算内容指纹...")
+        count = NearDuplicateService(db).backfill()
+        logger.info(f"✅ 迁移完成！共处理 {count} 篇文章")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ 迁移失败: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    migrate()
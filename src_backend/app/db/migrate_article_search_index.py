@@ -0,0 +1,37 @@
+"""
+为已有文章建立句子级检索索引
+
+新保存的文章会在后台自动建立索引，此脚本用于回填历史文章或修复索引。
+
+运行方式：
+python -m app.db.migrate_article_search_index
+"""
+
+import logging
+
+from app.db.database import SessionLocal, init_db
+from app.services.article_search_service import ArticleSearchService
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def migrate():
+    # 确保 article_search_* 表已创建
+    init_db()
+
+    db = SessionLocal()
+    try:
+        logger.info("🔄 开始为未索引的文章建立检索索引...")
+        count = ArticleSearchService(db).index_missing()
+        logger.info(f"✅ 迁移完成！共索引 {count} 篇文章")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ 迁移失败: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    migrate()
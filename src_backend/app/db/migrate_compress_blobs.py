@@ -0,0 +1,199 @@
+"""
+将大字段的历史数据转换为压缩存储格式（见 app/db/types.py）
+
+涉及字段：
+- articles.content（旧数据，迁移到 article_bodies 之前）
+- article_bodies.content
+- article_sentences.sentences
+- analysis_reports.report_data
+- insight_history.reasoning
+- meta_analyses.raw_llm_response
+
+PostgreSQL 中压缩列写入的是 bytea，旧的 TEXT/JSON 列必须先改为 BYTEA 才能写入：
+init_db（应用启动 / 部署时）会调用 convert_compressed_columns 完成列类型转换
+（USING convert_to(...) 保留旧内容，转换期间锁表）。SQLite 列类型宽松，无需转换。
+
+列类型转换之后，压缩列类型可以直接读取未压缩的旧数据，此脚本只用于回收存储空间，
+可在服务运行期间后台执行：按主键分批处理，每批单独提交，批次之间休眠以降低数据库压力。
+中断后重新运行会跳过已转换的行。
+
+运行方式：
+python -m app.db.migrate_compress_blobs [--batch-size 200] [--sleep 0.2]
+"""
+
+import argparse
+import logging
+import time
+
+from sqlalchemy import bindparam, inspect, text
+from sqlalchemy.types import LargeBinary
+
+from app.db.database import engine
+from app.db.types import FORMAT_RAW, FORMAT_ZLIB, FORMAT_ZSTD, CompressedJSON, CompressedText, compress_text
+
+logger = logging.getLogger(__name__)
+
+# (表名, 主键列, 压缩列)
+COMPRESSED_COLUMNS = [
+    ("articles", "id", "content"),
+    ("article_bodies", "sha256", "content"),
+    ("article_sentences", "content_hash", "sentences"),
+    ("analysis_reports", "id", "report_data"),
+    ("insight_history", "id", "reasoning"),
+    ("meta_analyses", "id", "raw_llm_response"),
+]
+
+_VERSION_BYTES = (FORMAT_RAW, FORMAT_ZLIB, FORMAT_ZSTD)
+
+
+def _is_encoded(value) -> bool:
+    """判断是否已经是带版本字节的存储格式"""
+    return isinstance(value, (bytes, bytearray, memoryview)) and len(value) > 0 and value[0] in _VERSION_BYTES
+
+
+def _legacy_text(value) -> str:
+    """将旧数据统一转换为文本"""
+    if isinstance(value, str):
+        return value
+    return bytes(value).decode("utf-8")
+
+
+def _alter_postgres_columns(conn, table: str, column: str) -> bool:
+    """PostgreSQL：将 TEXT/JSON 列改为 BYTEA，保留原有内容；返回是否修改"""
+    columns = {col["name"]: col for col in inspect(conn).get_columns(table)}
+    if column not in columns or isinstance(columns[column]["type"], LargeBinary):
+        return False
+
+    logger.info(f"🔄 修改列类型: {table}.{column} -> BYTEA")
+    conn.execute(text(
+        f"ALTER TABLE {table} ALTER COLUMN {column} TYPE BYTEA "
+        f"USING convert_to({column}::text, 'UTF8')"
+    ))
+    return True
+
+
+def _model_compressed_columns():
+    """模型中声明为压缩类型的所有 (表名, 列名)"""
+    from app.models.models import Base
+
+    return [
+        (table.name, column.name)
+        for table in Base.metadata.sorted_tables
+        for column in table.columns
+        if isinstance(column.type, (CompressedText, CompressedJSON))
+    ]
+
+
+def convert_compressed_columns(bind) -> int:
+    """
+    PostgreSQL：把压缩列中仍为 TEXT/JSON 的旧列改为 BYTEA（幂等，由 init_db 调用）
+
+    Args:
+        bind: 数据库引擎
+
+    Returns:
+        修改的列数
+    """
+    if bind.dialect.name != "postgresql":
+        return 0
+
+    existing_tables = set(inspect(bind).get_table_names())
+    altered = 0
+    with bind.begin() as conn:
+        for table, column in _model_compressed_columns():
+            if table in existing_tables and _alter_postgres_columns(conn, table, column):
+                altered += 1
+    return altered
+
+
+def migrate_column(table: str, pk: str, column: str, batch_size: int, sleep: float) -> dict:
+    """
+    分批转换单个列
+
+    Returns:
+        {"rows": 处理行数, "converted": 转换行数, "bytes_before": ..., "bytes_after": ...}
+    """
+    stats = {"rows": 0, "converted": 0, "bytes_before": 0, "bytes_after": 0}
+
+    select_sql = text(
+        f"SELECT {pk}, {column} FROM {table} "
+        f"WHERE {pk} > :last_pk AND {column} IS NOT NULL ORDER BY {pk} LIMIT :limit"
+    )
+    update_sql = text(
+        f"UPDATE {table} SET {column} = :value WHERE {pk} = :pk"
+    ).bindparams(bindparam("value", type_=LargeBinary))
+
+    last_pk = 0 if pk == "id" else ""
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(select_sql, {"last_pk": last_pk, "limit": batch_size}).fetchall()
+            if not rows:
+                break
+
+            for row_pk, value in rows:
+                stats["rows"] += 1
+                if _is_encoded(value):
+                    continue
+
+                raw = _legacy_text(value)
+                encoded = compress_text(raw)
+                if encoded[0] == FORMAT_RAW:
+                    # 低于阈值或不可压缩：保留旧数据，读取时同样兼容
+                    continue
+                conn.execute(update_sql, {"value": encoded, "pk": row_pk})
+
+                stats["converted"] += 1
+                stats["bytes_before"] += len(raw.encode("utf-8"))
+                stats["bytes_after"] += len(encoded)
+
+            last_pk = rows[-1][0]
+
+        logger.info(f"  {table}.{column}: 已处理至 {pk}={last_pk}，累计转换 {stats['converted']} 行")
+        if sleep > 0:
+            time.sleep(sleep)
+
+    return stats
+
+
+def migrate(batch_size: int = 200, sleep: float = 0.2):
+    existing_tables = set(inspect(engine).get_table_names())
+
+    try:
+        convert_compressed_columns(engine)
+
+        total_before = total_after = 0
+        for table, pk, column in COMPRESSED_COLUMNS:
+            if table not in existing_tables:
+                logger.info(f"⏭️  表 {table} 不存在，跳过")
+                continue
+
+            logger.info(f"🔄 开始压缩 {table}.{column} ...")
+            stats = migrate_column(table, pk, column, batch_size, sleep)
+            total_before += stats["bytes_before"]
+            total_after += stats["bytes_after"]
+
+            saved = stats["bytes_before"] - stats["bytes_after"]
+            logger.info(
+                f"✅ {table}.{column}: 扫描 {stats['rows']} 行，转换 {stats['converted']} 行，"
+                f"节省 {saved / 1024:.1f} KB"
+            )
+
+        if total_before:
+            ratio = total_after / total_before
+            logger.info(f"✅ 迁移完成！总计 {total_before / 1024:.1f} KB -> {total_after / 1024:.1f} KB（{ratio:.1%}）")
+        else:
+            logger.info("✅ 迁移完成！没有需要转换的数据")
+        logger.info("💡 SQLite 需执行 VACUUM 才能释放文件空间")
+    except Exception as e:
+        logger.error(f"❌ 迁移失败: {str(e)}")
+        raise
+
+
+if __name__ == "__main__":
+    # init_db 也会导入本模块，日志配置只在单独运行时设置
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="压缩大字段历史数据")
+    parser.add_argument("--batch-size", type=int, default=200, help="每批处理行数")
+    parser.add_argument("--sleep", type=float, default=0.2, help="批次之间休眠秒数")
+    args = parser.parse_args()
+    migrate(batch_size=args.batch_size, sleep=args.sleep)
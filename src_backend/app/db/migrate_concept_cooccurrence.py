@@ -0,0 +1,67 @@
+"""
+为知识图谱增量维护准备数据（article_concepts / concept_cooccurrences）
+
+- 创建 knowledge_nodes、article_concepts 的 (user_id, label) 索引
+- 按用户根据历史概念点击重建图谱：回填文章概念与共现计数，
+  已有节点按概念名称保留原 ID
+
+新点击在写入时自动增量更新，此脚本用于一次性回填历史数据或修复图谱。
+按用户逐个重建并提交，可重复执行。
+
+运行方式：
+python -m app.db.migrate_concept_cooccurrence
+"""
+
+import logging
+
+from sqlalchemy import text
+
+from app.db.database import SessionLocal, engine, init_db
+from app.models.models import SparkClick
+from app.services.knowledge_graph_service import KnowledgeGraphService
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def migrate():
+    # 确保 article_concepts / concept_cooccurrences 表已创建
+    init_db()
+
+    logger.info("🔄 创建索引 idx_knowledge_nodes_user_label / idx_article_concepts_user_label ...")
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_knowledge_nodes_user_label
+            ON knowledge_nodes(user_id, label)
+        """))
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_article_concepts_user_label
+            ON article_concepts(user_id, label)
+        """))
+
+    db = SessionLocal()
+    try:
+        user_ids = [
+            row[0] for row in db.query(SparkClick.user_id).filter(
+                SparkClick.spark_type == "concept"
+            ).distinct().order_by(SparkClick.user_id)
+        ]
+        logger.info(f"🔄 开始回填概念共现，共 {len(user_ids)} 个用户...")
+
+        service = KnowledgeGraphService(db)
+        for user_id in user_ids:
+            result = service.rebuild_graph(user_id)
+            logger.info(f"  User {user_id}: {result['nodes_created']} 节点, {result['edges_created']} 边")
+            db.expunge_all()
+
+        logger.info("✅ 迁移完成！")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ 迁移失败: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,39 @@
+"""
+修复旧版本以 \\uXXXX 转义保存的洞察卡片标签
+
+旧版本保存标签时使用了 json.dumps 的默认转义，中文标签无法被全文检索命中。
+此脚本把这些标签改存为原文并重建对应卡片的全文索引（幂等，可重复执行）。
+
+运行方式：
+python -m app.db.migrate_escaped_tags
+"""
+
+import logging
+
+from app.db.database import SessionLocal, init_db
+from app.services.search_service import InsightSearchService
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def migrate():
+    # 确保全文索引表已创建
+    init_db()
+
+    db = SessionLocal()
+    try:
+        logger.info("🔄 开始修复转义保存的卡片标签...")
+        count = InsightSearchService(db).fix_escaped_tags()
+        db.commit()
+        logger.info(f"✅ 迁移完成！共修复 {count} 张卡片")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ 迁移失败: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,56 @@
+"""
+为 knowledge_nodes 添加 component_id（连通分量）字段并回填
+
+新建数据库由 init_db 自动创建字段和索引；新边写入时分量增量合并，
+此脚本用于已有数据库：添加字段、创建索引，并按用户用并查集回填。可重复执行。
+
+运行方式：
+python -m app.db.migrate_knowledge_components
+"""
+
+import logging
+
+from sqlalchemy import inspect, text
+
+from app.db.database import SessionLocal, engine
+from app.models.models import KnowledgeNode
+from app.services.knowledge_graph_service import KnowledgeGraphService
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def migrate():
+    columns = {column["name"] for column in inspect(engine).get_columns("knowledge_nodes")}
+    with engine.begin() as conn:
+        if "component_id" not in columns:
+            logger.info("🔄 添加字段 knowledge_nodes.component_id ...")
+            conn.execute(text("ALTER TABLE knowledge_nodes ADD COLUMN component_id VARCHAR(36)"))
+        logger.info("🔄 创建索引 idx_knowledge_nodes_user_component ...")
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_knowledge_nodes_user_component
+            ON knowledge_nodes(user_id, component_id)
+        """))
+
+    db = SessionLocal()
+    try:
+        user_ids = [row[0] for row in db.query(KnowledgeNode.user_id).distinct().order_by(KnowledgeNode.user_id)]
+        logger.info(f"🔄 开始回填连通分量，共 {len(user_ids)} 个用户...")
+
+        service = KnowledgeGraphService(db)
+        total = 0
+        for user_id in user_ids:
+            total += service.rebuild_components(user_id)
+            db.commit()
+
+        logger.info(f"✅ 迁移完成！共更新 {total} 个节点")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ 迁移失败: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    migrate()
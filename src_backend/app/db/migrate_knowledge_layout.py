@@ -0,0 +1,51 @@
+"""
+为 knowledge_nodes 添加布局坐标 x / y 字段并计算初始布局
+
+新建数据库由 init_db 自动创建字段；图谱变化后由后台任务增量布局，
+此脚本用于已有数据库：添加字段，并为每个用户全量计算一次布局。可重复执行。
+
+运行方式：
+python -m app.db.migrate_knowledge_layout
+"""
+
+import logging
+
+from sqlalchemy import inspect, text
+
+from app.db.database import SessionLocal, engine
+from app.models.models import KnowledgeNode
+from app.services.graph_layout_service import GraphLayoutService
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def migrate():
+    columns = {column["name"] for column in inspect(engine).get_columns("knowledge_nodes")}
+    with engine.begin() as conn:
+        for column in ("x", "y"):
+            if column not in columns:
+                logger.info(f"🔄 添加字段 knowledge_nodes.{column} ...")
+                conn.execute(text(f"ALTER TABLE knowledge_nodes ADD COLUMN {column} FLOAT"))
+
+    db = SessionLocal()
+    try:
+        user_ids = [row[0] for row in db.query(KnowledgeNode.user_id).distinct().order_by(KnowledgeNode.user_id)]
+        logger.info(f"🔄 开始计算布局，共 {len(user_ids)} 个用户...")
+
+        service = GraphLayoutService(db)
+        total = 0
+        for user_id in user_ids:
+            total += service.compute_layout(user_id, full=True)["nodes"]
+
+        logger.info(f"✅ 迁移完成！共布局 {total} 个节点")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ 迁移失败: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    migrate()
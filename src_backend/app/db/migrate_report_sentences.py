@@ -0,0 +1,63 @@
+"""
+将分析报告中内嵌的 sentences 数组迁移到 article_sentences 表
+
+读取报告时也会按需迁移，此脚本用于一次性批量处理历史数据。
+
+运行方式：
+python -m app.db.migrate_report_sentences
+"""
+
+import logging
+
+from app.db.database import SessionLocal, init_db
+from app.models.models import AnalysisReport, Article
+from app.services.article_sentence_service import ArticleSentenceService
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100
+
+
+def migrate():
+    # 确保 article_sentences 表已创建
+    init_db()
+
+    db = SessionLocal()
+    try:
+        service = ArticleSentenceService(db)
+        last_id = 0
+        migrated = 0
+
+        logger.info("🔄 开始迁移报告中的分句数据...")
+        while True:
+            rows = db.query(AnalysisReport, Article).join(
+                Article, Article.id == AnalysisReport.article_id
+            ).filter(
+                AnalysisReport.id > last_id
+            ).order_by(AnalysisReport.id).limit(BATCH_SIZE).all()
+
+            if not rows:
+                break
+
+            for report, article in rows:
+                if service.detach_from_report(report, article.content_hash, article.content):
+                    migrated += 1
+                last_id = report.id
+
+            db.commit()
+            # 释放已处理的报告对象，避免大表迁移时内存增长
+            db.expunge_all()
+            logger.info(f"  已处理至报告 ID {last_id}，累计迁移 {migrated} 份")
+
+        logger.info(f"✅ 迁移完成！共迁移 {migrated} 份报告")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ 迁移失败: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,39 @@
+"""
+为 article_sentences 添加 offsets（句子字符偏移）和 splitter_version（分句规则版本）字段
+
+新建数据库由 init_db 自动创建字段。已有的分句结果不需要回填：
+读取时发现缺少偏移或版本不同，会按当前规则重新分句并覆盖（见 ArticleSentenceService.segment）。
+
+运行方式：
+python -m app.db.migrate_sentence_offsets
+"""
+
+import logging
+
+from sqlalchemy import inspect, text
+
+from app.db.database import engine
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def migrate():
+    try:
+        columns = {column["name"] for column in inspect(engine).get_columns("article_sentences")}
+        blob_type = "BYTEA" if engine.dialect.name == "postgresql" else "BLOB"
+        with engine.begin() as conn:
+            if "offsets" not in columns:
+                logger.info("🔄 添加字段 article_sentences.offsets ...")
+                conn.execute(text(f"ALTER TABLE article_sentences ADD COLUMN offsets {blob_type}"))
+            if "splitter_version" not in columns:
+                logger.info("🔄 添加字段 article_sentences.splitter_version ...")
+                conn.execute(text("ALTER TABLE article_sentences ADD COLUMN splitter_version VARCHAR(20)"))
+        logger.info("✅ 迁移完成！")
+    except Exception as e:
+        logger.error(f"❌ 迁移失败: {str(e)}")
+        raise
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,35 @@
+"""
+为 spark_clicks 表创建 (user_id, clicked_at, spark_type) 复合索引
+
+新建数据库由 init_db 自动创建，此脚本用于已有数据库。
+
+运行方式：
+python -m app.db.migrate_spark_click_index
+"""
+
+import logging
+
+from sqlalchemy import text
+
+from app.db.database import engine
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def migrate():
+    try:
+        logger.info("🔄 创建索引 idx_spark_clicks_user_time_type ...")
+        with engine.begin() as conn:
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS idx_spark_clicks_user_time_type
+                ON spark_clicks(user_id, clicked_at, spark_type)
+            """))
+        logger.info("✅ 索引创建完成！")
+    except Exception as e:
+        logger.error(f"❌ 迁移失败: {str(e)}")
+        raise
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,47 @@
+"""
+根据历史火花点击回填日汇总表（spark_click_daily / spark_topic_daily）
+
+新点击在写入时自动累加，此脚本用于一次性回填历史数据或修复汇总。
+按用户逐个重建并提交，可重复执行。
+
+运行方式：
+python -m app.db.migrate_spark_rollups
+"""
+
+import logging
+
+from app.db.database import SessionLocal, init_db
+from app.models.models import SparkClick
+from app.services.spark_rollup_service import SparkRollupService
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def migrate():
+    # 确保 spark_*_daily 表已创建
+    init_db()
+
+    db = SessionLocal()
+    try:
+        user_ids = [row[0] for row in db.query(SparkClick.user_id).distinct().order_by(SparkClick.user_id)]
+        logger.info(f"🔄 开始回填火花点击日汇总，共 {len(user_ids)} 个用户...")
+
+        service = SparkRollupService(db)
+        total = 0
+        for user_id in user_ids:
+            total += service.rebuild(user_id)
+            db.commit()
+            db.expunge_all()
+
+        logger.info(f"✅ 迁移完成！共汇总 {total} 条点击")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ 迁移失败: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    migrate()
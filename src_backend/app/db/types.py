@@ -0,0 +1,159 @@
+"""
+自定义列类型 - 透明压缩的大文本/JSON 字段
+
+存储格式（BLOB）：1 个版本字节 + 数据
+    0x00  未压缩的 UTF-8 文本（低于压缩阈值）
+    0x01  zlib 压缩
+    0x02  zstd 压缩（需安装 zstandard，缺失时写入回退到 zlib）
+
+PostgreSQL 中写入的是 bytea：旧的 TEXT/JSON 列由 init_db 在部署时改为 BYTEA
+（见 app/db/migrate_compress_blobs.py 的 convert_compressed_columns）。
+
+兼容旧数据：
+- SQLite 中迁移前的 TEXT 值读出为 str，直接返回
+- PostgreSQL 中 json 列迁移前读出为 dict/list，直接返回
+- 首字节不是版本字节的 BLOB 视为未加版本的 UTF-8 文本
+  （PostgreSQL 执行 ALTER ... TYPE BYTEA USING convert_to(...) 后的旧行）
+"""
+
+import json
+import logging
+import zlib
+from typing import Any, Optional
+
+from sqlalchemy.types import LargeBinary, TypeDecorator
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard  # noqa
+    _zstd_compressor = zstandard.ZstdCompressor(level=6)
+    _zstd_decompressor = zstandard.ZstdDecompressor()
+except ImportError:
+    zstandard = None
+    _zstd_compressor = None
+    _zstd_decompressor = None
+    logger.info("[INFO] zstandard not installed, compressed columns fall back to zlib")
+
+FORMAT_RAW = 0x00
+FORMAT_ZLIB = 0x01
+FORMAT_ZSTD = 0x02
+
+# 默认压缩阈值（字节）：小于该长度的值压缩收益很低，直接存储
+DEFAULT_THRESHOLD = 512
+
+
+def compress_text(value: str, threshold: int = DEFAULT_THRESHOLD) -> bytes:
+    """
+    将文本编码为带版本字节的存储格式
+
+    Args:
+        value: 原始文本
+        threshold: 压缩阈值（字节）
+
+    Returns:
+        存储用字节串
+    """
+    raw = value.encode("utf-8")
+    if len(raw) < threshold:
+        return bytes([FORMAT_RAW]) + raw
+
+    if _zstd_compressor is not None:
+        compressed = _zstd_compressor.compress(raw)
+        fmt = FORMAT_ZSTD
+    else:
+        compressed = zlib.compress(raw, 6)
+        fmt = FORMAT_ZLIB
+
+    # 不可压缩的数据（如已压缩内容）保持原样
+    if len(compressed) >= len(raw):
+        return bytes([FORMAT_RAW]) + raw
+    return bytes([fmt]) + compressed
+
+
+def decompress_text(data: bytes) -> str:
+    """
+    解码存储格式为文本（兼容无版本字节的旧数据）
+
+    Args:
+        data: 存储用字节串
+
+    Returns:
+        原始文本
+    """
+    if not data:
+        return ""
+
+    fmt = data[0]
+    payload = data[1:]
+    if fmt == FORMAT_RAW:
+        return payload.decode("utf-8")
+    if fmt == FORMAT_ZLIB:
+        return zlib.decompress(payload).decode("utf-8")
+    if fmt == FORMAT_ZSTD:
+        if _zstd_decompressor is None:
+            raise RuntimeError("读取 zstd 压缩字段需要安装 zstandard")
+        return _zstd_decompressor.decompress(payload).decode("utf-8")
+
+    # 无版本字节的旧数据
+    return data.decode("utf-8")
+
+
+class CompressedText(TypeDecorator):
+    """透明压缩的文本列（替代 Text）"""
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def __init__(self, threshold: int = DEFAULT_THRESHOLD, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.threshold = threshold
+
+    def process_bind_param(self, value: Optional[str], dialect) -> Optional[bytes]:
+        if value is None:
+            return None
+        return compress_text(value, self.threshold)
+
+    def result_processor(self, dialect, coltype):
+        # 跳过 LargeBinary 自带的 bytes() 转换：旧数据可能是 str/dict
+        def process(value):
+            return self.process_result_value(value, dialect)
+        return process
+
+    def process_result_value(self, value: Any, dialect) -> Optional[str]:
+        if value is None:
+            return None
+        if isinstance(value, str):
+            return value
+        return decompress_text(bytes(value))
+
+
+class CompressedJSON(TypeDecorator):
+    """透明压缩的 JSON 列（替代 JSON）"""
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def __init__(self, threshold: int = DEFAULT_THRESHOLD, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.threshold = threshold
+
+    def process_bind_param(self, value: Any, dialect) -> Optional[bytes]:
+        if value is None:
+            return None
+        serialized = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+        return compress_text(serialized, self.threshold)
+
+    def result_processor(self, dialect, coltype):
+        def process(value):
+            return self.process_result_value(value, dialect)
+        return process
+
+    def process_result_value(self, value: Any, dialect) -> Any:
+        if value is None:
+            return None
+        if isinstance(value, (dict, list)):
+            return value
+        if isinstance(value, str):
+            return json.loads(value)
+        return json.loads(decompress_text(bytes(value)))
@@ -53,6 +53,24 @@ async def startup_event():
         logger.error(f"[WARNING] Database initialization failed: {str(e)}")
         logger.info(f"[INFO] This is normal if tables already exist")
 
+    from app.core.token_estimator import token_estimator
+
+    try:
+        token_estimator.load()
+    except Exception as e:
+        logger.error(f"[WARNING] Token estimator calibration load failed: {str(e)}")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """应用关闭时写入缓冲中的火花点击和 token 估算的校准数据"""
+    from app.core.click_buffer import click_buffer
+    from app.core.token_estimator import token_estimator
+
+    click_buffer.shutdown()
+    logger.info(f"[OK] Click buffer flushed")
+    token_estimator.save()
+
 # 注册路由
 app.include_router(insights.router, prefix="/api/v1", tags=["insights"])
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["auth"])
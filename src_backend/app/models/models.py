@@ -1,10 +1,17 @@
 """数据库模型定义"""
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Float, JSON
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, Date, ForeignKey, Boolean, Float, JSON, LargeBinary, Index, delete, event, select, update
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, relationship
 from datetime import datetime
+from typing import Iterable, Optional
+from app.db.types import CompressedText, CompressedJSON
 import uuid
 import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
 
 Base = declarative_base()
 
@@ -97,6 +104,9 @@ class KnowledgeNode(Base):
     size = Column(Integer, default=1)  # 节点大小（基于关联洞察数量）
     color = Column(String(7), nullable=True)  # 十六进制颜色
     domain = Column(String(100), nullable=True, index=True)  # 所属领域
+    component_id = Column(String(36), nullable=True)  # 所在连通分量（分量内某个节点的 ID），随建边增量合并
+    x = Column(Float, nullable=True)  # 预计算的布局坐标（见 graph_layout_service），未布局时为空
+    y = Column(Float, nullable=True)
 
     # 关联信息
     insight_id = Column(Integer, ForeignKey("insight_cards.id"), nullable=True)
@@ -109,6 +119,13 @@ class KnowledgeNode(Base):
     # 关系
     user = relationship("User", back_populates="knowledge_nodes")
 
+    __table_args__ = (
+        # 增量更新时按概念名称查找节点
+        Index("idx_knowledge_nodes_user_label", "user_id", "label"),
+        # 知识孤岛：按连通分量分组
+        Index("idx_knowledge_nodes_user_component", "user_id", "component_id"),
+    )
+
 
 class KnowledgeEdge(Base):
     """知识关系表 - 用于知识图谱"""
@@ -133,6 +150,35 @@ class KnowledgeEdge(Base):
     user = relationship("User", back_populates="knowledge_edges")
 
 
+class ArticleConcept(Base):
+    """文章概念表 - 记录每篇文章中点击过的概念，用于增量更新共现计数"""
+    __tablename__ = "article_concepts"
+
+    # (user_id, article_id, label) 复合主键
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    article_id = Column(Integer, primary_key=True)
+    label = Column(String(255), primary_key=True)  # 概念名称（与 KnowledgeNode.label 对应）
+
+    click_count = Column(Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        # 统计概念对的共现文章数（按概念名称自连接）
+        Index("idx_article_concepts_user_label", "user_id", "label"),
+    )
+
+
+class ConceptCooccurrence(Base):
+    """概念共现表 - 两个概念在同一篇文章中被点击过的文章数（只存储达到建边阈值的概念对）"""
+    __tablename__ = "concept_cooccurrences"
+
+    # (user_id, concept_a, concept_b) 复合主键，concept_a < concept_b
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    concept_a = Column(String(255), primary_key=True)
+    concept_b = Column(String(255), primary_key=True)
+
+    count = Column(Integer, default=0, nullable=False)
+
+
 class SparkClick(Base):
     """火花点击日志表 - 用于好奇心指纹分析"""
     __tablename__ = "spark_clicks"
@@ -151,6 +197,34 @@ class SparkClick(Base):
     # 关系
     user = relationship("User", back_populates="spark_clicks")
 
+    __table_args__ = (
+        # 覆盖按用户 + 时间窗口统计类型分布的查询（GROUP BY spark_type 只需扫描索引）
+        Index("idx_spark_clicks_user_time_type", "user_id", "clicked_at", "spark_type"),
+    )
+
+
+class SparkClickDaily(Base):
+    """火花点击日汇总表 - 写入点击时增量累加，好奇心指纹按天读取"""
+    __tablename__ = "spark_click_daily"
+
+    # (user_id, day, spark_type) 复合主键
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)  # UTC 日期
+    spark_type = Column(String(50), primary_key=True)
+
+    count = Column(Integer, default=0, nullable=False)
+
+
+class SparkTopicDaily(Base):
+    """火花话题日汇总表 - 每个用户每天一份话题词 Top-K 草图"""
+    __tablename__ = "spark_topic_daily"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)  # UTC 日期
+
+    counters = Column(JSON, nullable=False)  # Space-Saving 草图 {"话题词": [count, error], ...}
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
 
 class CuriosityFingerprint(Base):
     """好奇心指纹缓存表"""
@@ -171,6 +245,19 @@ class CuriosityFingerprint(Base):
     user = relationship("User", back_populates="curiosity_fingerprint")
 
 
+class DashboardSnapshot(Base):
+    """仪表盘快照表 - 每个用户一份预计算的仪表盘总览"""
+    __tablename__ = "dashboard_snapshots"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+
+    data = Column(JSON, nullable=False)  # 仪表盘总览（与 GET /api/v1/dashboard/ 返回结构一致）
+    dirty_sections = Column(JSON, nullable=False, default=list)  # 待重算的部分 ["sparks", "graph"]
+    version = Column(Integer, default=0, nullable=False)  # 每次失效 +1，重算期间有新失效时不清除标记
+
+    computed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
 class Article(Base):
     """文章表 - 保存用户阅读的文章"""
     __tablename__ = "articles"
@@ -184,8 +271,9 @@ class Article(Base):
     source_url = Column(String(1000), nullable=True)  # 文章来源URL
     publish_date = Column(DateTime, nullable=True)
 
-    # 文章内容
-    content = Column(Text, nullable=False)  # 完整文章内容
+    # 文章内容（正文按 SHA-256 存放在 article_bodies 表，相同正文只存一份；通过 content 属性读写）
+    body_sha256 = Column(String(64), ForeignKey("article_bodies.sha256"), nullable=True, index=True)
+    _content = Column("content", CompressedText, nullable=False, default="")  # 旧数据：迁移前的正文，新文章为空
     content_hash = Column(String(64), index=True, nullable=False)  # MD5哈希，用于去重
 
     # 元数据
@@ -207,6 +295,278 @@ class Article(Base):
     meta_analysis = relationship("MetaAnalysis", back_populates="article", uselist=False, cascade="all, delete-orphan")
     insight_history = relationship("InsightHistory", back_populates="article", cascade="all, delete-orphan")
     analysis_report = relationship("AnalysisReport", back_populates="article", uselist=False, cascade="all, delete-orphan")
+    fingerprint = relationship("ArticleFingerprint", back_populates="article", uselist=False, cascade="all, delete-orphan")
+    body = relationship("ArticleBody", lazy="joined")
+
+    # 尚未写入 article_bodies 的新正文（flush 时处理，见 _store_article_bodies）
+    _pending_content = None
+
+    @property
+    def content(self) -> str:
+        """完整文章内容"""
+        if self._pending_content is not None:
+            return self._pending_content
+        if self.body is not None:
+            return self.body.content
+        return self._content
+
+    @content.setter
+    def content(self, value: str) -> None:
+        self._pending_content = value
+        # 同时标记文章已修改，保证 flush 时处理新正文
+        self._content = ""
+
+
+class ArticleBody(Base):
+    """文章正文表 - 按 SHA-256 内容寻址，相同正文只存一份
+
+    ref_count 记录引用该正文的文章数，由 flush 事件维护（_store_article_bodies）：
+    新增引用用一条 INSERT ... ON CONFLICT DO UPDATE 完成写入和计数（已有正文只增加计数，不改写正文）；
+    计数归零的正文在事务提交后由 collect_article_bodies 加锁复查后删除。
+    """
+    __tablename__ = "article_bodies"
+
+    sha256 = Column(String(64), primary_key=True)
+    content = Column(CompressedText, nullable=False)  # 透明压缩
+    size = Column(Integer, nullable=False)  # UTF-8 字节数
+    ref_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+def _add_body_references(session: Session, sha256: str, content: str, count: int) -> None:
+    """
+    增加正文的引用计数，正文不存在时一并写入
+
+    写入和计数在同一条语句中完成：并发回收刚删除该正文时也会重新写入，不会引用已删除的正文。
+    """
+    dialect = session.get_bind().dialect.name
+    insert = pg_insert if dialect == "postgresql" else sqlite_insert
+    stmt = insert(ArticleBody).values(
+        sha256=sha256,
+        content=content,
+        size=len(content.encode("utf-8")),
+        ref_count=count,
+        created_at=datetime.utcnow()
+    )
+    session.execute(stmt.on_conflict_do_update(
+        index_elements=["sha256"],
+        set_={"ref_count": ArticleBody.ref_count + stmt.excluded.ref_count}
+    ))
+
+
+@event.listens_for(Session, "before_flush")
+def _store_article_bodies(session, flush_context, instances):
+    """把文章的新正文写入 article_bodies 并维护引用计数"""
+    deltas = {}
+    contents = {}
+    attached = []
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, Article) or obj._pending_content is None:
+            continue
+        content = obj._pending_content
+        sha256 = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        old_sha256 = obj.body_sha256
+        if sha256 != old_sha256:
+            contents[sha256] = content
+            attached.append((obj, sha256))
+            deltas[sha256] = deltas.get(sha256, 0) + 1
+            if old_sha256 is not None:
+                deltas[old_sha256] = deltas.get(old_sha256, 0) - 1
+        obj._pending_content = None
+
+    for obj in session.deleted:
+        if isinstance(obj, Article) and obj.body_sha256 is not None:
+            deltas[obj.body_sha256] = deltas.get(obj.body_sha256, 0) - 1
+
+    released = set()
+    # 按 SHA-256 顺序加锁，避免并发事务互相等待
+    for sha256, delta in sorted(deltas.items()):
+        if delta > 0:
+            _add_body_references(session, sha256, contents[sha256], delta)
+        elif delta < 0:
+            # 用 SQL 表达式累加，避免并发保存时丢失计数
+            session.execute(
+                update(ArticleBody)
+                .where(ArticleBody.sha256 == sha256)
+                .values(ref_count=ArticleBody.ref_count + delta)
+                .execution_options(synchronize_session=False)
+            )
+            released.add(sha256)
+        body = session.identity_map.get(session.identity_key(ArticleBody, sha256))
+        if body is not None:
+            session.expire(body, ["ref_count"])
+
+    # 正文已写入，再关联到文章（flush 时写入 body_sha256）
+    for obj, sha256 in attached:
+        obj.body = session.get(ArticleBody, sha256)
+    if released:
+        session.info.setdefault("released_article_bodies", set()).update(released)
+
+
+def collect_article_bodies(session: Session, candidates: Optional[Iterable[str]] = None) -> int:
+    """
+    删除没有文章引用的正文（不提交事务）
+
+    计数归零的行逐行加锁（已被并发事务锁定、正在增加引用的行跳过）后复查：
+    计数仍不大于 0 且没有文章引用时才删除。
+
+    Args:
+        candidates: 只检查这些 SHA-256（None 表示全表扫描，用于修复）
+
+    Returns:
+        删除的正文数量
+    """
+    query = select(ArticleBody.sha256).where(ArticleBody.ref_count <= 0)
+    if candidates is not None:
+        query = query.where(ArticleBody.sha256.in_(list(candidates)))
+    locked = session.execute(
+        query.order_by(ArticleBody.sha256).with_for_update(skip_locked=True)
+    ).scalars().all()
+    if not locked:
+        return 0
+
+    referenced = select(Article.body_sha256).where(Article.body_sha256.in_(locked))
+    unreferenced = session.execute(
+        select(ArticleBody.sha256).where(
+            ArticleBody.sha256.in_(locked),
+            ArticleBody.ref_count <= 0,
+            ArticleBody.sha256.not_in(referenced)
+        )
+    ).scalars().all()
+    if unreferenced:
+        session.execute(
+            delete(ArticleBody)
+            .where(ArticleBody.sha256.in_(unreferenced))
+            .execution_options(synchronize_session=False)
+        )
+    return len(unreferenced)
+
+
+@event.listens_for(Session, "after_commit")
+def _collect_article_bodies(session):
+    """提交后在独立事务中回收本事务释放的正文"""
+    released = session.info.pop("released_article_bodies", None)
+    if not released:
+        return
+    for sha256 in released:
+        body = session.identity_map.get(session.identity_key(ArticleBody, sha256))
+        if body is not None:
+            session.expunge(body)
+    try:
+        with Session(bind=session.get_bind()) as sweeper:
+            count = collect_article_bodies(sweeper, released)
+            sweeper.commit()
+        if count:
+            logger.debug(f"[ArticleBody] 回收 {count} 份正文")
+    except Exception as e:
+        # 回收失败不影响已提交的事务，计数归零的正文留待下次回收
+        logger.warning(f"[ArticleBody] 正文回收失败: {str(e)}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_released_bodies(session):
+    """事务回滚时计数变更一并撤销"""
+    session.info.pop("released_article_bodies", None)
+
+
+class ArticleFingerprint(Base):
+    """文章内容指纹表 - SimHash，用于查找近似重复的文章（见 app/utils/simhash.py）"""
+    __tablename__ = "article_fingerprints"
+
+    article_id = Column(Integer, ForeignKey("articles.id"), primary_key=True)
+    simhash = Column(BigInteger, nullable=False)  # 64 位 SimHash（按有符号整数存储）
+
+    # 指纹按 16 位切成 4 段，分别建索引：近似重复的指纹至少有一段相同或只差一位
+    band0 = Column(Integer, nullable=False, index=True)
+    band1 = Column(Integer, nullable=False, index=True)
+    band2 = Column(Integer, nullable=False, index=True)
+    band3 = Column(Integer, nullable=False, index=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    article = relationship("Article", back_populates="fingerprint")
+
+
+class ArticleSearchDocument(Base):
+    """文章检索文档表 - 记录已写入倒排索引的文章"""
+    __tablename__ = "article_search_documents"
+
+    article_id = Column(Integer, ForeignKey("articles.id"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+
+    sentence_count = Column(Integer, nullable=False)  # 建索引时的句子数
+    term_count = Column(Integer, nullable=False)  # 不同词元数
+
+    indexed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class ArticleSearchPosting(Base):
+    """文章检索倒排表 - 按用户分区的句子级倒排索引"""
+    __tablename__ = "article_search_postings"
+
+    # (user_id, term) 复合主键：每个用户独立一份词典
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    term = Column(String(64), primary_key=True)  # 中文二元组或英文单词
+
+    # 压缩倒排列表（varint 差值编码，见 app/utils/postings.py）
+    postings = Column(LargeBinary, nullable=False)
+    doc_count = Column(Integer, default=0, nullable=False)  # 包含该词元的文章数
+    last_article_id = Column(Integer, default=0, nullable=False)  # 列表中最大的文章ID（用于追加编码）
+
+
+class ArticleSentences(Base):
+    """文章分句表 - 每个内容哈希只保存一份分句结果，供分析报告引用"""
+    __tablename__ = "article_sentences"
+
+    content_hash = Column(String(64), primary_key=True)  # 与 Article.content_hash 对应
+    sentences = Column(CompressedJSON, nullable=False)  # ["句子1", "句子2", ...]（透明压缩）
+    sentence_count = Column(Integer, nullable=False)
+    offsets = Column(CompressedJSON, nullable=True)  # [[start, end], ...] 句子在原文中的字符偏移
+    splitter_version = Column(String(20), nullable=True)  # 分句规则版本（见 sentence_splitter.SPLITTER_VERSION）
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class AnalysisArtifact(Base):
+    """分析结果共享表 - 按内容哈希保存 LLM 分析结果，跨用户复用
+
+    分析结果只取决于文章内容、分析版本（Prompt / 结构版本）和模型；
+    同一内容第一次分析后，其他用户保存相同内容时直接使用，不再调用 LLM。
+    各用户文章下的 AnalysisReport / MetaAnalysis / ThinkingLensResult 通过 artifact_id 引用来源。
+    """
+    __tablename__ = "analysis_artifacts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String(64), nullable=False)  # 与 Article.content_hash 对应
+    artifact_type = Column(String(50), nullable=False)  # unified_report / meta_analysis / lens:<lens_type>
+    analysis_version = Column(String(20), nullable=False)
+    model = Column(String(100), nullable=False)
+
+    payload = Column(CompressedJSON, nullable=False)  # 分析结果（透明压缩）
+    tokens_used = Column(Integer, nullable=True)  # 首次分析消耗的 token 数
+    reuse_count = Column(Integer, default=0, nullable=False)  # 被复用次数
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index(
+            "idx_analysis_artifacts_key",
+            "content_hash", "artifact_type", "analysis_version", "model",
+            unique=True
+        ),
+    )
+
+
+class TokenEstimatorStats(Base):
+    """token 估算器校准数据表 - 按模型保存最小二乘的正规方程统计量（见 app/core/token_estimator.py）"""
+    __tablename__ = "token_estimator_stats"
+
+    model = Column(String(100), primary_key=True)
+    xtx = Column(JSON, nullable=False)  # XᵀX（特征顺序见 token_estimator.FEATURES）
+    xty = Column(JSON, nullable=False)  # Xᵀy
+    sample_count = Column(Integer, default=0, nullable=False)  # 累计观测次数
+    coefficients = Column(JSON, nullable=True)  # 最近一次拟合的系数 {特征: 每字符 token 数}，便于查看
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
 
 class AnalysisReport(Base):
@@ -221,8 +581,9 @@ class AnalysisReport(Base):
     # 状态值: pending, processing, completed, failed
 
     # 分析报告数据 (JSONB格式)
-    report_data = Column(JSON, nullable=True)
+    report_data = Column(CompressedJSON, nullable=True)  # 透明压缩
     # 报告结构见设计文档中的 JSON Schema
+    # 分句结果不再内嵌在报告中，按 content_hash 存放于 article_sentences 表
 
     # 版本控制
     analysis_version = Column(String(10), default='1.0', nullable=False)
@@ -236,6 +597,9 @@ class AnalysisReport(Base):
     error_message = Column(Text, nullable=True)  # 错误详情
     retry_count = Column(Integer, default=0, nullable=False)  # 重试次数
 
+    # 共享的分析结果（见 AnalysisArtifact）
+    artifact_id = Column(Integer, ForeignKey("analysis_artifacts.id"), nullable=True, index=True)
+
     # 时间戳
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -269,7 +633,7 @@ class InsightHistory(Base):
     intent = Column(String(50), nullable=False)  # 'explain' | 'summarize' | 'question' | 'follow_up' | ...
     question = Column(Text, nullable=True)  # 如果是自定义问题
     insight = Column(Text, nullable=False)  # AI 的回答
-    reasoning = Column(Text, nullable=True)  # 推理过程（如果有）
+    reasoning = Column(CompressedText, nullable=True)  # 推理过程（如果有，透明压缩）
 
     # 元数据
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
@@ -328,7 +692,7 @@ class MetaAnalysis(Base):
     # }
 
     # 原始 LLM 响应 (用于调试和改进)
-    raw_llm_response = Column(Text, nullable=True)
+    raw_llm_response = Column(CompressedText, nullable=True)  # 透明压缩
 
     # 分析质量指标
     analysis_quality = Column(JSON, nullable=True)
@@ -339,6 +703,9 @@ class MetaAnalysis(Base):
     #   "prompt_version": "v1.0"
     # }
 
+    # 共享的分析结果（见 AnalysisArtifact）
+    artifact_id = Column(Integer, ForeignKey("analysis_artifacts.id"), nullable=True, index=True)
+
     # 时间戳
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -378,6 +745,9 @@ class ThinkingLensResult(Base):
     #   "statistics": {...}
     # }
 
+    # 共享的分析结果（见 AnalysisArtifact）
+    artifact_id = Column(Integer, ForeignKey("analysis_artifacts.id"), nullable=True, index=True)
+
     # 时间戳
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
@@ -37,6 +37,7 @@ class InsightCardResponse(BaseModel):
     tokens: Optional[int]
     created_at: datetime
     tags: Optional[List[str]]
+    highlight: Optional[str] = None  # 检索时的高亮片段（<mark> 包裹匹配词）
 
     class Config:
         from_attributes = True
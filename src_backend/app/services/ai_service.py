@@ -3,6 +3,8 @@ import logging
 from openai import AsyncOpenAI
 from app.config import settings
 from app.utils.prompt_templates import PromptTemplates
+from app.core.token_estimator import token_estimator
+from app.utils.token_budget import token_budget
 from app.schemas.insight import FollowUpButton, Message
 import json
 
@@ -19,6 +21,8 @@ class AIService:
             base_url=settings.openai_base_url
         )
         self.model_used = ""
+        # 最近一次流式调用的 usage（由最后一个片段返回，服务端不支持时为 None）
+        self.last_usage = None
 
     def select_model(self, intent: str, text_length: int, use_reasoning: bool = False) -> str:
         """
@@ -81,31 +85,49 @@ class AIService:
         else:
             # 使用标准 prompt 模板
             system_prompt = PromptTemplates.get_system_prompt(intent)
-            user_prompt = PromptTemplates.get_user_prompt(
+            prompt_args = dict(
                 intent=intent,
                 selected_text=selected_text,
                 context=context,
-                custom_question=custom_question,
+                custom_question=custom_question
+            )
+            if include_full_text and full_text:
+                # 附带的全文超出 token 预算时按重要性抽取句子
+                overhead = system_prompt + PromptTemplates.get_user_prompt(**prompt_args)
+                full_text = token_budget.fit_text(full_text, 'insight', self.model_used, overhead)
+            user_prompt = PromptTemplates.get_user_prompt(
+                **prompt_args,
                 include_full_text=include_full_text,
                 full_text=full_text
             )
 
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+        budget = token_budget.check(messages, 'insight', self.model_used)
+
         # 调用 OpenAI API (流式)
         try:
             stream = await self.client.chat.completions.create(
                 model=self.model_used,
-                max_tokens=settings.max_tokens,
+                max_tokens=budget.max_output_tokens,
                 temperature=settings.temperature,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                stream=True
+                messages=messages,
+                stream=True,
+                stream_options={"include_usage": True}
             )
 
+            self.last_usage = None
+            content_parts = []
             async for chunk in stream:
+                # 最后一个片段只携带 usage，choices 为空
+                if getattr(chunk, "usage", None) is not None:
+                    self.last_usage = chunk.usage
                 if chunk.choices and len(chunk.choices) > 0:
                     delta = chunk.choices[0].delta
+                    if delta.content:
+                        content_parts.append(delta.content)
 
                     # 支持推理模式
                     if use_reasoning:
@@ -122,6 +144,8 @@ class AIService:
                         # 非推理模式，直接返回内容
                         if delta.content:
                             yield delta.content
+
+            token_estimator.observe_usage(self.model_used, messages, "".join(content_parts), self.last_usage)
         except Exception as e:
             logger.error(f"LLM调用失败 - ai_service_generate_insight - model={self.model_used}, intent={intent}, error={e}")
             raise
@@ -189,16 +213,19 @@ class AIService:
 ]"""
 
         try:
+            messages = [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ]
+            budget = token_budget.check(messages, 'follow_up_buttons', settings.simple_model)
             response = await self.client.chat.completions.create(
                 model=settings.simple_model,  # 使用快速模型生成按钮
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
+                messages=messages,
                 response_format={"type": "json_object"},
                 temperature=0.7,
-                max_tokens=500
+                max_tokens=budget.max_output_tokens
             )
+            token_estimator.observe_response(settings.simple_model, messages, response)
 
             content = response.choices[0].message.content.strip()
 
@@ -316,19 +343,31 @@ class AIService:
             "content": follow_up_question
         })
 
+        # 对话历史超出 token 预算时丢弃最早的消息（保留系统提示词、原始文本和当前追问）
+        messages = token_budget.fit_history(messages, 'follow_up', self.model_used)
+        budget = token_budget.check(messages, 'follow_up', self.model_used)
+
         # 调用 API
         try:
             stream = await self.client.chat.completions.create(
                 model=self.model_used,
-                max_tokens=settings.max_tokens,
+                max_tokens=budget.max_output_tokens,
                 temperature=settings.temperature,
                 messages=messages,
-                stream=True
+                stream=True,
+                stream_options={"include_usage": True}
             )
 
+            self.last_usage = None
+            content_parts = []
             async for chunk in stream:
+                # 最后一个片段只携带 usage，choices 为空
+                if getattr(chunk, "usage", None) is not None:
+                    self.last_usage = chunk.usage
                 if chunk.choices and len(chunk.choices) > 0:
                     delta = chunk.choices[0].delta
+                    if delta.content:
+                        content_parts.append(delta.content)
 
                     # 支持推理模式
                     if use_reasoning:
@@ -344,6 +383,7 @@ class AIService:
                         if delta.content:
                             yield delta.content
 
+            token_estimator.observe_usage(self.model_used, messages, "".join(content_parts), self.last_usage)
         except Exception as e:
             logger.error(f"LLM调用失败 - ai_service_follow_up_answer - model={self.model_used}, question={follow_up_question}, error={e}")
             raise
@@ -360,15 +400,16 @@ class AIService:
         Returns:
             AI 生成的文本响应
         """
+        messages = [{"role": "user", "content": prompt}]
+        budget = token_budget.check(messages, 'simple_response', settings.default_model)
         try:
             response = await self.client.chat.completions.create(
                 model=settings.default_model,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ],
+                messages=messages,
                 temperature=0.7,
-                max_tokens=500
+                max_tokens=budget.max_output_tokens
             )
+            token_estimator.observe_response(settings.default_model, messages, response)
 
             return response.choices[0].message.content.strip()
 
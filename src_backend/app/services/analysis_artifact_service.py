@@ -0,0 +1,123 @@
+"""分析结果共享服务 - 按内容哈希跨用户复用 LLM 分析结果
+
+文章按用户各自保存（每个用户一行 Article），但统一分析报告、元信息分析和思维透镜结果
+只取决于文章内容。分析结果按 (content_hash, 类型, 分析版本, 模型) 保存在 analysis_artifacts 表：
+第一位读者触发分析并写入，之后任何用户保存相同内容时直接复制到自己的文章下（artifact_id 记录来源），
+不再调用 LLM。Prompt 或结构变化时递增对应服务的版本号，旧结果自然失效。
+"""
+import logging
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.models import AnalysisArtifact, AnalysisReport
+
+logger = logging.getLogger(__name__)
+
+# 分析结果类型
+UNIFIED_REPORT = "unified_report"
+META_ANALYSIS = "meta_analysis"
+
+
+def lens_artifact_type(lens_type: str) -> str:
+    """思维透镜结果的类型（每种透镜单独保存）"""
+    return f"lens:{lens_type}"
+
+
+class AnalysisArtifactService:
+    """分析结果共享"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get(
+        self,
+        content_hash: str,
+        artifact_type: str,
+        analysis_version: str,
+        model: Optional[str] = None
+    ) -> Optional[AnalysisArtifact]:
+        """
+        查找共享的分析结果
+
+        Args:
+            content_hash: 文章内容哈希
+            artifact_type: 结果类型
+            analysis_version: 分析版本
+            model: 模型（默认当前配置的模型）
+        """
+        return self.db.query(AnalysisArtifact).filter(
+            AnalysisArtifact.content_hash == content_hash,
+            AnalysisArtifact.artifact_type == artifact_type,
+            AnalysisArtifact.analysis_version == analysis_version,
+            AnalysisArtifact.model == (model or settings.default_model)
+        ).first()
+
+    def put(
+        self,
+        content_hash: str,
+        artifact_type: str,
+        analysis_version: str,
+        payload: Dict,
+        tokens_used: Optional[int] = None,
+        model: Optional[str] = None
+    ) -> AnalysisArtifact:
+        """
+        保存分析结果（已存在时覆盖，例如用户主动重新分析；不提交事务）
+
+        并发写入同一个键时以后写入的为准。
+
+        Returns:
+            AnalysisArtifact
+        """
+        model = model or settings.default_model
+        artifact = self.get(content_hash, artifact_type, analysis_version, model)
+        if artifact is None:
+            artifact = AnalysisArtifact(
+                content_hash=content_hash,
+                artifact_type=artifact_type,
+                analysis_version=analysis_version,
+                model=model,
+                payload=payload,
+                tokens_used=tokens_used
+            )
+            try:
+                with self.db.begin_nested():
+                    self.db.add(artifact)
+                return artifact
+            except IntegrityError:
+                # 其他进程刚写入同一个键
+                artifact = self.get(content_hash, artifact_type, analysis_version, model)
+
+        artifact.payload = payload
+        artifact.tokens_used = tokens_used
+        artifact.created_at = datetime.utcnow()
+        self.db.flush()
+        return artifact
+
+    def mark_reused(self, artifact: AnalysisArtifact) -> None:
+        """记录一次复用（不提交事务）"""
+        artifact.reuse_count = (artifact.reuse_count or 0) + 1
+        logger.info(
+            f"[AnalysisArtifact] 复用分析结果: type={artifact.artifact_type}, "
+            f"content_hash={artifact.content_hash}, 累计复用 {artifact.reuse_count} 次"
+        )
+
+    def apply_unified_report(self, report: AnalysisReport, artifact: AnalysisArtifact) -> None:
+        """用共享的统一分析结果填充文章的分析报告（不提交事务）"""
+        payload = artifact.payload
+        report.status = 'completed'
+        report.report_data = payload['report']
+        # 版本键可能带有元信息哈希（见 report_artifact_version），报告只记录分析版本
+        report.analysis_version = artifact.analysis_version.split(":", 1)[0]
+        report.model_used = payload.get('metadata', {}).get('model') or artifact.model
+        # 本次没有调用 LLM
+        report.tokens_used = 0
+        report.processing_time_ms = 0
+        report.error_message = None
+        report.completed_at = datetime.utcnow()
+        report.artifact_id = artifact.id
+        self.mark_reused(artifact)
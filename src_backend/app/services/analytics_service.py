@@ -1,16 +1,21 @@
 """分析服务 - 处理火花点击和好奇心指纹"""
 import logging
-from typing import Dict, List, Optional
-from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from collections import defaultdict, Counter
-import re
 
-from app.models.models import SparkClick, CuriosityFingerprint, InsightCard
+from app.core.click_buffer import FINGERPRINT_JOB, click_buffer, register_user_job, register_write_handler
+from app.models.models import SparkClick, CuriosityFingerprint
+from app.services.spark_rollup_service import SparkRollupService
+# 以下模块导入时向点击写缓冲登记写入回调 / 延迟任务（图谱、仪表盘、布局）
+from app.services import dashboard_service, graph_layout_service, knowledge_graph_service  # noqa: F401
 
 logger = logging.getLogger(__name__)
 
+# 好奇心指纹默认统计窗口（天），缓存只保存该窗口
+FINGERPRINT_DAYS = 30
+
 
 class AnalyticsService:
     """分析服务"""
@@ -23,50 +28,89 @@ class AnalyticsService:
         user_id: int,
         spark_type: str,
         spark_text: str,
-        article_id: Optional[int] = None
-    ) -> SparkClick:
+        article_id: Optional[int] = None,
+        clicked_at: Optional[datetime] = None
+    ) -> Dict:
         """
-        记录火花点击
+        记录火花点击（写入缓冲，由后台线程批量落库）
 
         Args:
             user_id: 用户 ID
             spark_type: 火花类型（concept/argument）
             spark_text: 火花文本
             article_id: 文章 ID（可选）
+            clicked_at: 点击时间（可选，默认当前时间）
 
         Returns:
-            SparkClick 对象
+            已入队的点击事件
         """
-        click = SparkClick(
-            user_id=user_id,
-            spark_type=spark_type,
-            spark_text=spark_text,
-            article_id=article_id,
-            clicked_at=datetime.utcnow()
-        )
-        self.db.add(click)
-        self.db.commit()
-        self.db.refresh(click)
+        event = self._build_click_event(user_id, spark_type, spark_text, article_id, clicked_at)
+        click_buffer.enqueue([event])
+        return event
 
-        logger.info(f"记录火花点击: {spark_type} - {spark_text[:20]}...")
+    def record_spark_clicks(self, user_id: int, events: List[Dict]) -> int:
+        """
+        批量记录火花点击（前端 sendBeacon 批量上报）
+
+        Args:
+            user_id: 用户 ID
+            events: 点击事件列表（spark_type, spark_text, article_id?, clicked_at?）
+
+        Returns:
+            入队数量
+        """
+        rows = [
+            self._build_click_event(
+                user_id,
+                event["spark_type"],
+                event["spark_text"],
+                event.get("article_id"),
+                event.get("clicked_at")
+            )
+            for event in events
+        ]
+        return click_buffer.enqueue(rows)
 
-        # 异步更新好奇心指纹（可选）
-        # 为了性能，这里可以使用异步任务队列（Celery）
-        # 目前直接同步更新
-        self._update_curiosity_fingerprint(user_id)
+    @staticmethod
+    def _build_click_event(
+        user_id: int,
+        spark_type: str,
+        spark_text: str,
+        article_id: Optional[int],
+        clicked_at: Optional[datetime]
+    ) -> Dict:
+        """构造 SparkClick 列字典（客户端时间不晚于服务器当前时间）"""
+        now = datetime.utcnow()
+        if clicked_at is None:
+            clicked_at = now
+        else:
+            if clicked_at.tzinfo is not None:
+                clicked_at = clicked_at.astimezone(timezone.utc).replace(tzinfo=None)
+            clicked_at = min(clicked_at, now)
 
-        return click
+        return {
+            "user_id": user_id,
+            "spark_type": spark_type,
+            "spark_text": spark_text,
+            "article_id": article_id,
+            "clicked_at": clicked_at
+        }
 
-    def get_curiosity_fingerprint(self, user_id: int) -> Dict:
+    def get_curiosity_fingerprint(self, user_id: int, days: int = 30) -> Dict:
         """
         获取用户的好奇心指纹
 
         Args:
             user_id: 用户 ID
+            days: 统计天数（默认 30 天，仅默认窗口使用缓存）
 
         Returns:
             好奇心指纹数据
         """
+        if days != FINGERPRINT_DAYS:
+            # 其他窗口直接从日汇总计算（只读取 days 天的汇总行）
+            return self._compute_curiosity_fingerprint(user_id, days)
+
         # 先尝试从缓存中获取
         fingerprint = self.db.query(CuriosityFingerprint).filter(
             CuriosityFingerprint.user_id == user_id
@@ -86,8 +130,8 @@ class AnalyticsService:
         # 否则，重新计算
         return self._compute_curiosity_fingerprint(user_id)
 
-    def _update_curiosity_fingerprint(self, user_id: int):
-        """更新好奇心指纹缓存"""
+    def update_curiosity_fingerprint(self, user_id: int):
+        """更新好奇心指纹缓存（由点击写缓冲延迟调用）"""
         data = self._compute_curiosity_fingerprint(user_id)
 
         # 查找或创建缓存记录
@@ -114,106 +158,71 @@ class AnalyticsService:
         self.db.commit()
         logger.info(f"好奇心指纹已更新: User {user_id}")
 
-    def _compute_curiosity_fingerprint(self, user_id: int) -> Dict:
+    def _compute_curiosity_fingerprint(self, user_id: int, days: int = FINGERPRINT_DAYS) -> Dict:
         """
-        计算好奇心指纹（实时计算）
+        计算好奇心指纹（读取日汇总表，不扫描原始点击）
 
         Args:
             user_id: 用户 ID
+            days: 统计天数
 
         Returns:
             好奇心指纹数据
         """
-        # 查询最近 30 天的火花点击
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        clicks = self.db.query(SparkClick).filter(
-            SparkClick.user_id == user_id,
-            SparkClick.clicked_at >= thirty_days_ago
-        ).order_by(SparkClick.clicked_at.desc()).all()
+        rollups = SparkRollupService(self.db)
 
         # 1. 火花类型分布
-        spark_distribution = defaultdict(int)
-        for click in clicks:
-            spark_distribution[click.spark_type] += 1
+        spark_distribution = rollups.get_type_counts(user_id, days)
 
         # 2. 时序分析（按天聚合）
-        time_series = self._compute_time_series(clicks)
+        time_series = self._compute_time_series(rollups.get_daily_counts(user_id, days), days)
 
         # 3. 话题云图（从火花文本中提取关键词）
-        topic_cloud = self._compute_topic_cloud(clicks, user_id)
+        topic_cloud = self._compute_topic_cloud(rollups.get_top_topics(user_id, days, limit=20))
 
         return {
-            "spark_distribution": dict(spark_distribution),
+            "spark_distribution": spark_distribution,
             "time_series": time_series,
             "topic_cloud": topic_cloud,
             "last_updated": datetime.utcnow().isoformat()
         }
 
-    def _compute_time_series(self, clicks: List[SparkClick]) -> List[Dict]:
+    def _compute_time_series(self, daily_counts: Dict[str, Dict[str, int]], days: int = FINGERPRINT_DAYS) -> List[Dict]:
         """
-        计算时序数据（最近 30 天）
+        计算时序数据（最近 days 天）
 
         Args:
-            clicks: 火花点击列表
+            daily_counts: 每日各类型点击数 {"2025-01-01": {"concept": 3}}
+            days: 统计天数
 
         Returns:
             时序数据数组
         """
-        # 按日期分组
-        daily_counts = defaultdict(lambda: defaultdict(int))
-
-        for click in clicks:
-            date_str = click.clicked_at.date().isoformat()
-            daily_counts[date_str][click.spark_type] += 1
-
-        # 生成最近 30 天的数据（填充缺失日期）
+        # 生成最近 days 天的数据（填充缺失日期）
         result = []
-        for i in range(30):
+        for i in range(days):
             date = (datetime.utcnow() - timedelta(days=i)).date()
             date_str = date.isoformat()
 
             result.append({
                 "date": date_str,
-                "counts": dict(daily_counts[date_str]) if date_str in daily_counts else {}
+                "counts": dict(daily_counts.get(date_str, {}))
             })
 
         # 倒序（最早的日期在前）
         result.reverse()
         return result
 
-    def _compute_topic_cloud(self, clicks: List[SparkClick], user_id: int) -> List[Dict]:
+    def _compute_topic_cloud(self, top_keywords: List[Tuple[str, int]]) -> List[Dict]:
         """
-        计算话题云图（从火花文本和洞察中提取关键词）
+        计算话题云图
 
         Args:
-            clicks: 火花点击列表
-            user_id: 用户 ID
+            top_keywords: 高频关键词 [(关键词, 次数), ...]，按次数降序
 
         Returns:
             话题列表
         """
-        # 方法 1: 从火花文本中提取（简单版）
-        # 统计所有火花文本中的高频词
-        all_text = " ".join([click.spark_text for click in clicks])
-
-        # 简单的关键词提取（去除停用词）
-        stopwords = {"的", "了", "在", "是", "我", "有", "和", "就", "不", "人", "都", "一", "个", "上", "也"}
-
-        # 使用正则提取中文词汇（2-10 字）
-        keywords = re.findall(r'[\u4e00-\u9fa5]{2,10}', all_text)
-
-        # 过滤停用词
-        keywords = [kw for kw in keywords if kw not in stopwords]
-
-        # 统计频率
-        keyword_counts = Counter(keywords)
-
-        # 取 TOP 20
-        top_keywords = keyword_counts.most_common(20)
-
-        # 方法 2: 从用户的洞察中提取领域标签（更准确，但需要洞察有 domain 字段）
-        # 这里先使用简单方法
-
         # 归一化权重（最高频的词权重为 1.0）
         if not top_keywords:
             return []
@@ -243,15 +252,15 @@ class AnalyticsService:
         """
         start_date = datetime.utcnow() - timedelta(days=days)
 
-        clicks = self.db.query(SparkClick).filter(
+        # 在数据库中按类型计数（由 (user_id, clicked_at, spark_type) 索引覆盖）
+        rows = self.db.query(
+            SparkClick.spark_type, func.count()
+        ).filter(
             SparkClick.user_id == user_id,
             SparkClick.clicked_at >= start_date
-        ).all()
+        ).group_by(SparkClick.spark_type).all()
 
-        # 按类型统计
-        type_counts = defaultdict(int)
-        for click in clicks:
-            type_counts[click.spark_type] += 1
+        type_counts = {spark_type: count for spark_type, count in rows}
 
         # 计算主导类型
         dominant_type = None
@@ -259,8 +268,22 @@ class AnalyticsService:
             dominant_type = max(type_counts.items(), key=lambda x: x[1])[0]
 
         return {
-            "total_clicks": len(clicks),
-            "type_counts": dict(type_counts),
+            "total_clicks": sum(type_counts.values()),
+            "type_counts": type_counts,
             "dominant_type": dominant_type,
             "period_days": days
         }
+
+
+@register_write_handler
+def _schedule_fingerprints(db: Session, events: List[Dict]):
+    """点击写缓冲回调：提交后登记点击用户的好奇心指纹延迟刷新"""
+    user_ids = {event["user_id"] for event in events}
+
+    def after_commit(buffer):
+        buffer.schedule_fingerprints(user_ids)
+
+    return after_commit
+
+
+register_user_job(FINGERPRINT_JOB, lambda db, user_id: AnalyticsService(db).update_curiosity_fingerprint(user_id))
@@ -0,0 +1,347 @@
+"""文章库检索服务 - 句子级倒排索引
+
+每篇文章保存时分句（与分析报告共享同一份分句结果，见 ArticleSentenceService），再用 cjk_tokenizer 切分为词元，
+写入按 (user_id, term) 分区的倒排表。倒排列表记录 文章ID -> 命中句子序号，
+使用 varint 差值编码压缩（见 app/utils/postings.py）。
+
+查询时对所有查询词元取交集（同一句子必须包含全部词元），
+返回每篇文章的命中句子序号，前端可直接定位到 #sentence-{idx}。
+
+同一用户的多篇文章可能在并发的后台任务中同时索引，共享 (user_id, term) 行：
+先用 INSERT ... ON CONFLICT DO NOTHING 补齐缺失的行，再按词元顺序 SELECT ... FOR UPDATE 加锁后读改写，
+避免更新丢失和插入冲突。倒排列表清空后保留空行，不删除（删除会与并发的补齐插入竞争）。
+"""
+import logging
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models.models import Article, ArticleSearchDocument, ArticleSearchPosting
+from app.services.article_sentence_service import ArticleSentenceService
+from app.utils.cjk_tokenizer import is_cjk_run, tokenize, tokenize_query
+from app.utils.postings import Postings, decode_postings, encode_postings
+
+logger = logging.getLogger(__name__)
+
+# 单次 IN 查询的词元数量上限（避免超出数据库参数个数限制）
+TERM_BATCH_SIZE = 500
+
+# 单条 INSERT 补齐的行数（每行 5 个参数）
+INSERT_BATCH_SIZE = 100
+
+# 词元最大长度（与 ArticleSearchPosting.term 列宽一致）
+MAX_TERM_LENGTH = 64
+
+# 每篇文章返回的命中句子预览数
+MAX_PREVIEW_SENTENCES = 3
+
+
+class ArticleSearchService:
+    """文章库句子级检索服务"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # ==================== 索引维护 ====================
+
+    def index_article(self, article: Article) -> int:
+        """
+        为一篇文章建立倒排索引（不提交事务）
+
+        Args:
+            article: 文章对象（必须有 user_id）
+
+        Returns:
+            写入的词元数量
+        """
+        if not article.user_id:
+            return 0
+
+        existing = self.db.get(ArticleSearchDocument, article.id)
+        if existing:
+            self.remove_article(article)
+
+        sentences = self._sentences(article)
+        term_sentences = self._collect_terms(sentences)
+
+        for batch in self._batches(sorted(term_sentences)):
+            self._ensure_rows(article.user_id, batch)
+            rows = {row.term: row for row in self._lock_rows(article.user_id, batch)}
+
+            for term in batch:
+                indices = term_sentences[term]
+                row = rows[term]
+                if article.id > row.last_article_id:
+                    # 文章ID递增：直接在末尾追加，无需解码
+                    row.postings = row.postings + encode_postings(
+                        [(article.id, indices)], base_article_id=row.last_article_id
+                    )
+                    row.doc_count += 1
+                    row.last_article_id = article.id
+                else:
+                    postings = decode_postings(row.postings)
+                    postings[article.id] = indices
+                    self._store_postings(row, postings)
+
+        self.db.add(ArticleSearchDocument(
+            article_id=article.id,
+            user_id=article.user_id,
+            sentence_count=len(sentences),
+            term_count=len(term_sentences)
+        ))
+        self.db.flush()
+
+        logger.info(f"[ArticleSearch] 文章已索引: article_id={article.id}, 句子={len(sentences)}, 词元={len(term_sentences)}")
+        return len(term_sentences)
+
+    def remove_article(self, article: Article) -> None:
+        """
+        从倒排索引中删除一篇文章（不提交事务）
+
+        Args:
+            article: 文章对象（删除前调用，需要读取其内容以确定词元）
+        """
+        document = self.db.get(ArticleSearchDocument, article.id)
+        if not document:
+            return
+
+        terms = sorted(self._collect_terms(self._sentences(article)))
+        for batch in self._batches(terms):
+            for row in self._lock_rows(document.user_id, batch):
+                postings = decode_postings(row.postings)
+                if postings.pop(article.id, None) is None:
+                    continue
+                self._store_postings(row, postings)
+
+        self.db.delete(document)
+        self.db.flush()
+
+    def index_missing(self, user_id: Optional[int] = None) -> int:
+        """
+        为尚未建立索引的文章补建索引（回填/修复工具，逐篇提交）
+
+        Args:
+            user_id: 只处理指定用户（None 表示全部用户）
+
+        Returns:
+            新索引的文章数量
+        """
+        indexed_ids = self.db.query(ArticleSearchDocument.article_id)
+        query = self.db.query(Article.id).filter(
+            Article.user_id.isnot(None),
+            Article.id.notin_(indexed_ids)
+        )
+        if user_id is not None:
+            query = query.filter(Article.user_id == user_id)
+
+        article_ids = [row[0] for row in query.order_by(Article.id).all()]
+        for article_id in article_ids:
+            self.index_article(self.db.get(Article, article_id))
+            self.db.commit()
+
+        return len(article_ids)
+
+    # ==================== 检索 ====================
+
+    def search(self, user_id: int, query: str, skip: int = 0, limit: int = 20) -> Dict:
+        """
+        检索用户文章库中提到查询词的文章
+
+        Args:
+            user_id: 用户 ID
+            query: 检索词
+            skip: 偏移量
+            limit: 每页数量
+
+        Returns:
+            {"total": int, "articles": [{"id", "title", "match_count", "sentences": [...]}]}
+        """
+        terms = tokenize_query(query)
+        if not terms:
+            return {"total": 0, "articles": []}
+
+        # 逐个词元取交集：先处理文档数最少的词元，尽早缩小候选集
+        term_postings = [self._load_term_postings(user_id, term) for term in terms]
+        term_postings.sort(key=len)
+
+        matches: Dict[int, Set[int]] = {
+            article_id: set(indices) for article_id, indices in term_postings[0].items()
+        }
+        for postings in term_postings[1:]:
+            if not matches:
+                break
+            narrowed = {}
+            for article_id, indices in matches.items():
+                other = postings.get(article_id)
+                if other:
+                    common = indices.intersection(other)
+                    if common:
+                        narrowed[article_id] = common
+            matches = narrowed
+
+        if not matches:
+            return {"total": 0, "articles": []}
+
+        # 按命中句子数降序、文章ID降序（新文章在前）
+        ranked = sorted(matches.items(), key=lambda item: (-len(item[1]), -item[0]))
+        page = ranked[skip:skip + limit]
+
+        articles = {
+            article.id: article
+            for article in self.db.query(Article).filter(
+                Article.id.in_([article_id for article_id, _ in page]),
+                Article.user_id == user_id
+            )
+        }
+
+        results = []
+        for article_id, indices in page:
+            article = articles.get(article_id)
+            if not article:
+                continue
+
+            sorted_indices = sorted(indices)
+            sentences = self._sentences(article)
+            results.append({
+                "id": article.id,
+                "title": article.title,
+                "last_read_at": article.last_read_at.isoformat() if article.last_read_at else None,
+                "match_count": len(sorted_indices),
+                "sentence_indices": sorted_indices,
+                "sentences": [
+                    {
+                        "index": idx,
+                        "text": sentences[idx] if idx < len(sentences) else "",
+                        "dom_path": f"#sentence-{idx}"
+                    }
+                    for idx in sorted_indices[:MAX_PREVIEW_SENTENCES]
+                ]
+            })
+
+        return {"total": len(ranked), "articles": results}
+
+    # ==================== 辅助方法 ====================
+
+    def _load_term_postings(self, user_id: int, term: str) -> Postings:
+        """
+        读取一个查询词元的倒排列表
+
+        单个中文字按前缀匹配（合并所有以该字开头的二元组）。
+        """
+        query = self.db.query(ArticleSearchPosting.postings).filter(
+            ArticleSearchPosting.user_id == user_id
+        )
+        if len(term) == 1 and is_cjk_run(term):
+            query = query.filter(ArticleSearchPosting.term.like(f"{term}%"))
+        else:
+            query = query.filter(ArticleSearchPosting.term == term[:MAX_TERM_LENGTH])
+
+        merged: Dict[int, Set[int]] = defaultdict(set)
+        for (data,) in query:
+            for article_id, indices in decode_postings(data).items():
+                merged[article_id].update(indices)
+        return {article_id: sorted(indices) for article_id, indices in merged.items()}
+
+    def _ensure_rows(self, user_id: int, terms: List[str]) -> None:
+        """补齐缺失的 (user_id, term) 行（空倒排列表；并发插入同一行时忽略冲突）"""
+        dialect = self.db.get_bind().dialect.name
+        if dialect not in ("sqlite", "postgresql"):
+            # 其他数据库：逐行检查后插入
+            existing = {
+                term for (term,) in self.db.query(ArticleSearchPosting.term).filter(
+                    ArticleSearchPosting.user_id == user_id,
+                    ArticleSearchPosting.term.in_(terms)
+                )
+            }
+            for term in terms:
+                if term not in existing:
+                    self.db.add(ArticleSearchPosting(user_id=user_id, term=term, postings=b"", doc_count=0, last_article_id=0))
+            self.db.flush()
+            return
+
+        insert = sqlite_insert if dialect == "sqlite" else pg_insert
+        for start in range(0, len(terms), INSERT_BATCH_SIZE):
+            stmt = insert(ArticleSearchPosting).values([
+                {"user_id": user_id, "term": term, "postings": b"", "doc_count": 0, "last_article_id": 0}
+                for term in terms[start:start + INSERT_BATCH_SIZE]
+            ]).on_conflict_do_nothing(index_elements=["user_id", "term"])
+            self.db.execute(stmt)
+
+    def _lock_rows(self, user_id: int, terms: List[str]) -> List[ArticleSearchPosting]:
+        """按词元顺序加行锁读取倒排行（并发任务以相同顺序加锁，避免死锁）"""
+        # populate_existing 会覆盖会话中未写入的修改，先写入
+        self.db.flush()
+        return self.db.query(ArticleSearchPosting).filter(
+            ArticleSearchPosting.user_id == user_id,
+            ArticleSearchPosting.term.in_(terms)
+        ).order_by(ArticleSearchPosting.term).with_for_update().populate_existing().all()
+
+    def _sentences(self, article: Article) -> List[str]:
+        """文章的分句结果（按 content_hash 共享，句子序号与分析报告一致）"""
+        return ArticleSentenceService(self.db).segment(article.content, article.content_hash).sentences
+
+    @staticmethod
+    def _collect_terms(sentences: List[str]) -> Dict[str, List[int]]:
+        """统计每个词元出现的句子序号（升序、去重）"""
+        term_sentences: Dict[str, List[int]] = defaultdict(list)
+        for idx, sentence in enumerate(sentences):
+            for term in set(tokenize(sentence)):
+                term_sentences[term[:MAX_TERM_LENGTH]].append(idx)
+        return term_sentences
+
+    @staticmethod
+    def _store_postings(row: ArticleSearchPosting, postings: Postings) -> None:
+        """重新编码整条倒排列表（清空时保留空行）"""
+        entries = sorted(postings.items())
+        row.postings = encode_postings(entries)
+        row.doc_count = len(entries)
+        row.last_article_id = entries[-1][0] if entries else 0
+
+    @staticmethod
+    def _batches(items: List[str]):
+        """按批次切分词元列表"""
+        for start in range(0, len(items), TERM_BATCH_SIZE):
+            yield items[start:start + TERM_BATCH_SIZE]
+
+
+def index_article_task(article_id: int) -> Dict:
+    """
+    后台索引任务：为新保存的文章建立倒排索引
+
+    Args:
+        article_id: 文章ID
+
+    Returns:
+        索引结果
+    """
+    from app.db.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        article = db.get(Article, article_id)
+        if not article or not article.user_id:
+            return {"article_id": article_id, "indexed": False}
+
+        term_count = ArticleSearchService(db).index_article(article)
+        db.commit()
+        return {"article_id": article_id, "indexed": True, "term_count": term_count}
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def submit_article_indexing(article_id: int) -> str:
+    """提交后台索引任务（不阻塞保存请求）"""
+    from app.core.task_manager import task_manager
+
+    return task_manager.submit_task(
+        "article_indexing",
+        index_article_task,
+        {"article_id": article_id},
+        article_id
+    )
@@ -0,0 +1,376 @@
+"""文章分句存储服务 - 按内容哈希保存分句结果
+
+分句结果按 content_hash 单独保存，分析报告本身不再内嵌句子数组；
+报告接口默认在返回时附带分句（可用 ?exclude=sentences 省略），也可以通过单独接口获取。
+
+同一篇文章只分句一次：结果（句子、字符偏移、分句规则版本）保存在 article_sentences 表，
+已保存的句子列表不再改变（分析报告的 sentence_index 指向它），分句规则升级只影响新内容；
+并按 content_hash 缓存在进程内（LRU），连同带编号的句子列表（"[i] 句子"，用于 Prompt）
+一起提供给统一分析、元信息分析、思维透镜和句子检索，保证各处的句子编号一致。
+
+进程内缓存只放已提交的分句结果：事务中得到的结果在提交后才写入缓存，回滚时丢弃。
+并发分句同一新内容时以先写入的一方为准（INSERT ... ON CONFLICT DO NOTHING 后重新读取）。
+"""
+import hashlib
+import logging
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.models import AnalysisReport, ArticleSentences
+from app.utils.extractive_compressor import select_sentences, to_regions
+from app.utils.sentence_splitter import SPLITTER_VERSION, split_sentences_with_offsets
+
+logger = logging.getLogger(__name__)
+
+
+class SentenceSegmentation:
+    """一篇文章的分句结果（构建后只读，可在线程间共享）"""
+
+    def __init__(
+        self,
+        content_hash: str,
+        sentences: List[str],
+        offsets: Sequence[Sequence[int]],
+        splitter_version: str = SPLITTER_VERSION
+    ):
+        self.content_hash = content_hash
+        self.sentences = sentences
+        self.offsets: List[Tuple[int, int]] = [(start, end) for start, end in offsets]
+        self.splitter_version = splitter_version
+
+        # 带编号的句子列表，以及每行在其中的结束位置（用于截取前若干句）
+        lines = [f"[{i}] {sentence}" for i, sentence in enumerate(sentences)]
+        self.numbered = "\n".join(lines)
+        self._line_ends: List[int] = []
+        position = -1
+        for line in lines:
+            position += len(line) + 1
+            self._line_ends.append(position)
+        self._starts = [start for start, _ in self.offsets]
+
+    @classmethod
+    def from_text(cls, content: str, content_hash: Optional[str] = None) -> "SentenceSegmentation":
+        """直接分句（不读写数据库）"""
+        if content_hash is None:
+            content_hash = hashlib.md5(content.encode('utf-8')).hexdigest()
+        parts = split_sentences_with_offsets(content)
+        return cls(content_hash, [part.text for part in parts], [(part.start, part.end) for part in parts])
+
+    def __len__(self) -> int:
+        return len(self.sentences)
+
+    def numbered_within(self, max_chars: int) -> Tuple[str, int]:
+        """
+        原文前 max_chars 个字符内的带编号句子列表
+
+        跨过边界的最后一句截断到 max_chars，与先截断原文再分句的结果一致，且编号与完整分句相同。
+
+        Returns:
+            (带编号的句子列表, 句子数)
+        """
+        count = bisect_left(self._starts, max_chars)
+        if count == 0:
+            return "", 0
+
+        last = count - 1
+        start, end = self.offsets[last]
+        if end <= max_chars:
+            return self.numbered[:self._line_ends[last]], count
+
+        head = self.numbered[:self._line_ends[last - 1] + 1] if last else ""
+        clipped = self.sentences[last][:max_chars - start].rstrip()
+        return f"{head}[{last}] {clipped}", count
+
+    def numbered_salient(self, budget: float, cost: Optional[Callable[[str], float]] = None) -> Tuple[str, int]:
+        """
+        不超过预算的带编号句子列表：超出时按重要性挑选句子（见 app/utils/extractive_compressor.py）
+
+        选中的句子保持原文顺序和编号，不连续的片段之间用 …… 分隔。
+
+        Args:
+            budget: 预算
+            cost: 每行（"[i] 句子"）的开销，默认按字符数（含换行符）
+
+        Returns:
+            (带编号的句子列表, 选中的句子数)
+        """
+        if cost is None and len(self.numbered) <= budget:
+            return self.numbered, len(self.sentences)
+
+        starts = [0] + [end + 1 for end in self._line_ends[:-1]]
+        if cost is None:
+            costs = [end - start + 1 for start, end in zip(starts, self._line_ends)]
+        else:
+            costs = [cost(self.numbered[start:end]) for start, end in zip(starts, self._line_ends)]
+            if sum(costs) <= budget:
+                return self.numbered, len(self.sentences)
+
+        selected = select_sentences(self.sentences, costs, budget)
+        return self.numbered_regions(to_regions(selected)), len(selected)
+
+    def numbered_regions(self, regions: Sequence[Tuple[int, int]]) -> str:
+        """
+        指定区间内的带编号句子列表（编号与完整分句相同，区间之间用 …… 分隔）
+
+        Args:
+            regions: [(start, end)] 句子序号区间，[start, end)，升序且不重叠
+        """
+        parts = []
+        for start, end in regions:
+            start, end = max(start, 0), min(end, len(self.sentences))
+            if start >= end:
+                continue
+            begin = self._line_ends[start - 1] + 1 if start else 0
+            parts.append(self.numbered[begin:self._line_ends[end - 1]])
+        return "\n……\n".join(parts)
+
+
+class SegmentationCache:
+    """按 content_hash 缓存分句结果（LRU 淘汰，线程安全）"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, SentenceSegmentation]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, content_hash: str) -> Optional[SentenceSegmentation]:
+        with self._lock:
+            segmentation = self._entries.get(content_hash)
+            if segmentation is not None:
+                self._entries.move_to_end(content_hash)
+            return segmentation
+
+    def put(self, segmentation: SentenceSegmentation) -> None:
+        with self._lock:
+            self._entries[segmentation.content_hash] = segmentation
+            self._entries.move_to_end(segmentation.content_hash)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, content_hash: str) -> None:
+        with self._lock:
+            self._entries.pop(content_hash, None)
+
+
+segmentation_cache = SegmentationCache(settings.sentence_cache_max_articles)
+
+# 本事务中得到、尚未提交的分句结果：{content_hash: SentenceSegmentation}
+PENDING_SEGMENTATIONS_KEY = "pending_segmentations"
+
+
+@event.listens_for(Session, "after_commit")
+def _cache_committed_segmentations(session):
+    """提交后把本事务中的分句结果放入进程内缓存"""
+    for segmentation in session.info.pop(PENDING_SEGMENTATIONS_KEY, {}).values():
+        segmentation_cache.put(segmentation)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_segmentations(session):
+    """事务回滚时数据库中没有对应的行，丢弃本事务中的分句结果"""
+    session.info.pop(PENDING_SEGMENTATIONS_KEY, None)
+
+
+class ArticleSentenceService:
+    """文章分句存储服务"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def segment(self, content: str, content_hash: Optional[str] = None) -> SentenceSegmentation:
+        """
+        获取文章的分句结果：进程内缓存 -> article_sentences 表 -> 现场分句并保存（不提交事务）
+
+        已保存的句子列表原样使用（即使分句规则版本已变化），缺少偏移时在原文中定位补全。
+        结果在事务提交后才进入进程内缓存。
+
+        Args:
+            content: 文章内容
+            content_hash: 文章内容哈希（不传时按内容计算 MD5，与 Article.content_hash 一致）
+
+        Returns:
+            SentenceSegmentation
+        """
+        if content_hash is None:
+            content_hash = hashlib.md5(content.encode('utf-8')).hexdigest()
+
+        segmentation = segmentation_cache.get(content_hash)
+        if segmentation is not None:
+            return segmentation
+
+        pending = self.db.info.setdefault(PENDING_SEGMENTATIONS_KEY, {})
+        segmentation = pending.get(content_hash)
+        if segmentation is not None:
+            return segmentation
+
+        row = self.db.get(ArticleSentences, content_hash)
+        if row is None:
+            segmentation = SentenceSegmentation.from_text(content, content_hash)
+            row = self._store(segmentation)
+            logger.info(f"[Sentences] 分句完成: content_hash={content_hash}, {len(segmentation)} 个句子")
+            if row.sentences != segmentation.sentences:
+                # 并发分句时另一方先写入：以已保存的分句为准
+                segmentation = None
+
+        if segmentation is None:
+            if row.offsets is None:
+                # 旧数据（报告中迁移来的分句）：保留句子列表，在原文中定位补全偏移
+                row.offsets = align_offsets(content, row.sentences)
+                self.db.flush()
+            segmentation = SentenceSegmentation(content_hash, row.sentences, row.offsets, row.splitter_version)
+
+        pending[content_hash] = segmentation
+        return segmentation
+
+    def get(self, content_hash: str) -> Optional[List[str]]:
+        """
+        获取已保存的分句结果
+
+        Args:
+            content_hash: 文章内容哈希
+
+        Returns:
+            句子列表，不存在时返回 None
+        """
+        segmentation = segmentation_cache.get(content_hash)
+        if segmentation is not None:
+            return segmentation.sentences
+        row = self.db.get(ArticleSentences, content_hash)
+        return row.sentences if row else None
+
+    def get_or_split(self, content_hash: str, content: str) -> List[str]:
+        """
+        获取分句结果，不存在时现场分句并保存（不提交事务）
+
+        Args:
+            content_hash: 文章内容哈希
+            content: 文章内容
+
+        Returns:
+            句子列表
+        """
+        return self.segment(content, content_hash).sentences
+
+    def save(self, content_hash: str, sentences: List[str], content: Optional[str] = None) -> bool:
+        """
+        保存来源不明的分句结果（如旧报告中内嵌的分句；不提交事务）
+
+        已有分句结果时不覆盖：其他报告的 sentence_index 可能指向它。
+
+        Args:
+            content_hash: 文章内容哈希
+            sentences: 句子列表
+            content: 文章内容（传入时同时保存句子在原文中的偏移，否则在下次 segment 时补全）
+
+        Returns:
+            是否写入
+        """
+        if self.db.get(ArticleSentences, content_hash) is not None:
+            return False
+
+        return self._insert(
+            content_hash=content_hash,
+            sentences=sentences,
+            sentence_count=len(sentences),
+            offsets=align_offsets(content, sentences) if content is not None else None,
+            splitter_version=None
+        )
+
+    def _store(self, segmentation: SentenceSegmentation) -> ArticleSentences:
+        """
+        写入分句结果（不提交事务）
+
+        Returns:
+            数据库中的分句行：已被并发事务写入时为对方的分句
+        """
+        self._insert(
+            content_hash=segmentation.content_hash,
+            sentences=segmentation.sentences,
+            sentence_count=len(segmentation),
+            offsets=[[start, end] for start, end in segmentation.offsets],
+            splitter_version=segmentation.splitter_version
+        )
+        return self.db.query(ArticleSentences).filter(
+            ArticleSentences.content_hash == segmentation.content_hash
+        ).populate_existing().one()
+
+    def _insert(self, **values) -> bool:
+        """插入分句行，已存在时不覆盖（不提交事务）；返回是否写入"""
+        dialect = self.db.get_bind().dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            insert = sqlite_insert if dialect == "sqlite" else pg_insert
+            result = self.db.execute(
+                insert(ArticleSentences).values(**values).on_conflict_do_nothing(index_elements=["content_hash"])
+            )
+            return result.rowcount == 1
+
+        # 其他数据库：检查后插入
+        if self.db.get(ArticleSentences, values["content_hash"]) is not None:
+            return False
+        self.db.add(ArticleSentences(**values))
+        self.db.flush()
+        return True
+
+    def detach_from_report(self, report: AnalysisReport, content_hash: str, content: Optional[str] = None) -> bool:
+        """
+        将旧报告中内嵌的 sentences 移到分句表（不提交事务）
+
+        分句表中已有不同的句子列表时保留报告内嵌的分句，保证报告的 sentence_index 仍然对应。
+
+        Args:
+            report: 分析报告
+            content_hash: 文章内容哈希
+            content: 文章内容（用于保存句子偏移，可选）
+
+        Returns:
+            报告是否被修改
+        """
+        data = report.report_data
+        if not isinstance(data, dict) or not isinstance(data.get("sentences"), list):
+            return False
+
+        slim = dict(data)
+        sentences = slim.pop("sentences")
+        stored = self.get(content_hash)
+        if stored is None:
+            self.save(content_hash, sentences, content)
+        elif stored != sentences:
+            logger.warning(
+                f"[Sentences] 报告 {report.id} 的内嵌分句与已保存的分句不同，保留在报告中: content_hash={content_hash}"
+            )
+            return False
+
+        # 整体赋值，确保 JSON 列的变更被 ORM 检测到
+        report.report_data = slim
+        logger.info(f"[Sentences] 报告 {report.id} 的内嵌分句已迁移到 article_sentences")
+        return True
+
+
+def align_offsets(content: str, sentences: Sequence[str]) -> List[List[int]]:
+    """
+    在原文中依次定位句子，得到字符偏移 [[start, end], ...]
+
+    句子中的换行符可能由原文的 \r\n 统一而来；找不到的句子（旧数据可能经过清洗）记为当前位置的空区间。
+    """
+    offsets = []
+    position = 0
+    for sentence in sentences:
+        start = content.find(sentence, position)
+        length = len(sentence)
+        if start < 0 and "\n" in sentence:
+            start = content.find(sentence.replace("\n", "\r\n"), position)
+            length = len(sentence) + sentence.count("\n")
+        if start < 0:
+            offsets.append([position, position])
+            continue
+        offsets.append([start, start + length])
+        position = start + length
+    return offsets
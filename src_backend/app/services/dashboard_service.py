@@ -0,0 +1,248 @@
+"""仪表盘服务 - 预计算的仪表盘快照
+
+仪表盘总览由两部分组成，分别在数据变化时失效：
+- sparks: 好奇心指纹分布 + 点击统计（火花点击写入时失效）
+- graph:  知识图谱统计 + 盲区（知识图谱重建时失效）
+
+读取采用 stale-while-revalidate：快照存在时立即返回，
+失效或过期的部分在后台任务中重算，只重算被标记的部分。
+"""
+import logging
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.click_buffer import register_write_handler
+from app.models.models import DashboardSnapshot, KnowledgeEdge, KnowledgeNode
+from app.services.knowledge_graph_service import KnowledgeGraphService
+from app.services.spark_rollup_service import SparkRollupService
+
+logger = logging.getLogger(__name__)
+
+SECTION_SPARKS = "sparks"
+SECTION_GRAPH = "graph"
+ALL_SECTIONS = [SECTION_SPARKS, SECTION_GRAPH]
+
+# 快照最长有效期（秒）：统计窗口随日期滑动，过期后即使未失效也在后台重算
+SNAPSHOT_MAX_AGE_SECONDS = 3600
+
+# 仪表盘统计窗口（天）
+OVERVIEW_DAYS = 30
+
+
+class DashboardService:
+    """仪表盘快照服务"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_overview(self, user_id: int) -> Dict:
+        """
+        获取仪表盘总览（有快照时立即返回，必要时后台刷新）
+
+        Args:
+            user_id: 用户 ID
+
+        Returns:
+            仪表盘总览数据
+        """
+        snapshot = self.db.get(DashboardSnapshot, user_id)
+        if snapshot is None:
+            # 首次访问：同步计算
+            return self.refresh(user_id)
+
+        if snapshot.dirty_sections or self._is_expired(snapshot):
+            submit_snapshot_refresh(user_id)
+
+        return self._with_meta(snapshot.data, snapshot.computed_at)
+
+    def refresh(self, user_id: int, sections: Optional[List[str]] = None) -> Dict:
+        """
+        重算快照并保存（提交事务）
+
+        Args:
+            user_id: 用户 ID
+            sections: 需要重算的部分（None 表示已失效的部分；快照不存在或已过期时全部重算）
+
+        Returns:
+            仪表盘总览数据
+        """
+        snapshot = self.db.get(DashboardSnapshot, user_id)
+        if snapshot is None or self._is_expired(snapshot):
+            sections = list(ALL_SECTIONS)
+        elif sections is None:
+            sections = list(snapshot.dirty_sections) or list(ALL_SECTIONS)
+
+        data = dict(snapshot.data) if snapshot else {}
+        if SECTION_SPARKS in sections:
+            data.update(self._compute_spark_sections(user_id))
+        if SECTION_GRAPH in sections:
+            data.update(self._compute_graph_sections(user_id))
+
+        now = datetime.utcnow()
+        if snapshot is None:
+            self.db.add(DashboardSnapshot(user_id=user_id, data=data, dirty_sections=[], computed_at=now))
+            try:
+                self.db.commit()
+            except IntegrityError:
+                # 并发的首次计算已写入快照
+                self.db.rollback()
+            return self._with_meta(data, now)
+
+        # 重算期间没有新的失效时才清除标记（version 未变化）
+        version = snapshot.version
+        remaining = [section for section in snapshot.dirty_sections if section not in sections]
+        updated = self.db.query(DashboardSnapshot).filter(
+            DashboardSnapshot.user_id == user_id,
+            DashboardSnapshot.version == version
+        ).update({
+            "data": data,
+            "dirty_sections": remaining,
+            "computed_at": now
+        }, synchronize_session=False)
+        if not updated:
+            self.db.query(DashboardSnapshot).filter(
+                DashboardSnapshot.user_id == user_id
+            ).update({"data": data, "computed_at": now}, synchronize_session=False)
+        self.db.commit()
+
+        logger.info(f"[Dashboard] 快照已刷新: user_id={user_id}, sections={sections}")
+        return self._with_meta(data, now)
+
+    def invalidate(self, user_ids: Iterable[int], section: str) -> None:
+        """
+        标记快照的某一部分失效（不提交事务）
+
+        Args:
+            user_ids: 用户 ID 列表
+            section: SECTION_SPARKS / SECTION_GRAPH
+        """
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+
+        snapshots = self.db.query(DashboardSnapshot).filter(
+            DashboardSnapshot.user_id.in_(user_ids)
+        ).all()
+        for snapshot in snapshots:
+            if section not in snapshot.dirty_sections:
+                snapshot.dirty_sections = list(snapshot.dirty_sections) + [section]
+            snapshot.version = DashboardSnapshot.version + 1
+        self.db.flush()
+
+    # ==================== 计算 ====================
+
+    def _compute_spark_sections(self, user_id: int) -> Dict:
+        """好奇心指纹分布与点击统计（读取日汇总）"""
+        type_counts = SparkRollupService(self.db).get_type_counts(user_id, OVERVIEW_DAYS)
+
+        dominant_type = None
+        if type_counts:
+            dominant_type = max(type_counts.items(), key=lambda x: x[1])[0]
+
+        return {
+            "curiosityFingerprint": {
+                "sparkDistribution": type_counts,
+                "dominantType": dominant_type
+            },
+            "stats": {
+                "totalSparkClicks": sum(type_counts.values()),
+                "activeDays": OVERVIEW_DAYS
+            }
+        }
+
+    def _compute_graph_sections(self, user_id: int) -> Dict:
+        """知识图谱统计与盲区（全部在数据库中聚合，孤岛按持久化的连通分量统计）"""
+        domain_rows = self.db.query(KnowledgeNode.domain, func.count()).filter(
+            KnowledgeNode.user_id == user_id
+        ).group_by(KnowledgeNode.domain).all()
+        total_edges = self.db.query(func.count(KnowledgeEdge.id)).filter(
+            KnowledgeEdge.user_id == user_id
+        ).scalar()
+
+        domain_stats = defaultdict(int)
+        for domain, count in domain_rows:
+            domain_stats[domain or "未分类"] += count
+
+        graph_service = KnowledgeGraphService(self.db)
+        user_domains = {domain for domain, _ in domain_rows if domain}
+        missing_domains = list(set(graph_service.classifier.domains) - user_domains)
+
+        return {
+            "knowledgeGraph": {
+                "totalNodes": sum(domain_stats.values()),
+                "totalEdges": total_edges,
+                "domains": dict(domain_stats)
+            },
+            "blindSpots": {
+                "missingDomains": missing_domains,
+                "knowledgeIslands": graph_service.count_knowledge_islands(user_id)
+            }
+        }
+
+    @staticmethod
+    def _is_expired(snapshot: DashboardSnapshot) -> bool:
+        return (datetime.utcnow() - snapshot.computed_at).total_seconds() > SNAPSHOT_MAX_AGE_SECONDS
+
+    @staticmethod
+    def _with_meta(data: Dict, computed_at: datetime) -> Dict:
+        return {**data, "snapshotAt": computed_at.isoformat()}
+
+
+# 正在后台刷新的用户（避免同一用户重复提交刷新任务）
+_refreshing: Set[int] = set()
+_refreshing_lock = threading.Lock()
+
+
+def refresh_snapshot_task(user_id: int) -> Dict:
+    """
+    后台任务：重算仪表盘快照中已失效的部分
+
+    Args:
+        user_id: 用户 ID
+
+    Returns:
+        刷新结果
+    """
+    from app.db.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        DashboardService(db).refresh(user_id)
+        return {"user_id": user_id, "refreshed": True}
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+        with _refreshing_lock:
+            _refreshing.discard(user_id)
+
+
+def submit_snapshot_refresh(user_id: int) -> Optional[str]:
+    """提交后台刷新任务（同一用户已在刷新时跳过）"""
+    from app.core.task_manager import task_manager
+
+    with _refreshing_lock:
+        if user_id in _refreshing:
+            return None
+        _refreshing.add(user_id)
+
+    # metadata 不使用 user_id 键：快照刷新不需要向前端推送 SSE 事件
+    return task_manager.submit_task(
+        "dashboard_snapshot",
+        refresh_snapshot_task,
+        {"target_user_id": user_id},
+        user_id
+    )
+
+
+@register_write_handler
+def _invalidate_spark_sections(db: Session, events: List[Dict]) -> None:
+    """点击写缓冲回调：点击用户的仪表盘火花统计失效"""
+    DashboardService(db).invalidate({event["user_id"] for event in events}, SECTION_SPARKS)
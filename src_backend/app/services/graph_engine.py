@@ -0,0 +1,225 @@
+"""知识图谱分析引擎 - 在内存中的邻接数组上回答局部问题
+
+用户的节点和边只读取所需列，构建为 CSR 邻接数组（见 app.utils.graph_algorithms），
+按用户缓存在进程内（LRU 淘汰）。缓存失效：
+- 本进程写入图谱时（点击增量更新、全量重建）显式失效
+- 每次读取前比对节点数 / 边数 / 节点最近更新时间，其他进程写入后自动重新加载
+
+支持：k 跳邻域、两个概念之间的最短路径、按 PageRank / 度排序的核心节点。
+"""
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.models import KnowledgeEdge, KnowledgeNode
+from app.utils.graph_algorithms import CSRGraph
+
+logger = logging.getLogger(__name__)
+
+METRIC_PAGERANK = "pagerank"
+METRIC_DEGREE = "degree"
+METRICS = [METRIC_PAGERANK, METRIC_DEGREE]
+
+
+class UserGraph:
+    """单个用户的图（节点属性数组 + CSR 邻接数组）"""
+
+    def __init__(self, node_rows: List[Tuple], edge_rows: List[Tuple], version: Tuple):
+        self.version = version
+        self.node_ids = [row[0] for row in node_rows]
+        self.labels = [row[1] for row in node_rows]
+        self.sizes = [row[2] for row in node_rows]
+        self.domains = [row[3] for row in node_rows]
+        self.colors = [row[4] for row in node_rows]
+        self.index = {label: i for i, label in enumerate(self.labels)}
+
+        position = {node_id: i for i, node_id in enumerate(self.node_ids)}
+        edges = [
+            (position[source_id], position[target_id], weight or 0.0)
+            for source_id, target_id, weight in edge_rows
+            if source_id in position and target_id in position
+        ]
+        self.graph = CSRGraph(
+            len(self.node_ids),
+            [edge[0] for edge in edges],
+            [edge[1] for edge in edges],
+            [edge[2] for edge in edges]
+        )
+        self._pagerank: Optional[np.ndarray] = None
+
+    def pagerank(self) -> np.ndarray:
+        """PageRank（首次使用时计算，随缓存一起失效）"""
+        if self._pagerank is None:
+            self._pagerank = self.graph.pagerank()
+        return self._pagerank
+
+    def node(self, i: int) -> Dict:
+        return {
+            "id": self.node_ids[i],
+            "label": self.labels[i],
+            "size": self.sizes[i],
+            "domain": self.domains[i],
+            "color": self.colors[i]
+        }
+
+    def edges_within(self, nodes: Iterable[int]) -> List[Dict]:
+        """两端都在给定节点集合中的边"""
+        members = np.fromiter(nodes, dtype=np.int64)
+        graph = self.graph
+        edges = []
+        for node in members.tolist():
+            start, end = graph.indptr[node], graph.indptr[node + 1]
+            neighbors = graph.indices[start:end]
+            # 每条无向边只输出一次（node < neighbor）
+            keep = np.isin(neighbors, members) & (neighbors > node)
+            for neighbor, weight in zip(neighbors[keep].tolist(), graph.weights[start:end][keep].tolist()):
+                edges.append({"source": self.node_ids[node], "target": self.node_ids[neighbor], "weight": weight})
+        return edges
+
+
+class GraphCache:
+    """按用户缓存 UserGraph（LRU 淘汰，线程安全）"""
+
+    def __init__(self, max_users: int):
+        self.max_users = max_users
+        self._graphs: "OrderedDict[int, UserGraph]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, version: Tuple) -> Optional[UserGraph]:
+        with self._lock:
+            graph = self._graphs.get(user_id)
+            if graph is None:
+                return None
+            if graph.version != version:
+                del self._graphs[user_id]
+                return None
+            self._graphs.move_to_end(user_id)
+            return graph
+
+    def put(self, user_id: int, graph: UserGraph) -> None:
+        with self._lock:
+            self._graphs[user_id] = graph
+            self._graphs.move_to_end(user_id)
+            while len(self._graphs) > self.max_users:
+                self._graphs.popitem(last=False)
+
+    def invalidate(self, user_ids: Iterable[int]) -> None:
+        with self._lock:
+            for user_id in user_ids:
+                self._graphs.pop(user_id, None)
+
+
+graph_cache = GraphCache(settings.graph_cache_max_users)
+
+
+class GraphEngine:
+    """知识图谱分析查询"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def load(self, user_id: int) -> UserGraph:
+        """获取用户的图（优先使用缓存）"""
+        version = self._version(user_id)
+        graph = graph_cache.get(user_id, version)
+        if graph is not None:
+            return graph
+
+        node_rows = self.db.query(
+            KnowledgeNode.id, KnowledgeNode.label, KnowledgeNode.size, KnowledgeNode.domain, KnowledgeNode.color
+        ).filter(KnowledgeNode.user_id == user_id).all()
+        edge_rows = self.db.query(
+            KnowledgeEdge.source_id, KnowledgeEdge.target_id, KnowledgeEdge.weight
+        ).filter(KnowledgeEdge.user_id == user_id).all()
+
+        graph = UserGraph(node_rows, edge_rows, version)
+        graph_cache.put(user_id, graph)
+        logger.info(f"[GraphEngine] 已加载图: user_id={user_id}, {len(node_rows)} 节点, {graph.graph.edge_count} 边")
+        return graph
+
+    def neighbors(self, user_id: int, concept: str, hops: int = 1, limit: int = 200) -> Optional[Dict]:
+        """
+        概念的 k 跳邻域
+
+        Args:
+            user_id: 用户 ID
+            concept: 中心概念名称
+            hops: 最大跳数
+            limit: 最多返回的节点数（含中心节点）
+
+        Returns:
+            {"center", "nodes", "edges"}，概念不存在时返回 None
+        """
+        graph = self.load(user_id)
+        center = graph.index.get(concept)
+        if center is None:
+            return None
+
+        distance = graph.graph.k_hop(center, hops, limit)
+        return {
+            "center": graph.node(center),
+            "nodes": [{**graph.node(i), "hops": hop} for i, hop in distance.items()],
+            "edges": graph.edges_within(distance.keys())
+        }
+
+    def shortest_path(self, user_id: int, source: str, target: str, max_hops: Optional[int] = None) -> Optional[Dict]:
+        """
+        两个概念之间跳数最少的路径
+
+        Returns:
+            {"found", "length", "nodes"}，概念不存在时返回 None
+        """
+        graph = self.load(user_id)
+        source_index, target_index = graph.index.get(source), graph.index.get(target)
+        if source_index is None or target_index is None:
+            return None
+
+        path = graph.graph.shortest_path(source_index, target_index, max_hops)
+        if path is None:
+            return {"found": False, "length": None, "nodes": []}
+        return {
+            "found": True,
+            "length": len(path) - 1,
+            "nodes": [graph.node(i) for i in path]
+        }
+
+    def top_nodes(self, user_id: int, metric: str = METRIC_PAGERANK, limit: int = 20) -> List[Dict]:
+        """
+        按 PageRank 或度排序的核心节点
+
+        Args:
+            metric: METRIC_PAGERANK / METRIC_DEGREE
+            limit: 返回数量
+
+        Returns:
+            [{节点..., "score"}]，按得分降序
+        """
+        graph = self.load(user_id)
+        if metric == METRIC_DEGREE:
+            scores = graph.graph.degree()
+        else:
+            scores = graph.pagerank()
+
+        limit = min(limit, len(scores))
+        if limit <= 0:
+            return []
+        # 先用 argpartition 取出前 limit 个，再只对这部分排序
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [{**graph.node(i), "score": scores[i].item()} for i in top.tolist()]
+
+    def _version(self, user_id: int) -> Tuple:
+        """图的版本（节点数、节点最近更新时间、边数），用于发现其他进程的写入"""
+        node_count, updated_at = self.db.query(
+            func.count(KnowledgeNode.id), func.max(KnowledgeNode.updated_at)
+        ).filter(KnowledgeNode.user_id == user_id).one()
+        edge_count = self.db.query(func.count(KnowledgeEdge.id)).filter(
+            KnowledgeEdge.user_id == user_id
+        ).scalar()
+        return node_count, updated_at, edge_count
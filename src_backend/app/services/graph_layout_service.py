@@ -0,0 +1,179 @@
+"""知识图谱布局服务 - 在服务端预计算节点坐标
+
+布局算法见 app.utils.graph_layout（NumPy 向量化的力导向布局）。坐标写入 knowledge_nodes.x / y，
+前端直接按坐标绘制，不必在浏览器中运行力导向模拟。
+
+- 全量布局：首次布局、全量重建后，或未布局的节点超过 INCREMENTAL_MAX_NEW_RATIO 时
+- 增量布局：以上次的坐标为初始值，新节点放在已布局邻居的中心附近，低温度少量迭代，
+  已有节点只做微调，前端看到的整体形状保持稳定
+
+图谱写入后由点击缓冲延迟触发（登记为 LAYOUT_JOB，见 ClickBuffer.refresh_due_layouts），后台任务执行。
+"""
+import logging
+import threading
+from typing import Dict, Optional, Set
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.click_buffer import LAYOUT_JOB, register_user_job
+from app.models.models import KnowledgeEdge, KnowledgeNode
+from app.utils.graph_layout import force_layout
+
+logger = logging.getLogger(__name__)
+
+FULL_ITERATIONS = 100
+INCREMENTAL_ITERATIONS = 30
+INCREMENTAL_TEMPERATURE = 0.5
+
+# 未布局节点超过该比例时改为全量布局
+INCREMENTAL_MAX_NEW_RATIO = 0.2
+
+# 写入坐标时每批更新的行数
+UPDATE_CHUNK_SIZE = 5000
+
+
+class GraphLayoutService:
+    """知识图谱布局"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def compute_layout(self, user_id: int, full: bool = False) -> Dict:
+        """
+        计算并保存用户知识图谱的节点坐标
+
+        Args:
+            user_id: 用户 ID
+            full: 忽略已有坐标，重新全量布局
+
+        Returns:
+            {"nodes": 节点数, "mode": "full" / "incremental" / "empty"}
+        """
+        nodes = self.db.query(KnowledgeNode.id, KnowledgeNode.x, KnowledgeNode.y).filter(
+            KnowledgeNode.user_id == user_id
+        ).order_by(KnowledgeNode.id).all()
+        if not nodes:
+            return {"nodes": 0, "mode": "empty"}
+
+        index = {node.id: i for i, node in enumerate(nodes)}
+        edges = [
+            (index[source_id], index[target_id], weight or 0.0)
+            for source_id, target_id, weight in self.db.query(
+                KnowledgeEdge.source_id, KnowledgeEdge.target_id, KnowledgeEdge.weight
+            ).filter(KnowledgeEdge.user_id == user_id)
+            if source_id in index and target_id in index
+        ]
+        sources = np.array([edge[0] for edge in edges], dtype=np.int64)
+        targets = np.array([edge[1] for edge in edges], dtype=np.int64)
+        weights = np.array([edge[2] for edge in edges], dtype=np.float64)
+
+        n = len(nodes)
+        placed = np.array([node.x is not None and node.y is not None for node in nodes])
+        incremental = not full and placed.any() and (n - placed.sum()) <= INCREMENTAL_MAX_NEW_RATIO * n
+
+        if incremental:
+            positions = self._seed_positions(nodes, placed, sources, targets)
+            result = force_layout(
+                n, sources, targets, weights,
+                positions=positions,
+                iterations=INCREMENTAL_ITERATIONS,
+                temperature=INCREMENTAL_TEMPERATURE
+            )
+        else:
+            result = force_layout(n, sources, targets, weights, iterations=FULL_ITERATIONS)
+
+        mappings = [
+            {"id": node.id, "x": x, "y": y}
+            for node, (x, y) in zip(nodes, np.round(result, 3).tolist())
+        ]
+        for start in range(0, len(mappings), UPDATE_CHUNK_SIZE):
+            self.db.bulk_update_mappings(KnowledgeNode, mappings[start:start + UPDATE_CHUNK_SIZE])
+        self.db.commit()
+
+        mode = "incremental" if incremental else "full"
+        logger.info(f"[GraphLayout] 布局完成: user_id={user_id}, {n} 节点, {len(edges)} 边, mode={mode}")
+        return {"nodes": n, "mode": mode}
+
+    @staticmethod
+    def _seed_positions(nodes, placed: np.ndarray, sources: np.ndarray, targets: np.ndarray) -> np.ndarray:
+        """增量布局的初始坐标：已布局节点沿用旧坐标，新节点放在已布局邻居的中心（加少量抖动）"""
+        n = len(nodes)
+        positions = np.zeros((n, 2))
+        positions[placed] = [(node.x, node.y) for node, ok in zip(nodes, placed) if ok]
+
+        # 每条边上，已布局端点的坐标累加到另一端
+        heads = np.concatenate((sources, targets))
+        tails = np.concatenate((targets, sources))
+        known = placed[tails]
+        heads, tails = heads[known], tails[known]
+        neighbor_count = np.bincount(heads, minlength=n)
+        center = np.zeros((n, 2))
+        for axis in range(2):
+            center[:, axis] = np.bincount(heads, weights=positions[tails, axis], minlength=n)
+
+        rng = np.random.default_rng(n)
+        new = ~placed
+        has_neighbors = new & (neighbor_count > 0)
+        positions[has_neighbors] = center[has_neighbors] / neighbor_count[has_neighbors, None]
+        # 没有已布局邻居的新节点放在已有布局的中心附近
+        positions[new & ~has_neighbors] = positions[placed].mean(axis=0)
+        positions[new] += rng.uniform(-0.5, 0.5, size=(int(new.sum()), 2))
+        return positions
+
+
+# 正在布局的用户；布局期间图谱又有变化时记入 _rerun，结束后再布局一次
+_running: Set[int] = set()
+_rerun: Dict[int, bool] = {}
+_running_lock = threading.Lock()
+
+
+def layout_task(user_id: int, full: bool = False) -> Dict:
+    """
+    后台任务：计算用户知识图谱布局
+
+    Args:
+        user_id: 用户 ID
+        full: 是否全量布局
+
+    Returns:
+        布局结果
+    """
+    from app.db.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return GraphLayoutService(db).compute_layout(user_id, full)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+        with _running_lock:
+            _running.discard(user_id)
+            rerun = _rerun.pop(user_id, None)
+        if rerun is not None:
+            submit_layout_refresh(user_id, rerun)
+
+
+def submit_layout_refresh(user_id: int, full: bool = False) -> Optional[str]:
+    """提交后台布局任务（同一用户正在布局时，结束后再执行一次）"""
+    from app.core.task_manager import task_manager
+
+    with _running_lock:
+        if user_id in _running:
+            _rerun[user_id] = _rerun.get(user_id, False) or full
+            return None
+        _running.add(user_id)
+
+    return task_manager.submit_task(
+        "graph_layout",
+        layout_task,
+        {"target_user_id": user_id},
+        user_id,
+        full
+    )
+
+
+# 点击写缓冲到期后提交后台布局任务（不使用缓冲的数据库会话）
+register_user_job(LAYOUT_JOB, lambda db, user_id: submit_layout_refresh(user_id))
@@ -0,0 +1,277 @@
+"""文章修改后的增量重新分析
+
+文章内容被修改时，按句子哈希对齐新旧分句结果（见 app.utils.sentence_diff）：
+
+- 未修改的句子：分析报告中的概念火花 / 论证火花、思维透镜的高亮直接沿用，只把 sentence_index
+  （以及 dom_path）换成新编号；落在被删除或改写的句子上的结果丢弃
+- 修改过的句子：连同前后 CONTEXT_SENTENCES 句上下文发给 LLM，只对这些句子重新标注，
+  结果合并回报告和透镜（后台任务，见 incremental_analysis_task）
+- 修改比例超过 INCREMENTAL_MAX_CHANGED_RATIO，或文章还没有完成的分析报告时，改为全量重新分析
+
+摘要、标签、元信息分析等整篇文章层面的判断在增量模式下保留，不随局部修改重新生成。
+"""
+import hashlib
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.models import AnalysisReport, Article
+from app.services.article_search_service import ArticleSearchService
+from app.services.article_sentence_service import ArticleSentenceService
+from app.utils.sentence_diff import SentenceAlignment, align_sentences
+
+logger = logging.getLogger(__name__)
+
+# 修改过的句子超过该比例时改为全量重新分析
+INCREMENTAL_MAX_CHANGED_RATIO = 0.3
+
+# 发给 LLM 的修改区间前后各带几句上下文
+CONTEXT_SENTENCES = 1
+
+# 合并后最多保留的概念火花数（与全量分析 Prompt 中的 3-7 个一致）
+MAX_CONCEPT_SPARKS = 7
+
+
+def remap_items(items: Optional[List[Dict]], index_map: Dict[int, int], dom_path: bool = False) -> List[Dict]:
+    """
+    按新旧句子编号映射调整火花 / 高亮，丢弃落在被删除或改写的句子上的条目
+
+    Args:
+        items: 带 sentence_index 的条目列表
+        index_map: 旧句子编号 -> 新句子编号
+        dom_path: 是否同时更新 dom_path（#sentence-{idx}）
+
+    Returns:
+        新的条目列表（不修改传入的条目）
+    """
+    remapped = []
+    for item in items or []:
+        new_index = index_map.get(item.get('sentence_index')) if isinstance(item, dict) else None
+        if new_index is None:
+            continue
+        item = {**item, 'sentence_index': new_index}
+        if dom_path:
+            item['dom_path'] = f"#sentence-{new_index}"
+        remapped.append(item)
+    return remapped
+
+
+def merge_sparks(report_data: Dict, regional: Dict) -> Dict:
+    """
+    把局部分析得到的火花合并进报告（按句子顺序；概念火花超出上限时保留重要性最高的）
+
+    Args:
+        report_data: 已调整编号的报告
+        regional: UnifiedAnalysisService.analyze_regions 的结果
+
+    Returns:
+        新的报告数据
+    """
+    concepts = list(report_data.get('concept_sparks') or []) + list(regional.get('concept_sparks') or [])
+    if len(concepts) > MAX_CONCEPT_SPARKS:
+        concepts = sorted(concepts, key=lambda spark: spark.get('importance_score') or 0, reverse=True)
+        concepts = concepts[:MAX_CONCEPT_SPARKS]
+    arguments = list(report_data.get('argument_sparks') or []) + list(regional.get('argument_sparks') or [])
+
+    return {
+        **report_data,
+        'concept_sparks': sorted(concepts, key=lambda spark: spark['sentence_index']),
+        'argument_sparks': sorted(arguments, key=lambda spark: spark['sentence_index'])
+    }
+
+
+class IncrementalAnalysisService:
+    """文章修改后的增量重新分析"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def update_content(self, article: Article, content: str, title: Optional[str] = None) -> Dict:
+        """
+        修改文章内容，沿用未修改句子上的分析结果（提交事务）
+
+        Args:
+            article: 文章
+            content: 新内容
+            title: 新标题（不传时不修改）
+
+        Returns:
+            {
+                "mode": "unchanged" | "remapped" | "incremental" | "full",
+                "content_hash": str,
+                "sentence_count": int,
+                "changed_sentences": [int],  # 修改过的句子（新编号）
+                "regions": [(start, end)],  # 需要重新分析的区间（含上下文）
+                "carried_sparks": int,  # 沿用的火花数
+                "carried_highlights": int  # 沿用的透镜高亮数
+            }
+            mode 为 incremental 时由调用方提交 incremental_analysis_task，full 时提交全量分析任务
+        """
+        if title is not None:
+            article.title = title
+
+        content_hash = hashlib.md5(content.encode('utf-8')).hexdigest()
+        if content_hash == article.content_hash:
+            self.db.commit()
+            return {
+                "mode": "unchanged",
+                "content_hash": content_hash,
+                "sentence_count": None,
+                "changed_sentences": [],
+                "regions": [],
+                "carried_sparks": 0,
+                "carried_highlights": 0
+            }
+
+        sentence_service = ArticleSentenceService(self.db)
+        old = sentence_service.segment(article.content, article.content_hash)
+        new = sentence_service.segment(content, content_hash)
+        alignment = align_sentences(old.sentences, new.sentences)
+
+        # 倒排索引按旧内容确定词元，必须在替换内容之前删除
+        ArticleSearchService(self.db).remove_article(article)
+        article.content = content
+        article.content_hash = content_hash
+        article.word_count = len(content)
+        # 内容指纹随内容更新（近似重复检测，见 near_duplicate_service）
+        from app.services.near_duplicate_service import NearDuplicateService
+        NearDuplicateService(self.db).fingerprint_article(article)
+
+        report = self.db.query(AnalysisReport).filter(AnalysisReport.article_id == article.id).first()
+        mode = self._choose_mode(report, alignment)
+        lens_results = article.meta_analysis.thinking_lens_results if article.meta_analysis else []
+
+        carried_sparks = carried_highlights = 0
+        if mode == "full":
+            if report is not None:
+                report.status = 'pending'
+                report.error_message = None
+            # 透镜结果按需重新生成（下次请求透镜时全量分析）
+            for lens_result in list(lens_results):
+                self.db.delete(lens_result)
+        else:
+            carried_sparks = self._remap_report(report, alignment.index_map)
+            for lens_result in lens_results:
+                lens_result.highlights = remap_items(lens_result.highlights, alignment.index_map)
+                carried_highlights += len(lens_result.highlights)
+
+        self.db.commit()
+        regions = alignment.regions(CONTEXT_SENTENCES) if mode == "incremental" else []
+
+        logger.info(
+            f"[IncrementalAnalysis] 文章内容已修改: article_id={article.id}, mode={mode}, "
+            f"修改 {len(alignment.changed)}/{len(new)} 句, 沿用火花 {carried_sparks} 个, 高亮 {carried_highlights} 个"
+        )
+        return {
+            "mode": mode,
+            "content_hash": content_hash,
+            "sentence_count": len(new),
+            "changed_sentences": alignment.changed,
+            "regions": regions,
+            "carried_sparks": carried_sparks,
+            "carried_highlights": carried_highlights
+        }
+
+    @staticmethod
+    def _choose_mode(report: Optional[AnalysisReport], alignment: SentenceAlignment) -> str:
+        """选择重新分析方式"""
+        if report is None or report.status != 'completed' or not isinstance(report.report_data, dict):
+            return "full"
+        if alignment.changed_ratio > INCREMENTAL_MAX_CHANGED_RATIO:
+            return "full"
+        if not alignment.changed:
+            # 只删除了句子，或只有空白变化：调整编号即可，不需要调用 LLM
+            return "remapped"
+        return "incremental"
+
+    @staticmethod
+    def _remap_report(report: Optional[AnalysisReport], index_map: Dict[int, int]) -> int:
+        """调整报告中火花的句子编号（不提交事务），返回沿用的火花数"""
+        if report is None or not isinstance(report.report_data, dict):
+            return 0
+        data = report.report_data
+        concepts = remap_items(data.get('concept_sparks'), index_map, dom_path=True)
+        arguments = remap_items(data.get('argument_sparks'), index_map, dom_path=True)
+        # 整体赋值，确保 JSON 列的变更被 ORM 检测到
+        report.report_data = {**data, 'concept_sparks': concepts, 'argument_sparks': arguments}
+        return len(concepts) + len(arguments)
+
+
+async def incremental_analysis_task(
+    article_id: int,
+    content_hash: str,
+    regions: List[Tuple[int, int]],
+    targets: List[int]
+) -> Dict:
+    """
+    后台任务：对修改过的句子做局部分析，合并进分析报告和思维透镜结果
+
+    文章在任务执行期间再次被修改（content_hash 变化）时放弃本次结果，由新的修改重新提交。
+
+    Args:
+        article_id: 文章ID
+        content_hash: 提交任务时的文章内容哈希
+        regions: 需要发给 LLM 的句子区间（含上下文）
+        targets: 修改过的句子（新编号）
+
+    Returns:
+        合并结果
+    """
+    from app.db.database import SessionLocal
+    from app.services.thinking_lens_service import ThinkingLensService
+    from app.services.unified_analysis_service import UnifiedAnalysisService
+
+    regions = [tuple(region) for region in regions]
+    db = SessionLocal()
+    try:
+        article = db.get(Article, article_id)
+        if article is None or article.content_hash != content_hash:
+            logger.info(f"[IncrementalAnalysis] 文章已删除或再次修改，跳过: article_id={article_id}")
+            return {"article_id": article_id, "skipped": True}
+
+        segmentation = ArticleSentenceService(db).segment(article.content, content_hash)
+        title = article.title or ""
+        db.commit()
+
+        regional = await UnifiedAnalysisService().analyze_regions(segmentation, regions, targets, title)
+
+        db.expire_all()
+        article = db.get(Article, article_id)
+        if article is None or article.content_hash != content_hash:
+            logger.info(f"[IncrementalAnalysis] 分析期间文章再次修改，放弃结果: article_id={article_id}")
+            return {"article_id": article_id, "skipped": True}
+
+        report = db.query(AnalysisReport).filter(AnalysisReport.article_id == article_id).first()
+        if report is not None and isinstance(report.report_data, dict):
+            report.report_data = merge_sparks(report.report_data, regional)
+            report.completed_at = datetime.utcnow()
+        db.commit()
+
+        added_highlights = 0
+        if article.meta_analysis:
+            lens_service = ThinkingLensService(db)
+            language = article.language or "zh"
+            for lens_result in list(article.meta_analysis.thinking_lens_results):
+                added_highlights += await lens_service.reanalyze_regions(
+                    lens_result, segmentation, regions, targets, language
+                )
+                db.commit()
+
+        added_sparks = len(regional['concept_sparks']) + len(regional['argument_sparks'])
+        logger.info(
+            f"[IncrementalAnalysis] 局部分析完成: article_id={article_id}, "
+            f"新增火花 {added_sparks} 个, 高亮 {added_highlights} 个, tokens={regional['metadata']['tokens']}"
+        )
+        return {
+            "article_id": article_id,
+            "skipped": False,
+            "added_sparks": added_sparks,
+            "added_highlights": added_highlights
+        }
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
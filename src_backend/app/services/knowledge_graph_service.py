@@ -1,15 +1,77 @@
 """知识图谱服务 - 构建和查询用户的知识图谱"""
+import base64
+import json
 import logging
-from typing import Dict, List, Tuple, Set
-from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
+import uuid
+import numpy as np
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Set
+from datetime import datetime
+from sqlalchemy import and_, func, or_, tuple_
+from sqlalchemy.orm import Session, aliased
 from collections import defaultdict, Counter
-import re
 
-from app.models.models import KnowledgeNode, KnowledgeEdge, InsightCard, SparkClick
+from app.core.click_buffer import register_write_handler
+from app.models.models import ArticleConcept, ConceptCooccurrence, KnowledgeNode, KnowledgeEdge, SparkClick
+from app.services.graph_engine import graph_cache
+from app.utils.cooccurrence import Cooccurrence, compute_cooccurrence
+from app.utils.domain_classifier import get_domain_classifier
+from app.utils.graph_algorithms import connected_components
 
 logger = logging.getLogger(__name__)
 
+# 两个概念至少在这么多篇文章中共同出现才建立边
+EDGE_MIN_COOCCURRENCE = 2
+
+# 知识孤岛：节点数在此范围内的连通分量
+ISLAND_MIN_SIZE = 2
+ISLAND_MAX_SIZE = 5
+
+# 导出图谱时读取的列（不构造 ORM 对象）
+NODE_COLUMNS = (
+    KnowledgeNode.id, KnowledgeNode.label, KnowledgeNode.type, KnowledgeNode.size, KnowledgeNode.color,
+    KnowledgeNode.domain, KnowledgeNode.created_at, KnowledgeNode.review_count,
+    KnowledgeNode.x, KnowledgeNode.y
+)
+EDGE_COLUMNS = (
+    KnowledgeEdge.id, KnowledgeEdge.source_id, KnowledgeEdge.target_id,
+    KnowledgeEdge.type, KnowledgeEdge.weight, KnowledgeEdge.label
+)
+
+# 全量重建时每批写入/删除的行数
+BULK_CHUNK_SIZE = 5000
+
+# 概念名称最大长度（与 KnowledgeNode.label 列宽一致）
+MAX_LABEL_LENGTH = 255
+
+
+def concept_label(spark_text: str) -> str:
+    """火花文本 -> 节点概念名称"""
+    return (spark_text or "")[:MAX_LABEL_LENGTH]
+
+
+def concept_pair(label_a: str, label_b: str) -> Tuple[str, str]:
+    """无序概念对的规范形式（按名称排序）"""
+    return (label_a, label_b) if label_a < label_b else (label_b, label_a)
+
+
+def encode_cursor(size: int, node_id: str) -> str:
+    """分页游标：最后一个节点的 (size, id)"""
+    return base64.urlsafe_b64encode(json.dumps([size, node_id]).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[int, str]:
+    """解析分页游标，无效时抛出 ValueError"""
+    try:
+        size, node_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return int(size), str(node_id)
+    except Exception:
+        raise ValueError("无效的分页游标")
+
+
+def edge_weight(count: int) -> float:
+    """共现次数 -> 边权重（归一化到 0-1）"""
+    return min(count / 10.0, 1.0)
+
 
 class KnowledgeGraphService:
     """知识图谱服务"""
@@ -17,96 +79,324 @@ class KnowledgeGraphService:
     def __init__(self, db: Session):
         self.db = db
 
-        # 领域关键词映射（用于自动分类）
-        self.domain_keywords = {
-            "人工智能": ["人工智能", "机器学习", "深度学习", "神经网络", "Transformer", "算法"],
-            "经济学": ["经济", "通货膨胀", "市盈率", "GDP", "量化宽松", "供需"],
-            "哲学": ["哲学", "认识论", "本体论", "形而上学", "存在主义"],
-            "计算机科学": ["数据结构", "算法复杂度", "分布式系统", "区块链", "云计算"],
-            "生物学": ["基因", "DNA", "进化论", "细胞", "免疫系统"],
-            "物理学": ["量子", "相对论", "热力学", "粒子", "引力波"],
-        }
+        # 领域分类器（词典编译为 Aho-Corasick 自动机，进程内共享）
+        self.classifier = get_domain_classifier()
 
-        # 颜色映射（根据领域）
-        self.domain_colors = {
-            "人工智能": "#10b981",  # 绿色
-            "经济学": "#f59e0b",    # 橙色
-            "哲学": "#8b5cf6",      # 紫色
-            "计算机科学": "#3b82f6", # 蓝色
-            "生物学": "#ec4899",    # 粉色
-            "物理学": "#06b6d4",    # 青色
-            "未分类": "#6b7280",    # 灰色
-        }
-
-    def get_knowledge_graph(self, user_id: int) -> Dict:
+    def get_knowledge_graph(self, user_id: int, limit: Optional[int] = None, cursor: Optional[str] = None) -> Dict:
         """
         获取用户的知识图谱
 
+        指定 limit 时按视口分页：节点按 size 降序取前 limit 个，
+        边只返回两端都在已返回节点（本页及之前各页）中、且至少一端在本页的边，
+        因此逐页累加即得到完整子图，每条边只返回一次。
+
         Args:
             user_id: 用户 ID
+            limit: 每页节点数（None 表示返回全部）
+            cursor: 上一页返回的 nextCursor
 
         Returns:
-            知识图谱数据（nodes + edges）
+            知识图谱数据（nodes + edges + stats，分页时另有 nextCursor）
+
+        Raises:
+            ValueError: cursor 无效
+        """
+        size_key = func.coalesce(KnowledgeNode.size, 0)
+        query = self.db.query(*NODE_COLUMNS).filter(KnowledgeNode.user_id == user_id)
+        if cursor:
+            last_size, last_id = decode_cursor(cursor)
+            query = query.filter(or_(
+                size_key < last_size,
+                and_(size_key == last_size, KnowledgeNode.id > last_id)
+            ))
+        query = query.order_by(size_key.desc(), KnowledgeNode.id)
+
+        if limit is None:
+            nodes = query.all()
+            edges = self.db.query(*EDGE_COLUMNS).filter(KnowledgeEdge.user_id == user_id).all()
+            return {
+                "nodes": [self._node_dict(node) for node in nodes],
+                "edges": [self._edge_dict(edge) for edge in edges],
+                "stats": self._graph_stats(user_id)
+            }
+
+        # 多取一个用于判断是否还有下一页
+        nodes = query.limit(limit + 1).all()
+        has_more = len(nodes) > limit
+        nodes = nodes[:limit]
+
+        edges = []
+        next_cursor = None
+        if nodes:
+            last = nodes[-1]
+            last_size = last.size or 0
+            page_ids = [node.id for node in nodes]
+            source, target = aliased(KnowledgeNode), aliased(KnowledgeNode)
+
+            def returned(alias):
+                # 排在本页最后一个节点之前（含）的节点，即本页及之前各页已返回的节点
+                alias_size = func.coalesce(alias.size, 0)
+                return or_(alias_size > last_size, and_(alias_size == last_size, alias.id <= last.id))
+
+            edges = self.db.query(*EDGE_COLUMNS).join(
+                source, source.id == KnowledgeEdge.source_id
+            ).join(
+                target, target.id == KnowledgeEdge.target_id
+            ).filter(
+                KnowledgeEdge.user_id == user_id,
+                or_(KnowledgeEdge.source_id.in_(page_ids), KnowledgeEdge.target_id.in_(page_ids)),
+                returned(source),
+                returned(target)
+            ).all()
+            if has_more:
+                next_cursor = encode_cursor(last_size, last.id)
+
+        return {
+            "nodes": [self._node_dict(node) for node in nodes],
+            "edges": [self._edge_dict(edge) for edge in edges],
+            "stats": self._graph_stats(user_id),
+            "nextCursor": next_cursor
+        }
+
+    def iter_knowledge_graph_ndjson(self, user_id: int, batch_size: int = 1000) -> Iterator[str]:
+        """
+        以 NDJSON 逐行输出知识图谱（yield_per 分批读取，内存占用与图大小无关）
+
+        每行一个 JSON 对象，kind 区分行类型（节点和边本身已有 type 字段）：
+        {"kind": "node", ...} / {"kind": "edge", ...}，最后一行为 {"kind": "stats", ...}
+
+        Args:
+            user_id: 用户 ID
+            batch_size: 每批从数据库读取的行数
         """
-        # 查询所有节点
-        nodes = self.db.query(KnowledgeNode).filter(
+        nodes = self.db.query(*NODE_COLUMNS).filter(
             KnowledgeNode.user_id == user_id
-        ).all()
+        ).order_by(func.coalesce(KnowledgeNode.size, 0).desc(), KnowledgeNode.id).yield_per(batch_size)
+        for node in nodes:
+            yield json.dumps({"kind": "node", **self._node_dict(node)}, ensure_ascii=False) + "\n"
 
-        # 查询所有边
-        edges = self.db.query(KnowledgeEdge).filter(
-            KnowledgeEdge.user_id == user_id
-        ).all()
+        edges = self.db.query(*EDGE_COLUMNS).filter(KnowledgeEdge.user_id == user_id).yield_per(batch_size)
+        for edge in edges:
+            yield json.dumps({"kind": "edge", **self._edge_dict(edge)}, ensure_ascii=False) + "\n"
 
-        # 转换为前端需要的格式
-        nodes_data = [
-            {
-                "id": node.id,
-                "label": node.label,
-                "type": node.type,
-                "size": node.size,
-                "color": node.color or self.domain_colors.get(node.domain, "#6b7280"),
-                "metadata": {
-                    "domain": node.domain,
-                    "insightId": node.insight_id,
-                    "createdAt": node.created_at.isoformat(),
-                    "reviewCount": node.review_count
-                }
-            }
-            for node in nodes
-        ]
+        yield json.dumps({"kind": "stats", **self._graph_stats(user_id)}, ensure_ascii=False) + "\n"
 
-        edges_data = [
-            {
-                "id": edge.id,
-                "source": edge.source_id,
-                "target": edge.target_id,
-                "type": edge.type,
-                "weight": edge.weight,
-                "label": edge.label
-            }
-            for edge in edges
-        ]
+    def _graph_stats(self, user_id: int) -> Dict:
+        """图谱统计（数据库中聚合）"""
+        domain_rows = self.db.query(KnowledgeNode.domain, func.count()).filter(
+            KnowledgeNode.user_id == user_id
+        ).group_by(KnowledgeNode.domain).all()
+        latest_update = self.db.query(func.max(KnowledgeNode.updated_at)).filter(
+            KnowledgeNode.user_id == user_id
+        ).scalar()
+        total_edges = self.db.query(func.count(KnowledgeEdge.id)).filter(
+            KnowledgeEdge.user_id == user_id
+        ).scalar()
 
-        # 统计信息
         domain_stats = defaultdict(int)
-        for node in nodes:
-            domain_stats[node.domain or "未分类"] += 1
+        for domain, count in domain_rows:
+            domain_stats[domain or "未分类"] += count
+
+        return {
+            "totalNodes": sum(domain_stats.values()),
+            "totalEdges": total_edges,
+            "domains": dict(domain_stats),
+            "latestUpdate": latest_update.isoformat() if latest_update else None
+        }
 
+    def _node_dict(self, node) -> Dict:
+        """节点行 -> 前端格式"""
         return {
-            "nodes": nodes_data,
-            "edges": edges_data,
-            "stats": {
-                "totalNodes": len(nodes),
-                "totalEdges": len(edges),
-                "domains": dict(domain_stats),
-                "latestUpdate": nodes[0].updated_at.isoformat() if nodes else None
+            "id": node.id,
+            "label": node.label,
+            "type": node.type,
+            "size": node.size,
+            "color": node.color or self.classifier.color(node.domain),
+            # 服务端预计算的坐标（尚未布局时为 null，前端自行布局）
+            "x": node.x,
+            "y": node.y,
+            "metadata": {
+                "domain": node.domain,
+                "createdAt": node.created_at.isoformat(),
+                "reviewCount": node.review_count
             }
         }
 
+    @staticmethod
+    def _edge_dict(edge) -> Dict:
+        """边行 -> 前端格式"""
+        return {
+            "id": edge.id,
+            "source": edge.source_id,
+            "target": edge.target_id,
+            "type": edge.type,
+            "weight": edge.weight,
+            "label": edge.label
+        }
+
+    # ==================== 增量维护 ====================
+
+    def apply_concept_clicks(self, events: Iterable[Dict]) -> Set[int]:
+        """
+        根据一批火花点击增量更新知识图谱（不提交事务）
+
+        - 节点：按概念名称查找或创建，size +1（节点 ID 保持不变）
+        - 共现：概念首次出现在某篇文章时，只与该文章已有的概念两两累加
+        - 边：共现次数达到阈值时创建，之后随共现次数增强
+
+        Args:
+            events: SparkClick 列字典（user_id, spark_type, spark_text, article_id）
+
+        Returns:
+            图谱发生变化的用户 ID
+        """
+        by_user = defaultdict(list)
+        for event in events:
+            if event["spark_type"] == "concept" and concept_label(event["spark_text"]):
+                by_user[event["user_id"]].append(event)
+
+        for user_id, user_events in by_user.items():
+            self._apply_user_concept_clicks(user_id, user_events)
+        return set(by_user)
+
+    def _apply_user_concept_clicks(self, user_id: int, events: List[Dict]) -> None:
+        """增量更新单个用户的节点、文章概念和共现计数"""
+        nodes = self._load_nodes(user_id, {concept_label(event["spark_text"]) for event in events})
+        for event in events:
+            label = concept_label(event["spark_text"])
+            node = nodes.get(label)
+            if node is None:
+                node = self._new_node(user_id, label, size=0)
+                nodes[label] = node
+            node.size = (node.size or 0) + 1
+
+        # 只读取本批点击涉及的文章
+        article_ids = {event["article_id"] for event in events if event["article_id"]}
+        article_concepts: Dict[int, Dict[str, ArticleConcept]] = defaultdict(dict)
+        if article_ids:
+            for row in self.db.query(ArticleConcept).filter(
+                ArticleConcept.user_id == user_id,
+                ArticleConcept.article_id.in_(article_ids)
+            ):
+                article_concepts[row.article_id][row.label] = row
+
+        pair_increments = Counter()
+        for event in events:
+            article_id = event["article_id"]
+            if not article_id:
+                continue
+
+            label = concept_label(event["spark_text"])
+            concepts = article_concepts[article_id]
+            row = concepts.get(label)
+            if row is not None:
+                row.click_count += 1
+                continue
+
+            for other in concepts:
+                pair_increments[concept_pair(label, other)] += 1
+
+            row = ArticleConcept(user_id=user_id, article_id=article_id, label=label, click_count=1)
+            self.db.add(row)
+            concepts[label] = row
+
+        if pair_increments:
+            self._apply_cooccurrence(user_id, pair_increments, nodes)
+        self.db.flush()
+
+    def _apply_cooccurrence(self, user_id: int, pair_increments: Counter, nodes: Dict[str, KnowledgeNode]) -> None:
+        """累加共现计数，并为达到阈值的概念对创建或增强边"""
+        edge_counts = {}
+        missing_pairs = []
+        for (concept_a, concept_b), increment in pair_increments.items():
+            row = self.db.get(ConceptCooccurrence, (user_id, concept_a, concept_b))
+            if row is None:
+                missing_pairs.append((concept_a, concept_b))
+            else:
+                row.count += increment
+                edge_counts[(concept_a, concept_b)] = row.count
+
+        # 未达到阈值的概念对不存储：从文章概念表统计实际共现次数（含本批），达到阈值时才写入
+        if missing_pairs:
+            self.db.flush()
+            for (concept_a, concept_b), count in self._count_cooccurrence(user_id, missing_pairs).items():
+                if count >= EDGE_MIN_COOCCURRENCE:
+                    self.db.add(ConceptCooccurrence(
+                        user_id=user_id, concept_a=concept_a, concept_b=concept_b, count=count
+                    ))
+                    edge_counts[(concept_a, concept_b)] = count
+
+        if not edge_counts:
+            return
+
+        missing = {label for pair in edge_counts for label in pair} - nodes.keys()
+        nodes.update(self._load_nodes(user_id, missing))
+
+        for (concept_a, concept_b), count in edge_counts.items():
+            source, target = nodes.get(concept_a), nodes.get(concept_b)
+            if source is None or target is None:
+                continue
+
+            edge = self.db.query(KnowledgeEdge).filter(
+                KnowledgeEdge.user_id == user_id,
+                or_(
+                    and_(KnowledgeEdge.source_id == source.id, KnowledgeEdge.target_id == target.id),
+                    and_(KnowledgeEdge.source_id == target.id, KnowledgeEdge.target_id == source.id)
+                )
+            ).first()
+            if edge is None:
+                edge = KnowledgeEdge(user_id=user_id, source_id=source.id, target_id=target.id, type="related")
+                self.db.add(edge)
+                self._merge_components(user_id, source, target)
+            edge.weight = edge_weight(count)
+            edge.label = f"共现 {count} 次"
+
+    def _merge_components(self, user_id: int, node_a: KnowledgeNode, node_b: KnowledgeNode) -> None:
+        """新边连接了两个连通分量时合并（较小的分量并入较大的分量）"""
+        component_a = node_a.component_id or node_a.id
+        component_b = node_b.component_id or node_b.id
+        if component_a == component_b:
+            return
+
+        sizes = dict(self.db.query(KnowledgeNode.component_id, func.count()).filter(
+            KnowledgeNode.user_id == user_id,
+            KnowledgeNode.component_id.in_([component_a, component_b])
+        ).group_by(KnowledgeNode.component_id).all())
+        if sizes.get(component_a, 0) < sizes.get(component_b, 0):
+            component_a, component_b = component_b, component_a
+
+        self.db.query(KnowledgeNode).filter(
+            KnowledgeNode.user_id == user_id,
+            KnowledgeNode.component_id == component_b
+        ).update({"component_id": component_a}, synchronize_session="evaluate")
+        node_a.component_id = node_b.component_id = component_a
+
+    def _count_cooccurrence(self, user_id: int, pairs: List[Tuple[str, str]]) -> Dict[Tuple[str, str], int]:
+        """从文章概念表统计指定概念对的共现文章数"""
+        labels = {label for pair in pairs for label in pair}
+        first, second = aliased(ArticleConcept), aliased(ArticleConcept)
+        rows = self.db.query(first.label, second.label, func.count()).join(
+            second,
+            and_(second.user_id == first.user_id, second.article_id == first.article_id)
+        ).filter(
+            first.user_id == user_id,
+            first.label.in_(labels),
+            second.label.in_(labels),
+            first.label != second.label
+        ).group_by(first.label, second.label).all()
+
+        wanted = set(pairs)
+        # 数据库排序规则可能与 Python 不同，按 concept_pair 规范化
+        counts = {concept_pair(label_a, label_b): count for label_a, label_b, count in rows}
+        return {pair: counts.get(pair, 0) for pair in wanted}
+
+    # ==================== 全量重建（修复工具） ====================
+
     def rebuild_graph(self, user_id: int) -> Dict:
         """
-        重新构建用户的知识图谱（从洞察中提取）
+        根据全部火花点击重建知识图谱（修复工具，日常由 apply_concept_clicks 增量维护）
+
+        已有节点按概念名称匹配并保留原 ID，只更新属性；不再出现的节点和边被删除。
 
         Args:
             user_id: 用户 ID
@@ -116,161 +406,279 @@ class KnowledgeGraphService:
         """
         logger.info(f"开始重建知识图谱: User {user_id}")
 
-        # 删除旧的图谱数据
-        self.db.query(KnowledgeEdge).filter(KnowledgeEdge.user_id == user_id).delete()
-        self.db.query(KnowledgeNode).filter(KnowledgeNode.user_id == user_id).delete()
-        self.db.commit()
-
-        # 提取概念节点
-        nodes = self._extract_nodes_from_insights(user_id)
+        # 只读取概念类火花的文章 ID 和文本
+        rows = self.db.query(SparkClick.article_id, SparkClick.spark_text).filter(
+            SparkClick.user_id == user_id,
+            SparkClick.spark_type == "concept"
+        ).all()
 
-        # 构建关系边
-        edges = self._build_edges_from_nodes(user_id, nodes)
+        concept_counts = Counter()
+        article_concepts: Dict[int, Counter] = defaultdict(Counter)
+        for article_id, spark_text in rows:
+            label = concept_label(spark_text)
+            if not label:
+                continue
+            concept_counts[label] += 1
+            if article_id:
+                article_concepts[article_id][label] += 1
+
+        nodes, stale_nodes = self._sync_nodes(user_id, concept_counts)
+        self._sync_article_concepts(user_id, article_concepts)
+
+        cooccurrence = self._compute_cooccurrence(article_concepts)
+        self._sync_cooccurrence(user_id, cooccurrence)
+        edge_count = self._sync_edges(user_id, cooccurrence, nodes)
+        self._sync_components(nodes, cooccurrence)
+
+        # 边已同步，不再被引用的旧节点可以删除
+        for node in stale_nodes:
+            self.db.delete(node)
+
+        # 仪表盘快照中的图谱统计随之失效
+        from app.services.dashboard_service import SECTION_GRAPH, DashboardService
+        DashboardService(self.db).invalidate([user_id], SECTION_GRAPH)
+        self.db.commit()
+        graph_cache.invalidate([user_id])
 
-        logger.info(f"知识图谱重建完成: {len(nodes)} 节点, {len(edges)} 边")
+        logger.info(f"知识图谱重建完成: {len(nodes)} 节点, {edge_count} 边")
 
         return {
             "nodes_created": len(nodes),
-            "edges_created": len(edges),
+            "edges_created": edge_count,
             "message": "知识图谱重建成功"
         }
 
-    def _extract_nodes_from_insights(self, user_id: int) -> List[KnowledgeNode]:
+    def _sync_nodes(self, user_id: int, concept_counts: Counter) -> Tuple[Dict[str, KnowledgeNode], List[KnowledgeNode]]:
         """
-        从用户的洞察中提取概念节点
-
-        Args:
-            user_id: 用户 ID
+        按概念名称更新或创建节点
 
         Returns:
-            节点列表
+            (概念名称 -> 节点, 需要删除的旧节点)
         """
-        # 查询用户的所有洞察
-        insights = self.db.query(InsightCard).filter(
-            InsightCard.user_id == user_id
-        ).all()
-
-        # 查询用户的所有火花点击（用于提取概念）
-        clicks = self.db.query(SparkClick).filter(
-            SparkClick.user_id == user_id,
-            SparkClick.spark_type == "concept"  # 只提取概念类火花
-        ).all()
-
-        # 统计概念频率
-        concept_counts = Counter()
-        concept_to_insight = {}  # 概念 -> 首次出现的洞察 ID
-
-        for click in clicks:
-            concept = click.spark_text
-            concept_counts[concept] += 1
-
-            # 记录首次出现的洞察
-            if concept not in concept_to_insight:
-                concept_to_insight[concept] = click.article_id
-
-        # 创建节点（只保留点击次数 >= 1 的概念）
-        nodes = []
-        for concept, count in concept_counts.items():
-            # 识别领域
-            domain = self._identify_domain(concept)
-
-            # 创建节点
-            node = KnowledgeNode(
-                user_id=user_id,
-                label=concept,
-                type="concept",
-                size=count,  # 节点大小 = 点击次数
-                color=self.domain_colors.get(domain, "#6b7280"),
-                domain=domain,
-                insight_id=concept_to_insight.get(concept),
-                review_count=0
-            )
-            self.db.add(node)
-            nodes.append(node)
-
-        self.db.commit()
+        nodes: Dict[str, KnowledgeNode] = {}
+        stale_nodes = []
+        for node in self.db.query(KnowledgeNode).filter(KnowledgeNode.user_id == user_id):
+            if node.label in concept_counts and node.label not in nodes:
+                nodes[node.label] = node
+            else:
+                stale_nodes.append(node)
+
+        domains = self.classifier.classify_many(concept_counts)
+        for label, count in concept_counts.items():
+            node = nodes.get(label)
+            if node is None:
+                node = self._new_node(user_id, label, size=count, domain=domains[label])
+                nodes[label] = node
+            else:
+                node.size = count
+                node.domain = domains[label]
+                node.color = self.classifier.color(node.domain)
+
+        self.db.flush()
         logger.info(f"提取到 {len(nodes)} 个概念节点")
-        return nodes
+        return nodes, stale_nodes
+
+    def _sync_article_concepts(self, user_id: int, article_concepts: Dict[int, Counter]) -> None:
+        """同步文章概念表（只写入有差异的行）"""
+        desired = {
+            (article_id, label): count
+            for article_id, concepts in article_concepts.items()
+            for label, count in concepts.items()
+        }
 
-    def _identify_domain(self, concept: str) -> str:
+        updated_rows = []
+        stale_keys = []
+        for article_id, label, click_count in self.db.query(
+            ArticleConcept.article_id, ArticleConcept.label, ArticleConcept.click_count
+        ).filter(ArticleConcept.user_id == user_id):
+            count = desired.pop((article_id, label), None)
+            if count is None:
+                stale_keys.append((user_id, article_id, label))
+            elif count != click_count:
+                updated_rows.append({"user_id": user_id, "article_id": article_id, "label": label, "click_count": count})
+
+        for i in range(0, len(stale_keys), BULK_CHUNK_SIZE):
+            self.db.query(ArticleConcept).filter(
+                tuple_(ArticleConcept.user_id, ArticleConcept.article_id, ArticleConcept.label).in_(
+                    stale_keys[i:i + BULK_CHUNK_SIZE]
+                )
+            ).delete(synchronize_session=False)
+        self.db.bulk_update_mappings(ArticleConcept, updated_rows)
+        self._bulk_insert(ArticleConcept, [
+            {"user_id": user_id, "article_id": article_id, "label": label, "click_count": count}
+            for (article_id, label), count in desired.items()
+        ])
+
+    def _compute_cooccurrence(self, article_concepts: Dict[int, Counter]) -> Cooccurrence:
         """
-        识别概念所属领域（基于关键词匹配）
+        统计概念共现次数（同时出现在多少篇文章中），见 app.utils.cooccurrence
 
         Args:
-            concept: 概念文本
+            article_concepts: 文章 ID -> 该文章中的概念
 
         Returns:
-            领域名称
+            Cooccurrence（concept_a < concept_b）
         """
-        for domain, keywords in self.domain_keywords.items():
-            for keyword in keywords:
-                if keyword in concept:
-                    return domain
-
-        return "未分类"
-
-    def _build_edges_from_nodes(self, user_id: int, nodes: List[KnowledgeNode]) -> List[KnowledgeEdge]:
+        return compute_cooccurrence(article_concepts.values())
+
+    def _sync_cooccurrence(self, user_id: int, cooccurrence: Cooccurrence) -> None:
+        """重写共现计数表（只保留达到建边阈值的概念对）"""
+        self.db.query(ConceptCooccurrence).filter(
+            ConceptCooccurrence.user_id == user_id
+        ).delete(synchronize_session=False)
+        self._bulk_insert(ConceptCooccurrence, [
+            {"user_id": user_id, "concept_a": concept_a, "concept_b": concept_b, "count": count}
+            for concept_a, concept_b, count in cooccurrence.pairs(EDGE_MIN_COOCCURRENCE)
+        ])
+
+    def _sync_edges(self, user_id: int, cooccurrence: Cooccurrence, nodes: Dict[str, KnowledgeNode]) -> int:
         """
-        构建节点间的关系边（基于共现分析）
+        按共现计数更新、创建或删除边（已有的边保留原 ID）
 
-        Args:
-            user_id: 用户 ID
-            nodes: 节点列表
+        Returns:
+            同步后的边数量
+        """
+        # 至少共现 EDGE_MIN_COOCCURRENCE 次才建立连接；阈值与权重按数组整体计算
+        mask = cooccurrence.counts >= EDGE_MIN_COOCCURRENCE
+        counts = cooccurrence.counts[mask]
+        weights = np.minimum(counts / 10.0, 1.0)
+        node_ids = [nodes[label].id for label in cooccurrence.labels]
+
+        existing = {}
+        duplicate_ids = []
+        for edge_id, source_id, target_id, weight, label in self.db.query(
+            KnowledgeEdge.id, KnowledgeEdge.source_id, KnowledgeEdge.target_id,
+            KnowledgeEdge.weight, KnowledgeEdge.label
+        ).filter(KnowledgeEdge.user_id == user_id):
+            key = frozenset((source_id, target_id))
+            if key in existing:
+                duplicate_ids.append(edge_id)
+            else:
+                existing[key] = (edge_id, weight, label)
+
+        new_edges = []
+        updated_edges = []
+        now = datetime.utcnow()
+        for a, b, count, weight in zip(
+            cooccurrence.rows[mask].tolist(), cooccurrence.cols[mask].tolist(), counts.tolist(), weights.tolist()
+        ):
+            source_id, target_id = node_ids[a], node_ids[b]
+            label = f"共现 {count} 次"
+            current = existing.pop(frozenset((source_id, target_id)), None)
+            if current is None:
+                new_edges.append({
+                    "id": str(uuid.uuid4()),
+                    "user_id": user_id,
+                    "source_id": source_id,
+                    "target_id": target_id,
+                    "type": "related",
+                    "weight": weight,
+                    "label": label,
+                    "created_at": now
+                })
+            elif current[1:] != (weight, label):
+                updated_edges.append({"id": current[0], "weight": weight, "label": label})
+
+        stale_ids = duplicate_ids + [edge_id for edge_id, _, _ in existing.values()]
+        for i in range(0, len(stale_ids), BULK_CHUNK_SIZE):
+            self.db.query(KnowledgeEdge).filter(
+                KnowledgeEdge.id.in_(stale_ids[i:i + BULK_CHUNK_SIZE])
+            ).delete(synchronize_session=False)
+        self.db.bulk_update_mappings(KnowledgeEdge, updated_edges)
+        self._bulk_insert(KnowledgeEdge, new_edges)
+
+        logger.info(
+            f"同步了 {len(counts)} 条关系边（新增 {len(new_edges)}，更新 {len(updated_edges)}，删除 {len(stale_ids)}）"
+        )
+        return len(counts)
+
+    def _sync_components(self, nodes: Dict[str, KnowledgeNode], cooccurrence: Cooccurrence) -> None:
+        """用并查集重新计算全部节点的连通分量"""
+        node_list = list(nodes.values())
+        node_index = {node.label: i for i, node in enumerate(node_list)}
+        label_to_node = np.array([node_index[label] for label in cooccurrence.labels], dtype=np.int64)
+
+        mask = cooccurrence.counts >= EDGE_MIN_COOCCURRENCE
+        roots = connected_components(
+            len(node_list),
+            label_to_node[cooccurrence.rows[mask]],
+            label_to_node[cooccurrence.cols[mask]]
+        )
+        for node, root in zip(node_list, roots.tolist()):
+            component_id = node_list[root].id
+            if node.component_id != component_id:
+                node.component_id = component_id
+        self.db.flush()
+
+    def rebuild_components(self, user_id: int) -> int:
+        """
+        根据现有的边重新计算连通分量（不提交事务，用于回填 component_id）
 
         Returns:
-            边列表
+            更新的节点数
         """
-        # 查询用户的火花点击（按文章分组）
-        clicks = self.db.query(SparkClick).filter(
-            SparkClick.user_id == user_id,
-            SparkClick.spark_type == "concept"
+        node_rows = self.db.query(KnowledgeNode.id, KnowledgeNode.component_id).filter(
+            KnowledgeNode.user_id == user_id
         ).all()
+        node_index = {node_id: i for i, (node_id, _) in enumerate(node_rows)}
+        edge_rows = [
+            (node_index[source_id], node_index[target_id])
+            for source_id, target_id in self.db.query(KnowledgeEdge.source_id, KnowledgeEdge.target_id).filter(
+                KnowledgeEdge.user_id == user_id
+            )
+            if source_id in node_index and target_id in node_index
+        ]
 
-        # 按文章分组
-        article_concepts = defaultdict(set)
-        for click in clicks:
-            if click.article_id:
-                article_concepts[click.article_id].add(click.spark_text)
-
-        # 统计概念共现次数
-        cooccurrence = defaultdict(int)
-        for article_id, concepts in article_concepts.items():
-            concepts_list = list(concepts)
-            # 两两组合
-            for i in range(len(concepts_list)):
-                for j in range(i + 1, len(concepts_list)):
-                    pair = tuple(sorted([concepts_list[i], concepts_list[j]]))
-                    cooccurrence[pair] += 1
-
-        # 创建节点 label -> id 的映射
-        label_to_id = {node.label: node.id for node in nodes}
-
-        # 创建边（共现次数 >= 2 才建立连接）
-        edges = []
-        for (concept_a, concept_b), count in cooccurrence.items():
-            if count >= 2:  # 至少共现 2 次
-                # 查找对应的节点 ID
-                source_id = label_to_id.get(concept_a)
-                target_id = label_to_id.get(concept_b)
-
-                if source_id and target_id:
-                    # 计算权重（归一化到 0-1）
-                    weight = min(count / 10.0, 1.0)
-
-                    edge = KnowledgeEdge(
-                        user_id=user_id,
-                        source_id=source_id,
-                        target_id=target_id,
-                        type="related",
-                        weight=weight,
-                        label=f"共现 {count} 次"
-                    )
-                    self.db.add(edge)
-                    edges.append(edge)
+        roots = connected_components(
+            len(node_rows),
+            [source for source, _ in edge_rows],
+            [target for _, target in edge_rows]
+        )
+        updated = [
+            {"id": node_id, "component_id": node_rows[root][0]}
+            for (node_id, component_id), root in zip(node_rows, roots.tolist())
+            if component_id != node_rows[root][0]
+        ]
+        self.db.bulk_update_mappings(KnowledgeNode, updated)
+        return len(updated)
 
-        self.db.commit()
-        logger.info(f"创建了 {len(edges)} 条关系边")
-        return edges
+    def _bulk_insert(self, model, rows: List[Dict]) -> None:
+        """分批 executemany 插入（不经过 ORM 对象）"""
+        table = model.__table__
+        for i in range(0, len(rows), BULK_CHUNK_SIZE):
+            self.db.execute(table.insert(), rows[i:i + BULK_CHUNK_SIZE])
+
+    # ==================== 辅助方法 ====================
+
+    def _load_nodes(self, user_id: int, labels: Set[str]) -> Dict[str, KnowledgeNode]:
+        """按概念名称加载节点"""
+        if not labels:
+            return {}
+        return {
+            node.label: node
+            for node in self.db.query(KnowledgeNode).filter(
+                KnowledgeNode.user_id == user_id,
+                KnowledgeNode.label.in_(labels)
+            )
+        }
+
+    def _new_node(self, user_id: int, label: str, size: int, domain: Optional[str] = None) -> KnowledgeNode:
+        """创建概念节点（ID 立即生成，便于同一事务中建立边；domain 未给出时按名称分类）"""
+        domain = domain or self.classifier.classify(label)
+        node_id = str(uuid.uuid4())
+        node = KnowledgeNode(
+            id=node_id,
+            component_id=node_id,  # 新节点自成一个分量
+            user_id=user_id,
+            label=label,
+            type="concept",
+            size=size,  # 节点大小 = 点击次数
+            color=self.classifier.color(domain),
+            domain=domain,
+            review_count=0
+        )
+        self.db.add(node)
+        return node
 
     def get_blind_spots(self, user_id: int) -> Dict:
         """
@@ -283,14 +691,15 @@ class KnowledgeGraphService:
             盲区数据
         """
         # 获取用户已涉足的领域
-        nodes = self.db.query(KnowledgeNode).filter(
-            KnowledgeNode.user_id == user_id
-        ).all()
-
-        user_domains = set(node.domain for node in nodes if node.domain)
+        user_domains = {
+            row[0] for row in self.db.query(KnowledgeNode.domain).filter(
+                KnowledgeNode.user_id == user_id,
+                KnowledgeNode.domain.isnot(None)
+            ).distinct()
+        }
 
         # 预定义的所有领域
-        all_domains = set(self.domain_keywords.keys())
+        all_domains = set(self.classifier.domains)
 
         # 缺失的领域
         missing_domains = list(all_domains - user_domains)
@@ -304,9 +713,18 @@ class KnowledgeGraphService:
             "crossDomainSuggestions": []  # TODO: 实现跨域推荐
         }
 
+    def _island_components(self, user_id: int):
+        """知识孤岛对应的连通分量 ID（子查询：节点数在 ISLAND_MIN_SIZE-ISLAND_MAX_SIZE 之间的分量）"""
+        return self.db.query(KnowledgeNode.component_id).filter(
+            KnowledgeNode.user_id == user_id,
+            KnowledgeNode.component_id.isnot(None)
+        ).group_by(KnowledgeNode.component_id).having(
+            func.count().between(ISLAND_MIN_SIZE, ISLAND_MAX_SIZE)
+        )
+
     def _detect_knowledge_islands(self, user_id: int) -> List[Dict]:
         """
-        检测知识孤岛（连通分量算法）
+        检测知识孤岛（按持久化的连通分量分组，不再加载整张图）
 
         Args:
             user_id: 用户 ID
@@ -314,49 +732,44 @@ class KnowledgeGraphService:
         Returns:
             孤岛列表
         """
-        # 获取所有节点和边
-        nodes = self.db.query(KnowledgeNode).filter(
-            KnowledgeNode.user_id == user_id
-        ).all()
+        rows = self.db.query(KnowledgeNode.component_id, KnowledgeNode.label).filter(
+            KnowledgeNode.user_id == user_id,
+            KnowledgeNode.component_id.in_(self._island_components(user_id))
+        ).order_by(KnowledgeNode.component_id).all()
 
-        edges = self.db.query(KnowledgeEdge).filter(
-            KnowledgeEdge.user_id == user_id
-        ).all()
+        components = defaultdict(list)
+        for component_id, label in rows:
+            components[component_id].append(label)
 
-        # 构建邻接表
-        adjacency = defaultdict(set)
-        for edge in edges:
-            adjacency[edge.source_id].add(edge.target_id)
-            adjacency[edge.target_id].add(edge.source_id)
+        return [
+            {
+                "id": f"island_{i}",
+                "concepts": concepts,
+                "recommendation": f"建议阅读相关内容建立联系"
+            }
+            for i, concepts in enumerate(components.values(), 1)
+        ]
 
-        # DFS 寻找连通分量
-        visited = set()
-        components = []
+    def count_knowledge_islands(self, user_id: int) -> int:
+        """知识孤岛数量"""
+        return self.db.query(func.count()).select_from(self._island_components(user_id).subquery()).scalar()
 
-        def dfs(node_id: str, component: Set[str]):
-            visited.add(node_id)
-            component.add(node_id)
-            for neighbor in adjacency.get(node_id, []):
-                if neighbor not in visited:
-                    dfs(neighbor, component)
 
-        for node in nodes:
-            if node.id not in visited:
-                component = set()
-                dfs(node.id, component)
-                components.append(component)
-
-        # 识别小规模孤岛（2-5 个节点）
-        islands = []
-        node_map = {node.id: node for node in nodes}
-
-        for component in components:
-            if 2 <= len(component) <= 5:
-                concepts = [node_map[node_id].label for node_id in component]
-                islands.append({
-                    "id": f"island_{len(islands) + 1}",
-                    "concepts": concepts,
-                    "recommendation": f"建议阅读相关内容建立联系"
-                })
+@register_write_handler
+def _apply_clicks_to_graph(db: Session, events: List[Dict]):
+    """
+    点击写缓冲回调：增量更新知识图谱并标记仪表盘图谱统计失效；
+    提交后清理图谱缓存并登记延迟布局
+    """
+    from app.services.dashboard_service import SECTION_GRAPH, DashboardService
+
+    user_ids = KnowledgeGraphService(db).apply_concept_clicks(events)
+    if not user_ids:
+        return None
+    DashboardService(db).invalidate(user_ids, SECTION_GRAPH)
+
+    def after_commit(buffer):
+        graph_cache.invalidate(user_ids)
+        buffer.schedule_layouts(user_ids)
 
-        return islands
+    return after_commit
@@ -13,10 +13,33 @@ from openai import AsyncOpenAI
 from sqlalchemy.orm import Session
 from app.models.models import MetaAnalysis, Article
 from app.config import settings
-from app.utils.sentence_splitter import split_sentences
+from app.services.article_sentence_service import ArticleSentenceService, SentenceSegmentation
+from app.services.near_duplicate_service import NearDuplicateService
+from app.services.analysis_artifact_service import AnalysisArtifactService, META_ANALYSIS
+from app.core.token_estimator import token_estimator
+from app.utils.token_budget import token_budget
 
 logger = logging.getLogger(__name__)
 
+# Prompt 版本（变化时递增；共享的分析结果按版本区分，见 AnalysisArtifact）
+PROMPT_VERSION = "v1.2"
+
+
+def meta_artifact_version(title: str, author: str, publish_date: str, language: str) -> str:
+    """
+    共享元信息分析的版本键
+
+    Prompt 中除正文外还包含标题、作者、发布时间和语言，时效性、作者意图等结论依赖这些信息，
+    因此把它们的哈希并入版本号：正文相同但元信息不同的文章（如转载署名不同）不复用彼此的结果。
+    结果形如 "v1.2:3f2a9c0d1b4e"，不超过 AnalysisArtifact.analysis_version 的长度。
+    """
+    metadata = json.dumps(
+        [title or "", author or "", publish_date or "", language or ""],
+        ensure_ascii=False
+    )
+    digest = hashlib.sha256(metadata.encode("utf-8")).hexdigest()[:12]
+    return f"{PROMPT_VERSION}:{digest}"
+
 
 class MetaAnalysisService:
     def __init__(self, db: Session):
@@ -58,9 +81,10 @@ class MetaAnalysisService:
         # 计算内容哈希用于去重
         content_hash = hashlib.md5(content.encode('utf-8')).hexdigest()
 
-        # 查找或创建文章记录
+        # 查找或创建文章记录（每个用户各自一份；分析结果按内容哈希跨用户共享，见 AnalysisArtifact）
         article = self.db.query(Article).filter(
-            Article.content_hash == content_hash
+            Article.content_hash == content_hash,
+            Article.user_id == user_id
         ).first()
 
         if article:
@@ -91,22 +115,56 @@ class MetaAnalysisService:
             self.db.refresh(article)
             logger.info(f"新建文章记录: article_id={article.id}")
 
+            # 内容指纹（用于查找近似重复的文章）
+            NearDuplicateService(self.db).fingerprint_article(article)
+            self.db.commit()
+
+            if article.user_id:
+                # 后台建立句子级检索索引
+                from app.services.article_search_service import submit_article_indexing
+                submit_article_indexing(article.id)
+
         # 检查是否已有元信息分析
         if not force_reanalyze and article.meta_analysis:
             logger.info(f"使用缓存的元信息分析: article_id={article.id}")
             return self._format_response(article.meta_analysis)
 
+        artifact_service = AnalysisArtifactService(self.db)
+        artifact_version = meta_artifact_version(title, author, publish_date, language)
+
+        # 相同内容（且元信息相同）已由其他用户分析过：直接复用，不调用 LLM
+        if not force_reanalyze and not article.meta_analysis:
+            artifact = artifact_service.get(content_hash, META_ANALYSIS, artifact_version)
+            if artifact is not None:
+                meta_analysis = self._save_meta_analysis(article, artifact.payload, 0, artifact.id, artifact_version)
+                artifact_service.mark_reused(artifact)
+                self.db.commit()
+                self.db.refresh(meta_analysis)
+                return self._format_response(meta_analysis)
+
+        # 近似重复的文章（转载、页脚不同等）已有分析时直接复用
+        if not force_reanalyze and not article.meta_analysis:
+            reused = NearDuplicateService(self.db).reuse_meta_analysis(article, artifact_version)
+            if reused is not None:
+                self.db.commit()
+                self.db.refresh(reused)
+                return self._format_response(reused)
+
         # 执行分析
         logger.info(f"开始元信息分析: article_id={article.id}")
         start_time = datetime.utcnow()
 
         try:
+            # 分句结果按内容哈希共享（与思维透镜、统一分析的句子编号一致），调用 LLM 前先提交
+            segmentation = ArticleSentenceService(self.db).segment(content, content_hash)
+            self.db.commit()
+
             # 调用 LLM
             llm_result = await self._call_llm_for_meta_analysis(
                 title=title,
                 author=author,
                 publish_date=publish_date,
-                content=content,
+                segmentation=segmentation,
                 language=language
             )
 
@@ -117,32 +175,9 @@ class MetaAnalysisService:
                 self.db.delete(article.meta_analysis)
                 self.db.commit()
 
-            # 保存分析结果
-            meta_analysis = MetaAnalysis(
-                article_id=article.id,
-                author_intent=llm_result['author_intent'],
-                timeliness_score=llm_result['timeliness']['score'],
-                timeliness_analysis=llm_result['timeliness'],
-                bias_analysis=llm_result['bias'],
-                knowledge_gaps=llm_result['knowledge_gaps'],
-                raw_llm_response=json.dumps(llm_result, ensure_ascii=False),
-                analysis_quality={
-                    "confidence_score": llm_result['author_intent']['confidence'],
-                    "processing_time_ms": processing_time,
-                    "llm_model": settings.default_model,
-                    "prompt_version": "v1.0"
-                }
-            )
-
-            self.db.add(meta_analysis)
-
-            # 更新文章标题（如果AI生成了标题）
-            if 'generated_title' in llm_result and llm_result['generated_title']:
-                # 如果当前标题是自动截取的（以...结尾），则更新为AI生成的标题
-                if article.title.endswith('...') or len(article.title) <= 50:
-                    article.title = llm_result['generated_title']
-                    logger.info(f"使用AI生成的标题更新文章: {article.title}")
-
+            # 保存分析结果，并按内容哈希共享给其他用户
+            artifact = artifact_service.put(content_hash, META_ANALYSIS, artifact_version, llm_result)
+            meta_analysis = self._save_meta_analysis(article, llm_result, processing_time, artifact.id, artifact_version)
             self.db.commit()
             self.db.refresh(meta_analysis)
 
@@ -155,48 +190,91 @@ class MetaAnalysisService:
             self.db.rollback()
             raise
 
+    def _save_meta_analysis(
+        self,
+        article: Article,
+        llm_result: Dict,
+        processing_time: int,
+        artifact_id: Optional[int] = None,
+        artifact_version: Optional[str] = None
+    ) -> MetaAnalysis:
+        """由 LLM 分析结果（新分析或共享的结果）创建元信息分析记录（不提交事务）"""
+        meta_analysis = MetaAnalysis(
+            article_id=article.id,
+            author_intent=llm_result['author_intent'],
+            timeliness_score=llm_result['timeliness']['score'],
+            timeliness_analysis=llm_result['timeliness'],
+            bias_analysis=llm_result['bias'],
+            knowledge_gaps=llm_result['knowledge_gaps'],
+            raw_llm_response=json.dumps(llm_result, ensure_ascii=False),
+            analysis_quality={
+                "confidence_score": llm_result['author_intent']['confidence'],
+                "processing_time_ms": processing_time,
+                "llm_model": settings.default_model,
+                "prompt_version": PROMPT_VERSION,
+                # 近似重复文章按该版本键判断能否复用（见 NearDuplicateService.reuse_meta_analysis）
+                "artifact_version": artifact_version
+            },
+            artifact_id=artifact_id
+        )
+
+        self.db.add(meta_analysis)
+
+        # 更新文章标题（如果AI生成了标题）
+        if 'generated_title' in llm_result and llm_result['generated_title']:
+            # 如果当前标题是自动截取的（以...结尾），则更新为AI生成的标题
+            if article.title.endswith('...') or len(article.title) <= 50:
+                article.title = llm_result['generated_title']
+                logger.info(f"使用AI生成的标题更新文章: {article.title}")
+
+        return meta_analysis
+
     async def _call_llm_for_meta_analysis(
         self,
         title: str,
         author: str,
         publish_date: str,
-        content: str,
+        segmentation: SentenceSegmentation,
         language: str
     ) -> Dict:
         """调用 LLM 进行元信息分析"""
 
-        # 限制内容长度，避免超出 token 限制
-        max_content_length = settings.max_context_length * 2  # 使用 settings 中的配置
-        truncated_content = content[:max_content_length]
+        # 构建 Prompt：句子列表超出 token 预算时按重要性抽取句子（保持原编号）
+        system_prompt = self._get_meta_analysis_system_prompt()
+        model = settings.default_model  # 使用配置中的默认模型
 
-        # 分句
-        sentences = split_sentences(truncated_content)
+        def build_user_prompt(sentence_list: str) -> str:
+            return self._get_meta_analysis_user_prompt(
+                title=title,
+                author=author,
+                publish_date=publish_date,
+                sentence_list=sentence_list,
+                sentence_count=len(segmentation),
+                language=language
+            )
 
-        # 构建 Prompt
-        system_prompt = self._get_meta_analysis_system_prompt()
-        user_prompt = self._get_meta_analysis_user_prompt(
-            title=title,
-            author=author,
-            publish_date=publish_date,
-            sentences=sentences,
-            language=language
+        sentence_list, scope_note = token_budget.fit_sentences(
+            segmentation, 'meta_analysis', model, system_prompt + build_user_prompt("")
         )
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": build_user_prompt(sentence_list + scope_note)}
+        ]
+        budget = token_budget.check(messages, 'meta_analysis', model)
 
         # 调用 OpenAI API (异步)，使用 settings 中的配置
         try:
             response = await self.client.chat.completions.create(
-                model=settings.default_model,  # 使用配置中的默认模型
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
+                model=model,
+                messages=messages,
                 response_format={"type": "json_object"},
                 temperature=0.3,  # 元信息分析需要较低温度以保证一致性
-                max_tokens=2000
+                max_tokens=budget.max_output_tokens
             )
         except Exception as e:
             logger.error(f"LLM调用失败 - meta_analysis - model={settings.default_model}, error={e}")
             raise
+        token_estimator.observe_response(model, messages, response)
 
         # 解析响应
         try:
@@ -328,13 +406,11 @@ class MetaAnalysisService:
         title: str,
         author: str,
         publish_date: str,
-        sentences: List[str],
+        sentence_list: str,
+        sentence_count: int,
         language: str
     ) -> str:
-        """构建用户 Prompt"""
-        # 格式化句子列表
-        sentence_list = "\n".join([f"[{i}] {sentence}" for i, sentence in enumerate(sentences)])
-
+        """构建用户 Prompt（sentence_list 为带编号的句子列表）"""
         return f"""请分析以下文章的元信息：
 
 ---
@@ -342,7 +418,7 @@ class MetaAnalysisService:
 作者：{author}
 发布时间：{publish_date}
 语言：{language}
-句子总数：{len(sentences)}
+句子总数：{sentence_count}
 
 文章句子列表：
 {sentence_list}
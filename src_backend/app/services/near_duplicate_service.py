@@ -0,0 +1,263 @@
+"""近似重复文章检测服务 - 复用近似重复文章的分析结果
+
+MD5 去重只能识别逐字节相同的内容；同一篇新闻从不同来源转载（页脚、追踪文字、空白不同）
+时会被当作新文章重新分析。这里为每篇文章保存 SimHash 内容指纹（article_fingerprints 表，
+算法见 app/utils/simhash.py），保存新文章时按指纹分段索引查找近似重复的文章：
+
+- 分析报告：按句子哈希对齐两篇文章（见 app/utils/sentence_diff.py），复制报告并把火花的
+  句子编号换成新文章的编号。句子完全对应时直接复用（reused）；少量句子不同时复制后只对
+  这些句子做局部分析（patched，由调用方提交 incremental_analysis_task）；差异超过
+  INCREMENTAL_MAX_CHANGED_RATIO 时不复用
+- 元信息分析：整篇文章层面的判断，只在标题、作者、发布时间、语言也相同时（版本键一致，
+  见 meta_artifact_version）直接复制；思维透镜结果按句子对齐调整高亮编号后一并复制
+
+分析结果只由文章内容决定，与 MD5 去重一样跨用户复用（新文章仍归当前用户所有）。
+"""
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.models.models import AnalysisReport, Article, ArticleFingerprint, MetaAnalysis, ThinkingLensResult
+from app.services.article_sentence_service import ArticleSentenceService
+from app.services.incremental_analysis_service import CONTEXT_SENTENCES, INCREMENTAL_MAX_CHANGED_RATIO, remap_items
+from app.utils.sentence_diff import SentenceAlignment, align_sentences
+from app.utils.simhash import (
+    bands, content_fingerprint, hamming_distance, probe_values, probes_for_distance, to_signed, to_unsigned
+)
+
+logger = logging.getLogger(__name__)
+
+# 汉明距离不超过该值视为近似重复（64 位指纹；转载时增删页脚、改动一两句通常在 6 以内）
+NEAR_DUPLICATE_MAX_DISTANCE = 6
+
+# 每次最多比较的近似重复文章数
+MAX_CANDIDATES = 5
+
+# 复制元信息分析时不复制的列
+_META_SKIP_COLUMNS = {"id", "article_id", "artifact_id", "created_at", "updated_at"}
+
+
+class NearDuplicateService:
+    """近似重复文章检测与分析结果复用"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def fingerprint_article(self, article: Article) -> Optional[int]:
+        """
+        计算并保存文章的内容指纹（不提交事务）
+
+        Args:
+            article: 文章（必须已有 id）
+
+        Returns:
+            无符号 64 位指纹；文章没有可用文字时返回 None（并删除旧指纹）
+        """
+        fingerprint = content_fingerprint(article.content)
+        row = self.db.get(ArticleFingerprint, article.id)
+        if fingerprint is None:
+            if row is not None:
+                self.db.delete(row)
+            return None
+
+        band_values = bands(fingerprint)
+        if row is None:
+            row = ArticleFingerprint(article_id=article.id)
+            self.db.add(row)
+        row.simhash = to_signed(fingerprint)
+        row.band0, row.band1, row.band2, row.band3 = band_values
+        self.db.flush()
+        return fingerprint
+
+    def find_near_duplicates(
+        self,
+        fingerprint: int,
+        max_distance: int = NEAR_DUPLICATE_MAX_DISTANCE,
+        exclude_article_id: Optional[int] = None,
+        limit: int = MAX_CANDIDATES
+    ) -> List[Tuple[int, int]]:
+        """
+        查找内容指纹相近的文章
+
+        各段按原值（以及距离较大时翻转一位的邻居）在索引中探测，候选文章再精确计算汉明距离。
+
+        Args:
+            fingerprint: 无符号 64 位指纹
+            max_distance: 最大汉明距离（不超过 7）
+            exclude_article_id: 排除的文章（通常是文章自身）
+            limit: 最多返回多少篇
+
+        Returns:
+            [(article_id, 汉明距离)]，按距离从近到远排序
+        """
+        flips = probes_for_distance(max_distance)
+        columns = (ArticleFingerprint.band0, ArticleFingerprint.band1, ArticleFingerprint.band2, ArticleFingerprint.band3)
+        conditions = [
+            column.in_(probe_values(value, flips))
+            for column, value in zip(columns, bands(fingerprint))
+        ]
+        query = self.db.query(ArticleFingerprint.article_id, ArticleFingerprint.simhash).filter(or_(*conditions))
+        if exclude_article_id is not None:
+            query = query.filter(ArticleFingerprint.article_id != exclude_article_id)
+
+        matches = []
+        for article_id, value in query:
+            distance = hamming_distance(fingerprint, to_unsigned(value))
+            if distance <= max_distance:
+                matches.append((article_id, distance))
+        matches.sort(key=lambda match: (match[1], match[0]))
+        return matches[:limit]
+
+    def reuse_report(self, article: Article, fingerprint: Optional[int] = None) -> Optional[Dict]:
+        """
+        复用近似重复文章的分析报告（不提交事务）
+
+        Args:
+            article: 新文章（还没有完成的分析报告）
+            fingerprint: 文章指纹（不传时读取已保存的指纹）
+
+        Returns:
+            没有可复用的报告时返回 None，否则：
+            {
+                "mode": "reused" | "patched",
+                "source_article_id": int,
+                "distance": int,
+                "changed_sentences": [int],  # patched 时需要局部分析的句子（新编号）
+                "regions": [(start, end)]  # patched 时发给 LLM 的区间（含上下文）
+            }
+        """
+        fingerprint = self._fingerprint(article, fingerprint)
+        if fingerprint is None:
+            return None
+
+        for source_id, distance in self.find_near_duplicates(fingerprint, exclude_article_id=article.id):
+            source_report = self.db.query(AnalysisReport).filter(
+                AnalysisReport.article_id == source_id,
+                AnalysisReport.status == 'completed'
+            ).first()
+            if source_report is None or not isinstance(source_report.report_data, dict):
+                continue
+            alignment = self._align(source_report.article, article)
+            if alignment.changed_ratio > INCREMENTAL_MAX_CHANGED_RATIO:
+                continue
+
+            data = source_report.report_data
+            report_data = {
+                **data,
+                'concept_sparks': remap_items(data.get('concept_sparks'), alignment.index_map, dom_path=True),
+                'argument_sparks': remap_items(data.get('argument_sparks'), alignment.index_map, dom_path=True)
+            }
+            report = self.db.query(AnalysisReport).filter(AnalysisReport.article_id == article.id).first()
+            if report is None:
+                report = AnalysisReport(article_id=article.id)
+                self.db.add(report)
+            report.status = 'completed'
+            report.report_data = report_data
+            report.analysis_version = source_report.analysis_version
+            report.model_used = source_report.model_used
+            report.tokens_used = 0
+            report.processing_time_ms = 0
+            report.error_message = None
+            report.completed_at = datetime.utcnow()
+            self.db.flush()
+
+            mode = "patched" if alignment.changed else "reused"
+            logger.info(
+                f"[NearDuplicate] 复用分析报告: article_id={article.id}, 来源={source_id}, "
+                f"距离={distance}, mode={mode}, 修改 {len(alignment.changed)} 句"
+            )
+            return {
+                "mode": mode,
+                "source_article_id": source_id,
+                "distance": distance,
+                "changed_sentences": alignment.changed,
+                "regions": alignment.regions(CONTEXT_SENTENCES)
+            }
+        return None
+
+    def reuse_meta_analysis(
+        self, article: Article, artifact_version: str, fingerprint: Optional[int] = None
+    ) -> Optional[MetaAnalysis]:
+        """
+        复用近似重复文章的元信息分析和思维透镜结果（不提交事务）
+
+        元信息分析的 Prompt 包含标题、作者等元信息，只复用版本键相同的分析结果。
+
+        Args:
+            article: 新文章（还没有元信息分析）
+            artifact_version: 新文章的元信息分析版本键（meta_artifact_version）
+            fingerprint: 文章指纹（不传时读取已保存的指纹）
+
+        Returns:
+            复制得到的 MetaAnalysis，没有可复用的结果时返回 None
+        """
+        fingerprint = self._fingerprint(article, fingerprint)
+        if fingerprint is None:
+            return None
+
+        for source_id, distance in self.find_near_duplicates(fingerprint, exclude_article_id=article.id):
+            source = self.db.query(MetaAnalysis).filter(MetaAnalysis.article_id == source_id).first()
+            if source is None or (source.analysis_quality or {}).get("artifact_version") != artifact_version:
+                continue
+
+            meta_analysis = MetaAnalysis(article_id=article.id, **{
+                column.key: getattr(source, column.key)
+                for column in MetaAnalysis.__table__.columns
+                if column.key not in _META_SKIP_COLUMNS
+            })
+            self.db.add(meta_analysis)
+            self.db.flush()
+
+            if source.thinking_lens_results:
+                alignment = self._align(source.article, article)
+                for lens_result in source.thinking_lens_results:
+                    self.db.add(ThinkingLensResult(
+                        meta_analysis_id=meta_analysis.id,
+                        lens_type=lens_result.lens_type,
+                        highlights=remap_items(lens_result.highlights, alignment.index_map),
+                        annotations=lens_result.annotations
+                    ))
+                self.db.flush()
+
+            logger.info(f"[NearDuplicate] 复用元信息分析: article_id={article.id}, 来源={source_id}, 距离={distance}")
+            return meta_analysis
+        return None
+
+    def _fingerprint(self, article: Article, fingerprint: Optional[int]) -> Optional[int]:
+        """读取已保存的指纹，没有时现场计算并保存"""
+        if fingerprint is not None:
+            return fingerprint
+        row = self.db.get(ArticleFingerprint, article.id)
+        if row is not None:
+            return to_unsigned(row.simhash)
+        return self.fingerprint_article(article)
+
+    def _align(self, source: Article, article: Article) -> SentenceAlignment:
+        """按句子哈希对齐来源文章和新文章"""
+        sentence_service = ArticleSentenceService(self.db)
+        old = sentence_service.segment(source.content, source.content_hash)
+        new = sentence_service.segment(article.content, article.content_hash)
+        return align_sentences(old.sentences, new.sentences)
+
+    def backfill(self, batch_size: int = 200) -> int:
+        """为还没有指纹的文章计算指纹（提交事务），返回写入指纹的文章数"""
+        count = 0
+        last_id = 0
+        while True:
+            articles = self.db.query(Article).outerjoin(
+                ArticleFingerprint, ArticleFingerprint.article_id == Article.id
+            ).filter(
+                ArticleFingerprint.article_id.is_(None),
+                Article.id > last_id
+            ).order_by(Article.id).limit(batch_size).all()
+            if not articles:
+                break
+            for article in articles:
+                if self.fingerprint_article(article) is not None:
+                    count += 1
+            last_id = articles[-1].id
+            self.db.commit()
+        return count
@@ -0,0 +1,404 @@
+"""全文检索服务 - 洞察卡片的相关性检索
+
+根据数据库方言选择索引实现：
+- SQLite：FTS5 虚拟表（rowid = 卡片 ID），bm25 排序
+- PostgreSQL：tsvector + GIN 索引，ts_rank_cd 排序
+
+两种实现都写入 cjk_tokenizer 预处理后的词元串（中文二元组 + 英文单词），
+因此不依赖数据库自带的中文分词能力。索引在卡片创建/更新/删除时增量维护。
+"""
+import html
+import json
+import logging
+import re
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from app.models.models import InsightCard
+from app.utils.cjk_tokenizer import is_cjk_run, to_index_text, tokenize_query
+
+logger = logging.getLogger(__name__)
+
+# SQLite FTS5 索引表（owner 列存放 "u{user_id}"，用于按用户分区匹配）
+SQLITE_FTS_DDL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS insight_cards_fts USING fts5(
+    owner,
+    selected_text,
+    insight,
+    article_title,
+    tags,
+    tokenize = 'unicode61 remove_diacritics 0'
+)
+"""
+
+# PostgreSQL tsvector 索引表
+POSTGRES_SEARCH_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS insight_card_search (
+        card_id INTEGER PRIMARY KEY REFERENCES insight_cards(id) ON DELETE CASCADE,
+        user_id INTEGER NOT NULL,
+        document TSVECTOR NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_insight_card_search_document ON insight_card_search USING GIN (document)",
+    "CREATE INDEX IF NOT EXISTS idx_insight_card_search_user_id ON insight_card_search (user_id)",
+]
+
+# 字段权重：选中文本 > 标题/标签 > 洞察正文
+SQLITE_BM25_WEIGHTS = "0.0, 3.0, 1.0, 2.0, 2.0"
+
+# 高亮片段的上下文长度（字符）
+SNIPPET_CONTEXT_CHARS = 40
+
+# 索引不可用时（例如 SQLite 编译时未启用 FTS5）降级为 LIKE 检索
+_index_available: Optional[bool] = None
+
+
+def init_search_index(engine: Engine) -> None:
+    """
+    创建全文索引表（幂等），首次创建时回填已有卡片
+
+    Args:
+        engine: 数据库引擎
+    """
+    global _index_available
+
+    dialect = engine.dialect.name
+    try:
+        with engine.begin() as conn:
+            if dialect == "sqlite":
+                existed = conn.execute(text(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'insight_cards_fts'"
+                )).first() is not None
+                conn.execute(text(SQLITE_FTS_DDL))
+            elif dialect == "postgresql":
+                existed = conn.execute(text(
+                    "SELECT to_regclass('insight_card_search') IS NOT NULL"
+                )).scalar()
+                for ddl in POSTGRES_SEARCH_DDL:
+                    conn.execute(text(ddl))
+            else:
+                logger.warning(f"[Search] 不支持的数据库方言: {dialect}，使用 LIKE 检索")
+                _index_available = False
+                return
+    except DBAPIError as e:
+        logger.warning(f"[Search] 全文索引创建失败，使用 LIKE 检索: {e}")
+        _index_available = False
+        return
+
+    _index_available = True
+
+    if not existed:
+        with Session(bind=engine) as db:
+            count = InsightSearchService(db).rebuild_index()
+            db.commit()
+        logger.info(f"[Search] 全文索引已创建并回填 {count} 张卡片")
+
+
+def _tag_text(tags: Optional[str]) -> str:
+    """标签 JSON 字符串解码为空格分隔的原文（旧数据中的 \\uXXXX 转义也还原为中文）"""
+    if not tags:
+        return ""
+    try:
+        values = json.loads(tags)
+    except ValueError:
+        return tags
+    if not isinstance(values, list):
+        return str(values)
+    return " ".join(str(value) for value in values)
+
+
+class InsightSearchService:
+    """洞察卡片全文检索服务"""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.dialect = db.get_bind().dialect.name
+
+    @property
+    def index_available(self) -> bool:
+        """全文索引是否可用"""
+        return bool(_index_available)
+
+    # ==================== 索引维护 ====================
+
+    def index_card(self, card: InsightCard) -> None:
+        """
+        写入或更新一张卡片的索引（不提交事务）
+
+        Args:
+            card: 已 flush（拥有 ID）的卡片
+        """
+        if not self.index_available:
+            return
+
+        fields = self._index_fields(card)
+
+        if self.dialect == "sqlite":
+            self.db.execute(text("DELETE FROM insight_cards_fts WHERE rowid = :id"), {"id": card.id})
+            self.db.execute(text("""
+                INSERT INTO insight_cards_fts (rowid, owner, selected_text, insight, article_title, tags)
+                VALUES (:id, :owner, :selected_text, :insight, :article_title, :tags)
+            """), {"id": card.id, "owner": f"u{card.user_id}", **fields})
+        else:
+            self.db.execute(text("""
+                INSERT INTO insight_card_search (card_id, user_id, document)
+                VALUES (
+                    :id, :user_id,
+                    setweight(to_tsvector('simple', :selected_text), 'A') ||
+                    setweight(to_tsvector('simple', :article_title), 'B') ||
+                    setweight(to_tsvector('simple', :tags), 'B') ||
+                    setweight(to_tsvector('simple', :insight), 'C')
+                )
+                ON CONFLICT (card_id) DO UPDATE SET
+                    user_id = EXCLUDED.user_id,
+                    document = EXCLUDED.document
+            """), {"id": card.id, "user_id": card.user_id, **fields})
+
+    def remove_card(self, card_id: int) -> None:
+        """
+        从索引中删除一张卡片（不提交事务）
+
+        Args:
+            card_id: 卡片 ID
+        """
+        if not self.index_available:
+            return
+
+        if self.dialect == "sqlite":
+            self.db.execute(text("DELETE FROM insight_cards_fts WHERE rowid = :id"), {"id": card_id})
+        else:
+            self.db.execute(text("DELETE FROM insight_card_search WHERE card_id = :id"), {"id": card_id})
+
+    def rebuild_index(self, user_id: Optional[int] = None) -> int:
+        """
+        重建索引（修复工具，不提交事务）
+
+        Args:
+            user_id: 只重建指定用户的索引（None 表示全部）
+
+        Returns:
+            写入的卡片数量
+        """
+        if not self.index_available:
+            return 0
+
+        table, key = ("insight_cards_fts", "owner") if self.dialect == "sqlite" else ("insight_card_search", "user_id")
+        if user_id is None:
+            self.db.execute(text(f"DELETE FROM {table}"))
+        else:
+            owner = f"u{user_id}" if self.dialect == "sqlite" else user_id
+            self.db.execute(text(f"DELETE FROM {table} WHERE {key} = :owner"), {"owner": owner})
+
+        query = self.db.query(InsightCard)
+        if user_id is not None:
+            query = query.filter(InsightCard.user_id == user_id)
+
+        count = 0
+        for card in query.yield_per(500):
+            self.index_card(card)
+            count += 1
+        return count
+
+    def fix_escaped_tags(self) -> int:
+        """
+        把旧版本以 \\uXXXX 转义保存的标签改存为原文并重建这些卡片的索引（幂等，不提交事务）
+
+        全表扫描，不在启动时执行，见 app/db/migrate_escaped_tags.py
+
+        Returns:
+            修复的卡片数量
+        """
+        count = 0
+        cards = self.db.query(InsightCard).filter(InsightCard.tags.contains("\\u", autoescape=True))
+        for card in cards.all():
+            try:
+                tags = json.loads(card.tags)
+            except ValueError:
+                continue
+            fixed = json.dumps(tags, ensure_ascii=False)
+            if fixed == card.tags:
+                continue
+            card.tags = fixed
+            self.index_card(card)
+            count += 1
+        return count
+
+    # ==================== 检索 ====================
+
+    def search(
+        self,
+        user_id: int,
+        query: str,
+        intent: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 20
+    ) -> Tuple[int, List[Tuple[InsightCard, Optional[str]]]]:
+        """
+        按相关性检索用户的洞察卡片
+
+        Args:
+            user_id: 用户 ID
+            query: 检索词
+            intent: 意图筛选（可选）
+            skip: 偏移量
+            limit: 每页数量
+
+        Returns:
+            (匹配总数, [(卡片, 高亮片段), ...])，按相关性降序
+        """
+        terms = tokenize_query(query)
+        if not terms:
+            return 0, []
+
+        if not self.index_available:
+            total, cards = self._search_like(user_id, query, intent, skip, limit)
+        elif self.dialect == "sqlite":
+            total, cards = self._search_sqlite(user_id, terms, intent, skip, limit)
+        else:
+            total, cards = self._search_postgres(user_id, terms, intent, skip, limit)
+
+        return total, [(card, self._build_highlight(card, query, terms)) for card in cards]
+
+    def _search_sqlite(
+        self, user_id: int, terms: List[str], intent: Optional[str], skip: int, limit: int
+    ) -> Tuple[int, List[InsightCard]]:
+        """FTS5 检索（owner 列限定用户，其余列匹配检索词）"""
+        content_match = " AND ".join(
+            f'"{term}"*' if len(term) == 1 and is_cjk_run(term) else f'"{term}"'
+            for term in terms
+        )
+        match = f'owner:"u{user_id}" AND {{selected_text insight article_title tags}}: ({content_match})'
+
+        intent_clause = "AND c.intent = :intent" if intent else ""
+        params = {"match": match, "intent": intent, "user_id": user_id}
+
+        total = self.db.execute(text(f"""
+            SELECT COUNT(*) FROM insight_cards_fts f
+            JOIN insight_cards c ON c.id = f.rowid
+            WHERE insight_cards_fts MATCH :match AND c.user_id = :user_id {intent_clause}
+        """), params).scalar() or 0
+
+        rows = self.db.execute(text(f"""
+            SELECT f.rowid FROM insight_cards_fts f
+            JOIN insight_cards c ON c.id = f.rowid
+            WHERE insight_cards_fts MATCH :match AND c.user_id = :user_id {intent_clause}
+            ORDER BY bm25(insight_cards_fts, {SQLITE_BM25_WEIGHTS}), c.created_at DESC
+            LIMIT :limit OFFSET :skip
+        """), {**params, "limit": limit, "skip": skip}).fetchall()
+
+        return total, self._load_cards([row[0] for row in rows])
+
+    def _search_postgres(
+        self, user_id: int, terms: List[str], intent: Optional[str], skip: int, limit: int
+    ) -> Tuple[int, List[InsightCard]]:
+        """tsvector 检索（GIN 索引匹配，ts_rank_cd 排序）"""
+        tsquery = " & ".join(
+            f"{term}:*" if len(term) == 1 and is_cjk_run(term) else term
+            for term in terms
+        )
+
+        intent_clause = "AND c.intent = :intent" if intent else ""
+        params = {"tsquery": tsquery, "intent": intent, "user_id": user_id}
+
+        total = self.db.execute(text(f"""
+            SELECT COUNT(*) FROM insight_card_search s
+            JOIN insight_cards c ON c.id = s.card_id
+            WHERE s.user_id = :user_id
+              AND s.document @@ to_tsquery('simple', :tsquery) {intent_clause}
+        """), params).scalar() or 0
+
+        rows = self.db.execute(text(f"""
+            SELECT s.card_id FROM insight_card_search s
+            JOIN insight_cards c ON c.id = s.card_id
+            WHERE s.user_id = :user_id
+              AND s.document @@ to_tsquery('simple', :tsquery) {intent_clause}
+            ORDER BY ts_rank_cd(s.document, to_tsquery('simple', :tsquery)) DESC, c.created_at DESC
+            LIMIT :limit OFFSET :skip
+        """), {**params, "limit": limit, "skip": skip}).fetchall()
+
+        return total, self._load_cards([row[0] for row in rows])
+
+    def _search_like(
+        self, user_id: int, query: str, intent: Optional[str], skip: int, limit: int
+    ) -> Tuple[int, List[InsightCard]]:
+        """降级检索：LIKE 模糊匹配（无相关性排序）"""
+        search_pattern = f"%{query}%"
+        q = self.db.query(InsightCard).filter(
+            InsightCard.user_id == user_id,
+            (InsightCard.selected_text.like(search_pattern)) |
+            (InsightCard.insight.like(search_pattern)) |
+            (InsightCard.article_title.like(search_pattern))
+        )
+        if intent:
+            q = q.filter(InsightCard.intent == intent)
+
+        total = q.count()
+        cards = q.order_by(InsightCard.created_at.desc()).offset(skip).limit(limit).all()
+        return total, cards
+
+    def _load_cards(self, card_ids: List[int]) -> List[InsightCard]:
+        """按给定顺序加载卡片"""
+        if not card_ids:
+            return []
+        cards = self.db.query(InsightCard).filter(InsightCard.id.in_(card_ids)).all()
+        card_map = {card.id: card for card in cards}
+        return [card_map[card_id] for card_id in card_ids if card_id in card_map]
+
+    # ==================== 辅助方法 ====================
+
+    @staticmethod
+    def _index_fields(card: InsightCard) -> Dict[str, str]:
+        """生成写入索引的各字段词元串"""
+        return {
+            "selected_text": to_index_text(card.selected_text or ""),
+            "insight": to_index_text(card.insight or ""),
+            "article_title": to_index_text(card.article_title or ""),
+            "tags": to_index_text(_tag_text(card.tags)),
+        }
+
+    @staticmethod
+    def _build_highlight(card: InsightCard, query: str, terms: List[str]) -> Optional[str]:
+        """
+        生成高亮片段：在命中字段中截取首个匹配附近的文本，用 <mark> 包裹匹配词
+
+        优先匹配用户输入的完整词（按空白切分），匹配不到时退回到词元匹配。
+
+        Returns:
+            HTML 片段（原文已转义），无匹配时返回 None
+        """
+        raw_terms = [t for t in query.split() if t]
+        patterns = [
+            re.compile("|".join(re.escape(t) for t in sorted(candidates, key=len, reverse=True)), re.IGNORECASE)
+            for candidates in (raw_terms, terms) if candidates
+        ]
+
+        for pattern in patterns:
+            for field in (card.selected_text, card.article_title, card.insight):
+                if not field:
+                    continue
+                first = pattern.search(field)
+                if not first:
+                    continue
+
+                start = max(first.start() - SNIPPET_CONTEXT_CHARS, 0)
+                end = min(first.end() + SNIPPET_CONTEXT_CHARS * 2, len(field))
+                window = field[start:end]
+
+                parts = []
+                cursor = 0
+                for match in pattern.finditer(window):
+                    parts.append(html.escape(window[cursor:match.start()]))
+                    parts.append(f"<mark>{html.escape(match.group(0))}</mark>")
+                    cursor = match.end()
+                parts.append(html.escape(window[cursor:]))
+
+                prefix = "…" if start > 0 else ""
+                suffix = "…" if end < len(field) else ""
+                return prefix + "".join(parts) + suffix
+
+        return None
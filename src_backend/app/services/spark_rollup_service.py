@@ -0,0 +1,230 @@
+"""火花点击汇总服务 - 按天累加点击计数和话题关键词
+
+点击写入时（ClickBuffer 批量写入同一事务内）增量更新：
+- spark_click_daily: (user_id, day, spark_type) -> count，使用 upsert 累加
+- spark_topic_daily: (user_id, day) -> 话题词 Space-Saving 草图（见 app/utils/topk_sketch.py）
+
+好奇心指纹只需读取窗口内的每日汇总行（30 天窗口最多 30 × 类型数 行），
+90 / 365 天窗口同样只按天读取，不再扫描原始点击。
+"""
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.core.click_buffer import register_write_handler
+from app.models.models import SparkClick, SparkClickDaily, SparkTopicDaily
+from app.utils.cjk_segmenter import extract_topics
+from app.utils.topk_sketch import SpaceSavingSketch
+
+logger = logging.getLogger(__name__)
+
+# 每个用户每天的话题草图计数器数量
+TOPIC_CAPACITY = 100
+
+# 单条 upsert 语句的行数上限（避免超出数据库参数个数限制）
+UPSERT_BATCH_SIZE = 500
+
+def window_start(days: int) -> date:
+    """统计窗口的起始日期（含今天共 days 天）"""
+    return datetime.utcnow().date() - timedelta(days=days - 1)
+
+
+class SparkRollupService:
+    """火花点击汇总服务"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # ==================== 写入 ====================
+
+    def apply_clicks(self, events: Iterable[Dict]) -> None:
+        """
+        将一批点击累加到日汇总表（不提交事务）
+
+        Args:
+            events: SparkClick 列字典（user_id, spark_type, spark_text, clicked_at）
+        """
+        type_counts: Dict[Tuple[int, date, str], int] = defaultdict(int)
+        topics: Dict[Tuple[int, date], List[str]] = defaultdict(list)
+
+        for event in events:
+            day = event["clicked_at"].date()
+            type_counts[(event["user_id"], day, event["spark_type"])] += 1
+            topics[(event["user_id"], day)].extend(extract_topics(event["spark_text"]))
+
+        if type_counts:
+            self._upsert_type_counts(type_counts)
+        # 按 (user_id, day) 顺序加锁，并发写入以相同顺序加锁，避免死锁
+        for (user_id, day), words in sorted(topics.items()):
+            if words:
+                self._update_topic_sketch(user_id, day, words)
+
+    def _upsert_type_counts(self, type_counts: Dict[Tuple[int, date, str], int]) -> None:
+        """累加每日类型计数（SQLite / PostgreSQL 使用 ON CONFLICT 原子累加）"""
+        rows = [
+            {"user_id": user_id, "day": day, "spark_type": spark_type, "count": count}
+            for (user_id, day, spark_type), count in type_counts.items()
+        ]
+
+        dialect = self.db.get_bind().dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            insert = sqlite_insert if dialect == "sqlite" else pg_insert
+            for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+                stmt = insert(SparkClickDaily).values(rows[start:start + UPSERT_BATCH_SIZE])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=["user_id", "day", "spark_type"],
+                    set_={"count": SparkClickDaily.count + stmt.excluded.count}
+                )
+                self.db.execute(stmt)
+            return
+
+        # 其他数据库：逐行读取后更新
+        for row in rows:
+            existing = self.db.get(SparkClickDaily, (row["user_id"], row["day"], row["spark_type"]))
+            if existing:
+                existing.count += row["count"]
+            else:
+                self.db.add(SparkClickDaily(**row))
+        self.db.flush()
+
+    def _update_topic_sketch(self, user_id: int, day: date, words: List[str]) -> None:
+        """
+        逐词更新当天的话题草图
+
+        草图是整行 JSON 的读-改-写：先补齐当天的行（并发插入时忽略冲突），再加行锁读取，
+        多个进程同时写入同一用户同一天的点击时不会丢失更新。
+        """
+        self._ensure_topic_row(user_id, day)
+        # populate_existing 会覆盖会话中未写入的修改，先写入
+        self.db.flush()
+        row = self.db.query(SparkTopicDaily).filter(
+            SparkTopicDaily.user_id == user_id,
+            SparkTopicDaily.day == day
+        ).with_for_update().populate_existing().one()
+
+        sketch = SpaceSavingSketch.from_dict(row.counters, TOPIC_CAPACITY)
+        sketch.update_many(words)
+        row.counters = sketch.to_dict()
+        self.db.flush()
+
+    def _ensure_topic_row(self, user_id: int, day: date) -> None:
+        """补齐当天的话题草图行（空草图）"""
+        dialect = self.db.get_bind().dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            insert = sqlite_insert if dialect == "sqlite" else pg_insert
+            self.db.execute(
+                insert(SparkTopicDaily).values(
+                    user_id=user_id, day=day, counters={}, updated_at=datetime.utcnow()
+                ).on_conflict_do_nothing(index_elements=["user_id", "day"])
+            )
+            return
+
+        # 其他数据库：检查后插入
+        if self.db.get(SparkTopicDaily, (user_id, day)) is None:
+            self.db.add(SparkTopicDaily(user_id=user_id, day=day, counters={}))
+
+    # ==================== 读取 ====================
+
+    def get_type_counts(self, user_id: int, days: int = 30) -> Dict[str, int]:
+        """窗口内各火花类型的点击数"""
+        rows = self.db.query(
+            SparkClickDaily.spark_type, func.sum(SparkClickDaily.count)
+        ).filter(
+            SparkClickDaily.user_id == user_id,
+            SparkClickDaily.day >= window_start(days)
+        ).group_by(SparkClickDaily.spark_type).all()
+        return {spark_type: int(count) for spark_type, count in rows}
+
+    def get_daily_counts(self, user_id: int, days: int = 30) -> Dict[str, Dict[str, int]]:
+        """窗口内每天各类型的点击数：{"2025-01-01": {"concept": 3}}"""
+        rows = self.db.query(SparkClickDaily).filter(
+            SparkClickDaily.user_id == user_id,
+            SparkClickDaily.day >= window_start(days)
+        ).all()
+
+        daily: Dict[str, Dict[str, int]] = defaultdict(dict)
+        for row in rows:
+            daily[row.day.isoformat()][row.spark_type] = row.count
+        return daily
+
+    def get_top_topics(self, user_id: int, days: int = 30, limit: int = 20) -> List[Tuple[str, int]]:
+        """窗口内的高频话题词（合并每日草图，读取量 O(days × TOPIC_CAPACITY)）"""
+        rows = self.db.query(SparkTopicDaily.counters).filter(
+            SparkTopicDaily.user_id == user_id,
+            SparkTopicDaily.day >= window_start(days)
+        ).all()
+
+        merged = SpaceSavingSketch(TOPIC_CAPACITY)
+        for (counters,) in rows:
+            merged.merge(SpaceSavingSketch.from_dict(counters, TOPIC_CAPACITY))
+        return merged.top(limit)
+
+    # ==================== 回填 ====================
+
+    def rebuild(self, user_id: Optional[int] = None, batch_size: int = 1000) -> int:
+        """
+        根据原始点击重建日汇总（回填/修复工具，不提交事务）
+
+        Args:
+            user_id: 只重建指定用户（None 表示全部用户）
+            batch_size: 读取原始点击的批大小
+
+        Returns:
+            处理的点击数量
+        """
+        for model in (SparkClickDaily, SparkTopicDaily):
+            query = self.db.query(model)
+            if user_id is not None:
+                query = query.filter(model.user_id == user_id)
+            query.delete(synchronize_session=False)
+
+        # 类型计数直接在数据库中按天分组
+        day_expr = func.date(SparkClick.clicked_at)
+        query = self.db.query(
+            SparkClick.user_id, day_expr, SparkClick.spark_type, func.count()
+        )
+        if user_id is not None:
+            query = query.filter(SparkClick.user_id == user_id)
+
+        type_counts = {}
+        total = 0
+        for row_user_id, day, spark_type, count in query.group_by(
+            SparkClick.user_id, day_expr, SparkClick.spark_type
+        ):
+            if isinstance(day, str):
+                day = date.fromisoformat(day)
+            type_counts[(row_user_id, day, spark_type)] = count
+            total += count
+        if type_counts:
+            self._upsert_type_counts(type_counts)
+
+        # 话题草图需要原始文本：只读取所需列，分批流式处理
+        sketches: Dict[Tuple[int, date], SpaceSavingSketch] = {}
+        query = self.db.query(SparkClick.user_id, SparkClick.clicked_at, SparkClick.spark_text)
+        if user_id is not None:
+            query = query.filter(SparkClick.user_id == user_id)
+        for row_user_id, clicked_at, spark_text in query.order_by(SparkClick.id).yield_per(batch_size):
+            key = (row_user_id, clicked_at.date())
+            if key not in sketches:
+                sketches[key] = SpaceSavingSketch(TOPIC_CAPACITY)
+            sketches[key].update_many(extract_topics(spark_text))
+
+        for (row_user_id, day), sketch in sketches.items():
+            if sketch.counters:
+                self.db.add(SparkTopicDaily(user_id=row_user_id, day=day, counters=sketch.to_dict()))
+        self.db.flush()
+
+        logger.info(f"[SparkRollup] 日汇总已重建: user_id={user_id}, 点击={total}")
+        return total
+
+
+@register_write_handler
+def _apply_clicks_to_rollups(db: Session, events: List[Dict]) -> None:
+    """点击写缓冲回调：在写入原始点击的同一事务中累加日汇总"""
+    SparkRollupService(db).apply_clicks(events)
@@ -8,13 +8,19 @@ from openai import AsyncOpenAI
 from sqlalchemy.orm import Session
 from app.models.models import ThinkingLensResult, MetaAnalysis
 from app.config import settings
-from app.utils.sentence_splitter import split_sentences
+from app.services.article_sentence_service import ArticleSentenceService, SentenceSegmentation
+from app.services.analysis_artifact_service import AnalysisArtifactService, lens_artifact_type
+from app.core.token_estimator import token_estimator
+from app.utils.token_budget import token_budget
 import json
 import json_repair
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# 透镜分析版本（Prompt 变化时递增；共享的分析结果按版本区分，见 AnalysisArtifact）
+LENS_VERSION = "1.0"
+
 
 class ThinkingLensService:
     def __init__(self, db: Session):
@@ -70,12 +76,33 @@ class ThinkingLensService:
         logger.info(f"开始透镜分析: lens_type={lens_type}")
 
         try:
-            if lens_type == "argument_structure":
-                result = await self._apply_argument_lens(full_text, language)
-            elif lens_type == "author_stance":
-                result = await self._apply_stance_lens(full_text, language)
+            # 分句结果按内容哈希共享（各透镜与元信息分析的句子编号一致），调用 LLM 前先提交
+            segmentation = ArticleSentenceService(self.db).segment(full_text)
+            self.db.commit()
+
+            # 相同内容的透镜结果按内容哈希跨用户共享（强制重新分析时重新调用 LLM 并覆盖）
+            artifact_service = AnalysisArtifactService(self.db)
+            artifact_type = lens_artifact_type(lens_type)
+            artifact = None
+            if not force_reanalyze:
+                artifact = artifact_service.get(segmentation.content_hash, artifact_type, LENS_VERSION)
+
+            if artifact is not None:
+                result = artifact.payload
+                artifact_service.mark_reused(artifact)
             else:
-                raise ValueError(f"不支持的透镜类型: {lens_type}")
+                if lens_type == "argument_structure":
+                    result = await self._apply_argument_lens(segmentation, language)
+                elif lens_type == "author_stance":
+                    result = await self._apply_stance_lens(segmentation, language)
+                else:
+                    raise ValueError(f"不支持的透镜类型: {lens_type}")
+                artifact = artifact_service.put(
+                    segmentation.content_hash,
+                    artifact_type,
+                    LENS_VERSION,
+                    {"highlights": result['highlights'], "annotations": result['annotations']}
+                )
 
             # 如果是重新分析，删除旧记录
             if force_reanalyze:
@@ -92,7 +119,8 @@ class ThinkingLensService:
                 meta_analysis_id=meta_analysis_id,
                 lens_type=lens_type,
                 highlights=result['highlights'],
-                annotations=result['annotations']
+                annotations=result['annotations'],
+                artifact_id=artifact.id
             )
 
             self.db.add(lens_result)
@@ -108,13 +136,15 @@ class ThinkingLensService:
             self.db.rollback()
             raise
 
-    async def _apply_argument_lens(self, full_text: str, language: str) -> Dict:
+    async def _apply_argument_lens(
+        self,
+        segmentation: SentenceSegmentation,
+        language: str,
+        regions: Optional[List[Tuple[int, int]]] = None,
+        targets: Optional[List[int]] = None
+    ) -> Dict:
         """应用论证结构透镜"""
 
-        # 分句
-        sentences = split_sentences(full_text)
-        sentence_list = "\n".join([f"[{i}] {sentence}" for i, sentence in enumerate(sentences)])
-
         system_prompt = """你是一位逻辑分析专家，擅长识别文本中的论证结构。
 
 你的任务是分析文章，标注出：
@@ -170,26 +200,30 @@ class ThinkingLensService:
 - color固定为: claim="#dbeafe", evidence="#d1fae5"
 - 所有文本片段必须与句子列表中的原文完全一致"""
 
+        sentence_list, scope_note = self._sentence_scope(segmentation, regions, targets, system_prompt)
+
         user_prompt = f"""请分析以下文章的论证结构，标注出核心主张和支撑证据：
 
-句子总数：{len(sentences)}
+句子总数：{len(segmentation)}
 
 文章句子列表：
 {sentence_list}
-
+{scope_note}
 **注意**: 文章已拆分为带编号的句子列表，请直接引用句子编号（如 [5]）而不是搜索文本位置。
 
 请输出JSON格式的分析结果。"""
 
         return await self._call_llm_for_lens(system_prompt, user_prompt)
 
-    async def _apply_stance_lens(self, full_text: str, language: str) -> Dict:
+    async def _apply_stance_lens(
+        self,
+        segmentation: SentenceSegmentation,
+        language: str,
+        regions: Optional[List[Tuple[int, int]]] = None,
+        targets: Optional[List[int]] = None
+    ) -> Dict:
         """应用作者立场透镜"""
 
-        # 分句
-        sentences = split_sentences(full_text)
-        sentence_list = "\n".join([f"[{i}] {sentence}" for i, sentence in enumerate(sentences)])
-
         system_prompt = """你是一位语言学专家，擅长区分文本中的主观表达和客观陈述。
 
 你的任务是分析文章，标注出：
@@ -247,37 +281,107 @@ class ThinkingLensService:
 - color固定为: subjective="#fef3c7", objective="#e2e8f0", irony="#fde68a"
 - 所有文本片段必须与句子列表中的原文完全一致"""
 
+        sentence_list, scope_note = self._sentence_scope(segmentation, regions, targets, system_prompt)
+
         user_prompt = f"""请分析以下文章的作者立场，标注出主观表达和客观陈述：
 
-句子总数：{len(sentences)}
+句子总数：{len(segmentation)}
 
 文章句子列表：
 {sentence_list}
-
+{scope_note}
 **注意**: 文章已拆分为带编号的句子列表，请直接引用句子编号（如 [5]）而不是搜索文本位置。
 
 请输出JSON格式的分析结果。"""
 
         return await self._call_llm_for_lens(system_prompt, user_prompt)
 
+    @staticmethod
+    def _sentence_scope(
+        segmentation: SentenceSegmentation,
+        regions: Optional[List[Tuple[int, int]]],
+        targets: Optional[List[int]],
+        overhead: str = ""
+    ) -> Tuple[str, str]:
+        """
+        Prompt 中的句子列表：完整文章（超出 token 预算时按重要性抽取），
+        或文章修改后只包含修改过的区间（编号与完整文章一致）
+
+        Args:
+            overhead: Prompt 中句子列表以外的部分（用于计算句子列表的预算）
+
+        Returns:
+            (带编号的句子列表, 范围说明)
+        """
+        if regions is None:
+            return token_budget.fit_sentences(segmentation, 'thinking_lens', settings.default_model, overhead)
+        target_list = ", ".join(f"[{i}]" for i in targets or [])
+        scope_note = (
+            "\n（文章刚被修改，以上只是修改过的片段及其前后文，片段之间以 …… 分隔；"
+            f"只标注以下句子：{target_list}，其余句子仅作上下文参考）\n"
+        )
+        return segmentation.numbered_regions(regions), scope_note
+
+    async def reanalyze_regions(
+        self,
+        lens_result: ThinkingLensResult,
+        segmentation: SentenceSegmentation,
+        regions: List[Tuple[int, int]],
+        targets: List[int],
+        language: str = "zh"
+    ) -> int:
+        """
+        文章修改后只对修改过的句子重新应用透镜，合并进已有结果（不提交事务）
+
+        已有结果中未修改句子上的高亮应已按新编号调整（见 IncrementalAnalysisService）。
+
+        Args:
+            lens_result: 已有的透镜结果
+            segmentation: 修改后文章的分句结果
+            regions: 修改过的句子及其上下文区间 [(start, end)]
+            targets: 修改过的句子序号
+
+        Returns:
+            新增的高亮数
+        """
+        if lens_result.lens_type == "argument_structure":
+            result = await self._apply_argument_lens(segmentation, language, regions, targets)
+        elif lens_result.lens_type == "author_stance":
+            result = await self._apply_stance_lens(segmentation, language, regions, targets)
+        else:
+            raise ValueError(f"不支持的透镜类型: {lens_result.lens_type}")
+
+        allowed = set(targets)
+        added = [item for item in result['highlights'] if item['sentence_index'] in allowed]
+        # 整体赋值，确保 JSON 列的变更被 ORM 检测到
+        lens_result.highlights = sorted(
+            list(lens_result.highlights or []) + added,
+            key=lambda item: item.get('sentence_index', 0)
+        )
+        logger.info(f"透镜局部分析完成: lens_type={lens_result.lens_type}, 新增高亮 {len(added)} 个")
+        return len(added)
+
     async def _call_llm_for_lens(self, system_prompt: str, user_prompt: str) -> Dict:
         """调用 LLM 进行透镜分析"""
 
         # 使用 settings 中的配置调用 OpenAI API (异步)
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+        budget = token_budget.check(messages, 'thinking_lens', settings.default_model)
         try:
             response = await self.client.chat.completions.create(
                 model=settings.default_model,  # 使用配置中的默认模型
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
+                messages=messages,
                 response_format={"type": "json_object"},
                 temperature=0.2,  # 降低温度以提高准确性
-                max_tokens=3000
+                max_tokens=budget.max_output_tokens
             )
         except Exception as e:
             logger.error(f"LLM调用失败 - thinking_lens - model={settings.default_model}, error={e}")
             raise
+        token_estimator.observe_response(settings.default_model, messages, response)
 
         # 解析响应
         try:
@@ -7,15 +7,34 @@
 import logging
 from openai import AsyncOpenAI
 from app.config import settings
-from app.utils.sentence_splitter import split_sentences
+from app.services.article_sentence_service import SentenceSegmentation
+from app.core.token_estimator import token_estimator
+from app.utils.token_budget import token_budget
+import hashlib
 import json
 import json_repair
 import re
 import time
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# 分析版本（Prompt 或报告结构变化时递增；共享的分析结果按版本区分，见 AnalysisArtifact）
+ANALYSIS_VERSION = "1.0"
+
+def report_artifact_version(article_title: str) -> str:
+    """
+    共享分析报告的版本键
+
+    Prompt 中包含文章标题，把标题的哈希并入版本号：正文相同但标题不同的文章不复用彼此的报告。
+    结果形如 "1.0:3f2a9c0d1b4e"，不超过 AnalysisArtifact.analysis_version 的长度。
+    """
+    digest = hashlib.sha256((article_title or "").encode("utf-8")).hexdigest()[:12]
+    return f"{ANALYSIS_VERSION}:{digest}"
+
+
+SYSTEM_PROMPT = "你是一名世界级的跨学科研究分析师，拥有深厚的批判性思维能力和教育心理学背景。"
+
 
 class UnifiedAnalysisService:
     """统一深度分析服务"""
@@ -28,18 +47,25 @@ class UnifiedAnalysisService:
         )
         self.model = settings.default_model
 
-    async def analyze_article(self, article_content: str, article_title: str = "") -> Dict:
+    async def analyze_article(
+        self,
+        article_content: str,
+        article_title: str = "",
+        segmentation: Optional[SentenceSegmentation] = None
+    ) -> Dict:
         """
         执行文章的统一深度分析
 
         Args:
             article_content: 文章内容
             article_title: 文章标题（可选）
+            segmentation: 分句结果（调用方通过 ArticleSentenceService.segment 获取；不传时现场分句）
 
         Returns:
-            包含报告和元数据的字典：
+            包含报告、分句结果和元数据的字典：
             {
-                "report": {...},  # 分析报告 JSON
+                "report": {...},  # 分析报告 JSON（不含分句）
+                "sentences": [...],  # 分句结果（即 segmentation.sentences，已按 content_hash 保存）
                 "metadata": {
                     "model": str,
                     "tokens": int,
@@ -50,33 +76,35 @@ class UnifiedAnalysisService:
         start_time = time.time()
 
         # 1. 预处理：分句
-        sentences = self._split_sentences(article_content)
+        if segmentation is None:
+            segmentation = SentenceSegmentation.from_text(article_content)
+        sentences = segmentation.sentences
         logger.info(f"文章分句完成，共 {len(sentences)} 个句子")
 
-        # 2. 构建 Prompt（传递句子列表而非原始内容）
-        prompt = self._build_analysis_prompt(sentences, article_title)
+        # 2. 构建 Prompt（传递句子列表而非原始内容；超出 token 预算时按重要性抽取句子）
+        overhead = SYSTEM_PROMPT + self._build_analysis_prompt(segmentation, article_title, sentence_list="")
+        sentence_list, scope_note = token_budget.fit_sentences(segmentation, 'unified_analysis', self.model, overhead)
+        prompt = self._build_analysis_prompt(segmentation, article_title, sentence_list + scope_note)
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+        budget = token_budget.check(messages, 'unified_analysis', self.model)
 
         # 3. 调用 LLM (异步)
         logger.info("开始调用 LLM 进行深度分析")
         try:
             response = await self.client.chat.completions.create(
                 model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "你是一名世界级的跨学科研究分析师，拥有深厚的批判性思维能力和教育心理学背景。"
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
+                messages=messages,
                 response_format={"type": "json_object"},
                 temperature=0.3,
+                max_tokens=budget.max_output_tokens
             )
         except Exception as e:
             logger.error(f"LLM调用失败 - unified_analysis - model={self.model}, error={e}")
             raise
+        token_estimator.observe_response(self.model, messages, response)
 
         # 4. 解析响应
         try:
@@ -91,19 +119,17 @@ class UnifiedAnalysisService:
         # 5. 后处理：添加 DOM 路径
         report_json = self._add_dom_paths(report_json, sentences)
 
-        # 6. 添加分句结果到报告（供前端使用）
-        report_json['sentences'] = sentences
-        logger.info(f"已将 {len(sentences)} 个句子添加到报告")
-
-        # 7. 验证报告
+        # 6. 验证报告
         self._validate_report(report_json)
         logger.info("报告验证通过")
 
-        # 8. 计算处理时间
+        # 7. 计算处理时间
         processing_time_ms = int((time.time() - start_time) * 1000)
 
+        # 分句结果单独返回，不再内嵌到报告中（避免每次序列化报告都携带全文副本）
         return {
             "report": report_json,
+            "sentences": sentences,
             "metadata": {
                 "model": response.model,
                 "tokens": response.usage.total_tokens,
@@ -111,33 +137,162 @@ class UnifiedAnalysisService:
             }
         }
 
-    def _split_sentences(self, text: str) -> List[str]:
+    async def analyze_regions(
+        self,
+        segmentation: SentenceSegmentation,
+        regions: List[Tuple[int, int]],
+        targets: List[int],
+        article_title: str = ""
+    ) -> Dict:
         """
-        智能分句
-
-        使用正则表达式将文章拆分成句子列表。
+        文章修改后的局部分析：只把修改过的句子（连同上下文）发给 LLM，重新标注其中的火花
 
         Args:
-            text: 原始文本
+            segmentation: 修改后文章的分句结果
+            regions: 句子序号区间 [(start, end)]（修改过的句子及其上下文）
+            targets: 需要标注的句子序号（修改过的句子）；上下文句子上的火花已从旧报告沿用
 
         Returns:
-            句子列表
+            {
+                "concept_sparks": [...],  # 只含 targets 上的火花，已添加 DOM 路径
+                "argument_sparks": [...],
+                "metadata": {"model": str, "tokens": int, "processing_time_ms": int}
+            }
         """
-        return split_sentences(text)
+        start_time = time.time()
+        prompt = self._build_region_prompt(segmentation, regions, targets, article_title)
+
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+        budget = token_budget.check(messages, 'unified_analysis_regions', self.model)
+
+        logger.info(f"开始调用 LLM 进行局部分析：{len(targets)} 个修改过的句子，{len(regions)} 个区间")
+        try:
+            response = await self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                response_format={"type": "json_object"},
+                temperature=0.3,
+                max_tokens=budget.max_output_tokens
+            )
+        except Exception as e:
+            logger.error(f"LLM调用失败 - unified_analysis_regions - model={self.model}, error={e}")
+            raise
+        token_estimator.observe_response(self.model, messages, response)
+
+        raw_content = response.choices[0].message.content
+        result = json_repair.repair_json(raw_content, return_objects=True, ensure_ascii=False)
+        if not isinstance(result, dict):
+            raise ValueError("局部分析结果不是 JSON 对象")
+
+        # 只保留落在修改过的句子上的火花（LLM 可能标注上下文句子）
+        allowed = set(targets)
+        sparks = {}
+        for key in ('concept_sparks', 'argument_sparks'):
+            items = result.get(key) or []
+            sparks[key] = [
+                spark for spark in items
+                if isinstance(spark, dict) and isinstance(spark.get('sentence_index'), int)
+                and spark['sentence_index'] in allowed
+            ]
+        sparks = self._add_dom_paths(sparks, segmentation.sentences)
+
+        return {
+            **sparks,
+            "metadata": {
+                "model": response.model,
+                "tokens": response.usage.total_tokens,
+                "processing_time_ms": int((time.time() - start_time) * 1000)
+            }
+        }
+
+    def _build_region_prompt(
+        self,
+        segmentation: SentenceSegmentation,
+        regions: List[Tuple[int, int]],
+        targets: List[int],
+        title: str
+    ) -> str:
+        """
+        构建局部分析 Prompt（只包含修改过的区间，句子编号与完整文章一致）
+        """
+        target_list = ", ".join(f"[{i}]" for i in targets)
+        return f"""# 任务目标
+
+以下文章刚被作者修改过。其余部分已经分析完毕，请只分析修改过的句子，并严格按照指定的 JSON Schema 返回结果。
+
+# 文章信息
+
+标题：{title if title else "（无标题）"}
+句子总数：{len(segmentation)}
+
+# 修改过的片段
+
+以下是修改过的句子及其前后文（编号与完整文章一致，片段之间以 …… 分隔）：
+
+{segmentation.numbered_regions(regions)}
+
+需要分析的句子编号：{target_list}
+（其余句子仅作上下文参考，不要标注）
+
+# 分析维度
+
+## 1. 核心概念提炼 (concept_sparks)
+
+仅当需要分析的句子中出现理解核心论点所必需、且读者可能陌生的专业术语或抽象概念时才标注，宁缺毋滥。
+
+## 2. 论证结构分析 (argument_sparks)
+
+识别需要分析的句子中的核心观点句 (claim)、支撑证据句 (evidence) 和关键转折句 (transition)。
+
+# 输出格式
+
+```json
+{{
+  "concept_sparks": [
+    {{
+      "text": "概念原文",
+      "sentence_index": 5,
+      "importance_score": 9,
+      "explanation_hint": "用一个日常生活中的例子解释该概念，并说明它为何重要。"
+    }}
+  ],
+  "argument_sparks": [
+    {{
+      "type": "claim",
+      "text": "句子原文（从句子列表中复制）",
+      "sentence_index": 3,
+      "role_description": "这句话在论证中的作用"
+    }}
+  ]
+}}
+```
+
+没有值得标注的内容时返回空数组。sentence_index 必须直接使用上方的句子编号，且只能是需要分析的句子。
+"""
 
-    def _build_analysis_prompt(self, sentences: List[str], title: str) -> str:
+    def _build_analysis_prompt(
+        self,
+        segmentation: SentenceSegmentation,
+        title: str,
+        sentence_list: Optional[str] = None
+    ) -> str:
         """
         构建分析 Prompt
 
         Args:
-            sentences: 句子列表（已分句）
+            segmentation: 分句结果
             title: 文章标题
+            sentence_list: 带编号的句子列表（默认完整文章；超出 token 预算时为抽取的句子）
 
         Returns:
             完整的 Prompt 字符串
         """
-        # 格式化句子列表：每句一行，带编号
-        sentence_list = "\n".join([f"[{i}] {sentence}" for i, sentence in enumerate(sentences)])
+        # 句子列表：每句一行，带编号（分句时已预先生成）
+        if sentence_list is None:
+            sentence_list = segmentation.numbered
         prompt = f"""# 任务目标
 
 对以下文章进行全面的深度分析，并严格按照指定的 JSON Schema 返回结果。
@@ -145,7 +300,7 @@ class UnifiedAnalysisService:
 # 文章信息
 
 标题：{title if title else "（无标题）"}
-句子总数：{len(sentences)}
+句子总数：{len(segmentation)}
 
 # 文章句子列表
 
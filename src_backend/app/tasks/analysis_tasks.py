@@ -4,7 +4,9 @@
 """
 
 from app.celery_app import celery_app
-from app.services.unified_analysis_service import UnifiedAnalysisService
+from app.services.unified_analysis_service import ANALYSIS_VERSION, UnifiedAnalysisService, report_artifact_version
+from app.services.analysis_artifact_service import AnalysisArtifactService, UNIFIED_REPORT
+from app.services.article_sentence_service import ArticleSentenceService
 from app.db.database import get_db
 from app.models.models import Article, AnalysisReport
 from app.api.sse import notify_analysis_complete, notify_analysis_progress
@@ -62,34 +64,55 @@ def analyze_article_task(self, article_id: int, user_id: int = None):
                 user_id, article_id, "extracting_concepts", 20
             ))
 
-        # 4. 调用 AI 分析服务
-        analysis_service = UnifiedAnalysisService()
-        result = asyncio.run(analysis_service.analyze_article(
-            article.content,
-            article.title
-        ))
-
-        logger.info(f"✅ AI 分析完成")
-
-        # 5. 发送进度通知
-        if user_id:
-            asyncio.run(notify_analysis_progress(
-                user_id, article_id, "finalizing", 90
+        # 4. 相同内容已由其他用户分析过：直接复用共享的分析结果
+        artifact_service = AnalysisArtifactService(db)
+        artifact = artifact_service.get(article.content_hash, UNIFIED_REPORT, report_artifact_version(article.title))
+        if artifact is not None:
+            artifact_service.apply_unified_report(report, artifact)
+            db.commit()
+            logger.info(f"♻️ 复用共享的分析结果 (artifact_id={artifact.id})")
+        else:
+            # 5. 调用 AI 分析服务
+            # 分句结果按内容哈希共享（进程内缓存 + article_sentences 表）
+            segmentation = ArticleSentenceService(db).segment(article.content, article.content_hash)
+            db.commit()
+            analysis_service = UnifiedAnalysisService()
+            result = asyncio.run(analysis_service.analyze_article(
+                article.content,
+                article.title,
+                segmentation
             ))
 
-        # 6. 保存分析结果
-        report.report_data = result['report']
-        report.model_used = result['metadata']['model']
-        report.tokens_used = result['metadata']['tokens']
-        report.processing_time_ms = result['metadata']['processing_time_ms']
-        report.status = 'completed'
-        report.completed_at = datetime.utcnow()
-        report.error_message = None
+            logger.info(f"✅ AI 分析完成")
+
+            # 6. 发送进度通知
+            if user_id:
+                asyncio.run(notify_analysis_progress(
+                    user_id, article_id, "finalizing", 90
+                ))
+
+            # 7. 保存分析结果（分句结果已在分句时按内容哈希单独保存），并按内容哈希共享
+            artifact = artifact_service.put(
+                article.content_hash,
+                UNIFIED_REPORT,
+                report_artifact_version(article.title),
+                {"report": result['report'], "metadata": result['metadata']},
+                tokens_used=result['metadata']['tokens']
+            )
+            report.report_data = result['report']
+            report.analysis_version = ANALYSIS_VERSION
+            report.model_used = result['metadata']['model']
+            report.tokens_used = result['metadata']['tokens']
+            report.processing_time_ms = result['metadata']['processing_time_ms']
+            report.status = 'completed'
+            report.completed_at = datetime.utcnow()
+            report.error_message = None
+            report.artifact_id = artifact.id
 
-        db.commit()
-        logger.info(f"💾 分析报告已保存到数据库")
+            db.commit()
+            logger.info(f"💾 分析报告已保存到数据库")
 
-        # 7. 发送完成通知
+        # 8. 发送完成通知
         if user_id:
             asyncio.run(notify_analysis_complete(user_id, article_id))
             logger.info(f"📬 已通知用户 {user_id} 分析完成")
@@ -0,0 +1,82 @@
+"""
+Aho-Corasick 多模式匹配
+
+把全部关键词编译成一个自动机（字典树 + 失败链接），扫描文本一遍即可找出所有出现的关键词，
+耗时与文本长度和匹配数成正比，与关键词数量无关。
+
+匹配不区分大小写（关键词和文本都先做 casefold）。
+"""
+
+from collections import deque
+from typing import Dict, Generic, Iterator, List, Mapping, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class AhoCorasick(Generic[T]):
+    """编译后的关键词自动机（构建后只读，可在线程间共享）"""
+
+    def __init__(self, patterns: Mapping[str, T]):
+        """
+        Args:
+            patterns: 关键词 -> 附带的值（匹配时返回）；空关键词被忽略
+        """
+        # 状态 0 为根；_goto[s] 为状态 s 的转移表，_outputs[s] 为在状态 s 结束的全部关键词
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[List[Tuple[str, T]]] = [[]]
+        self._size = 0
+
+        for pattern, value in patterns.items():
+            key = pattern.casefold()
+            if not key:
+                continue
+            state = 0
+            for char in key:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._outputs.append([])
+                state = next_state
+            self._outputs[state].append((pattern, value))
+            self._size += 1
+
+        self._build_failure_links()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _build_failure_links(self) -> None:
+        """按层（广度优先）计算失败链接，并把失败状态的输出并入当前状态"""
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                link = fail[state]
+                while link and char not in goto[link]:
+                    link = fail[link]
+                target = goto[link].get(char, 0)
+                fail[next_state] = target if target != next_state else 0
+                if outputs[fail[next_state]]:
+                    outputs[next_state] = outputs[next_state] + outputs[fail[next_state]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, str, T]]:
+        """
+        扫描文本，逐个返回匹配（允许重叠）
+
+        Yields:
+            (结束位置（casefold 后文本中的下标，不含）, 关键词, 附带的值)
+        """
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        state = 0
+        for position, char in enumerate(text.casefold(), 1):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for pattern, value in outputs[state]:
+                yield position, pattern, value
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+CJK 感知的检索分词工具
+
+全文检索（SQLite FTS5 / PostgreSQL tsvector）自带的分词器无法切分中文，
+这里统一把文本预处理成空格分隔的词元序列：
+- 中文（CJK）连续片段：生成重叠二元组（bigram），并补上片段最后一个字，
+  保证任意单字查询都能通过前缀匹配命中
+- 英文/数字：按单词切分并转为小写
+"""
+
+import re
+from typing import List
+
+# CJK 统一表意文字 + 扩展A + 兼容表意文字
+_CJK_RANGES = r'\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff'
+
+# 一次扫描同时匹配 CJK 片段和拉丁/数字单词
+_TOKEN_PATTERN = re.compile(rf'[{_CJK_RANGES}]+|[0-9A-Za-z\u00c0-\u024f]+')
+_CJK_RUN_PATTERN = re.compile(rf'[{_CJK_RANGES}]+')
+
+
+def is_cjk_run(token: str) -> bool:
+    """判断片段是否为 CJK 连续片段"""
+    return bool(_CJK_RUN_PATTERN.fullmatch(token))
+
+
+def cjk_bigrams(run: str) -> List[str]:
+    """
+    将 CJK 连续片段拆分为重叠二元组
+
+    Args:
+        run: 纯 CJK 字符片段，如 "人工智能"
+
+    Returns:
+        二元组列表，如 ["人工", "工智", "智能", "能"]
+    """
+    if len(run) == 1:
+        return [run]
+
+    grams = [run[i:i + 2] for i in range(len(run) - 1)]
+    # 补上最后一个字，单字查询可以前缀匹配到所有位置
+    grams.append(run[-1])
+    return grams
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    将文本拆分为检索词元（用于建立索引）
+
+    Args:
+        text: 原始文本
+
+    Returns:
+        词元列表（保持出现顺序，可能重复）
+    """
+    if not text:
+        return []
+
+    tokens: List[str] = []
+    for match in _TOKEN_PATTERN.finditer(text):
+        piece = match.group(0)
+        if is_cjk_run(piece):
+            tokens.extend(cjk_bigrams(piece))
+        else:
+            tokens.append(piece.lower())
+    return tokens
+
+
+def tokenize_query(query: str) -> List[str]:
+    """
+    将查询拆分为检索词元（用于构造查询条件）
+
+    与 tokenize 的区别：
+    - 多字 CJK 片段只保留完整二元组（不补尾字），避免放宽匹配条件
+    - 单个 CJK 字保留为单字，由调用方转为前缀查询
+    - 去重但保持顺序
+
+    Args:
+        query: 用户输入的检索词
+
+    Returns:
+        去重后的查询词元列表
+    """
+    if not query:
+        return []
+
+    terms: List[str] = []
+    for match in _TOKEN_PATTERN.finditer(query):
+        piece = match.group(0)
+        if is_cjk_run(piece):
+            if len(piece) == 1:
+                terms.append(piece)
+            else:
+                terms.extend(piece[i:i + 2] for i in range(len(piece) - 1))
+        else:
+            terms.append(piece.lower())
+
+    return list(dict.fromkeys(terms))
+
+
+def to_index_text(text: str) -> str:
+    """将文本转换为空格分隔的词元串，直接写入全文索引"""
+    return " ".join(tokenize(text))
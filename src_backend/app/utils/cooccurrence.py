@@ -0,0 +1,105 @@
+"""
+概念共现矩阵（稀疏矩阵计算）
+
+把 "文章 × 概念" 看作 0/1 关联矩阵 A，共现矩阵即 C = Aᵀ·A：
+C[i][j] 为概念 i 和 j 同时出现的文章数。只保留上三角（i < j）。
+
+- 安装了 SciPy 时使用 CSR 稀疏矩阵乘法
+- 否则使用 NumPy：按文章的概念数分组，每组用 triu_indices 一次生成全部概念对，
+  再把概念对编码成 int64 后 np.unique 计数
+"""
+
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+import numpy as np
+
+try:
+    import scipy.sparse as sparse  # noqa
+except ImportError:
+    sparse = None
+
+
+class Cooccurrence(NamedTuple):
+    """共现计数（COO 格式，rows[k] < cols[k]）"""
+    labels: List[str]      # 概念名称，按字符串排序
+    rows: np.ndarray       # 概念 a 在 labels 中的下标
+    cols: np.ndarray       # 概念 b 在 labels 中的下标
+    counts: np.ndarray     # 共现文章数
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def pairs(self, min_count: int = 1) -> Iterable[Tuple[str, str, int]]:
+        """逐个返回 (concept_a, concept_b, count)，concept_a < concept_b"""
+        mask = self.counts >= min_count
+        labels = self.labels
+        for a, b, count in zip(self.rows[mask].tolist(), self.cols[mask].tolist(), self.counts[mask].tolist()):
+            yield labels[a], labels[b], count
+
+    def to_dict(self) -> Dict[Tuple[str, str], int]:
+        return {(a, b): count for a, b, count in self.pairs()}
+
+
+def compute_cooccurrence(article_concepts: Iterable[Iterable[str]]) -> Cooccurrence:
+    """
+    统计概念共现次数
+
+    Args:
+        article_concepts: 每篇文章中出现的概念（同一文章内重复的概念只计一次）
+
+    Returns:
+        Cooccurrence
+    """
+    articles = [set(concepts) for concepts in article_concepts]
+    labels = sorted(set().union(*articles)) if articles else []
+    index = {label: i for i, label in enumerate(labels)}
+
+    lengths = np.fromiter((len(concepts) for concepts in articles), dtype=np.int64, count=len(articles))
+    concept_ids = np.fromiter(
+        (index[label] for concepts in articles for label in concepts),
+        dtype=np.int64,
+        count=int(lengths.sum())
+    )
+
+    if sparse is not None:
+        rows, cols, counts = _cooccurrence_sparse(lengths, concept_ids, len(labels))
+    else:
+        rows, cols, counts = _cooccurrence_numpy(lengths, concept_ids, len(labels))
+    return Cooccurrence(labels, rows, cols, counts)
+
+
+def _cooccurrence_sparse(lengths: np.ndarray, concept_ids: np.ndarray, n_concepts: int):
+    """C = Aᵀ·A（SciPy CSR），取严格上三角"""
+    empty = np.empty(0, dtype=np.int64)
+    if n_concepts == 0:
+        return empty, empty, empty
+
+    article_ids = np.repeat(np.arange(len(lengths)), lengths)
+    incidence = sparse.csr_matrix(
+        (np.ones(len(concept_ids), dtype=np.int32), (article_ids, concept_ids)),
+        shape=(len(lengths), n_concepts)
+    )
+    product = sparse.triu(incidence.T @ incidence, k=1).tocoo()
+    return product.row.astype(np.int64), product.col.astype(np.int64), product.data.astype(np.int64)
+
+
+def _cooccurrence_numpy(lengths: np.ndarray, concept_ids: np.ndarray, n_concepts: int):
+    """按概念数分组生成概念对并计数（不依赖 SciPy）"""
+    empty = np.empty(0, dtype=np.int64)
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+
+    keys = []
+    for size in np.unique(lengths):
+        if size < 2:
+            continue
+        # 概念数为 size 的文章组成 (m, size) 矩阵，行内排序后上三角即 a < b 的全部概念对
+        starts = offsets[:-1][lengths == size]
+        matrix = np.sort(concept_ids[starts[:, None] + np.arange(size)], axis=1)
+        first, second = np.triu_indices(size, k=1)
+        keys.append((matrix[:, first] * n_concepts + matrix[:, second]).ravel())
+
+    if not keys:
+        return empty, empty, empty
+
+    unique_keys, counts = np.unique(np.concatenate(keys), return_counts=True)
+    return unique_keys // n_concepts, unique_keys % n_concepts, counts.astype(np.int64)
@@ -0,0 +1,100 @@
+"""
+概念领域分类（关键词词典 + Aho-Corasick 自动机）
+
+词典文件 app/data/domain_keywords.json：每个领域有颜色和 "关键词 -> 权重" 表。
+全部关键词编译成一个自动机，每个概念只扫描一遍；概念命中的各个关键词按领域累加权重
+（同一关键词只计一次），取总分最高的领域，同分按词典中的领域顺序。一个关键词也没命中时
+归为默认领域（未分类）。
+
+扩充领域或关键词只需修改词典文件，分类耗时不随词典变大而增长。
+"""
+
+import json
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.utils.aho_corasick import AhoCorasick
+
+DOMAIN_DICTIONARY_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "domain_keywords.json")
+
+
+class DomainClassifier:
+    """领域分类器（构建后只读，进程内共享）"""
+
+    def __init__(self, path: str = DOMAIN_DICTIONARY_PATH):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+
+        self.default_domain: str = data["default"]["name"]
+        self.default_color: str = data["default"]["color"]
+        self.domains: List[str] = [domain["name"] for domain in data["domains"]]
+        self.colors: Dict[str, str] = {domain["name"]: domain["color"] for domain in data["domains"]}
+        self.colors[self.default_domain] = self.default_color
+
+        # 关键词 -> [(领域下标, 权重)]（同一关键词可以属于多个领域）
+        patterns: Dict[str, List[Tuple[int, float]]] = {}
+        for i, domain in enumerate(data["domains"]):
+            for keyword, weight in domain["keywords"].items():
+                patterns.setdefault(keyword, []).append((i, float(weight)))
+        self._automaton = AhoCorasick(patterns)
+
+    @property
+    def keyword_count(self) -> int:
+        return len(self._automaton)
+
+    def classify(self, concept: str) -> str:
+        """
+        识别概念所属领域
+
+        Args:
+            concept: 概念文本
+
+        Returns:
+            领域名称（未命中任何关键词时为默认领域）
+        """
+        scores: Dict[int, float] = {}
+        seen = set()
+        for _, keyword, targets in self._automaton.iter_matches(concept):
+            if keyword in seen:
+                continue
+            seen.add(keyword)
+            for domain, weight in targets:
+                scores[domain] = scores.get(domain, 0.0) + weight
+
+        if not scores:
+            return self.default_domain
+        # 总分最高；同分取词典中靠前的领域
+        best = min(scores, key=lambda domain: (-scores[domain], domain))
+        return self.domains[best]
+
+    def classify_many(self, concepts: Iterable[str]) -> Dict[str, str]:
+        """
+        批量分类（重复的概念只计算一次）
+
+        Returns:
+            概念 -> 领域名称
+        """
+        result: Dict[str, str] = {}
+        for concept in concepts:
+            if concept not in result:
+                result[concept] = self.classify(concept)
+        return result
+
+    def color(self, domain: Optional[str]) -> str:
+        """领域颜色（未知领域使用默认颜色）"""
+        return self.colors.get(domain, self.default_color)
+
+
+_classifier: Optional[DomainClassifier] = None
+_classifier_lock = threading.Lock()
+
+
+def get_domain_classifier() -> DomainClassifier:
+    """获取进程内共享的分类器（首次调用时加载词典并编译自动机）"""
+    global _classifier
+    if _classifier is None:
+        with _classifier_lock:
+            if _classifier is None:
+                _classifier = DomainClassifier()
+    return _classifier
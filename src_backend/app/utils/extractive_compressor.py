@@ -0,0 +1,215 @@
+"""
+抽取式压缩：文章超出 Prompt 预算时挑选最重要的句子
+
+句子重要性用 TextRank 计算：
+1. 每句用检索分词（中文二元组 + 英文单词，见 cjk_tokenizer）得到词项，按 TF-IDF 加权并归一化
+2. 句子两两余弦相似度构成带权图（只在两句以上出现的词项才影响相似度，先去掉其余词项以缩小矩阵）
+3. 在图上做 PageRank 幂迭代，与越多重要句子相似的句子得分越高
+
+挑选时按得分从高到低贪心装入预算，跳过与已选句子几乎相同的句子（转载文章常见的重复段落），
+返回按原文顺序排列的句子序号，调用方用原编号生成 Prompt，LLM 返回的 sentence_index 仍然对应完整文章。
+
+超过 MAX_SENTENCES 句的文章按原文顺序切成若干块，每块单独计算 TextRank，
+得分按块的句子数加权后合并（相似度矩阵的大小与句子数的平方成正比，不分块时上万句的文章会占用 GB 级内存）。
+去重也只在块内比较。
+
+- 安装了 SciPy 时 TF-IDF 矩阵、相似度矩阵和 PageRank 迭代都用 CSR 稀疏矩阵
+- 否则使用 NumPy 稠密矩阵（分块后每块的矩阵大小有上限）
+"""
+
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from app.utils.cjk_tokenizer import tokenize
+
+try:
+    import scipy.sparse as sparse  # noqa
+except ImportError:
+    sparse = None
+
+# PageRank 阻尼系数与收敛条件
+DAMPING = 0.85
+TOLERANCE = 1e-6
+MAX_ITERATIONS = 100
+
+# 参与相似度计算的词项上限（按文档频率保留，限制 n × 词项 矩阵的大小）
+MAX_FEATURES = 8192
+
+# 与已选句子的相似度超过该值视为重复
+REDUNDANCY_THRESHOLD = 0.9
+
+# TextRank 图的句子数上限（更长的文章分块计算）
+MAX_SENTENCES = 1000
+
+
+def _term_matrix(sentences: Sequence[str]):
+    """
+    TF-IDF 句子向量（L2 归一化，只保留在两句以上出现的词项）
+
+    Returns:
+        (句子数, 词项数) float32 矩阵；安装了 SciPy 时为 CSR 稀疏矩阵
+    """
+    n = len(sentences)
+    vocabulary = {}
+    sentence_ids = []
+    term_ids = []
+    for i, sentence in enumerate(sentences):
+        for token in tokenize(sentence):
+            sentence_ids.append(i)
+            term_ids.append(vocabulary.setdefault(token, len(vocabulary)))
+    if not term_ids:
+        if sparse is not None:
+            return sparse.csr_matrix((n, 0), dtype=np.float32)
+        return np.zeros((n, 0), dtype=np.float32)
+
+    # 按 (句子, 词项) 计数得到词频
+    size = len(vocabulary)
+    keys, tf = np.unique(np.asarray(sentence_ids, dtype=np.int64) * size + np.asarray(term_ids, dtype=np.int64), return_counts=True)
+    rows, cols = keys // size, keys % size
+
+    df = np.bincount(cols, minlength=size)
+    idf = np.log((1 + n) / (1 + df)) + 1.0
+    weights = (1.0 + np.log(tf)) * idf[cols]
+    norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=n))
+    weights = weights / norms[rows]
+
+    # 只出现在一句中的词项不影响句子之间的相似度
+    shared = np.flatnonzero(df >= 2)
+    if len(shared) > MAX_FEATURES:
+        shared = shared[np.argsort(-df[shared], kind="stable")[:MAX_FEATURES]]
+    column_of = np.full(size, -1, dtype=np.int64)
+    column_of[shared] = np.arange(len(shared))
+    keep = column_of[cols] >= 0
+    rows, cols, weights = rows[keep], column_of[cols[keep]], weights[keep].astype(np.float32)
+
+    if sparse is not None:
+        return sparse.csr_matrix((weights, (rows, cols)), shape=(n, len(shared)))
+    matrix = np.zeros((n, len(shared)), dtype=np.float32)
+    matrix[rows, cols] = weights
+    return matrix
+
+
+def sentence_similarity(sentences: Sequence[str]):
+    """句子两两余弦相似度（对角线为 0）；安装了 SciPy 时为 CSR 稀疏矩阵"""
+    matrix = _term_matrix(sentences)
+    if sparse is not None:
+        similarity = (matrix @ matrix.T).astype(np.float64).tocsr()
+        similarity.setdiag(0.0)
+        similarity.eliminate_zeros()
+        return similarity
+    similarity = (matrix @ matrix.T).astype(np.float64)
+    np.fill_diagonal(similarity, 0.0)
+    return similarity
+
+
+def textrank(similarity) -> np.ndarray:
+    """
+    相似度图上的 PageRank 得分（总和为 1）
+
+    similarity 可以是稠密矩阵或 SciPy 稀疏矩阵。与其他句子都不相似的句子把得分均匀分给所有句子。
+    """
+    n = similarity.shape[0]
+    if n == 0:
+        return np.zeros(0)
+    out_weight = np.asarray(similarity.sum(axis=1)).ravel()
+    dangling = out_weight == 0
+    inverse = np.divide(1.0, out_weight, out=np.zeros(n), where=~dangling)
+    if sparse is not None and sparse.issparse(similarity):
+        transposed = (sparse.diags(inverse) @ similarity).T.tocsr()
+    else:
+        transposed = (similarity * inverse[:, None]).T
+
+    scores = np.full(n, 1.0 / n)
+    for _ in range(MAX_ITERATIONS):
+        spread = transposed @ scores + scores[dangling].sum() / n
+        updated = (1 - DAMPING) / n + DAMPING * spread
+        if np.abs(updated - scores).sum() < TOLERANCE:
+            return updated
+        scores = updated
+    return scores
+
+
+def _blocks(n: int) -> List[Tuple[int, int]]:
+    """n 句按原文顺序切成不超过 MAX_SENTENCES 句、长度相近的块 [(start, end)]"""
+    count = -(-n // MAX_SENTENCES)
+    bounds = np.linspace(0, n, count + 1).round().astype(int).tolist()
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _block_rank(sentences: Sequence[str]):
+    """
+    分块计算 TextRank
+
+    Returns:
+        (得分, [(start, end, 块内相似度矩阵)])，得分按块的句子数加权，总和为 1
+    """
+    n = len(sentences)
+    scores = np.zeros(n)
+    blocks = []
+    for start, end in _blocks(n):
+        similarity = sentence_similarity(sentences[start:end])
+        scores[start:end] = textrank(similarity) * ((end - start) / n)
+        blocks.append((start, end, similarity))
+    return scores, blocks
+
+
+def _is_redundant(similarity, row: int, chosen: np.ndarray) -> bool:
+    """块内第 row 句与已选句子（chosen 为块内布尔掩码）的相似度是否超过阈值"""
+    if sparse is not None and sparse.issparse(similarity):
+        span = slice(similarity.indptr[row], similarity.indptr[row + 1])
+        columns, values = similarity.indices[span], similarity.data[span]
+        return bool((values[chosen[columns]] >= REDUNDANCY_THRESHOLD).any())
+    return bool((similarity[row][chosen] >= REDUNDANCY_THRESHOLD).any())
+
+
+def salience_scores(sentences: Sequence[str]) -> np.ndarray:
+    """句子重要性得分（TextRank，超过 MAX_SENTENCES 句时分块计算）"""
+    return _block_rank(list(sentences))[0]
+
+
+def select_sentences(sentences: Sequence[str], costs: Sequence[float], budget: float) -> List[int]:
+    """
+    按重要性贪心挑选句子，总开销不超过预算
+
+    Args:
+        sentences: 句子列表（通常是 split_sentences 的结果）
+        costs: 每句的开销（token 数或字符数，与 budget 单位一致）
+        budget: 预算
+
+    Returns:
+        选中句子的原始序号（升序）
+    """
+    n = len(sentences)
+    costs = np.asarray(costs, dtype=np.float64)
+    if n == 0:
+        return []
+    if costs.sum() <= budget:
+        return list(range(n))
+
+    scores, blocks = _block_rank(list(sentences))
+    block_of = np.repeat(np.arange(len(blocks)), [end - start for start, end, _ in blocks])
+
+    chosen = np.zeros(n, dtype=bool)
+    remaining = budget
+    # 得分相同时靠前的句子优先
+    for index in np.argsort(-scores, kind="stable").tolist():
+        if costs[index] > remaining:
+            continue
+        start, end, similarity = blocks[block_of[index]]
+        if _is_redundant(similarity, index - start, chosen[start:end]):
+            continue
+        chosen[index] = True
+        remaining -= costs[index]
+    return np.flatnonzero(chosen).tolist()
+
+
+def to_regions(indices: Sequence[int]) -> List[Tuple[int, int]]:
+    """升序句子序号合并为连续区间 [(start, end)]，end 不含"""
+    regions: List[Tuple[int, int]] = []
+    for index in indices:
+        if regions and regions[-1][1] == index:
+            regions[-1] = (regions[-1][0], index + 1)
+        else:
+            regions.append((index, index + 1))
+    return regions
@@ -0,0 +1,191 @@
+"""
+图算法工具（知识图谱）
+
+节点以 0..n-1 的整数下标表示，边以两个等长的下标数组（sources, targets）表示，
+所有算法都是迭代实现，不受 Python 递归深度限制。
+"""
+
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+class UnionFind:
+    """并查集（路径压缩 + 按大小合并）"""
+
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+        self.size = [1] * n
+
+    def find(self, x: int) -> int:
+        """查找根节点（路径减半：沿途节点直接指向祖父节点）"""
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, a: int, b: int) -> int:
+        """
+        合并 a、b 所在的集合
+
+        Returns:
+            合并后的根节点
+        """
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return root_a
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+        return root_a
+
+
+def connected_components(n: int, sources: Sequence[int], targets: Sequence[int]) -> np.ndarray:
+    """
+    计算无向图的连通分量
+
+    Args:
+        n: 节点数
+        sources: 边的起点下标
+        targets: 边的终点下标
+
+    Returns:
+        长度为 n 的数组，第 i 项为节点 i 所在分量的根节点下标
+    """
+    uf = UnionFind(n)
+    for a, b in zip(_as_list(sources), _as_list(targets)):
+        uf.union(a, b)
+    return np.fromiter((uf.find(i) for i in range(n)), dtype=np.int64, count=n)
+
+
+def _as_list(values: Sequence[int]) -> List[int]:
+    # NumPy 数组逐项访问较慢，先转成 Python 列表
+    return values.tolist() if isinstance(values, np.ndarray) else list(values)
+
+
+class CSRGraph:
+    """
+    无向加权图的压缩邻接数组（CSR）
+
+    节点 i 的邻居为 indices[indptr[i]:indptr[i + 1]]，对应边权为 weights 的同一区间。
+    每条无向边在两个端点下各存一次。
+    """
+
+    def __init__(self, n: int, sources: Sequence[int], targets: Sequence[int], weights: Optional[Sequence[float]] = None):
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        weights = np.ones(len(sources)) if weights is None else np.asarray(weights, dtype=np.float64)
+
+        # 双向展开后按起点排序
+        heads = np.concatenate((sources, targets))
+        tails = np.concatenate((targets, sources))
+        order = np.argsort(heads, kind="stable")
+
+        self.n = n
+        self.indices = tails[order]
+        self.weights = np.concatenate((weights, weights))[order]
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(heads, minlength=n), out=self.indptr[1:])
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.indices) // 2
+
+    def degree(self) -> np.ndarray:
+        """各节点的度"""
+        return np.diff(self.indptr)
+
+    def neighbors(self, node: int) -> np.ndarray:
+        return self.indices[self.indptr[node]:self.indptr[node + 1]]
+
+    def k_hop(self, start: int, hops: int, limit: Optional[int] = None) -> Dict[int, int]:
+        """
+        广度优先搜索 k 跳以内的节点
+
+        Args:
+            start: 起点
+            hops: 最大跳数
+            limit: 最多返回的节点数（按跳数由近到远截断）
+
+        Returns:
+            节点 -> 跳数（包含起点，跳数为 0）
+        """
+        distance = {start: 0}
+        frontier = np.array([start], dtype=np.int64)
+        for hop in range(1, hops + 1):
+            if not len(frontier) or (limit is not None and len(distance) >= limit):
+                break
+            # 当前层所有节点的邻居一次取出
+            spans = [self.indices[self.indptr[node]:self.indptr[node + 1]] for node in frontier.tolist()]
+            candidates = np.unique(np.concatenate(spans)) if spans else frontier[:0]
+
+            next_frontier = []
+            for node in candidates.tolist():
+                if node not in distance:
+                    if limit is not None and len(distance) >= limit:
+                        break
+                    distance[node] = hop
+                    next_frontier.append(node)
+            frontier = np.array(next_frontier, dtype=np.int64)
+        return distance
+
+    def shortest_path(self, source: int, target: int, max_hops: Optional[int] = None) -> Optional[List[int]]:
+        """
+        跳数最少的路径（广度优先搜索，找到终点即停止）
+
+        Returns:
+            [source, ..., target]，不连通（或超过 max_hops）时返回 None
+        """
+        if source == target:
+            return [source]
+
+        parent = {source: source}
+        frontier = [source]
+        hops = 0
+        while frontier and (max_hops is None or hops < max_hops):
+            hops += 1
+            next_frontier = []
+            for node in frontier:
+                for neighbor in self.neighbors(node).tolist():
+                    if neighbor in parent:
+                        continue
+                    parent[neighbor] = node
+                    if neighbor == target:
+                        path = [target]
+                        while path[-1] != source:
+                            path.append(parent[path[-1]])
+                        return path[::-1]
+                    next_frontier.append(neighbor)
+            frontier = next_frontier
+        return None
+
+    def pagerank(self, damping: float = 0.85, tol: float = 1e-6, max_iter: int = 100) -> np.ndarray:
+        """
+        加权 PageRank（向量化幂迭代）
+
+        每轮：rank' = (1 - d) / n + d * (Σ 邻居 rank * w / 邻居总权重 + 悬挂节点 rank / n)
+
+        Returns:
+            长度为 n 的数组，总和为 1
+        """
+        n = self.n
+        if n == 0:
+            return np.zeros(0)
+
+        heads = np.repeat(np.arange(n), np.diff(self.indptr))
+        strength = np.bincount(heads, weights=self.weights, minlength=n)
+        dangling = strength == 0
+        # 每条（有向化的）边上传递的比例
+        share = self.weights / np.where(dangling, 1.0, strength)[heads]
+
+        rank = np.full(n, 1.0 / n)
+        for _ in range(max_iter):
+            spread = np.bincount(self.indices, weights=rank[heads] * share, minlength=n)
+            new_rank = (1.0 - damping) / n + damping * (spread + rank[dangling].sum() / n)
+            converged = np.abs(new_rank - rank).sum() < tol
+            rank = new_rank
+            if converged:
+                break
+        return rank / rank.sum()
@@ -0,0 +1,163 @@
+"""
+力导向布局（Fruchterman-Reingold，NumPy 向量化）
+
+- 斥力：节点数不超过 EXACT_REPULSION_MAX_NODES 时两两精确计算（分块，限制内存）；
+  更大的图使用网格近似：相邻网格内精确计算，更远的网格之间按质心（质量 = 节点数）整体计算
+- 引力：沿边计算，按边权缩放
+- 向心力（与到原点的距离成正比）：防止不连通的分量无限远离
+- 温度（单步最大位移）线性冷却
+
+坐标单位：理想边长 k = 1。增量布局时传入上次的坐标并降低初始温度，已有节点只做微调。
+"""
+
+import math
+from typing import Optional, Sequence
+
+import numpy as np
+
+EXACT_REPULSION_MAX_NODES = 1000
+GRAVITY = 0.5
+
+# 网格近似时每个网格的平均节点数
+NODES_PER_CELL = 16
+
+# 精确斥力每块处理的节点数（块大小 × n 个距离）
+_CHUNK = 512
+
+
+def force_layout(
+    n: int,
+    sources: Sequence[int],
+    targets: Sequence[int],
+    weights: Optional[Sequence[float]] = None,
+    positions: Optional[np.ndarray] = None,
+    iterations: int = 100,
+    temperature: Optional[float] = None,
+    seed: int = 0
+) -> np.ndarray:
+    """
+    计算力导向布局
+
+    Args:
+        n: 节点数
+        sources, targets: 边的端点下标
+        weights: 边权（None 表示全为 1）
+        positions: 初始坐标 (n, 2)，None 时随机初始化
+        iterations: 迭代次数
+        temperature: 初始温度（默认 sqrt(n) / 10）
+        seed: 随机种子
+
+    Returns:
+        坐标数组 (n, 2)
+    """
+    if n == 0:
+        return np.zeros((0, 2))
+
+    rng = np.random.default_rng(seed)
+    side = math.sqrt(n)
+    if positions is None:
+        pos = rng.uniform(-side / 2, side / 2, size=(n, 2))
+    else:
+        pos = np.array(positions, dtype=np.float64)
+
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    weights = np.ones(len(sources)) if weights is None else np.asarray(weights, dtype=np.float64)
+
+    t0 = side / 10 if temperature is None else temperature
+    for step in range(iterations):
+        if n <= EXACT_REPULSION_MAX_NODES:
+            disp = _repulsion_exact(pos)
+        else:
+            disp = _repulsion_grid(pos)
+
+        # 引力 d² / k（k = 1），沿边方向
+        if len(sources):
+            delta = pos[sources] - pos[targets]
+            distance = np.sqrt((delta ** 2).sum(axis=1)) + 1e-9
+            pull = delta * (distance * weights)[:, None]
+            for axis in range(2):
+                disp[:, axis] -= np.bincount(sources, weights=pull[:, axis], minlength=n)
+                disp[:, axis] += np.bincount(targets, weights=pull[:, axis], minlength=n)
+
+        disp -= GRAVITY * pos
+
+        # 单步位移不超过当前温度
+        temperature_now = t0 * (1 - step / iterations)
+        length = np.sqrt((disp ** 2).sum(axis=1)) + 1e-9
+        pos += disp * (np.minimum(length, temperature_now) / length)[:, None]
+
+    return pos
+
+
+def _repulsion_exact(pos: np.ndarray, others: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    精确斥力 k² / d（分块计算）
+
+    Args:
+        pos: 受力节点坐标
+        others: 施力节点坐标（None 表示 pos 自身；重合的点间距按 0 处理，不产生斥力）
+    """
+    others = pos if others is None else others
+    ox, oy = others[:, 0], others[:, 1]
+    disp = np.zeros_like(pos)
+    for start in range(0, len(pos), _CHUNK):
+        block = pos[start:start + _CHUNK]
+        dx = block[:, 0:1] - ox[None, :]
+        dy = block[:, 1:2] - oy[None, :]
+        inv = 1.0 / (dx * dx + dy * dy + 1e-9)
+        inv[(dx == 0) & (dy == 0)] = 0.0
+        disp[start:start + _CHUNK, 0] = (dx * inv).sum(axis=1)
+        disp[start:start + _CHUNK, 1] = (dy * inv).sum(axis=1)
+    return disp
+
+
+def _repulsion_grid(pos: np.ndarray) -> np.ndarray:
+    """
+    网格近似斥力
+
+    近场：自身及相邻 8 个网格中的节点精确计算；
+    远场：更远的网格按质心（质量 = 节点数）整体计算，作用在网格质心上，
+    同一网格内的节点共用（代价与网格数的平方成正比，与节点数无关）。
+    """
+    n = len(pos)
+    cells_per_side = max(3, int(math.ceil(math.sqrt(n / NODES_PER_CELL))))
+    # 按分位数确定网格范围，少数离群节点不会把其余节点挤进同一个网格
+    low = np.percentile(pos, 1, axis=0)
+    span = np.maximum(np.percentile(pos, 99, axis=0) - low, 1e-9)
+    cell_xy = np.clip(((pos - low) / span * cells_per_side).astype(np.int64), 0, cells_per_side - 1)
+    cell = cell_xy[:, 0] * cells_per_side + cell_xy[:, 1]
+    n_cells = cells_per_side * cells_per_side
+
+    mass = np.bincount(cell, minlength=n_cells).astype(np.float64)
+    occupied = np.flatnonzero(mass)
+    centroids = np.zeros((n_cells, 2))
+    for axis in range(2):
+        centroids[:, axis] = np.bincount(cell, weights=pos[:, axis], minlength=n_cells)
+    centroids = centroids[occupied] / mass[occupied, None]
+    mass = mass[occupied]
+    occupied_x, occupied_y = occupied // cells_per_side, occupied % cells_per_side
+
+    # 远场：网格之间按质心计算（排除自身及相邻网格），同一网格内的节点受力相同
+    dx = centroids[:, None, 0] - centroids[None, :, 0]
+    dy = centroids[:, None, 1] - centroids[None, :, 1]
+    strength = mass[None, :] / (dx * dx + dy * dy + 1e-9)
+    strength[(np.abs(occupied_x[:, None] - occupied_x[None, :]) <= 1) & (np.abs(occupied_y[:, None] - occupied_y[None, :]) <= 1)] = 0.0
+    far = np.zeros((n_cells, 2))
+    far[occupied, 0] = (dx * strength).sum(axis=1)
+    far[occupied, 1] = (dy * strength).sum(axis=1)
+    disp = far[cell]
+
+    # 近场：按网格分组，每组与相邻 3×3 网格内的节点精确计算
+    order = np.argsort(cell, kind="stable")
+    starts = np.searchsorted(cell[order], np.arange(n_cells + 1))
+    for c in occupied.tolist():
+        members = order[starts[c]:starts[c + 1]]
+        cx, cy = divmod(c, cells_per_side)
+        neighbors = [
+            order[starts[x * cells_per_side + y]:starts[x * cells_per_side + y + 1]]
+            for x in range(max(cx - 1, 0), min(cx + 2, cells_per_side))
+            for y in range(max(cy - 1, 0), min(cy + 2, cells_per_side))
+        ]
+        disp[members] += _repulsion_exact(pos[members], pos[np.concatenate(neighbors)])
+    return disp
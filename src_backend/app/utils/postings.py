@@ -0,0 +1,91 @@
+"""
+倒排列表压缩编码
+
+格式（全部为无符号 varint）：
+    对每篇文章依次写入
+        文章ID增量（相对上一篇文章ID）
+        命中句子数 n
+        n 个句子序号增量（第一个为绝对值）
+
+文章按 ID 升序排列，每个文章块自描述长度，因此新文章（ID 更大）
+可以直接在原编码末尾追加，无需解码。
+"""
+
+from typing import Dict, Iterable, List, Tuple
+
+Postings = Dict[int, List[int]]
+
+
+def encode_varint(value: int, out: bytearray) -> None:
+    """写入一个无符号 varint（7 位一组，高位为延续标记）"""
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_varints(data: bytes) -> List[int]:
+    """解码字节串中的全部 varint"""
+    values = []
+    value = 0
+    shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            values.append(value)
+            value = 0
+            shift = 0
+    return values
+
+
+def encode_postings(entries: Iterable[Tuple[int, List[int]]], base_article_id: int = 0) -> bytes:
+    """
+    编码倒排列表
+
+    Args:
+        entries: (文章ID, 升序句子序号列表)，文章ID必须升序且大于 base_article_id
+        base_article_id: 起始文章ID（追加编码时传入已有列表的最后一个文章ID）
+
+    Returns:
+        压缩后的字节串
+    """
+    out = bytearray()
+    prev_article = base_article_id
+    for article_id, sentence_indices in entries:
+        encode_varint(article_id - prev_article, out)
+        encode_varint(len(sentence_indices), out)
+        prev_sentence = 0
+        for sentence_index in sentence_indices:
+            encode_varint(sentence_index - prev_sentence, out)
+            prev_sentence = sentence_index
+        prev_article = article_id
+    return bytes(out)
+
+
+def decode_postings(data: bytes) -> Postings:
+    """
+    解码倒排列表
+
+    Returns:
+        {文章ID: [句子序号, ...]}
+    """
+    values = decode_varints(data or b"")
+    postings: Postings = {}
+    pos = 0
+    article_id = 0
+    while pos < len(values):
+        article_id += values[pos]
+        count = values[pos + 1]
+        pos += 2
+
+        sentence_indices = []
+        sentence_index = 0
+        for delta in values[pos:pos + count]:
+            sentence_index += delta
+            sentence_indices.append(sentence_index)
+        pos += count
+
+        postings[article_id] = sentence_indices
+    return postings
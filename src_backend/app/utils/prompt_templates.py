@@ -66,13 +66,13 @@ class PromptTemplates:
     ) -> str:
         """构建用户提示词"""
 
-        # 如果附带全文，添加全文信息
+        # 如果附带全文，添加全文信息（长度由调用方按 token 预算控制，见 app/utils/token_budget.py）
         full_text_section = ""
         if include_full_text and full_text:
             full_text_section = f"""
 
 **完整文章内容**（供参考）：
-{full_text[:10000]}
+{full_text}
 """
 
         # V2.0: 自定义问题
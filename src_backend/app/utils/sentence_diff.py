@@ -0,0 +1,73 @@
+"""
+新旧分句结果对齐（文章修改后的增量分析）
+
+每个句子取内容哈希，用 difflib.SequenceMatcher 在两个哈希序列上找出最长的相同片段，
+得到旧句子序号 -> 新句子序号的映射；新文章中没有对应旧句子的即为修改（新增或改写）的句子。
+"""
+
+import hashlib
+from difflib import SequenceMatcher
+from typing import Dict, List, Sequence, Tuple
+
+
+def sentence_key(sentence: str) -> bytes:
+    """句子内容哈希（8 字节）"""
+    return hashlib.blake2b(sentence.encode("utf-8"), digest_size=8).digest()
+
+
+class SentenceAlignment:
+    """新旧句子列表的对齐结果"""
+
+    def __init__(self, old_count: int, new_count: int, index_map: Dict[int, int]):
+        self.old_count = old_count
+        self.new_count = new_count
+        # 未修改的句子：旧序号 -> 新序号
+        self.index_map = index_map
+        carried = set(index_map.values())
+        # 新增或改写的句子（新序号，升序）
+        self.changed: List[int] = [i for i in range(new_count) if i not in carried]
+        # 被删除或改写的旧句子数
+        self.removed = old_count - len(index_map)
+
+    @property
+    def changed_ratio(self) -> float:
+        """修改比例（按新旧句子数中较大者计算）"""
+        total = max(self.old_count, self.new_count, 1)
+        return max(len(self.changed), self.removed) / total
+
+    def regions(self, context: int = 1) -> List[Tuple[int, int]]:
+        """
+        修改过的句子连同前后 context 句上下文组成的区间（新序号，[start, end)，相邻区间合并）
+        """
+        regions: List[Tuple[int, int]] = []
+        for index in self.changed:
+            start, end = max(index - context, 0), min(index + context + 1, self.new_count)
+            if regions and start <= regions[-1][1]:
+                regions[-1] = (regions[-1][0], max(regions[-1][1], end))
+            else:
+                regions.append((start, end))
+        return regions
+
+
+def align_sentences(old: Sequence[str], new: Sequence[str]) -> SentenceAlignment:
+    """
+    按句子哈希对齐新旧句子列表
+
+    Args:
+        old: 修改前的句子
+        new: 修改后的句子
+
+    Returns:
+        SentenceAlignment
+    """
+    matcher = SequenceMatcher(
+        None,
+        [sentence_key(sentence) for sentence in old],
+        [sentence_key(sentence) for sentence in new],
+        autojunk=False
+    )
+    index_map: Dict[int, int] = {}
+    for old_start, new_start, size in matcher.get_matching_blocks():
+        for offset in range(size):
+            index_map[old_start + offset] = new_start + offset
+    return SentenceAlignment(len(old), len(new), index_map)
@@ -3,23 +3,41 @@
 句子拆分工具
 
 使用优化的规则方法进行中文分句（轻量级，零依赖）
+
+单遍扫描：预编译的正则依次找出中文句末标点，两个断句候选点之间的文本只统计一次
+「」和括号的数量（计数器随扫描累加，断句后清零），整体耗时与文本长度成线性关系。
+每个句子同时给出在原文中的字符偏移 [start, end)。
+
+断句规则（与此前逐片段判断的实现输出完全一致）：
+1. 文本先按空行（\\n\\n）分段，段落之间一定断句
+2. 段内只在中文句末标点（。！？；…，可连续出现，连同其后的空白）之后断句
+3. 「」或括号 ()/（） 数量不相等时不断句（引号、括号内的句子不拆开）；
+   当前句中「 出现奇数次时也不断句
+4. 英文句末标点（.!?）和单个换行不断句：英文缩写、小数点都不会被误拆，
+   中英文混排时英文部分保持在所在的中文句子内
 """
 
 import re
-from typing import List, Dict
+from typing import Dict, List, NamedTuple, Tuple
+
+# 分句规则版本：规则变化导致输出不同时递增，已保存的分句结果会按新规则重新计算
+SPLITTER_VERSION = "2"
+
+# 中文句末标点（连续出现时视为一个）及其后的空白
+_CJK_BOUNDARY = re.compile(r'[。！？；…]+\s*')
+_PARAGRAPH_BREAK = re.compile(r'\n\n+')
+
+
+class Sentence(NamedTuple):
+    """句子及其在原文中的字符偏移"""
+    text: str
+    start: int
+    end: int
 
 
 class SentenceSplitter:
     """句子拆分器 - 使用规则方法进行高质量中文分句"""
 
-    # 常见英文缩写
-    ABBREVIATIONS = [
-        'Mr.', 'Mrs.', 'Ms.', 'Dr.', 'Prof.', 'Sr.', 'Jr.',
-        'etc.', 'vs.', 'e.g.', 'i.e.', 'U.S.', 'U.K.',
-        'Inc.', 'Ltd.', 'Co.', 'Corp.', 'St.', 'Ave.',
-        'Ph.D.', 'M.D.', 'B.A.', 'M.A.', 'D.C.'
-    ]
-
     @staticmethod
     def split_into_sentences(text: str) -> List[str]:
         """
@@ -31,144 +49,88 @@ class SentenceSplitter:
         Returns:
             句子数组
         """
-        if not text or not text.strip():
-            return []
-
-        # 预处理：统一换行符
-        text = text.replace('\r\n', '\n').replace('\r', '\n')
-
-        return SentenceSplitter._split_with_enhanced_rules(text)
+        return [sentence.text for sentence in SentenceSplitter.split_with_offsets(text)]
 
     @staticmethod
-    def _split_with_enhanced_rules(text: str) -> List[str]:
+    def split_with_offsets(text: str) -> List[Sentence]:
         """
-        使用增强规则进行分句
-
-        规则优化：
-        1. 识别中文句子结束标点：。！？；…
-        2. 识别英文句子结束标点：.!?;
-        3. 处理引号、括号内的句子
-        4. 处理省略号、感叹号的组合
-        5. 处理英文缩写（避免误拆分）
-        6. 处理换行符（强制句子边界）
-        7. 处理数字、日期（避免误拆分）
-        """
-        sentences = []
-
-        # 步骤1: 按段落预处理
-        paragraphs = text.split('\n\n')
-
-        for para in paragraphs:
-            if not para.strip():
-                continue
-
-            # 步骤2: 在段落内进行分句
-            para_sentences = SentenceSplitter._split_paragraph(para)
-            sentences.extend(para_sentences)
+        将文本拆分为句子，并给出每个句子在原文中的位置
 
-        return [s.strip() for s in sentences if s.strip()]
+        句子文本中的 \\r\\n、\\r 统一为 \\n，偏移仍对应传入的原文。
 
-    @staticmethod
-    def _split_paragraph(text: str) -> List[str]:
-        """在段落内进行精细分句"""
-
-        # 句子分隔符的正则模式
-        # 匹配：中文标点(。！？；…) + 可选空白
-        #      英文标点(.!?;) + 空白
-        #      换行符
-        pattern = r'([。！？；…]+\s*|[.!?]+\s+|\n)'
+        Args:
+            text: 纯文本（不包含 HTML 标签）
 
-        parts = re.split(pattern, text)
+        Returns:
+            [Sentence(text, start, end)]，text 为去掉首尾空白后的句子
+        """
+        if not text or not text.strip():
+            return []
 
-        sentences = []
-        current = ''
-        i = 0
+        # 预处理：统一换行符
+        normalized = text.replace('\r\n', '\n').replace('\r', '\n')
+        spans = SentenceSplitter._scan(normalized)
 
-        while i < len(parts):
-            part = parts[i]
+        if len(normalized) == len(text):
+            # 没有 \r\n（单独的 \r 一对一替换），偏移不变
+            return [Sentence(normalized[start:end], start, end) for start, end in spans]
 
-            if not part:
-                i += 1
+        # 存在 \r\n：把统一换行后的偏移映射回原文
+        positions = []
+        for i, char in enumerate(text):
+            if char == '\n' and i > 0 and text[i - 1] == '\r':
                 continue
-
-            # 如果是分隔符
-            if re.match(pattern, part):
-                current += part
-
-                # 检查是否应该在此处断句
-                next_part = parts[i + 1] if i + 1 < len(parts) else ''
-
-                if SentenceSplitter._should_break(current, next_part):
-                    sentences.append(current.strip())
-                    current = ''
-                # 否则继续累积
-            else:
-                current += part
-
-            i += 1
-
-        # 添加最后一个句子
-        if current.strip():
-            sentences.append(current.strip())
-
-        return sentences
+            positions.append(i)
+        positions.append(len(text))
+        return [Sentence(normalized[start:end], positions[start], positions[end]) for start, end in spans]
 
     @staticmethod
-    def _should_break(current: str, next_part: str) -> bool:
+    def _scan(text: str) -> List[Tuple[int, int]]:
         """
-        判断是否应该在当前位置断句
+        单遍扫描，返回各句子（去掉首尾空白后）的 [start, end) 偏移
 
         Args:
-            current: 当前累积的文本
-            next_part: 下一个文本片段
-
-        Returns:
-            是否应该断句
+            text: 已统一换行符的文本
         """
-        current = current.strip()
-
-        # 空文本，不断句
-        if not current:
-            return False
-
-        # 以换行符结束，强制断句
-        if current.endswith('\n'):
-            return True
-
-        # 检查是否以英文缩写结尾
-        for abbr in SentenceSplitter.ABBREVIATIONS:
-            if current.endswith(abbr):
-                # 如果下一部分以小写字母开头，不断句
-                if next_part and re.match(r'^[a-z]', next_part.strip()):
-                    return False
-
-        # 检查是否是数字 + 点（如：3.14, 1.5）
-        if re.search(r'\d+\.\s*$', current):
-            if next_part and re.match(r'^\d', next_part.strip()):
-                return False
-
-        # 检查是否在引号或括号内
-        # 如果引号、括号未闭合，不断句
-        open_quotes = current.count('"') + current.count('"') + current.count('「')
-        close_quotes = current.count('"') + current.count('"') + current.count('」')
-        open_parens = current.count('(') + current.count('（')
-        close_parens = current.count(')') + current.count('）')
-
-        if open_quotes % 2 != 0 or open_quotes != close_quotes:
-            return False
-        if open_parens != close_parens:
-            return False
-
-        # 以中文句子结束标点结尾，断句
-        if re.search(r'[。！？；…]$', current):
-            return True
-
-        # 以英文句子结束标点 + 空白结尾，断句
-        if re.search(r'[.!?]\s+$', current):
-            return True
-
-        # 默认不断句
-        return False
+        spans: List[Tuple[int, int]] = []
+
+        def emit(start: int, end: int) -> None:
+            segment = text[start:end]
+            stripped = segment.lstrip()
+            if not stripped:
+                return
+            start += len(segment) - len(stripped)
+            spans.append((start, start + len(stripped.rstrip())))
+
+        length = len(text)
+        para_start = 0
+        while para_start <= length:
+            para_end = text.find('\n\n', para_start)
+            if para_end < 0:
+                para_end = length
+
+            sentence_start = para_start
+            scanned = para_start
+            # 当前句子中未配对的「」和括号数量（左 - 右），以及「 的总数（奇偶）
+            corner_open = corner_balance = paren_balance = 0
+            for match in _CJK_BOUNDARY.finditer(text, para_start, para_end):
+                end = match.end()
+                chunk = text[scanned:end]
+                opened = chunk.count('「')
+                corner_open += opened
+                corner_balance += opened - chunk.count('」')
+                paren_balance += chunk.count('(') + chunk.count('（') - chunk.count(')') - chunk.count('）')
+                scanned = end
+
+                if corner_open % 2 == 0 and corner_balance == 0 and paren_balance == 0:
+                    emit(sentence_start, end)
+                    sentence_start = end
+                    corner_open = corner_balance = paren_balance = 0
+
+            emit(sentence_start, para_end)
+            para_start = para_end + 2
+
+        return spans
 
     @staticmethod
     def split_into_paragraphs(text: str) -> List[Dict]:
@@ -191,7 +153,7 @@ class SentenceSplitter:
             ]
         """
         # 按双换行拆分段落
-        raw_paragraphs = [p.strip() for p in re.split(r'\n\n+', text) if p.strip()]
+        raw_paragraphs = [p.strip() for p in _PARAGRAPH_BREAK.split(text) if p.strip()]
 
         paragraphs = []
         global_sentence_index = 0
@@ -231,6 +193,19 @@ def split_sentences(text: str) -> List[str]:
     return SentenceSplitter.split_into_sentences(text)
 
 
+def split_sentences_with_offsets(text: str) -> List[Sentence]:
+    """
+    拆分句子并给出字符偏移
+
+    Args:
+        text: 输入文本
+
+    Returns:
+        [Sentence(text, start, end)]，text[start:end] 即句子（换行符统一为 \\n 之前）
+    """
+    return SentenceSplitter.split_with_offsets(text)
+
+
 def split_paragraphs(text: str) -> List[Dict]:
     """
     拆分段落和句子
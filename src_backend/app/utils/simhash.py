@@ -0,0 +1,147 @@
+"""
+SimHash 内容指纹（近似重复文章检测）
+
+文本先规范化（NFKC、统一大小写、去掉空白和标点，句子边界随之消失），再取字符 4-gram 作为特征：
+同一篇新闻被不同来源转载时，页脚、追踪文字、空白和标点的差异只影响少量特征，
+64 位指纹之间的汉明距离很小；内容不同的文章距离接近 32。
+
+特征哈希、按位投票均用 NumPy 向量化完成（十万字的文章约 20 毫秒）。
+
+查找近似重复时把指纹切成 BANDS 段（每段 16 位）：汉明距离 ≤ BANDS - 1 的两个指纹
+至少有一段完全相同；再对每段探测翻转一位的 16 个邻居（multi-probe），
+距离 ≤ 2 * BANDS - 1 时至少有一段相差不超过一位。数据库中按段建索引，
+候选文章再精确计算汉明距离。
+"""
+
+import re
+import unicodedata
+from typing import List, Optional
+
+import numpy as np
+
+FINGERPRINT_BITS = 64
+BANDS = 4
+BAND_BITS = FINGERPRINT_BITS // BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+
+SHINGLE_SIZE = 4
+
+# 多项式滚动哈希的乘数（奇数，uint64 溢出即取模）
+_MULTIPLIER = np.uint64(0x100000001B3)
+
+# 空白、标点和符号（\W 之外再去掉下划线）
+_NON_WORD = re.compile(r'[\W_]+')
+
+
+def normalize_text(text: str) -> str:
+    """规范化文本：NFKC、casefold，去掉空白、标点和符号"""
+    return _NON_WORD.sub("", unicodedata.normalize("NFKC", text).casefold())
+
+
+def _mix(values: np.ndarray) -> np.ndarray:
+    """splitmix64 终结函数：让相近的滚动哈希值在 64 位上均匀分布"""
+    values = values ^ (values >> np.uint64(30))
+    values = values * np.uint64(0xBF58476D1CE4E5B9)
+    values = values ^ (values >> np.uint64(27))
+    values = values * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+def shingle_hashes(normalized: str, size: int = SHINGLE_SIZE) -> np.ndarray:
+    """
+    字符 n-gram 特征的 64 位哈希（去重）
+
+    Args:
+        normalized: 规范化后的文本
+        size: n-gram 长度（文本更短时整体作为一个特征）
+    """
+    if not normalized:
+        return np.zeros(0, dtype=np.uint64)
+    codes = np.frombuffer(normalized.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    size = min(size, len(codes))
+
+    count = len(codes) - size + 1
+    hashes = np.zeros(count, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for offset in range(size):
+            hashes = hashes * _MULTIPLIER + codes[offset:offset + count]
+        return np.unique(_mix(hashes))
+
+
+def simhash(hashes: np.ndarray) -> int:
+    """
+    由特征哈希计算 64 位 SimHash（每一位按特征多数投票）
+
+    Args:
+        hashes: uint64 特征哈希
+
+    Returns:
+        无符号 64 位整数
+    """
+    if len(hashes) == 0:
+        return 0
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 > len(hashes)
+    packed = np.packbits(votes, bitorder="little")
+    return int.from_bytes(packed.tobytes(), "little")
+
+
+def content_fingerprint(text: str) -> Optional[int]:
+    """
+    文章内容指纹
+
+    Returns:
+        无符号 64 位 SimHash；没有可用文字时返回 None
+    """
+    hashes = shingle_hashes(normalize_text(text or ""))
+    if len(hashes) == 0:
+        return None
+    return simhash(hashes)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """两个指纹的汉明距离"""
+    return bin(a ^ b).count("1")
+
+
+def bands(fingerprint: int) -> List[int]:
+    """把指纹切成 BANDS 段（低位在前）"""
+    return [(fingerprint >> (band * BAND_BITS)) & BAND_MASK for band in range(BANDS)]
+
+
+def probe_values(band_value: int, max_flips: int) -> List[int]:
+    """
+    某一段需要探测的取值：原值，以及 max_flips = 1 时翻转任意一位后的 16 个邻居
+
+    Args:
+        band_value: 段的取值
+        max_flips: 0 或 1
+    """
+    values = [band_value]
+    if max_flips >= 1:
+        values.extend(band_value ^ (1 << bit) for bit in range(BAND_BITS))
+    return values
+
+
+def probes_for_distance(max_distance: int) -> int:
+    """
+    保证找到汉明距离 ≤ max_distance 的指纹所需的每段翻转位数
+
+    Raises:
+        ValueError: max_distance 超出分段探测能保证的范围
+    """
+    if max_distance < BANDS:
+        return 0
+    if max_distance < 2 * BANDS:
+        return 1
+    raise ValueError(f"max_distance 不能超过 {2 * BANDS - 1}")
+
+
+def to_signed(fingerprint: int) -> int:
+    """无符号 64 位 -> 有符号（存入 BIGINT 列）"""
+    return fingerprint - (1 << 64) if fingerprint >= 1 << 63 else fingerprint
+
+
+def to_unsigned(value: int) -> int:
+    """有符号 BIGINT -> 无符号 64 位"""
+    return value + (1 << 64) if value < 0 else value
@@ -3,38 +3,51 @@
 
 处理长文本、文本压缩、分块等功能
 """
-import re
 from typing import List, Optional
 
+from app.config import settings
+from app.core.token_estimator import token_estimator
+from app.utils.extractive_compressor import select_sentences, to_regions
+from app.utils.sentence_splitter import split_sentences
+
 
 class TextProcessor:
     """文本处理器"""
 
-    # 不同分析类型的最大token限制（估算，1 token ≈ 1.5 字符）
+    # 不同分析类型的最大token限制（中文约 1 token ≈ 1.5 字符）
     MAX_TOKENS = {
         'unified_analysis': 8000,      # 统一分析：约12000字符
         'meta_analysis': 12000,        # 元分析：约18000字符
         'thinking_lens': 8000,         # 思维透镜：约12000字符
         'spark_analysis': 16000,       # 火花分析：约24000字符
+        'insight': 8000,               # 划词洞察（附带全文时）：约12000字符
     }
 
     @staticmethod
-    def estimate_tokens(text: str) -> int:
+    def estimate_tokens(text: str, model: Optional[str] = None) -> int:
         """
         估算文本的token数量
 
+        按字符类别（中文、英文、数字、标点等）加权计算，
+        系数根据实际调用的用量自动校准（见 app/core/token_estimator.py）
+
         Args:
             text: 输入文本
+            model: 模型（默认当前配置的模型）
 
         Returns:
             估算的token数量
         """
-        # 简单估算：中文 1字≈1.5token，英文 1词≈1.3token
-        # 这里简化为：总字符数 / 1.5
-        return int(len(text) / 1.5)
+        return token_estimator.estimate(text, model or settings.default_model)
+
+    @staticmethod
+    def chars_per_token(text: str, model: Optional[str] = None) -> float:
+        """文本平均每个 token 对应的字符数（用于把 token 预算换算成字符数）"""
+        tokens = TextProcessor.estimate_tokens(text, model)
+        return len(text) / tokens if tokens else 1.5
 
     @staticmethod
-    def truncate_text(text: str, max_tokens: int, strategy: str = 'smart') -> str:
+    def truncate_text(text: str, max_tokens: int, strategy: str = 'smart', model: Optional[str] = None) -> str:
         """
         智能截断文本
 
@@ -42,17 +55,18 @@ class TextProcessor:
             text: 原始文本
             max_tokens: 最大token数
             strategy: 截断策略 ('smart', 'head', 'tail', 'middle')
+            model: 模型（用于估算 token 数）
 
         Returns:
             截断后的文本
         """
-        current_tokens = TextProcessor.estimate_tokens(text)
+        current_tokens = TextProcessor.estimate_tokens(text, model)
 
         if current_tokens <= max_tokens:
             return text
 
         # 计算目标字符数（留10%余量）
-        target_chars = int(max_tokens * 1.5 * 0.9)
+        target_chars = int(max_tokens * len(text) / current_tokens * 0.9)
 
         if strategy == 'head':
             # 保留开头
@@ -69,74 +83,54 @@ class TextProcessor:
             return text[:head_chars] + "\n\n[... 中间内容已省略 ...]\n\n" + text[-tail_chars:]
 
         else:  # 'smart'
-            # 智能截断：保留开头更多，结尾适量
-            # 开头70%，结尾30%
-            head_chars = int(target_chars * 0.7)
-            tail_chars = int(target_chars * 0.3)
-            return text[:head_chars] + "\n\n[... 文章较长，已智能压缩 ...]\n\n" + text[-tail_chars:]
+            # 按重要性抽取句子（见 extract_key_content）
+            return TextProcessor.extract_key_content(text, max_tokens, model)
 
     @staticmethod
-    def extract_key_content(text: str, max_tokens: int) -> str:
+    def _head_tail(text: str, target_chars: int) -> str:
+        """保留开头70%、结尾30%（无法按句子抽取时使用）"""
+        head_chars = int(target_chars * 0.7)
+        tail_chars = int(target_chars * 0.3)
+        return text[:head_chars] + "\n\n[... 文章较长，已智能压缩 ...]\n\n" + text[-tail_chars:]
+
+    @staticmethod
+    def extract_key_content(text: str, max_tokens: int, model: Optional[str] = None) -> str:
         """
         提取文本的关键内容
 
         策略：
-        1. 保留所有标题
-        2. 保留每段的关键句
-        3. 移除重复内容
+        1. 分句后用 TextRank 计算每句的重要性（见 app/utils/extractive_compressor.py）
+        2. 按重要性贪心挑选句子装入预算，跳过重复的句子
+        3. 选中的句子按原文顺序拼接，省略处用 …… 标记
 
         Args:
             text: 原始文本
             max_tokens: 最大token数
+            model: 模型（用于估算 token 数）
 
         Returns:
             提取后的关键内容
         """
-        current_tokens = TextProcessor.estimate_tokens(text)
+        current_tokens = TextProcessor.estimate_tokens(text, model)
 
         if current_tokens <= max_tokens:
             return text
 
-        # 分段
-        paragraphs = text.split('\n\n')
-
-        # 提取关键内容
-        key_parts = []
-        total_chars = 0
-        target_chars = int(max_tokens * 1.5 * 0.9)
-
-        for para in paragraphs:
-            para = para.strip()
-            if not para:
-                continue
-
-            # 检查是否是标题（短且可能有特殊格式）
-            is_title = (len(para) < 50 and
-                       (para.startswith('#') or
-                        para.isupper() or
-                        re.match(r'^[一二三四五六七八九十\d]+[、．.]', para)))
-
-            if is_title:
-                # 保留所有标题
-                key_parts.append(para)
-                total_chars += len(para)
-            else:
-                # 提取段落的关键句（第一句）
-                sentences = re.split(r'[。！？\n]', para)
-                if sentences:
-                    first_sentence = sentences[0].strip()
-                    if first_sentence and total_chars + len(first_sentence) < target_chars:
-                        key_parts.append(first_sentence)
-                        total_chars += len(first_sentence)
-
-            if total_chars >= target_chars:
-                break
+        # 计算目标字符数（留10%余量）
+        target_chars = int(max_tokens * len(text) / current_tokens * 0.9)
+
+        sentences = split_sentences(text)
+        if len(sentences) < 2:
+            return TextProcessor._head_tail(text, target_chars)
 
-        result = '\n\n'.join(key_parts)
+        costs = [TextProcessor.estimate_tokens(sentence + "\n", model) for sentence in sentences]
+        selected = select_sentences(sentences, costs, int(max_tokens * 0.9))
+        parts = ["\n".join(sentences[start:end]) for start, end in to_regions(selected)]
+        result = "\n……\n".join(parts)
 
-        # 如果提取后仍然太长，使用智能截断
-        if TextProcessor.estimate_tokens(result) > max_tokens:
-            result = TextProcessor.truncate_text(result, max_tokens, 'smart')
+        # 单句过长、一句都放不下时按字符截断
+        if not result or TextProcessor.estimate_tokens(result, model) > max_tokens:
+            result = TextProcessor._head_tail(result or text, target_chars)
 
         return result
 
@@ -154,8 +148,9 @@ class TextProcessor:
             文本块列表
         """
         # 转换为字符数
-        chunk_chars = int(chunk_size * 1.5)
-        overlap_chars = int(overlap * 1.5)
+        chars_per_token = TextProcessor.chars_per_token(text)
+        chunk_chars = int(chunk_size * chars_per_token)
+        overlap_chars = int(overlap * chars_per_token)
 
         if len(text) <= chunk_chars:
             return [text]
@@ -232,5 +227,5 @@ def smart_truncate(text: str, max_length: int = 12000) -> str:
         return text
 
     processor = TextProcessor()
-    max_tokens = int(max_length / 1.5)
+    max_tokens = int(max_length / processor.chars_per_token(text))
     return processor.truncate_text(text, max_tokens, 'smart')
@@ -0,0 +1,242 @@
+"""
+LLM 调用的 token 预算控制
+
+每次调用 LLM 前估算 Prompt 的 token 数，并按分析类型的预算策略（BUDGET_POLICIES）处理：
+- 输入预算：TextProcessor.MAX_TOKENS 中配置的上限，同时不超过模型上下文窗口减去预留的输出 token
+- 超出预算时按策略压缩：
+  - salient：带编号的句子列表按重要性抽取（编号与原文一致，见 app/utils/extractive_compressor.py）
+  - smart：普通文本使用 TextProcessor.truncate_text 的 smart 策略（同样按重要性抽取句子）
+  - drop_oldest：对话历史从最早的消息开始丢弃
+- 发送前最后检查（check）：Prompt 加输出放不进上下文窗口时先减少输出 token；
+  连最少的输出都放不下时直接抛出 TokenBudgetExceeded，不再发出注定失败的请求
+
+每次压缩、降级和拒绝都记录日志（[TokenBudget]）。
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.core.token_estimator import token_estimator
+from app.utils.text_processor import TextProcessor
+
+logger = logging.getLogger(__name__)
+
+# 估算误差的安全余量（占上下文窗口的比例）
+SAFETY_MARGIN = 0.05
+
+# 输出 token 至少保留这么多，否则拒绝请求
+MIN_OUTPUT_TOKENS = 256
+
+
+class TokenBudgetExceeded(ValueError):
+    """Prompt 压缩后仍然超出模型上下文窗口"""
+
+
+@dataclass(frozen=True)
+class BudgetPolicy:
+    """一种分析类型的预算策略"""
+    max_input_tokens: Optional[int]  # 输入上限（None 表示只受上下文窗口限制）
+    max_output_tokens: Optional[int]  # 预留的输出 token（None 表示使用 settings.max_tokens）
+    strategy: str  # 超出输入预算时的压缩策略：salient / smart / drop_oldest / none
+
+
+BUDGET_POLICIES: Dict[str, BudgetPolicy] = {
+    'unified_analysis': BudgetPolicy(TextProcessor.MAX_TOKENS['unified_analysis'], 8000, 'salient'),
+    'unified_analysis_regions': BudgetPolicy(None, 4000, 'none'),
+    'meta_analysis': BudgetPolicy(TextProcessor.MAX_TOKENS['meta_analysis'], 2000, 'salient'),
+    'thinking_lens': BudgetPolicy(TextProcessor.MAX_TOKENS['thinking_lens'], 3000, 'salient'),
+    'insight': BudgetPolicy(TextProcessor.MAX_TOKENS['insight'], None, 'smart'),
+    'follow_up': BudgetPolicy(None, None, 'drop_oldest'),
+    'follow_up_buttons': BudgetPolicy(None, 500, 'none'),
+    'simple_response': BudgetPolicy(None, 500, 'none'),
+}
+
+
+@dataclass
+class BudgetDecision:
+    """一次 LLM 调用的预算决策"""
+    analysis_type: str
+    model: str
+    prompt_tokens: int
+    max_output_tokens: int
+    context_limit: int
+
+
+class TokenBudgetGovernor:
+    """LLM 调用的 token 预算控制"""
+
+    def policy(self, analysis_type: str) -> BudgetPolicy:
+        if analysis_type not in BUDGET_POLICIES:
+            raise ValueError(f"未配置 token 预算的分析类型: {analysis_type}")
+        return BUDGET_POLICIES[analysis_type]
+
+    def estimate(self, text: str, model: str) -> int:
+        """估算文本的 token 数（按实际用量自动校准，见 app/core/token_estimator.py）"""
+        return token_estimator.estimate(text, model)
+
+    def estimate_messages(self, messages: List[Dict], model: str) -> int:
+        """估算消息列表（含每条消息的格式开销）的 token 数"""
+        return token_estimator.estimate_messages(messages, model)
+
+    def context_limit(self, model: str) -> int:
+        """模型的上下文窗口（精确匹配，其次最长前缀匹配，如 gpt-4o-2024-08-06 -> gpt-4o）"""
+        limits = settings.llm_context_tokens
+        if model in limits:
+            return limits[model]
+        prefixes = [name for name in limits if model.startswith(name)]
+        if prefixes:
+            return limits[max(prefixes, key=len)]
+        return settings.llm_default_context_tokens
+
+    def output_tokens(self, analysis_type: str) -> int:
+        """预留的输出 token"""
+        return self.policy(analysis_type).max_output_tokens or settings.max_tokens
+
+    def input_budget(self, analysis_type: str, model: str) -> int:
+        """输入（Prompt）的 token 预算"""
+        limit = self.context_limit(model)
+        budget = limit - int(limit * SAFETY_MARGIN) - self.output_tokens(analysis_type)
+        max_input = self.policy(analysis_type).max_input_tokens
+        return min(budget, max_input) if max_input else budget
+
+    def fit_sentences(
+        self,
+        segmentation,
+        analysis_type: str,
+        model: str,
+        overhead: str = ""
+    ) -> Tuple[str, str]:
+        """
+        带编号的句子列表，超出预算时按重要性抽取句子
+
+        Args:
+            segmentation: 分句结果（SentenceSegmentation）
+            analysis_type: 分析类型
+            model: 模型
+            overhead: Prompt 中句子列表以外的部分（系统提示词、模板等）
+
+        Returns:
+            (带编号的句子列表, 范围说明)；未压缩时范围说明为空字符串
+        """
+        budget = self.input_budget(analysis_type, model) - self.estimate(overhead, model)
+        # 每行按可能跟随的换行和 …… 分隔行计算开销
+        sentence_list, count = segmentation.numbered_salient(
+            max(budget, 0), cost=lambda line: self.estimate(line + "\n……\n", model) + 1
+        )
+        total = len(segmentation)
+        if count == total:
+            return sentence_list, ""
+
+        logger.info(
+            f"[TokenBudget] 句子列表超出预算: type={analysis_type}, model={model}, "
+            f"预算≈{budget} tokens, 抽取 {count}/{total} 句"
+        )
+        scope_note = (
+            f"\n（文章较长，以上只列出按重要性挑选的 {count}/{total} 句，片段之间以 …… 分隔，"
+            "编号与原文一致）\n"
+        )
+        return sentence_list, scope_note
+
+    def fit_text(self, text: str, analysis_type: str, model: str, overhead: str = "") -> str:
+        """
+        普通文本（如附带的全文），超出预算时按分析类型的策略压缩
+
+        Args:
+            text: 原始文本
+            analysis_type: 分析类型
+            model: 模型
+            overhead: Prompt 中该文本以外的部分
+        """
+        budget = self.input_budget(analysis_type, model) - self.estimate(overhead, model)
+        tokens = self.estimate(text, model)
+        if tokens <= budget:
+            return text
+        if budget <= 0:
+            logger.info(f"[TokenBudget] 没有剩余预算，省略文本: type={analysis_type}, model={model}, 原文≈{tokens} tokens")
+            return ""
+
+        strategy = self.policy(analysis_type).strategy
+        compressed = TextProcessor.truncate_text(text, budget, strategy if strategy != 'none' else 'head', model)
+        logger.info(
+            f"[TokenBudget] 文本超出预算: type={analysis_type}, model={model}, strategy={strategy}, "
+            f"{tokens} -> {self.estimate(compressed, model)} tokens（预算≈{budget}）"
+        )
+        return compressed
+
+    def fit_history(self, messages: List[Dict], analysis_type: str, model: str, keep_head: int = 2) -> List[Dict]:
+        """
+        对话消息超出预算时从最早的历史消息开始丢弃
+
+        Args:
+            messages: 完整消息列表
+            analysis_type: 分析类型
+            model: 模型
+            keep_head: 开头始终保留的消息数（系统提示词、原始文本等）；最后一条（当前问题）也始终保留
+
+        Returns:
+            新的消息列表（未超出时原样返回）
+        """
+        budget = self.input_budget(analysis_type, model)
+        tokens = self.estimate_messages(messages, model)
+        if tokens <= budget:
+            return messages
+
+        head, history, last = messages[:keep_head], list(messages[keep_head:-1]), messages[-1:]
+        dropped = 0
+        while history and tokens > budget:
+            history.pop(0)
+            tokens = self.estimate_messages(head + history + last, model)
+            dropped += 1
+
+        logger.info(
+            f"[TokenBudget] 对话历史超出预算: type={analysis_type}, model={model}, "
+            f"丢弃最早的 {dropped} 条消息, 剩余≈{tokens} tokens（预算≈{budget}）"
+        )
+        return head + history + last
+
+    def check(self, messages: List[Dict], analysis_type: str, model: str) -> BudgetDecision:
+        """
+        发送前检查：返回本次调用的输出 token 上限
+
+        Prompt 加预留输出放不进上下文窗口时减少输出 token；
+        连 MIN_OUTPUT_TOKENS 都放不下时抛出 TokenBudgetExceeded。
+        """
+        limit = self.context_limit(model)
+        available = limit - int(limit * SAFETY_MARGIN)
+        prompt_tokens = self.estimate_messages(messages, model)
+        max_output = self.output_tokens(analysis_type)
+
+        if prompt_tokens + MIN_OUTPUT_TOKENS > available:
+            logger.warning(
+                f"[TokenBudget] 拒绝请求: type={analysis_type}, model={model}, "
+                f"Prompt≈{prompt_tokens} tokens, 上下文窗口 {limit}"
+            )
+            raise TokenBudgetExceeded(
+                f"内容过长：约 {prompt_tokens} tokens，超出模型 {model} 的上下文窗口（{limit} tokens）"
+            )
+
+        if prompt_tokens + max_output > available:
+            degraded = available - prompt_tokens
+            logger.info(
+                f"[TokenBudget] 减少输出 token: type={analysis_type}, model={model}, "
+                f"Prompt≈{prompt_tokens} tokens, 输出 {max_output} -> {degraded}"
+            )
+            max_output = degraded
+        else:
+            logger.debug(
+                f"[TokenBudget] type={analysis_type}, model={model}, Prompt≈{prompt_tokens} tokens, "
+                f"输出 {max_output}, 上下文窗口 {limit}"
+            )
+
+        return BudgetDecision(
+            analysis_type=analysis_type,
+            model=model,
+            prompt_tokens=prompt_tokens,
+            max_output_tokens=max_output,
+            context_limit=limit
+        )
+
+
+token_budget = TokenBudgetGovernor()
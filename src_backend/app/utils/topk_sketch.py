@@ -0,0 +1,95 @@
+"""
+Space-Saving Top-K 草图
+
+用固定数量（capacity）的计数器近似统计数据流中的高频项：
+- 已跟踪的项：计数 +1
+- 未跟踪且计数器未满：新增计数器
+- 未跟踪且计数器已满：替换计数最小的项，新计数 = 最小计数 + 1，
+  并记录误差上界 error = 被替换的最小计数
+
+每个计数器的真实频次满足 count - error <= 真实值 <= count，
+真实频次超过 N / capacity 的项一定会被保留（N 为总次数）。
+
+序列化格式（JSON）：{"项": [count, error], ...}
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+DEFAULT_CAPACITY = 100
+
+
+class SpaceSavingSketch:
+    """Space-Saving Top-K 草图"""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, counters: Optional[Dict[str, List[int]]] = None):
+        self.capacity = capacity
+        # 项 -> [count, error]
+        self.counters: Dict[str, List[int]] = counters or {}
+
+    def update(self, item: str, count: int = 1) -> None:
+        """记录一次（或 count 次）出现"""
+        counter = self.counters.get(item)
+        if counter is not None:
+            counter[0] += count
+            return
+
+        if len(self.counters) < self.capacity:
+            self.counters[item] = [count, 0]
+            return
+
+        min_item = min(self.counters, key=lambda key: self.counters[key][0])
+        min_count = self.counters.pop(min_item)[0]
+        self.counters[item] = [min_count + count, min_count]
+
+    def update_many(self, items: Iterable[str]) -> None:
+        """依次记录多项"""
+        for item in items:
+            self.update(item)
+
+    def merge(self, other: "SpaceSavingSketch") -> "SpaceSavingSketch":
+        """
+        合并另一个草图（计数与误差相加后保留计数最大的 capacity 项）
+
+        Returns:
+            self
+        """
+        for item, (count, error) in other.counters.items():
+            counter = self.counters.get(item)
+            if counter is None:
+                self.counters[item] = [count, error]
+            else:
+                counter[0] += count
+                counter[1] += error
+
+        if len(self.counters) > self.capacity:
+            kept = sorted(self.counters.items(), key=lambda kv: -kv[1][0])[:self.capacity]
+            self.counters = dict(kept)
+        return self
+
+    def top(self, k: int) -> List[Tuple[str, int]]:
+        """计数最高的 k 项 [(项, 计数)]，按计数降序"""
+        ranked = sorted(self.counters.items(), key=lambda kv: (-kv[1][0], kv[1][1]))
+        return [(item, counter[0]) for item, counter in ranked[:k]]
+
+    def to_dict(self) -> Dict[str, List[int]]:
+        """序列化为 JSON 兼容的字典"""
+        return {item: list(counter) for item, counter in self.counters.items()}
+
+    @classmethod
+    def from_dict(
+        cls,
+        data: Optional[Dict[str, Union[int, List[int]]]],
+        capacity: int = DEFAULT_CAPACITY
+    ) -> "SpaceSavingSketch":
+        """
+        从字典恢复草图
+
+        兼容旧格式 {"项": count}（误差视为 0）
+        """
+        counters = {}
+        for item, value in (data or {}).items():
+            if isinstance(value, list):
+                counters[item] = [int(value[0]), int(value[1])]
+            else:
+                counters[item] = [int(value), 0]
+        return cls(capacity, counters)
@@ -0,0 +1,138 @@
+"""
+压缩列基准测试
+
+对比 zlib / zstd 的编码、解码耗时与压缩率，
+并在内存 SQLite 中对比 Text 列与 CompressedText 列的写入/读取耗时和存储体积。
+
+运行方式：
+python bench_compressed_columns.py
+"""
+
+import json
+import time
+import zlib
+
+from sqlalchemy import Column, Integer, Text, create_engine, func, select
+from sqlalchemy.orm import Session, declarative_base
+
+from app.db.types import CompressedJSON, CompressedText, compress_text, decompress_text
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ROUNDS = 200
+
+
+def build_samples():
+    """构造与线上数据形态相近的样本：长文章、推理链、分析报告 JSON"""
+    paragraph = (
+        "人工智能的发展正在深刻改变我们的生活方式。从智能手机上的语音助手，到自动驾驶汽车，"
+        "再到医疗诊断系统，AI技术已经渗透到各个领域。The model reasons step by step about "
+        "the structure of the argument before producing an answer. "
+    )
+    article = paragraph * 60
+    reasoning = ("首先分析用户的问题。" + "Let me think about this carefully. " * 3) * 150
+    report = {
+        "summary": paragraph * 3,
+        "concepts": [{"text": f"概念{i}", "explanation": paragraph} for i in range(30)],
+        "arguments": [{"claim": paragraph, "evidence": [paragraph] * 2} for _ in range(10)],
+    }
+    return {
+        "article": article,
+        "reasoning": reasoning,
+        "report_json": json.dumps(report, ensure_ascii=False),
+    }
+
+
+def time_it(func, rounds=ROUNDS):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def bench_codecs(samples):
+    print("=" * 60)
+    print("编解码对比（单次耗时 ms / 压缩后大小）")
+    print("=" * 60)
+
+    for name, value in samples.items():
+        raw = value.encode("utf-8")
+        print(f"\n{name}: {len(raw) / 1024:.1f} KB")
+
+        compressed = zlib.compress(raw, 6)
+        enc = time_it(lambda: zlib.compress(raw, 6))
+        dec = time_it(lambda: zlib.decompress(compressed))
+        print(f"  zlib-6   enc {enc:.3f}  dec {dec:.3f}  -> {len(compressed) / 1024:.1f} KB ({len(compressed) / len(raw):.1%})")
+
+        if zstandard is not None:
+            compressor = zstandard.ZstdCompressor(level=6)
+            decompressor = zstandard.ZstdDecompressor()
+            compressed = compressor.compress(raw)
+            enc = time_it(lambda: compressor.compress(raw))
+            dec = time_it(lambda: decompressor.decompress(compressed))
+            print(f"  zstd-6   enc {enc:.3f}  dec {dec:.3f}  -> {len(compressed) / 1024:.1f} KB ({len(compressed) / len(raw):.1%})")
+        else:
+            print("  zstd     (未安装 zstandard，跳过)")
+
+        encoded = compress_text(value)
+        assert decompress_text(encoded) == value
+        print(f"  列格式   首字节 0x{encoded[0]:02x}，{len(encoded) / 1024:.1f} KB")
+
+
+def bench_sqlite(samples):
+    print("\n" + "=" * 60)
+    print(f"SQLite 读写对比（{ROUNDS} 行）")
+    print("=" * 60)
+
+    Base = declarative_base()
+
+    class PlainRow(Base):
+        __tablename__ = "plain_rows"
+        id = Column(Integer, primary_key=True)
+        content = Column(Text)
+        report = Column(Text)
+
+    class CompressedRow(Base):
+        __tablename__ = "compressed_rows"
+        id = Column(Integer, primary_key=True)
+        content = Column(CompressedText)
+        report = Column(CompressedJSON)
+
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+
+    article = samples["article"]
+    report = json.loads(samples["report_json"])
+
+    for label, model, report_value in (
+        ("Text          ", PlainRow, samples["report_json"]),
+        ("CompressedText", CompressedRow, report),
+    ):
+        with Session(engine) as db:
+            start = time.perf_counter()
+            for i in range(ROUNDS):
+                db.add(model(id=i + 1, content=article, report=report_value))
+            db.commit()
+            write_ms = (time.perf_counter() - start) * 1000
+
+        with Session(engine) as db:
+            start = time.perf_counter()
+            rows = db.query(model).all()
+            total_len = sum(len(row.content) for row in rows)
+            read_ms = (time.perf_counter() - start) * 1000
+            assert total_len == len(article) * ROUNDS
+
+            size = db.execute(
+                select(func.sum(func.length(model.__table__.c.content) + func.length(model.__table__.c.report)))
+            ).scalar()
+
+        print(f"  {label}  写入 {write_ms:7.1f} ms  读取 {read_ms:7.1f} ms  存储 {size / 1024:8.1f} KB")
+
+
+if __name__ == "__main__":
+    samples = build_samples()
+    bench_codecs(samples)
+    bench_sqlite(samples)
@@ -0,0 +1,136 @@
+"""
+概念共现计算基准测试
+
+生成模拟数据（默认 1 万个概念、5 万篇文章，每篇 3-12 个概念，概念热度服从 Zipf 分布），对比：
+- 旧实现：逐篇文章两两组合，tuple(sorted(...)) 作为字典键
+- NumPy：按概念数分组生成概念对后 np.unique 计数
+- SciPy：稀疏关联矩阵 Aᵀ·A（需安装 scipy）
+并在临时 SQLite 数据库中测量完整的 rebuild_graph（含节点、共现与边的批量写入）。
+
+运行方式：
+python bench_cooccurrence.py [--concepts 10000] [--articles 50000] [--skip-rebuild]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+import app.utils.cooccurrence as cooccurrence_module
+from app.models.models import Base, User
+from app.services.knowledge_graph_service import KnowledgeGraphService
+from app.utils.cooccurrence import compute_cooccurrence
+
+
+def generate(concepts: int, articles: int):
+    """文章 ID -> Counter(概念)"""
+    rng = np.random.default_rng(42)
+    labels = [f"概念{i}" for i in range(concepts)]
+    popularity = 1.0 / np.arange(1, concepts + 1) ** 0.8
+    popularity /= popularity.sum()
+
+    article_concepts = {}
+    for article_id in range(1, articles + 1):
+        size = int(rng.integers(3, 13))
+        picked = rng.choice(concepts, size=size, replace=False, p=popularity)
+        article_concepts[article_id] = Counter(labels[i] for i in picked)
+    return article_concepts
+
+
+def cooccurrence_loops(article_concepts):
+    """旧实现：逐篇两两组合"""
+    cooccurrence = defaultdict(int)
+    for concepts in article_concepts.values():
+        concepts_list = list(concepts)
+        for i in range(len(concepts_list)):
+            for j in range(i + 1, len(concepts_list)):
+                pair = tuple(sorted([concepts_list[i], concepts_list[j]]))
+                cooccurrence[pair] += 1
+    return cooccurrence
+
+
+def time_it(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def bench_compute(article_concepts):
+    print("\n共现计算：")
+    loops_s, expected = time_it(cooccurrence_loops, article_concepts)
+    print(f"  Python 双重循环              {loops_s:8.2f} s   {len(expected)} 个概念对")
+
+    sparse = cooccurrence_module.sparse
+    cooccurrence_module.sparse = None
+    numpy_s, result = time_it(compute_cooccurrence, article_concepts.values())
+    cooccurrence_module.sparse = sparse
+    print(f"  NumPy 分组 + unique          {numpy_s:8.2f} s")
+    assert result.to_dict() == expected
+
+    if sparse is not None:
+        scipy_s, result = time_it(compute_cooccurrence, article_concepts.values())
+        print(f"  SciPy 稀疏矩阵 Aᵀ·A         {scipy_s:8.2f} s")
+        assert result.to_dict() == expected
+    else:
+        print("  SciPy 未安装，跳过")
+
+    edges = int((result.counts >= 2).sum())
+    print(f"  共现 >= 2 的概念对（边）: {edges}")
+
+
+def bench_rebuild(article_concepts):
+    path = os.path.join(tempfile.mkdtemp(), "bench_cooccurrence.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    user = User(email="bench@example.com")
+    db.add(user)
+    db.commit()
+    user_id = user.id
+
+    now = datetime.utcnow()
+    clicks = [
+        {"user_id": user_id, "spark_type": "concept", "spark_text": label, "article_id": article_id, "clicked_at": now}
+        for article_id, concepts in article_concepts.items()
+        for label in concepts
+    ]
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO spark_clicks (user_id, spark_type, spark_text, article_id, clicked_at) "
+            "VALUES (:user_id, :spark_type, :spark_text, :article_id, :clicked_at)"
+        ), clicks)
+
+    print(f"\n完整重建（SQLite，{len(clicks)} 次概念点击）：")
+    service = KnowledgeGraphService(db)
+    for round_name in ("首次重建", "再次重建（全部已存在）"):
+        elapsed, result = time_it(service.rebuild_graph, user_id)
+        db.expunge_all()
+        print(f"  {round_name:<20}{elapsed:8.2f} s   {result['nodes_created']} 节点, {result['edges_created']} 边")
+
+    db.close()
+    os.remove(path)
+
+
+def main(concepts: int, articles: int, skip_rebuild: bool):
+    print(f"生成 {concepts} 个概念、{articles} 篇文章...")
+    article_concepts = generate(concepts, articles)
+    bench_compute(article_concepts)
+    if not skip_rebuild:
+        bench_rebuild(article_concepts)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="概念共现计算基准测试")
+    parser.add_argument("--concepts", type=int, default=10000, help="概念数量")
+    parser.add_argument("--articles", type=int, default=50000, help="文章数量")
+    parser.add_argument("--skip-rebuild", action="store_true", help="只测共现计算，不测数据库重建")
+    args = parser.parse_args()
+    main(args.concepts, args.articles, args.skip_rebuild)
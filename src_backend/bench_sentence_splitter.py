@@ -0,0 +1,159 @@
+"""
+分句吞吐量基准测试
+
+生成约 1 MB 的中英文混排语料（默认），对比：
+- 旧实现：re.split 后逐片段 re.match，每个分隔符处对累积文本重新统计引号 / 括号、遍历全部缩写
+- 新实现：单遍扫描（app.utils.sentence_splitter）
+并校验两者输出完全一致。另测一个病态段落：开头有未闭合的「，整段都不能断句，
+旧实现每个分隔符都要重新统计整段累积文本（平方复杂度）。
+
+运行方式：
+python bench_sentence_splitter.py [--size-mb 1] [--repeat 3]
+"""
+
+import argparse
+import random
+import re
+import time
+
+from app.utils.sentence_splitter import split_sentences, split_sentences_with_offsets
+
+ZH_SENTENCES = [
+    "人工智能正在改变世界。", "它让我们的生活更加便捷！", "但同时也带来了新的挑战？",
+    "我们应该如何应对…", "这是一个值得深思的问题。", "有人认为（包括许多专家）这种说法言过其实。",
+    "他说：「技术本身是中立的。」", "测试数据集包含10000个样本；", "准确率达到了98.5%。",
+]
+EN_SENTENCES = [
+    "Dr. Smith works at U.S. Inc. ", "He has a Ph.D. in Computer Science. ",
+    "The model shows great potential! ", "Is it really that simple? ", "Pi is about 3.14. ",
+]
+
+
+def generate(size: int, seed: int = 42) -> str:
+    """生成约 size 字节（UTF-8）的语料：段落之间空行分隔，段内偶有单个换行"""
+    rng = random.Random(seed)
+    paragraphs = []
+    total = 0
+    while total < size:
+        parts = []
+        for _ in range(rng.randint(3, 15)):
+            parts.append(rng.choice(EN_SENTENCES if rng.random() < 0.3 else ZH_SENTENCES))
+            if rng.random() < 0.05:
+                parts.append("\n")
+        paragraph = "".join(parts)
+        paragraphs.append(paragraph)
+        total += len(paragraph.encode("utf-8")) + 2
+    return "\n\n".join(paragraphs)
+
+
+# ==================== 旧实现（仅用于对比） ====================
+
+ABBREVIATIONS = [
+    'Mr.', 'Mrs.', 'Ms.', 'Dr.', 'Prof.', 'Sr.', 'Jr.',
+    'etc.', 'vs.', 'e.g.', 'i.e.', 'U.S.', 'U.K.',
+    'Inc.', 'Ltd.', 'Co.', 'Corp.', 'St.', 'Ave.',
+    'Ph.D.', 'M.D.', 'B.A.', 'M.A.', 'D.C.'
+]
+
+
+def legacy_split(text):
+    if not text or not text.strip():
+        return []
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    sentences = []
+    for para in text.split('\n\n'):
+        if para.strip():
+            sentences.extend(legacy_split_paragraph(para))
+    return [s.strip() for s in sentences if s.strip()]
+
+
+def legacy_split_paragraph(text):
+    pattern = r'([。！？；…]+\s*|[.!?]+\s+|\n)'
+    parts = re.split(pattern, text)
+    sentences = []
+    current = ''
+    for i, part in enumerate(parts):
+        if not part:
+            continue
+        if re.match(pattern, part):
+            current += part
+            next_part = parts[i + 1] if i + 1 < len(parts) else ''
+            if legacy_should_break(current, next_part):
+                sentences.append(current.strip())
+                current = ''
+        else:
+            current += part
+    if current.strip():
+        sentences.append(current.strip())
+    return sentences
+
+
+def legacy_should_break(current, next_part):
+    current = current.strip()
+    if not current:
+        return False
+    if current.endswith('\n'):
+        return True
+    for abbr in ABBREVIATIONS:
+        if current.endswith(abbr):
+            if next_part and re.match(r'^[a-z]', next_part.strip()):
+                return False
+    if re.search(r'\d+\.\s*$', current):
+        if next_part and re.match(r'^\d', next_part.strip()):
+            return False
+    open_quotes = current.count('"') + current.count('"') + current.count('「')
+    close_quotes = current.count('"') + current.count('"') + current.count('」')
+    open_parens = current.count('(') + current.count('（')
+    close_parens = current.count(')') + current.count('）')
+    if open_quotes % 2 != 0 or open_quotes != close_quotes:
+        return False
+    if open_parens != close_parens:
+        return False
+    if re.search(r'[。！？；…]$', current):
+        return True
+    if re.search(r'[.!?]\s+$', current):
+        return True
+    return False
+
+
+# ==================== 测量 ====================
+
+def best_of(repeat, func, *args):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def report(name, text, repeat):
+    size_mb = len(text.encode("utf-8")) / 1024 / 1024
+    legacy_time, expected = best_of(repeat, legacy_split, text)
+    new_time, actual = best_of(repeat, split_sentences, text)
+    offsets_time, _ = best_of(repeat, split_sentences_with_offsets, text)
+    assert actual == expected, "新旧实现输出不一致"
+
+    print(f"\n{name}: {len(text):,} 字符 ({size_mb:.2f} MB), {len(actual):,} 个句子")
+    print(f"  旧实现:          {legacy_time * 1000:9.1f} ms  ({size_mb / legacy_time:6.1f} MB/s)")
+    print(f"  单遍扫描:        {new_time * 1000:9.1f} ms  ({size_mb / new_time:6.1f} MB/s)  x{legacy_time / new_time:.1f}")
+    print(f"  单遍扫描 + 偏移: {offsets_time * 1000:9.1f} ms")
+
+
+def main(size_mb: float, repeat: int):
+    corpus = generate(int(size_mb * 1024 * 1024))
+    report("中英文混排语料", corpus, repeat)
+
+    # 病态段落：未闭合的「 使整段无法断句
+    pathological = "「" + "".join(ZH_SENTENCES[i % 5] for i in range(4000))
+    report("未闭合引号的长段落", pathological, 1)
+    print("\n✅ 输出一致")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="分句吞吐量基准测试")
+    parser.add_argument("--size-mb", type=float, default=1.0, help="语料大小（MB，UTF-8）")
+    parser.add_argument("--repeat", type=int, default=3, help="每个实现重复次数（取最快一次）")
+    args = parser.parse_args()
+    main(args.size_mb, args.repeat)
@@ -0,0 +1,147 @@
+"""
+火花统计基准测试
+
+在临时 SQLite 数据库中写入 spark_clicks 数据（默认 100 万行，
+其中一个高频用户 5 万次点击），对比：
+- 旧实现：加载全部 ORM 对象后在 Python 中按类型计数
+- 新实现：GROUP BY spark_type（单列 user_id 索引 vs 复合索引）
+
+运行方式：
+python bench_spark_stats.py [--rows 1000000]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, func, text
+from sqlalchemy.orm import sessionmaker
+
+from app.models.models import Base, SparkClick, User
+
+SPARK_TYPES = ["concept", "argument", "entity"]
+POWER_USER_CLICKS = 50000
+USER_COUNT = 200
+ROUNDS = 5
+
+
+def seed(engine, rows: int) -> int:
+    """写入测试数据，返回高频用户 ID"""
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    db.add_all([User(email=f"bench{i}@example.com") for i in range(USER_COUNT)])
+    db.commit()
+    db.close()
+
+    now = datetime.utcnow()
+    random.seed(42)
+    insert_sql = text(
+        "INSERT INTO spark_clicks (user_id, spark_type, spark_text, article_id, clicked_at) "
+        "VALUES (:user_id, :spark_type, :spark_text, NULL, :clicked_at)"
+    )
+
+    batch = []
+    with engine.begin() as conn:
+        for i in range(rows):
+            # 前 POWER_USER_CLICKS 行属于高频用户 1，其余随机分布
+            user_id = 1 if i < POWER_USER_CLICKS else random.randint(2, USER_COUNT)
+            batch.append({
+                "user_id": user_id,
+                "spark_type": random.choice(SPARK_TYPES),
+                "spark_text": f"火花文本示例 {i % 1000}，包含一些用于模拟真实长度的内容",
+                "clicked_at": now - timedelta(seconds=random.randint(0, 90 * 86400)),
+            })
+            if len(batch) >= 10000:
+                conn.execute(insert_sql, batch)
+                batch = []
+        if batch:
+            conn.execute(insert_sql, batch)
+    return 1
+
+
+def stats_orm(db, user_id: int, days: int = 30):
+    """旧实现：加载全部 ORM 对象后计数"""
+    start_date = datetime.utcnow() - timedelta(days=days)
+    clicks = db.query(SparkClick).filter(
+        SparkClick.user_id == user_id,
+        SparkClick.clicked_at >= start_date
+    ).all()
+    type_counts = defaultdict(int)
+    for click in clicks:
+        type_counts[click.spark_type] += 1
+    return dict(type_counts)
+
+
+def stats_group_by(db, user_id: int, days: int = 30):
+    """新实现：数据库中 GROUP BY"""
+    start_date = datetime.utcnow() - timedelta(days=days)
+    rows = db.query(SparkClick.spark_type, func.count()).filter(
+        SparkClick.user_id == user_id,
+        SparkClick.clicked_at >= start_date
+    ).group_by(SparkClick.spark_type).all()
+    return {spark_type: count for spark_type, count in rows}
+
+
+def time_it(func, *args):
+    best = None
+    result = None
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main(rows: int):
+    path = os.path.join(tempfile.mkdtemp(), "bench_spark_stats.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+
+    # 先去掉复合索引，对比只有 user_id 单列索引时的表现
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX idx_spark_clicks_user_time_type"))
+
+    print(f"写入 {rows} 行测试数据...")
+    start = time.perf_counter()
+    user_id = seed(engine, rows)
+    print(f"  完成，耗时 {time.perf_counter() - start:.1f}s，数据库 {os.path.getsize(path) / 1024 / 1024:.0f} MB")
+
+    Session = sessionmaker(bind=engine)
+    db = Session()
+
+    print(f"\n高频用户（{POWER_USER_CLICKS} 次点击），30 天窗口，取 {ROUNDS} 次最优：")
+    orm_ms, orm_result = time_it(lambda: (db.expunge_all(), stats_orm(db, user_id))[1])
+    print(f"  ORM 加载 + Python 计数        {orm_ms:8.1f} ms")
+
+    group_ms, group_result = time_it(stats_group_by, db, user_id)
+    print(f"  GROUP BY（单列索引）          {group_ms:8.1f} ms")
+    assert group_result == orm_result
+
+    db.close()
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE INDEX idx_spark_clicks_user_time_type ON spark_clicks(user_id, clicked_at, spark_type)"
+        ))
+        conn.execute(text("ANALYZE"))
+    db = Session()
+
+    indexed_ms, indexed_result = time_it(stats_group_by, db, user_id)
+    print(f"  GROUP BY（复合覆盖索引）      {indexed_ms:8.1f} ms")
+    assert indexed_result == orm_result
+
+    print(f"\n结果: {indexed_result}")
+    print(f"加速比: {orm_ms / indexed_ms:.0f}x")
+    db.close()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="火花统计基准测试")
+    parser.add_argument("--rows", type=int, default=1000000, help="spark_clicks 行数")
+    args = parser.parse_args()
+    main(args.rows)
@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""
+测试按内容哈希跨用户共享的分析结果（AnalysisArtifact）
+"""
+
+import asyncio
+import hashlib
+
+from fastapi import HTTPException
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.api.unified_analysis as unified_analysis_api
+from app.api.unified_analysis import analyze_article_task, reanalyze_article
+from app.config import settings
+from app.models.models import AnalysisArtifact, AnalysisReport, Article, Base, User
+from app.services.analysis_artifact_service import META_ANALYSIS, UNIFIED_REPORT, AnalysisArtifactService
+from app.services.meta_analysis_service import PROMPT_VERSION, MetaAnalysisService, meta_artifact_version
+from app.services.unified_analysis_service import ANALYSIS_VERSION, UnifiedAnalysisService, report_artifact_version
+
+CONTENT = "人工智能正在改变世界。它让我们的生活更加便捷！但同时也带来了新的挑战？"
+CONTENT_HASH = hashlib.md5(CONTENT.encode("utf-8")).hexdigest()
+
+LLM_RESULT = {
+    "author_intent": {"primary": "inform", "confidence": 0.9},
+    "timeliness": {"score": 0.7, "category": "evergreen"},
+    "bias": {"detected": False},
+    "knowledge_gaps": {"prerequisites": []},
+    "generated_title": "人工智能的机遇与挑战"
+}
+
+
+def _make_session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+def test_put_and_get():
+    """测试按 (内容哈希, 类型, 版本, 模型) 保存和查找"""
+    print("=" * 50)
+    print("测试1: 保存和查找")
+    print("=" * 50)
+
+    db = _make_session()
+    try:
+        service = AnalysisArtifactService(db)
+        assert service.get(CONTENT_HASH, UNIFIED_REPORT, ANALYSIS_VERSION) is None
+
+        first = service.put(CONTENT_HASH, UNIFIED_REPORT, ANALYSIS_VERSION, {"report": {"summary": "旧"}}, tokens_used=100)
+        db.commit()
+        assert first.model == settings.default_model
+
+        # 同一个键覆盖（重新分析），不同版本 / 模型互不影响
+        second = service.put(CONTENT_HASH, UNIFIED_REPORT, ANALYSIS_VERSION, {"report": {"summary": "新"}}, tokens_used=120)
+        service.put(CONTENT_HASH, UNIFIED_REPORT, "0.9", {"report": {"summary": "旧版本"}})
+        service.put(CONTENT_HASH, UNIFIED_REPORT, ANALYSIS_VERSION, {"report": {"summary": "其他模型"}}, model="other-model")
+        db.commit()
+        assert second.id == first.id
+        assert db.query(AnalysisArtifact).count() == 3
+        found = service.get(CONTENT_HASH, UNIFIED_REPORT, ANALYSIS_VERSION)
+        assert found.payload["report"]["summary"] == "新" and found.tokens_used == 120
+        assert service.get(CONTENT_HASH, UNIFIED_REPORT, ANALYSIS_VERSION, "other-model").payload["report"]["summary"] == "其他模型"
+
+        # 填充另一篇文章的报告（版本键带标题哈希，报告只记录分析版本）
+        report = AnalysisReport(article_id=1)
+        service.apply_unified_report(report, found)
+        assert report.status == "completed" and report.tokens_used == 0
+        keyed = service.put(CONTENT_HASH, UNIFIED_REPORT, report_artifact_version("AI"), {"report": {"summary": "AI"}})
+        keyed_report = AnalysisReport(article_id=2)
+        service.apply_unified_report(keyed_report, keyed)
+        assert keyed_report.analysis_version == ANALYSIS_VERSION
+        assert report.artifact_id == found.id and report.report_data == {"summary": "新"}
+        assert found.reuse_count == 1
+        assert len(report_artifact_version("AI")) <= 20
+        assert report_artifact_version("AI") != report_artifact_version("人工智能")
+    finally:
+        db.close()
+    print("✅ 按键保存和覆盖")
+
+
+def test_meta_analysis_shared_across_users():
+    """测试第二位用户保存相同内容时直接使用共享的元信息分析，且文章归自己所有"""
+    print("=" * 50)
+    print("测试2: 跨用户共享元信息分析")
+    print("=" * 50)
+
+    db = _make_session()
+    try:
+        alice, bob = User(email="alice@example.com"), User(email="bob@example.com")
+        db.add_all([alice, bob])
+        db.flush()
+        db.add(Article(user_id=alice.id, title="AI", content=CONTENT, content_hash=CONTENT_HASH))
+        AnalysisArtifactService(db).put(
+            CONTENT_HASH, META_ANALYSIS, meta_artifact_version("AI", "未知作者", "", "zh"), LLM_RESULT
+        )
+        db.commit()
+
+        service = MetaAnalysisService(db)
+
+        async def fail(**kwargs):
+            raise AssertionError("不应调用 LLM")
+
+        service._call_llm_for_meta_analysis = fail
+        result = asyncio.run(service.analyze_article(
+            title="AI", author="未知作者", publish_date="", content=CONTENT, user_id=bob.id
+        ))
+
+        bob_article = db.query(Article).filter(Article.user_id == bob.id).one()
+        assert result["article_id"] == bob_article.id
+        assert result["author_intent"] == LLM_RESULT["author_intent"]
+        assert bob_article.meta_analysis.artifact_id is not None
+        assert bob_article.title == LLM_RESULT["generated_title"]
+        assert db.query(Article).count() == 2
+        assert db.query(AnalysisArtifact).one().reuse_count == 1
+    finally:
+        db.close()
+    print("✅ 未调用 LLM")
+
+
+def test_meta_analysis_keyed_by_metadata():
+    """测试正文相同但作者等元信息不同时不复用元信息分析"""
+    print("=" * 50)
+    print("测试3: 元信息不同不复用")
+    print("=" * 50)
+
+    version = meta_artifact_version("AI", "未知作者", "", "zh")
+    assert version.startswith(PROMPT_VERSION) and len(version) <= 20
+    assert meta_artifact_version("AI", "张三", "", "zh") != version
+    assert meta_artifact_version("AI", "未知作者", "2024-01-01", "zh") != version
+    assert meta_artifact_version("AI", "未知作者", "", "en") != version
+    assert meta_artifact_version("AI 转载", "未知作者", "", "zh") != version
+
+    db = _make_session()
+    try:
+        alice, bob = User(email="alice@example.com"), User(email="bob@example.com")
+        db.add_all([alice, bob])
+        db.flush()
+        db.add(Article(user_id=alice.id, title="AI", content=CONTENT, content_hash=CONTENT_HASH))
+        AnalysisArtifactService(db).put(CONTENT_HASH, META_ANALYSIS, version, LLM_RESULT)
+        db.commit()
+
+        service = MetaAnalysisService(db)
+        calls = []
+
+        async def fake_llm(**kwargs):
+            calls.append(kwargs)
+            return dict(LLM_RESULT, author_intent={"primary": "inform", "confidence": 0.5})
+
+        service._call_llm_for_meta_analysis = fake_llm
+        result = asyncio.run(service.analyze_article(
+            title="AI", author="张三", publish_date="", content=CONTENT, user_id=bob.id
+        ))
+
+        assert len(calls) == 1 and calls[0]["author"] == "张三"
+        assert result["author_intent"]["confidence"] == 0.5
+        assert db.query(AnalysisArtifact).count() == 2
+        assert db.query(AnalysisArtifact).filter(AnalysisArtifact.analysis_version == version).one().reuse_count == 0
+    finally:
+        db.close()
+    print("✅ 按元信息区分")
+
+
+def test_reanalyze_requires_owner():
+    """测试只能重新分析自己的文章"""
+    print("=" * 50)
+    print("测试4: 重新分析权限检查")
+    print("=" * 50)
+
+    db = _make_session()
+    try:
+        alice, bob = User(email="alice@example.com"), User(email="bob@example.com")
+        db.add_all([alice, bob])
+        db.flush()
+        article = Article(user_id=alice.id, title="AI", content=CONTENT, content_hash=CONTENT_HASH)
+        db.add(article)
+        db.flush()
+        db.add(AnalysisReport(article_id=article.id, status="completed", report_data={"summary": "旧"}))
+        db.commit()
+
+        try:
+            asyncio.run(reanalyze_article(article.id, current_user=bob, db=db))
+            raise AssertionError("应拒绝其他用户重新分析")
+        except HTTPException as e:
+            assert e.status_code == 403
+
+        report = db.query(AnalysisReport).one()
+        assert report.status == "completed" and report.report_data == {"summary": "旧"}
+    finally:
+        db.close()
+    print("✅ 其他用户返回 403")
+
+
+def test_unified_report_keyed_by_title():
+    """测试统一分析报告按标题区分：正文相同但标题不同时重新分析"""
+    print("=" * 50)
+    print("测试5: 分析报告按标题区分")
+    print("=" * 50)
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    db = factory()
+    calls = []
+
+    async def fake_analyze(self, article_content, article_title, segmentation):
+        calls.append(article_title)
+        return {"report": {"summary": article_title}, "metadata": {"model": "m", "tokens": 10}}
+
+    original_session, original_analyze = unified_analysis_api.SessionLocal, UnifiedAnalysisService.analyze_article
+    unified_analysis_api.SessionLocal = factory
+    UnifiedAnalysisService.analyze_article = fake_analyze
+    try:
+        user = User(email="alice@example.com")
+        db.add(user)
+        db.flush()
+        articles = [
+            Article(user_id=user.id, title=title, content=CONTENT, content_hash=CONTENT_HASH)
+            for title in ("AI", "人工智能", "AI")
+        ]
+        db.add_all(articles)
+        db.commit()
+        article_ids = [article.id for article in articles]
+
+        summaries = [asyncio.run(analyze_article_task(article_id))["report_data"]["summary"] for article_id in article_ids]
+        assert calls == ["AI", "人工智能"]
+        assert summaries == ["AI", "人工智能", "AI"]
+        assert db.query(AnalysisArtifact).count() == 2
+    finally:
+        unified_analysis_api.SessionLocal = original_session
+        UnifiedAnalysisService.analyze_article = original_analyze
+        db.close()
+    print("✅ 标题不同不复用")
+
+
+if __name__ == "__main__":
+    test_put_and_get()
+    test_meta_analysis_shared_across_users()
+    test_meta_analysis_keyed_by_metadata()
+    test_reanalyze_requires_owner()
+    test_unified_report_keyed_by_title()
+    print("\n✅ 所有测试通过")
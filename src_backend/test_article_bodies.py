@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+测试按 SHA-256 内容寻址的文章正文存储（引用计数、删除回收）
+"""
+
+import hashlib
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.models.models import Article, ArticleBody, Base, User, collect_article_bodies
+
+CONTENT = "人工智能正在改变世界。它让我们的生活更加便捷！但同时也带来了新的挑战？"
+EDITED = CONTENT + "我们需要认真应对。"
+
+
+def _make_session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+def _make_session():
+    return _make_session_factory()()
+
+
+def _sha256(content):
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def _add_article(db, user, content):
+    article = Article(
+        user_id=user.id, title="AI", content=content,
+        content_hash=hashlib.md5(content.encode("utf-8")).hexdigest()
+    )
+    db.add(article)
+    return article
+
+
+def test_shared_body_and_gc():
+    """测试多位用户保存相同内容时只存一份正文，全部删除后正文被回收"""
+    print("=" * 50)
+    print("测试1: 正文共享与回收")
+    print("=" * 50)
+
+    db = _make_session()
+    try:
+        users = [User(email=f"user{i}@example.com") for i in range(3)]
+        db.add_all(users)
+        db.flush()
+        user_ids = [user.id for user in users]
+
+        first = _add_article(db, users[0], CONTENT)
+        db.commit()
+        body = db.get(ArticleBody, _sha256(CONTENT))
+        assert body.ref_count == 1 and body.size == len(CONTENT.encode("utf-8"))
+        assert first.body_sha256 == body.sha256 and first.content == CONTENT
+
+        # 同一事务中保存两篇相同内容的文章
+        _add_article(db, users[1], CONTENT)
+        third = _add_article(db, users[2], CONTENT)
+        db.commit()
+        assert db.query(ArticleBody).count() == 1
+        assert db.get(ArticleBody, _sha256(CONTENT)).ref_count == 3
+        # 文章表不再保存正文
+        assert db.execute(text("SELECT length(content) FROM articles")).scalars().all() == [1, 1, 1]
+
+        third_id = third.id
+        db.expunge_all()
+        assert db.get(Article, third_id).content == CONTENT
+
+        # 改写一篇文章：旧正文计数减一，新正文单独保存
+        article = db.query(Article).filter(Article.user_id == user_ids[0]).one()
+        article.content = EDITED
+        db.commit()
+        assert db.get(ArticleBody, _sha256(CONTENT)).ref_count == 2
+        assert db.get(ArticleBody, _sha256(EDITED)).ref_count == 1
+        assert article.content == EDITED
+
+        # 删除全部引用后回收正文
+        db.delete(article)
+        db.commit()
+        assert db.get(ArticleBody, _sha256(EDITED)) is None
+        for article in db.query(Article).all():
+            db.delete(article)
+        db.commit()
+        assert db.query(ArticleBody).count() == 0
+
+        # 回收后再次保存相同内容
+        _add_article(db, db.get(User, user_ids[0]), CONTENT)
+        db.commit()
+        assert db.get(ArticleBody, _sha256(CONTENT)).ref_count == 1
+    finally:
+        db.close()
+    print("✅ 相同正文只存一份，无引用时回收")
+
+
+def test_legacy_content():
+    """测试迁移前直接保存在文章表中的正文仍可读取，改写后迁入正文表"""
+    print("=" * 50)
+    print("测试2: 旧数据兼容")
+    print("=" * 50)
+
+    db = _make_session()
+    try:
+        db.execute(text(
+            "INSERT INTO articles (id, title, content, content_hash, language, insight_count, is_demo, "
+            "created_at, last_read_at, read_count) "
+            "VALUES (1, 'AI', :content, 'x', 'zh', 0, 0, '2024-01-01', '2024-01-01', 1)"
+        ), {"content": CONTENT})
+        db.commit()
+
+        article = db.get(Article, 1)
+        assert article.body_sha256 is None and article.content == CONTENT
+
+        article.content = article.content
+        db.commit()
+        assert article.body_sha256 == _sha256(CONTENT) and article.content == CONTENT
+        assert db.get(ArticleBody, _sha256(CONTENT)).ref_count == 1
+    finally:
+        db.close()
+    print("✅ 旧数据可读取并迁移")
+
+
+def test_save_after_concurrent_gc():
+    """测试另一会话回收了正文后，持有旧正文对象的会话保存相同内容时重新写入正文"""
+    print("=" * 50)
+    print("测试3: 并发回收后保存")
+    print("=" * 50)
+
+    factory = _make_session_factory()
+    first, second = factory(), factory()
+    try:
+        users = [User(email=f"user{i}@example.com") for i in range(2)]
+        first.add_all(users)
+        first.flush()
+        user_ids = [user.id for user in users]
+        article = _add_article(first, users[0], CONTENT)
+        first.commit()
+        article_id = article.id
+
+        # 第一个会话仍缓存着正文对象（文章对象移出，SQLite 会复用已删除文章的 ID）
+        assert first.get(ArticleBody, _sha256(CONTENT)).ref_count == 1
+        first.expunge(article)
+
+        # 第二个会话删除唯一的引用，提交后正文被回收
+        second.delete(second.get(Article, article_id))
+        second.commit()
+        assert second.get(ArticleBody, _sha256(CONTENT)) is None
+
+        _add_article(first, first.get(User, user_ids[1]), CONTENT)
+        first.commit()
+        first.expunge_all()
+        body = first.get(ArticleBody, _sha256(CONTENT))
+        assert body is not None and body.ref_count == 1 and body.content == CONTENT
+    finally:
+        first.close()
+        second.close()
+    print("✅ 正文重新写入，计数正确")
+
+
+def test_collect_rechecks_references():
+    """测试回收时复查计数和文章引用"""
+    print("=" * 50)
+    print("测试4: 回收复查")
+    print("=" * 50)
+
+    db = _make_session()
+    try:
+        user = User(email="user@example.com")
+        db.add(user)
+        db.flush()
+        _add_article(db, user, CONTENT)
+        db.commit()
+
+        # 计数与实际引用不一致（例如中断的旧版本回收）时不删除仍被引用的正文
+        db.execute(text("UPDATE article_bodies SET ref_count = 0"))
+        db.execute(text(
+            "INSERT INTO article_bodies (sha256, content, size, ref_count, created_at) "
+            "VALUES ('orphan', :content, 1, 0, '2024-01-01')"
+        ), {"content": b"x"})
+        db.commit()
+        assert collect_article_bodies(db, [_sha256(CONTENT)]) == 0
+        assert collect_article_bodies(db) == 1
+        db.commit()
+        assert [row.sha256 for row in db.query(ArticleBody).all()] == [_sha256(CONTENT)]
+    finally:
+        db.close()
+    print("✅ 只回收无引用的正文")
+
+
+if __name__ == "__main__":
+    test_shared_body_and_gc()
+    test_legacy_content()
+    test_save_after_concurrent_gc()
+    test_collect_rechecks_references()
+    print("\n✅ 所有测试通过")
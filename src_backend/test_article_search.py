@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+测试文章库句子级检索（倒排索引的建立、删除与并发写入）
+"""
+
+import hashlib
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.models.models import Article, ArticleSearchDocument, ArticleSearchPosting, Base, User
+from app.services.article_search_service import ArticleSearchService
+from app.utils.postings import decode_postings
+
+ARTICLES = [
+    "人工智能正在改变世界。机器学习是人工智能的核心。",
+    "今天天气很好。我们去公园散步吧。",
+    "深度学习推动了人工智能的发展。",
+]
+
+
+def _make_session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+def _add_articles(db, user_id, contents):
+    articles = [
+        Article(user_id=user_id, title=f"文章{i}", content=content,
+                content_hash=hashlib.md5(content.encode("utf-8")).hexdigest())
+        for i, content in enumerate(contents)
+    ]
+    db.add_all(articles)
+    db.commit()
+    return articles
+
+
+def test_index_search_and_remove():
+    """测试建立索引、按句子检索与删除"""
+    print("=" * 50)
+    print("测试1: 建立索引与检索")
+    print("=" * 50)
+
+    db = _make_session_factory()()
+    user = User(email="search@example.com")
+    db.add(user)
+    db.commit()
+    first, second, third = _add_articles(db, user.id, ARTICLES)
+
+    service = ArticleSearchService(db)
+    for article in (first, second, third):
+        service.index_article(article)
+    db.commit()
+
+    result = service.search(user.id, "人工智能")
+    print(f"检索结果: {[(item['id'], item['sentence_indices']) for item in result['articles']]}")
+    assert result["total"] == 2
+    assert result["articles"][0]["id"] == first.id
+    assert result["articles"][0]["sentence_indices"] == [0, 1]
+    assert result["articles"][1]["sentences"][0]["dom_path"] == "#sentence-0"
+
+    # 同一句子必须包含全部词元
+    assert service.search(user.id, "天气 公园")["total"] == 0
+    assert service.search(user.id, "公园散步")["total"] == 1
+
+    service.remove_article(first)
+    db.commit()
+    assert [item["id"] for item in service.search(user.id, "人工智能")["articles"]] == [third.id]
+    assert db.get(ArticleSearchDocument, first.id) is None
+
+    # 重新索引（文章ID小于列表末尾时重新编码）
+    service.index_article(first)
+    db.commit()
+    assert service.search(user.id, "人工智能")["total"] == 2
+    db.close()
+    print("✅ 检索与删除")
+
+
+def test_concurrent_writers_do_not_lose_updates():
+    """测试另一个会话更新了共享的倒排行后，本会话按最新内容追加（不覆盖对方的写入）"""
+    print("=" * 50)
+    print("测试2: 共享倒排行的并发更新")
+    print("=" * 50)
+
+    Session = _make_session_factory()
+    setup = Session()
+    user = User(email="concurrent@example.com")
+    setup.add(user)
+    setup.commit()
+    base, first, second = _add_articles(setup, user.id, [ARTICLES[2], ARTICLES[0], "人工智能也会带来风险。"])
+    user_id, first_id, second_id = user.id, first.id, second.id
+    ArticleSearchService(setup).index_article(base)
+    setup.commit()
+    base_id = base.id
+    setup.close()
+
+    worker_a, worker_b = Session(), Session()
+    # 会话 A 先读到共享的倒排行，随后会话 B 索引另一篇文章并提交
+    stale = worker_a.get(ArticleSearchPosting, (user_id, "智能"))
+    assert set(decode_postings(stale.postings)) == {base_id}
+    ArticleSearchService(worker_b).index_article(worker_b.get(Article, second_id))
+    worker_b.commit()
+
+    ArticleSearchService(worker_a).index_article(worker_a.get(Article, first_id))
+    worker_a.commit()
+
+    check = Session()
+    row = check.get(ArticleSearchPosting, (user_id, "智能"))
+    print(f"'智能' 倒排: {decode_postings(row.postings)}")
+    assert set(decode_postings(row.postings)) == {base_id, first_id, second_id}
+    assert row.doc_count == 3
+    assert ArticleSearchService(check).search(user_id, "人工智能")["total"] == 3
+    for session in (worker_a, worker_b, check):
+        session.close()
+    print("✅ 没有丢失更新")
+
+
+if __name__ == "__main__":
+    test_index_search_and_remove()
+    test_concurrent_writers_do_not_lose_updates()
+    print("\n✅ 所有测试通过")
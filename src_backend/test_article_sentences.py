@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+测试文章分句缓存（进程内 LRU + article_sentences 表，按 content_hash 共享）
+"""
+
+import hashlib
+import tempfile
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.services.article_sentence_service as sentence_module
+from app.models.models import AnalysisReport, ArticleSentences, Base
+from app.services.article_sentence_service import ArticleSentenceService, SentenceSegmentation, segmentation_cache
+from app.utils.sentence_splitter import SPLITTER_VERSION, split_sentences
+
+CONTENT = "人工智能正在改变世界。它让我们的生活更加便捷！\r\n\r\n但同时也带来了新的挑战？我们应该如何应对…这是一个值得深思的问题。"
+
+
+def _make_session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+def _make_sessionmaker(path):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+def test_segment_once_and_share():
+    """测试同一内容只分句一次：之后从进程内缓存或数据库读取"""
+    print("=" * 50)
+    print("测试1: 分句结果缓存")
+    print("=" * 50)
+
+    db = _make_session()
+    content_hash = hashlib.md5(CONTENT.encode("utf-8")).hexdigest()
+    segmentation_cache.invalidate(content_hash)
+
+    calls = []
+    original = sentence_module.split_sentences_with_offsets
+
+    def counting(text):
+        calls.append(text)
+        return original(text)
+
+    sentence_module.split_sentences_with_offsets = counting
+    try:
+        service = ArticleSentenceService(db)
+        first = service.segment(CONTENT)
+        db.commit()
+        assert first.sentences == split_sentences(CONTENT)
+        assert first.content_hash == content_hash
+        for sentence, (start, end) in zip(first.sentences, first.offsets):
+            assert CONTENT[start:end].replace("\r\n", "\n") == sentence
+
+        row = db.get(ArticleSentences, content_hash)
+        assert row.sentence_count == 5 and row.splitter_version == SPLITTER_VERSION
+        assert row.offsets == [list(offset) for offset in first.offsets]
+
+        # 进程内缓存命中：同一个对象
+        assert service.segment(CONTENT, content_hash) is first
+        # 清空进程内缓存后从数据库读取，不重新分句
+        segmentation_cache.invalidate(content_hash)
+        second = ArticleSentenceService(db).segment(CONTENT, content_hash)
+        assert second.sentences == first.sentences and second.offsets == first.offsets
+        assert second.numbered == first.numbered
+        assert len(calls) == 1
+
+        # 旧数据（不同规则的分句、没有偏移）：保留句子列表，只补全偏移，不重新分句
+        legacy = ["人工智能正在改变世界。它让我们的生活更加便捷！", "但同时也带来了新的挑战？", "我们应该如何应对…这是一个值得深思的问题。"]
+        row.sentences = legacy
+        row.offsets = None
+        row.splitter_version = None
+        db.commit()
+        segmentation_cache.invalidate(content_hash)
+        legacy_segmentation = ArticleSentenceService(db).segment(CONTENT, content_hash)
+        db.commit()
+        assert len(calls) == 1
+        assert legacy_segmentation.sentences == legacy
+        for sentence, (start, end) in zip(legacy, legacy_segmentation.offsets):
+            assert CONTENT[start:end] == sentence
+        db.expire_all()
+        row = db.get(ArticleSentences, content_hash)
+        assert row.sentences == legacy and row.splitter_version is None
+        assert row.offsets == [list(offset) for offset in legacy_segmentation.offsets]
+    finally:
+        sentence_module.split_sentences_with_offsets = original
+        segmentation_cache.invalidate(content_hash)
+        db.close()
+    print("✅ 只分句一次")
+
+
+def test_numbered_list():
+    """测试带编号的句子列表，以及按原文长度截取（与先截断原文再分句的结果一致）"""
+    print("=" * 50)
+    print("测试2: 带编号的句子列表")
+    print("=" * 50)
+
+    segmentation = SentenceSegmentation.from_text(CONTENT)
+    expected = "\n".join(f"[{i}] {sentence}" for i, sentence in enumerate(split_sentences(CONTENT)))
+    assert segmentation.numbered == expected
+    print(segmentation.numbered)
+
+    for max_chars in range(0, len(CONTENT) + 5):
+        prefix = CONTENT[:max_chars].replace("\r\n", "\n")
+        if CONTENT[:max_chars].endswith("\r"):
+            continue  # 截断在 \r\n 中间，两种做法对换行的处理不同
+        sentences = split_sentences(CONTENT[:max_chars])
+        numbered, count = segmentation.numbered_within(max_chars)
+        assert count == len(sentences), (max_chars, prefix)
+        assert numbered == "\n".join(f"[{i}] {sentence}" for i, sentence in enumerate(sentences)), max_chars
+
+    assert SentenceSegmentation.from_text("").numbered_within(100) == ("", 0)
+    print("✅ 截取结果与先截断再分句一致")
+
+
+def test_legacy_report_sentences_preserved():
+    """测试旧报告的内嵌分句：迁移时保存偏移；与已保存的分句不同时保留在报告中"""
+    print("=" * 50)
+    print("测试3: 旧报告的内嵌分句")
+    print("=" * 50)
+
+    db = _make_session()
+    content_hash = hashlib.md5(CONTENT.encode("utf-8")).hexdigest()
+    segmentation_cache.invalidate(content_hash)
+    try:
+        service = ArticleSentenceService(db)
+        legacy = ["人工智能正在改变世界。", "它让我们的生活更加便捷！\n\n但同时也带来了新的挑战？", "我们应该如何应对…这是一个值得深思的问题。"]
+        report = AnalysisReport(article_id=1, report_data={"summary": "摘要", "sentences": legacy})
+        db.add(report)
+        db.flush()
+
+        assert service.detach_from_report(report, content_hash, CONTENT)
+        db.commit()
+        row = db.get(ArticleSentences, content_hash)
+        assert row.sentences == legacy and report.report_data == {"summary": "摘要"}
+        # \r\n 统一为 \n 的句子也能定位
+        assert [CONTENT[start:end].replace("\r\n", "\n") for start, end in row.offsets] == legacy
+
+        # 另一份报告的内嵌分句不同：不覆盖已保存的分句，报告保持原样
+        other = AnalysisReport(article_id=2, report_data={"sentences": split_sentences(CONTENT)})
+        db.add(other)
+        db.flush()
+        assert not service.detach_from_report(other, content_hash, CONTENT)
+        assert other.report_data["sentences"] == split_sentences(CONTENT)
+        assert not service.save(content_hash, split_sentences(CONTENT))
+        assert service.segment(CONTENT, content_hash).sentences == legacy
+    finally:
+        segmentation_cache.invalidate(content_hash)
+        db.close()
+    print("✅ 报告引用的分句不被改写")
+
+
+def test_cache_after_commit():
+    """测试分句结果在提交后才进入进程内缓存，回滚时丢弃"""
+    print("=" * 50)
+    print("测试4: 提交后才缓存")
+    print("=" * 50)
+
+    db = _make_session()
+    content_hash = hashlib.md5(CONTENT.encode("utf-8")).hexdigest()
+    segmentation_cache.invalidate(content_hash)
+    try:
+        service = ArticleSentenceService(db)
+        first = service.segment(CONTENT, content_hash)
+        assert segmentation_cache.get(content_hash) is None
+        # 同一事务内复用
+        assert service.segment(CONTENT, content_hash) is first
+        db.rollback()
+        assert segmentation_cache.get(content_hash) is None
+        assert db.get(ArticleSentences, content_hash) is None
+
+        second = service.segment(CONTENT, content_hash)
+        assert second is not first
+        db.commit()
+        assert segmentation_cache.get(content_hash) is second
+        assert db.get(ArticleSentences, content_hash) is not None
+    finally:
+        segmentation_cache.invalidate(content_hash)
+        db.close()
+    print("✅ 回滚的分句结果不会留在缓存中")
+
+
+def test_concurrent_segment():
+    """测试两个事务同时分句同一新内容：后写入的一方不报错，并使用先写入的分句"""
+    print("=" * 50)
+    print("测试5: 并发分句")
+    print("=" * 50)
+
+    make_session = _make_sessionmaker(f"{tempfile.mkdtemp()}/sentences.db")
+    content_hash = hashlib.md5(CONTENT.encode("utf-8")).hexdigest()
+    segmentation_cache.invalidate(content_hash)
+
+    winner, loser = make_session(), make_session()
+    original = sentence_module.split_sentences_with_offsets
+    try:
+        # 两个事务都已确认分句表中没有该内容
+        assert loser.get(ArticleSentences, content_hash) is None
+        stored = ArticleSentenceService(winner).segment(CONTENT, content_hash)
+        winner.commit()
+        segmentation_cache.invalidate(content_hash)
+
+        # 模拟分句规则不同的另一进程
+        sentence_module.split_sentences_with_offsets = lambda text: original(text)[:2]
+        service = ArticleSentenceService(loser)
+        loser.get = lambda model, key: None  # 读取发生在对方提交之前
+        segmentation = service.segment(CONTENT, content_hash)
+        loser.commit()
+        assert segmentation.sentences == stored.sentences
+        assert segmentation_cache.get(content_hash).sentences == stored.sentences
+    finally:
+        sentence_module.split_sentences_with_offsets = original
+        segmentation_cache.invalidate(content_hash)
+        winner.close()
+        loser.close()
+    print("✅ 并发写入以先写入的分句为准")
+
+
+if __name__ == "__main__":
+    test_segment_once_and_share()
+    test_numbered_list()
+    test_legacy_report_sentences_preserved()
+    test_cache_after_commit()
+    test_concurrent_segment()
+    print("\n✅ 所有测试通过")
@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""
+测试火花点击写缓冲（批量写入 + 日汇总 + 好奇心指纹延迟刷新）
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.api.analytics import _resolve_beacon_user_id
+from app.core.click_buffer import MAX_FLUSH_RETRIES, ClickBuffer
+from app.models.models import Base, CuriosityFingerprint, SparkClick, SparkClickDaily, SparkTopicDaily, User
+from app.services.analytics_service import AnalyticsService
+from app.services.spark_rollup_service import SparkRollupService
+from app.utils.auth import create_access_token
+
+
+def _make_session_factory():
+    """创建内存数据库（后台线程共享同一连接）"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+def _click(user_id: int, spark_type: str, text: str, days_ago: int = 0) -> dict:
+    return {
+        "user_id": user_id,
+        "spark_type": spark_type,
+        "spark_text": text,
+        "article_id": None,
+        "clicked_at": datetime.utcnow() - timedelta(days=days_ago)
+    }
+
+
+def test_batched_flush_and_debounced_fingerprint():
+    """测试批量写入与指纹刷新合并"""
+    print("=" * 50)
+    print("测试1: 批量写入与延迟刷新指纹")
+    print("=" * 50)
+
+    Session = _make_session_factory()
+    db = Session()
+    user = User(email="buffer@example.com")
+    db.add(user)
+    db.commit()
+
+    buffer = ClickBuffer(
+        max_events=1000,
+        flush_interval_ms=60000,
+        debounce_seconds=3600,
+        session_factory=Session
+    )
+
+    buffer.enqueue([_click(user.id, "concept", "人工智能") for _ in range(5)])
+    buffer.enqueue([_click(user.id, "argument", "机器学习")])
+    print(f"缓冲中: {buffer.pending_count()} 条，数据库中: {db.query(SparkClick).count()} 条")
+    assert buffer.pending_count() == 6
+    assert db.query(SparkClick).count() == 0
+
+    assert buffer.flush() == 6
+    assert buffer.pending_count() == 0
+    assert db.query(SparkClick).count() == 6
+
+    # 未到刷新时间：指纹不更新
+    assert buffer.refresh_due_fingerprints() == 0
+    assert db.query(CuriosityFingerprint).count() == 0
+
+    # 多次写入合并为一次指纹刷新
+    buffer.enqueue([_click(user.id, "concept", "深度学习")])
+    buffer.flush()
+    assert buffer.refresh_due_fingerprints(force=True) == 1
+
+    fingerprint = db.query(CuriosityFingerprint).filter_by(user_id=user.id).one()
+    print(f"火花分布: {fingerprint.spark_distribution}")
+    assert fingerprint.spark_distribution == {"concept": 6, "argument": 1}
+    db.close()
+
+
+def test_daily_rollups_and_windows():
+    """测试写入时累加日汇总、按窗口读取以及重建一致性"""
+    print("\n" + "=" * 50)
+    print("测试2: 日汇总与统计窗口")
+    print("=" * 50)
+
+    Session = _make_session_factory()
+    db = Session()
+    user = User(email="rollup@example.com")
+    db.add(user)
+    db.commit()
+
+    buffer = ClickBuffer(max_events=1000, flush_interval_ms=60000, session_factory=Session)
+    buffer.enqueue([
+        _click(user.id, "concept", "人工智能"),
+        _click(user.id, "concept", "人工智能"),
+        _click(user.id, "argument", "机器学习", days_ago=1),
+        _click(user.id, "concept", "深度学习", days_ago=60),
+    ])
+    buffer.flush()
+    buffer.enqueue([_click(user.id, "concept", "人工智能")])
+    buffer.flush()
+
+    service = AnalyticsService(db)
+    fingerprint = service.get_curiosity_fingerprint(user.id)
+    print(f"30 天分布: {fingerprint['spark_distribution']}")
+    assert fingerprint["spark_distribution"] == {"concept": 3, "argument": 1}
+    assert len(fingerprint["time_series"]) == 30
+    assert fingerprint["time_series"][-1]["counts"] == {"concept": 3}
+    assert fingerprint["topic_cloud"][0] == {"topic": "人工智能", "count": 3, "weight": 1.0}
+
+    fingerprint_90 = service.get_curiosity_fingerprint(user.id, days=90)
+    print(f"90 天分布: {fingerprint_90['spark_distribution']}")
+    assert fingerprint_90["spark_distribution"] == {"concept": 4, "argument": 1}
+    assert len(fingerprint_90["time_series"]) == 90
+
+    # 从原始点击重建，结果与增量累加一致
+    incremental = sorted((row.day, row.spark_type, row.count) for row in db.query(SparkClickDaily))
+    SparkRollupService(db).rebuild(user.id)
+    db.commit()
+    rebuilt = sorted((row.day, row.spark_type, row.count) for row in db.query(SparkClickDaily))
+    assert incremental == rebuilt
+    db.close()
+
+
+def test_bad_event_isolated_after_retries():
+    """测试整批连续失败后逐条写入，只丢弃出错的事件"""
+    print("\n" + "=" * 50)
+    print("测试3: 隔离无法写入的事件")
+    print("=" * 50)
+
+    Session = _make_session_factory()
+    db = Session()
+    user = User(email="bad-event@example.com")
+    db.add(user)
+    db.commit()
+
+    buffer = ClickBuffer(max_events=1000, flush_interval_ms=60000, session_factory=Session)
+    bad = _click(user.id, "concept", "人工智能")
+    bad["clicked_at"] = None
+    buffer.enqueue([_click(user.id, "concept", "人工智能"), bad, _click(user.id, "argument", "机器学习")])
+
+    # 前几次整批重试，事件留在缓冲中
+    for _ in range(MAX_FLUSH_RETRIES - 1):
+        assert buffer.flush() == 0
+        assert buffer.pending_count() == 3
+
+    assert buffer.flush() == 2
+    assert buffer.pending_count() == 0
+    assert db.query(SparkClick).count() == 2
+    assert sum(row.count for row in db.query(SparkClickDaily)) == 2
+
+    # 之后的批次恢复整批写入
+    buffer.enqueue([_click(user.id, "concept", "深度学习")])
+    assert buffer.flush() == 1
+    db.close()
+    print("✅ 坏事件已丢弃，其余点击写入")
+
+
+def test_integrity_errors():
+    """测试违反约束时：已删除用户的点击被丢弃，其他约束冲突直接逐条写入，不整批重试"""
+    print("\n" + "=" * 50)
+    print("测试4: 违反约束的点击")
+    print("=" * 50)
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+
+    @event.listens_for(engine, "connect")
+    def enable_foreign_keys(connection, _):
+        connection.execute("PRAGMA foreign_keys=ON")
+
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    user = User(email="constraint@example.com")
+    db.add(user)
+    db.commit()
+
+    buffer = ClickBuffer(max_events=1000, flush_interval_ms=60000, session_factory=Session)
+
+    # 字段缺失（NOT NULL）：与用户无关，第一次写入就隔离出错的事件
+    bad = _click(user.id, "concept", "人工智能")
+    bad["spark_text"] = None
+    buffer.enqueue([_click(user.id, "concept", "人工智能"), bad])
+    assert buffer.flush() == 1
+    assert buffer.pending_count() == 0
+
+    # 已删除的用户：只丢弃其点击
+    buffer.enqueue([_click(user.id, "concept", "机器学习"), _click(9999, "concept", "机器学习")])
+    assert buffer.flush() == 1
+    assert buffer.pending_count() == 0
+    assert db.query(SparkClick).count() == 2
+    db.close()
+    print("✅ 按原因处理约束冲突")
+
+
+def test_beacon_requires_active_user():
+    """测试批量上报接口与 get_current_active_user 一样校验用户状态"""
+    print("\n" + "=" * 50)
+    print("测试5: 批量上报的用户校验")
+    print("=" * 50)
+
+    Session = _make_session_factory()
+    db = Session()
+    active, inactive = User(email="active@example.com"), User(email="inactive@example.com", is_active=False)
+    db.add_all([active, inactive])
+    db.commit()
+
+    request = Request({"type": "http", "headers": []})
+
+    def resolve(user_id):
+        return _resolve_beacon_user_id(request, create_access_token({"sub": str(user_id)}), db)
+
+    assert resolve(active.id) == active.id
+    with pytest.raises(HTTPException) as error:
+        resolve(inactive.id)
+    assert error.value.status_code == 400
+    with pytest.raises(HTTPException) as error:
+        resolve(9999)
+    assert error.value.status_code == 401
+    db.close()
+    print("✅ 未激活 / 不存在的用户被拒绝")
+
+
+def test_topic_sketch_concurrent_sessions():
+    """测试两个会话先后写入同一用户同一天的话题草图时不丢失更新"""
+    print("=" * 50)
+    print("测试6: 话题草图并发写入")
+    print("=" * 50)
+
+    Session = _make_session_factory()
+    first, second = Session(), Session()
+    user = User(email="sketch@example.com")
+    first.add(user)
+    first.commit()
+    user_id = user.id
+
+    SparkRollupService(first).apply_clicks([_click(user_id, "concept", "人工智能")])
+    first.commit()
+    # 第一个会话缓存着当天的草图行（保留引用，避免被身份映射回收后重新加载）
+    today = datetime.utcnow().date()
+    cached = first.get(SparkTopicDaily, (user_id, today))
+    assert cached.counters["人工智能"][0] == 1
+
+    SparkRollupService(second).apply_clicks([_click(user_id, "concept", "人工智能")])
+    second.commit()
+
+    # 第一个会话在读取旧行之后写入（模拟与第二个进程交错执行）
+    SparkRollupService(first)._update_topic_sketch(user_id, today, ["人工智能"])
+    first.commit()
+
+    # 同一天的行尚不存在时两边都补齐，不会主键冲突
+    tomorrow = today + timedelta(days=1)
+    SparkRollupService(first)._update_topic_sketch(user_id, tomorrow, ["机器学习"])
+    SparkRollupService(first)._update_topic_sketch(user_id, tomorrow, ["机器学习"])
+    first.commit()
+    assert second.get(SparkTopicDaily, (user_id, tomorrow)).counters["机器学习"][0] == 2
+
+    topics = dict(SparkRollupService(second).get_top_topics(user_id))
+    assert topics["人工智能"] == 3
+    first.close()
+    second.close()
+    print("✅ 草图计数未丢失")
+
+
+if __name__ == "__main__":
+    test_batched_flush_and_debounced_fingerprint()
+    test_daily_rollups_and_windows()
+    test_bad_event_isolated_after_retries()
+    test_integrity_errors()
+    test_beacon_requires_active_user()
+    test_topic_sketch_concurrent_sessions()
+    print("\n✅ 所有测试通过")
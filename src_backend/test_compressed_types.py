@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+测试透明压缩列类型（版本字节格式 + 旧数据兼容）
+"""
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.db.types import FORMAT_RAW, compress_text, decompress_text
+from app.models.models import Base, Article, AnalysisReport, User
+
+
+def test_codec_roundtrip():
+    """测试压缩阈值与编解码往返"""
+    print("=" * 50)
+    print("测试1: 编解码往返")
+    print("=" * 50)
+
+    short = "短文本"
+    encoded = compress_text(short)
+    print(f"短文本首字节: 0x{encoded[0]:02x}")
+    assert encoded[0] == FORMAT_RAW
+    assert decompress_text(encoded) == short
+
+    long_text = "人工智能正在改变世界。" * 200
+    encoded = compress_text(long_text)
+    print(f"长文本: {len(long_text.encode('utf-8'))} -> {len(encoded)} 字节")
+    assert encoded[0] != FORMAT_RAW
+    assert len(encoded) < len(long_text.encode("utf-8"))
+    assert decompress_text(encoded) == long_text
+
+    # 无版本字节的旧数据按 UTF-8 读取
+    assert decompress_text("旧数据".encode("utf-8")) == "旧数据"
+
+
+def test_orm_columns_and_legacy_rows():
+    """测试 ORM 读写与迁移前旧数据的读取"""
+    print("\n" + "=" * 50)
+    print("测试2: ORM 列与旧数据")
+    print("=" * 50)
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    user = User(email="test@example.com")
+    db.add(user)
+    db.flush()
+
+    content = "这是一篇很长的文章。" * 300
+    article = Article(user_id=user.id, title="测试", content=content, content_hash="hash-1")
+    db.add(article)
+    db.flush()
+    report = AnalysisReport(article_id=article.id, report_data={"concepts": ["概念"] * 100})
+    db.add(report)
+    db.commit()
+
+    # 正文保存在 article_bodies 表
+    stored = db.execute(text("SELECT typeof(content), length(content) FROM article_bodies")).fetchone()
+    print(f"存储类型: {stored[0]}，{stored[1]} 字节（原文 {len(content.encode('utf-8'))} 字节）")
+    assert stored[0] == "blob"
+    assert stored[1] < len(content.encode("utf-8"))
+
+    db.expire_all()
+    assert db.get(Article, article.id).content == content
+    assert db.get(AnalysisReport, report.id).report_data["concepts"][0] == "概念"
+
+    # 模拟迁移前以 TEXT 存储的旧行
+    db.execute(text("UPDATE articles SET content = '旧文章内容', body_sha256 = NULL"))
+    db.execute(text("UPDATE analysis_reports SET report_data = '{\"legacy\": true}'"))
+    db.commit()
+    db.expire_all()
+
+    print("旧数据读取:", db.get(Article, article.id).content, db.get(AnalysisReport, report.id).report_data)
+    assert db.get(Article, article.id).content == "旧文章内容"
+    assert db.get(AnalysisReport, report.id).report_data == {"legacy": True}
+    db.close()
+
+
+def test_columns_converted_by_init_db():
+    """测试 init_db 的列类型转换覆盖所有压缩列（SQLite 无需转换）"""
+    print("\n" + "=" * 50)
+    print("测试3: 部署时的列类型转换")
+    print("=" * 50)
+
+    from app.db.migrate_compress_blobs import (
+        COMPRESSED_COLUMNS, _model_compressed_columns, convert_compressed_columns
+    )
+
+    declared = set(_model_compressed_columns())
+    print(f"压缩列: {sorted(declared)}")
+    assert {(table, column) for table, _, column in COMPRESSED_COLUMNS} <= declared
+    assert ("analysis_artifacts", "payload") in declared
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    assert convert_compressed_columns(engine) == 0
+
+
+if __name__ == "__main__":
+    test_codec_roundtrip()
+    test_orm_columns_and_legacy_rows()
+    test_columns_converted_by_init_db()
+    print("\n✅ 所有测试通过")
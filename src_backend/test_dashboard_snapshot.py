@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+测试仪表盘快照（预计算 + 分部分失效 + stale-while-revalidate）
+"""
+
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.services.dashboard_service as dashboard_service
+from app.core.click_buffer import ClickBuffer
+from app.models.models import Base, DashboardSnapshot, User
+from app.services.dashboard_service import SECTION_GRAPH, SECTION_SPARKS, DashboardService
+
+
+def _make_session_factory():
+    """创建内存数据库（后台线程共享同一连接）"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+def test_snapshot_invalidation_and_refresh():
+    """测试快照失效后先返回旧数据，刷新后只重算失效部分"""
+    print("=" * 50)
+    print("测试1: 快照失效与刷新")
+    print("=" * 50)
+
+    Session = _make_session_factory()
+    db = Session()
+    user = User(email="dashboard@example.com")
+    db.add(user)
+    db.commit()
+
+    # 后台刷新改为记录调用，由测试显式执行
+    submitted = []
+    original_submit = dashboard_service.submit_snapshot_refresh
+    dashboard_service.submit_snapshot_refresh = submitted.append
+    try:
+        service = DashboardService(db)
+        overview = service.get_overview(user.id)
+        print(f"首次计算: {overview['stats']}")
+        assert overview["stats"]["totalSparkClicks"] == 0
+        assert submitted == []
+
+        # 写入概念点击 -> sparks 与 graph 部分失效（节点增量创建）
+        buffer = ClickBuffer(max_events=1000, flush_interval_ms=60000, session_factory=Session)
+        buffer.enqueue([{
+            "user_id": user.id,
+            "spark_type": "concept",
+            "spark_text": "人工智能",
+            "article_id": None,
+            "clicked_at": datetime.utcnow()
+        }])
+        buffer.flush()
+
+        db.expire_all()
+        snapshot = db.get(DashboardSnapshot, user.id)
+        assert set(snapshot.dirty_sections) == {SECTION_SPARKS, SECTION_GRAPH}
+
+        # stale-while-revalidate：立即返回旧数据，并提交后台刷新
+        stale = service.get_overview(user.id)
+        assert stale["stats"]["totalSparkClicks"] == 0
+        assert submitted == [user.id]
+
+        fresh = service.refresh(user.id)
+        print(f"刷新后: {fresh['stats']}, {fresh['knowledgeGraph']}")
+        assert fresh["stats"]["totalSparkClicks"] == 1
+        assert fresh["curiosityFingerprint"]["dominantType"] == "concept"
+        assert fresh["knowledgeGraph"]["totalNodes"] == 1
+        assert "人工智能" not in fresh["blindSpots"]["missingDomains"]
+
+        db.expire_all()
+        assert db.get(DashboardSnapshot, user.id).dirty_sections == []
+    finally:
+        dashboard_service.submit_snapshot_refresh = original_submit
+        db.close()
+
+
+if __name__ == "__main__":
+    test_snapshot_invalidation_and_refresh()
+    print("\n✅ 所有测试通过")
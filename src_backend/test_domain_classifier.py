@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+测试概念领域分类（Aho-Corasick 自动机 + 加权词典）
+"""
+
+import json
+import os
+import random
+import tempfile
+import time
+
+from app.utils.aho_corasick import AhoCorasick
+from app.utils.domain_classifier import DomainClassifier, get_domain_classifier
+
+
+def test_aho_corasick_matches():
+    """测试自动机与逐个子串查找的结果一致（含重叠、互为前后缀的关键词）"""
+    print("=" * 50)
+    print("测试1: Aho-Corasick 匹配")
+    print("=" * 50)
+
+    patterns = ["he", "she", "his", "hers", "机器", "机器学习", "学习", "习"]
+    automaton = AhoCorasick({pattern: pattern for pattern in patterns})
+    assert len(automaton) == len(patterns)
+
+    random.seed(0)
+    alphabet = "hers机器学习i"
+    for _ in range(200):
+        text = "".join(random.choice(alphabet) for _ in range(random.randint(0, 30)))
+        expected = sorted(
+            (start + len(pattern), pattern)
+            for pattern in patterns
+            for start in range(len(text))
+            if text.startswith(pattern, start)
+        )
+        actual = sorted((end, pattern) for end, pattern, _ in automaton.iter_matches(text))
+        assert actual == expected, text
+
+    # 不区分大小写，返回原始关键词
+    matches = list(AhoCorasick({"GDP": 1}).iter_matches("gdp 与 GDP"))
+    assert [(end, pattern) for end, pattern, _ in matches] == [(3, "GDP"), (9, "GDP")]
+    print("✅ 与逐个查找结果一致")
+
+
+def _write_dictionary(directory: str, domains) -> str:
+    path = os.path.join(directory, "domains.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "default": {"name": "未分类", "color": "#6b7280"},
+            "domains": [{"name": name, "color": "#000000", "keywords": keywords} for name, keywords in domains]
+        }, f, ensure_ascii=False)
+    return path
+
+
+def test_weighted_classification():
+    """测试加权打分：多个领域命中时取总分最高者，同分按词典顺序"""
+    print("=" * 50)
+    print("测试2: 加权分类")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as directory:
+        classifier = DomainClassifier(_write_dictionary(directory, [
+            ("人工智能", {"算法": 1, "神经网络": 3}),
+            ("计算机科学", {"算法复杂度": 2, "数据结构": 2}),
+            ("数学", {"算法": 1}),
+        ]))
+
+    assert classifier.classify("算法复杂度") == "计算机科学"
+    assert classifier.classify("神经网络的算法复杂度") == "人工智能"
+    # 同一关键词在两个领域中权重相同 -> 词典中靠前的领域
+    assert classifier.classify("算法") == "人工智能"
+    # 同一关键词出现多次只计一次
+    assert classifier.classify("算法算法算法 数据结构") == "计算机科学"
+    assert classifier.classify("诗歌") == "未分类"
+    assert classifier.color("未分类") == "#6b7280"
+    assert classifier.color("不存在的领域") == "#6b7280"
+    assert classifier.classify_many(["算法", "诗歌", "算法"]) == {"算法": "人工智能", "诗歌": "未分类"}
+
+    # 默认词典
+    default = get_domain_classifier()
+    assert default is get_domain_classifier()
+    assert default.classify("深度学习") == "人工智能"
+    assert default.classify("通货膨胀") == "经济学"
+    assert default.classify("transformer 架构") == "人工智能"
+    print(f"✅ 默认词典 {len(default.domains)} 个领域, {default.keyword_count} 个关键词")
+
+
+def test_large_dictionary():
+    """测试大词典：每个领域数千个关键词，分类耗时不随词典规模增长"""
+    print("=" * 50)
+    print("测试3: 大词典")
+    print("=" * 50)
+
+    random.seed(1)
+    chars = [chr(code) for code in range(0x4e00, 0x4e00 + 3000)]
+
+    def timed_classifier(keywords_per_domain: int):
+        domains = [
+            (f"领域{d}", {"".join(random.sample(chars, random.randint(2, 6))): random.randint(1, 3)
+                         for _ in range(keywords_per_domain)})
+            for d in range(10)
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            classifier = DomainClassifier(_write_dictionary(directory, domains))
+        concepts = ["".join(random.sample(chars, 12)) for _ in range(2000)]
+        # 保证一部分概念能命中
+        concepts += [keyword + "理论" for keyword in list(domains[3][1])[:200]]
+
+        start = time.perf_counter()
+        result = classifier.classify_many(concepts)
+        return classifier, result, time.perf_counter() - start, domains
+
+    small, _, small_time, _ = timed_classifier(50)
+    large, result, large_time, domains = timed_classifier(5000)
+    print(f"{small.keyword_count} 个关键词: {small_time * 1000:.1f} ms; "
+          f"{large.keyword_count} 个关键词: {large_time * 1000:.1f} ms")
+
+    hits = [keyword + "理论" for keyword in list(domains[3][1])[:200]]
+    assert sum(result[concept] != "未分类" for concept in hits) == len(hits)
+    # 关键词多 100 倍，耗时不应成比例增长（留出充分余量）
+    assert large_time < small_time * 10 + 0.5
+
+
+if __name__ == "__main__":
+    test_aho_corasick_matches()
+    test_weighted_classification()
+    test_large_dictionary()
+    print("\n✅ 所有测试通过")
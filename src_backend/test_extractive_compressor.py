@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+测试抽取式压缩（TextRank 句子重要性、按预算挑选、保持原句子编号）
+"""
+
+import random
+import re
+import time
+
+import numpy as np
+
+import app.utils.extractive_compressor as extractive_compressor
+from app.services.article_sentence_service import SentenceSegmentation
+from app.utils.extractive_compressor import MAX_SENTENCES, salience_scores, select_sentences, to_regions
+from app.utils.sentence_splitter import split_sentences
+from app.utils.text_processor import TextProcessor
+
+
+# 围绕同一主题的句子（彼此相似，应当得分较高）
+TOPIC = [
+    "人工智能模型的训练需要大量数据和算力。",
+    "训练人工智能模型时，数据质量决定了模型的上限。",
+    "大模型的算力成本让人工智能训练越来越昂贵。",
+    "为了降低训练成本，研究者开始压缩人工智能模型。",
+]
+
+
+def _noise(rng, count):
+    """互不相关的句子"""
+    return ["".join(chr(rng.randint(0x4e00, 0x9fa5)) for _ in range(rng.randint(15, 30))) + "。" for _ in range(count)]
+
+
+def _article(seed=1):
+    """主题句分散在开头、中间和结尾，其余为无关的句子"""
+    rng = random.Random(seed)
+    noise = _noise(rng, 36)
+    sentences = noise[:12] + TOPIC[:2] + noise[12:24] + TOPIC[2:] + noise[24:]
+    return sentences, [sentences.index(sentence) for sentence in TOPIC]
+
+
+def test_salience_and_selection():
+    """测试主题句得分最高，挑选结果不超过预算且按原文顺序排列"""
+    print("=" * 50)
+    print("测试1: 句子重要性与挑选")
+    print("=" * 50)
+
+    sentences, topic_indices = _article()
+    scores = salience_scores(sentences)
+    assert abs(scores.sum() - 1.0) < 1e-6
+    top = sorted(range(len(sentences)), key=lambda i: -scores[i])[:len(TOPIC)]
+    assert sorted(top) == topic_indices, (top, topic_indices)
+
+    costs = [len(sentence) for sentence in sentences]
+    budget = sum(costs[i] for i in topic_indices) + 40
+    selected = select_sentences(sentences, costs, budget)
+    assert set(topic_indices) <= set(selected)
+    assert selected == sorted(selected) and sum(costs[i] for i in selected) <= budget
+
+    # 预算足够时全部保留，重复句子只选一次
+    assert select_sentences(sentences, costs, sum(costs)) == list(range(len(sentences)))
+    duplicated = TOPIC + TOPIC[:1]
+    assert select_sentences(duplicated, [1] * 5, 4.5) in ([0, 1, 2, 3], [1, 2, 3, 4])
+    assert select_sentences([], [], 10) == []
+    assert to_regions([1, 2, 3, 7, 9, 10]) == [(1, 4), (7, 8), (9, 11)]
+    print("✅ 主题句全部选中")
+
+
+def test_numbered_salient_keeps_indices():
+    """测试带编号的句子列表：抽取的句子保持完整文章中的编号"""
+    print("=" * 50)
+    print("测试2: 保持句子编号")
+    print("=" * 50)
+
+    sentences, topic_indices = _article(2)
+    segmentation = SentenceSegmentation.from_text("".join(sentences))
+    assert segmentation.numbered_salient(len(segmentation.numbered)) == (segmentation.numbered, len(sentences))
+
+    numbered, count = segmentation.numbered_salient(400)
+    print(numbered)
+    assert len(numbered) <= 400 + 20
+    lines = [line for line in numbered.split("\n") if line != "……"]
+    assert len(lines) == count
+    for line in lines:
+        index, text = re.match(r"\[(\d+)\] (.*)", line).groups()
+        assert segmentation.sentences[int(index)] == text
+    shown = {int(re.match(r"\[(\d+)\]", line).group(1)) for line in lines}
+    assert set(topic_indices) <= shown
+    print("✅ 编号与完整分句一致")
+
+
+def test_text_processor():
+    """测试 TextProcessor 的智能截断保留中间的重要内容"""
+    print("=" * 50)
+    print("测试3: TextProcessor")
+    print("=" * 50)
+
+    sentences, _ = _article(3)
+    text = "".join(sentences)
+    max_tokens = len(text) // 3
+    result = TextProcessor.truncate_text(text, max_tokens, 'smart')
+    assert TextProcessor.estimate_tokens(result) <= max_tokens
+    for sentence in TOPIC:
+        assert sentence in result
+    # 选中的句子都来自原文
+    assert all(part in sentences for part in split_sentences(result.replace("……", "")))
+
+    # 无法分句时退回按字符截断
+    single = "无标点的长句" * 200
+    assert TextProcessor.estimate_tokens(TextProcessor.extract_key_content(single, 100)) <= 110
+
+    # 长文章的耗时
+    rng = random.Random(4)
+    long_text = "".join(_noise(rng, 3000))
+    start = time.perf_counter()
+    TextProcessor.extract_key_content(long_text, 8000)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"3000 句文章抽取耗时: {elapsed:.0f} ms")
+    print("✅ 重要内容保留")
+
+
+def test_long_article_blocks():
+    """测试超过 MAX_SENTENCES 句的文章分块计算，稀疏与稠密实现结果一致"""
+    print("=" * 50)
+    print("测试4: 长文章分块")
+    print("=" * 50)
+
+    rng = random.Random(5)
+    sentences = _noise(rng, MAX_SENTENCES * 2 + 300)
+    # 每块中各放一组主题句，末尾重复一句主题句
+    for offset in (100, MAX_SENTENCES + 100, MAX_SENTENCES * 2 + 100):
+        sentences[offset:offset + len(TOPIC)] = TOPIC
+    sentences.append(TOPIC[0])
+    costs = [len(sentence) for sentence in sentences]
+
+    start = time.perf_counter()
+    scores = salience_scores(sentences)
+    selected = select_sentences(sentences, costs, sum(costs) / 10)
+    print(f"{len(sentences)} 句文章打分并抽取耗时: {(time.perf_counter() - start) * 1000:.0f} ms")
+    assert len(scores) == len(sentences) and abs(scores.sum() - 1.0) < 1e-6
+    assert sum(costs[i] for i in selected) <= sum(costs) / 10
+    assert {100, MAX_SENTENCES + 100, MAX_SENTENCES * 2 + 100} <= set(selected)
+    # 块内去重：最后一块的重复主题句不再选中
+    assert len(sentences) - 1 not in selected
+
+    sparse = extractive_compressor.sparse
+    extractive_compressor.sparse = None
+    try:
+        assert np.allclose(salience_scores(sentences), scores)
+        assert select_sentences(sentences, costs, sum(costs) / 10) == selected
+    finally:
+        extractive_compressor.sparse = sparse
+    print("✅ 分块结果一致")
+
+
+if __name__ == "__main__":
+    test_salience_and_selection()
+    test_numbered_salient_keeps_indices()
+    test_text_processor()
+    test_long_article_blocks()
+    print("\n✅ 所有测试通过")
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+测试知识图谱分析引擎（CSR 邻接数组 + 进程内缓存）
+"""
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.models.models import Base, KnowledgeEdge, KnowledgeNode, User
+from app.services.graph_engine import METRIC_DEGREE, GraphEngine, graph_cache
+from app.utils.graph_algorithms import CSRGraph
+
+
+def test_csr_algorithms():
+    """测试 k 跳邻域、最短路径与 PageRank"""
+    print("=" * 50)
+    print("测试1: CSR 图算法")
+    print("=" * 50)
+
+    # 0-1-2-3 链 + 1-4，5 为孤立节点
+    graph = CSRGraph(6, [0, 1, 2, 1], [1, 2, 3, 4], [1.0, 0.5, 0.5, 1.0])
+    assert graph.degree().tolist() == [1, 3, 2, 1, 1, 0]
+    assert graph.k_hop(0, 2) == {0: 0, 1: 1, 2: 2, 4: 2}
+    assert len(graph.k_hop(0, 3, limit=3)) == 3
+    assert graph.shortest_path(0, 3) == [0, 1, 2, 3]
+    assert graph.shortest_path(0, 3, max_hops=2) is None
+    assert graph.shortest_path(0, 5) is None
+
+    # 与稠密矩阵的幂迭代结果对比
+    rank = graph.pagerank(tol=1e-12, max_iter=500)
+    weights = np.zeros((6, 6))
+    for a, b, w in [(0, 1, 1.0), (1, 2, 0.5), (2, 3, 0.5), (1, 4, 1.0)]:
+        weights[a, b] = weights[b, a] = w
+    strength = weights.sum(axis=1)
+    expected = np.full(6, 1 / 6)
+    for _ in range(500):
+        spread = (expected / np.where(strength == 0, 1, strength)) @ weights
+        expected = 0.15 / 6 + 0.85 * (spread + expected[strength == 0].sum() / 6)
+    print(f"PageRank: {np.round(rank, 4).tolist()}")
+    assert np.allclose(rank, expected / expected.sum(), atol=1e-8)
+    assert int(np.argmax(rank)) == 1
+
+
+def test_engine_cache_invalidation():
+    """测试缓存命中，以及数据变化后自动重新加载"""
+    print("\n" + "=" * 50)
+    print("测试2: 引擎缓存")
+    print("=" * 50)
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    user = User(email="engine@example.com")
+    db.add(user)
+    db.commit()
+
+    nodes = [KnowledgeNode(user_id=user.id, label=label, type="concept", size=1) for label in ("甲", "乙", "丙")]
+    db.add_all(nodes)
+    db.flush()
+    db.add(KnowledgeEdge(user_id=user.id, source_id=nodes[0].id, target_id=nodes[1].id, type="related", weight=0.2))
+    db.commit()
+
+    service = GraphEngine(db)
+    first = service.load(user.id)
+    assert service.load(user.id) is first
+    assert service.shortest_path(user.id, "甲", "丙")["found"] is False
+    assert service.neighbors(user.id, "不存在", 1) is None
+
+    # 新增一条边（模拟其他进程写入）：版本变化后重新加载
+    db.add(KnowledgeEdge(user_id=user.id, source_id=nodes[1].id, target_id=nodes[2].id, type="related", weight=0.2))
+    db.commit()
+    path = service.shortest_path(user.id, "甲", "丙")
+    print(f"路径: {[node['label'] for node in path['nodes']]}")
+    assert path["length"] == 2
+    assert service.load(user.id) is not first
+
+    top = service.top_nodes(user.id, METRIC_DEGREE, 1)
+    assert top[0]["label"] == "乙" and top[0]["score"] == 2
+
+    graph_cache.invalidate([user.id])
+    db.close()
+
+
+if __name__ == "__main__":
+    test_csr_algorithms()
+    test_engine_cache_invalidation()
+    print("\n✅ 所有测试通过")
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+测试知识图谱服务端布局（力导向布局 + 增量布局）
+"""
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.utils.graph_layout as graph_layout
+from app.models.models import Base, KnowledgeEdge, KnowledgeNode, User
+from app.services.graph_layout_service import GraphLayoutService
+from app.utils.graph_layout import force_layout
+
+
+def _clusters(cluster_count: int, cluster_size: int):
+    """若干个内部全连接的簇，簇之间无边"""
+    sources, targets = [], []
+    for c in range(cluster_count):
+        members = range(c * cluster_size, (c + 1) * cluster_size)
+        for a in members:
+            for b in members:
+                if a < b:
+                    sources.append(a)
+                    targets.append(b)
+    return sources, targets
+
+
+def _check_separation(pos: np.ndarray, cluster_count: int, cluster_size: int):
+    """簇内平均半径应明显小于簇中心之间的最小距离"""
+    assert np.isfinite(pos).all()
+    groups = pos.reshape(cluster_count, cluster_size, 2)
+    centers = groups.mean(axis=1)
+    spread = np.sqrt(((groups - centers[:, None, :]) ** 2).sum(axis=2)).mean()
+    gaps = [
+        np.linalg.norm(centers[a] - centers[b])
+        for a in range(cluster_count) for b in range(a + 1, cluster_count)
+    ]
+    print(f"簇内半径 {spread:.2f}, 簇间最小距离 {min(gaps):.2f}")
+    assert min(gaps) > 2 * spread
+
+
+def test_force_layout():
+    """测试精确斥力与网格近似斥力都能分开不相连的簇"""
+    print("=" * 50)
+    print("测试1: 力导向布局")
+    print("=" * 50)
+
+    sources, targets = _clusters(4, 20)
+    _check_separation(force_layout(80, sources, targets), 4, 20)
+
+    # 调低阈值，强制走网格近似
+    original = graph_layout.EXACT_REPULSION_MAX_NODES
+    graph_layout.EXACT_REPULSION_MAX_NODES = 10
+    try:
+        _check_separation(force_layout(80, sources, targets), 4, 20)
+    finally:
+        graph_layout.EXACT_REPULSION_MAX_NODES = original
+
+    assert force_layout(0, [], []).shape == (0, 2)
+    assert np.isfinite(force_layout(1, [], [])).all()
+
+
+def test_incremental_layout():
+    """测试增量布局：新节点放在邻居附近，已有节点只做微调"""
+    print("=" * 50)
+    print("测试2: 增量布局")
+    print("=" * 50)
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    try:
+        user = User(email="layout@example.com")
+        db.add(user)
+        db.commit()
+
+        def add_node(i):
+            node = KnowledgeNode(id=f"n{i:03d}", user_id=user.id, label=f"概念{i}", type="concept", size=1)
+            db.add(node)
+            return node
+
+        def add_edge(a, b):
+            db.add(KnowledgeEdge(user_id=user.id, source_id=f"n{a:03d}", target_id=f"n{b:03d}", type="related", weight=1.0))
+
+        sources, targets = _clusters(3, 10)
+        for i in range(30):
+            add_node(i)
+        for a, b in zip(sources, targets):
+            add_edge(a, b)
+        db.commit()
+
+        service = GraphLayoutService(db)
+        assert service.compute_layout(user.id) == {"nodes": 30, "mode": "full"}
+        before = {node.id: (node.x, node.y) for node in db.query(KnowledgeNode)}
+        assert all(x is not None and y is not None for x, y in before.values())
+
+        # 新节点只连接第一个簇
+        add_node(30)
+        add_edge(0, 30)
+        add_edge(1, 30)
+        db.commit()
+        assert service.compute_layout(user.id) == {"nodes": 31, "mode": "incremental"}
+
+        db.expire_all()
+        after = {node.id: np.array([node.x, node.y]) for node in db.query(KnowledgeNode)}
+        moved = np.mean([np.linalg.norm(after[node_id] - np.array(xy)) for node_id, xy in before.items()])
+        print(f"已有节点平均位移 {moved:.3f}")
+        assert moved < 1.0
+
+        first_cluster = np.mean([after[f"n{i:03d}"] for i in range(10)], axis=0)
+        other_cluster = np.mean([after[f"n{i:03d}"] for i in range(10, 20)], axis=0)
+        new = after["n030"]
+        assert np.linalg.norm(new - first_cluster) < np.linalg.norm(new - other_cluster)
+
+        assert service.compute_layout(user.id, full=True)["mode"] == "full"
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    test_force_layout()
+    test_incremental_layout()
+    print("\n✅ 所有测试通过")
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+测试文章修改后的增量重新分析（句子对齐、火花 / 高亮编号调整、分析方式选择）
+"""
+
+import hashlib
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.models.models import AnalysisReport, Article, Base, MetaAnalysis, ThinkingLensResult, User
+from app.services.article_sentence_service import SentenceSegmentation
+from app.services.incremental_analysis_service import IncrementalAnalysisService, merge_sparks
+from app.utils.sentence_diff import align_sentences
+
+SENTENCES = [f"这是第{i}句话，讨论主题{i}。" for i in range(10)]
+CONTENT = "".join(SENTENCES)
+
+
+def _make_session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+def _spark(index):
+    return {
+        "text": SENTENCES[index], "sentence_index": index, "importance_score": index,
+        "explanation_hint": "提示", "dom_path": f"#sentence-{index}"
+    }
+
+
+def _make_article(db):
+    user = User(email="editor@example.com")
+    db.add(user)
+    db.flush()
+    article = Article(
+        user_id=user.id, title="测试", content=CONTENT,
+        content_hash=hashlib.md5(CONTENT.encode("utf-8")).hexdigest(), word_count=len(CONTENT)
+    )
+    db.add(article)
+    db.flush()
+    db.add(AnalysisReport(
+        article_id=article.id,
+        status="completed",
+        report_data={
+            "summary": "摘要",
+            "tags": ["a", "b", "c"],
+            "concept_sparks": [_spark(2), _spark(5), _spark(8)],
+            "argument_sparks": [{"type": "claim", "text": SENTENCES[6], "sentence_index": 6, "dom_path": "#sentence-6"}]
+        }
+    ))
+    meta = MetaAnalysis(
+        article_id=article.id, author_intent={}, timeliness_score=0.5,
+        timeliness_analysis={}, bias_analysis={}, knowledge_gaps={}
+    )
+    db.add(meta)
+    db.flush()
+    db.add(ThinkingLensResult(
+        meta_analysis_id=meta.id, lens_type="argument_structure",
+        highlights=[{"sentence_index": 5, "text": SENTENCES[5]}, {"sentence_index": 9, "text": SENTENCES[9]}]
+    ))
+    db.commit()
+    return article
+
+
+def test_align_sentences():
+    """测试句子对齐：插入、删除、改写"""
+    print("=" * 50)
+    print("测试1: 句子对齐")
+    print("=" * 50)
+
+    new = SENTENCES[:3] + ["插入的新句子。"] + SENTENCES[3:5] + ["改写后的第五句。"] + SENTENCES[6:9]
+    alignment = align_sentences(SENTENCES, new)
+
+    # 旧 0-2 不变，3-4 后移一位，5 被改写，6-8 后移一位，9 被删除
+    assert alignment.index_map == {0: 0, 1: 1, 2: 2, 3: 4, 4: 5, 6: 7, 7: 8, 8: 9}
+    assert alignment.changed == [3, 6]
+    assert alignment.removed == 2
+    assert alignment.regions(1) == [(2, 8)]
+    assert alignment.regions(0) == [(3, 4), (6, 7)]
+    assert align_sentences(SENTENCES, SENTENCES).changed_ratio == 0
+    assert align_sentences([], SENTENCES).changed_ratio == 1
+    print("✅ 对齐结果正确")
+
+
+def test_numbered_regions():
+    """测试只渲染修改区间的带编号句子列表"""
+    print("=" * 50)
+    print("测试2: 区间句子列表")
+    print("=" * 50)
+
+    segmentation = SentenceSegmentation.from_text(CONTENT)
+    assert segmentation.sentences == SENTENCES
+    lines = segmentation.numbered.split("\n")
+    assert segmentation.numbered_regions([(0, 10)]) == segmentation.numbered
+    assert segmentation.numbered_regions([(1, 3), (7, 8)]) == "\n".join(lines[1:3] + ["……", lines[7]])
+    assert segmentation.numbered_regions([(9, 12)]) == lines[9]
+    assert segmentation.numbered_regions([]) == ""
+    print(segmentation.numbered_regions([(1, 3), (7, 8)]))
+    print("✅ 编号与完整列表一致")
+
+
+def test_update_content_incremental():
+    """测试小修改：沿用未修改句子上的火花和高亮，编号按新内容调整"""
+    print("=" * 50)
+    print("测试3: 增量模式")
+    print("=" * 50)
+
+    db = _make_session()
+    try:
+        article = _make_article(db)
+        # 在第 3 句前插入一句，改写第 8 句
+        new = SENTENCES[:3] + ["插入的新句子。"] + SENTENCES[3:8] + ["改写后的第八句。", SENTENCES[9]]
+        result = IncrementalAnalysisService(db).update_content(article, "".join(new), title="新标题")
+
+        assert result["mode"] == "incremental"
+        assert result["changed_sentences"] == [3, 9]
+        assert result["regions"] == [(2, 5), (8, 11)]
+        assert result["carried_sparks"] == 3  # 第 8 句上的概念火花被丢弃
+        assert result["carried_highlights"] == 2
+
+        db.expire_all()
+        article = db.get(Article, article.id)
+        assert article.title == "新标题" and article.content == "".join(new)
+        data = article.analysis_report.report_data
+        assert [s["sentence_index"] for s in data["concept_sparks"]] == [2, 6]
+        assert [s["dom_path"] for s in data["concept_sparks"]] == ["#sentence-2", "#sentence-6"]
+        assert data["argument_sparks"][0]["sentence_index"] == 7
+        assert data["summary"] == "摘要"
+        highlights = article.meta_analysis.thinking_lens_results[0].highlights
+        assert [h["sentence_index"] for h in highlights] == [6, 10]
+
+        # 局部分析结果合并
+        merged = merge_sparks(data, {
+            "concept_sparks": [{**_spark(3), "sentence_index": 3, "importance_score": 7}],
+            "argument_sparks": []
+        })
+        assert [s["sentence_index"] for s in merged["concept_sparks"]] == [2, 3, 6]
+
+        # 内容不变
+        assert IncrementalAnalysisService(db).update_content(article, "".join(new))["mode"] == "unchanged"
+    finally:
+        db.close()
+    print("✅ 火花和高亮已沿用")
+
+
+def test_update_content_full():
+    """测试大幅修改时改为全量重新分析"""
+    print("=" * 50)
+    print("测试4: 全量模式")
+    print("=" * 50)
+
+    db = _make_session()
+    try:
+        article = _make_article(db)
+        new = [f"完全不同的第{i}句。" for i in range(6)] + SENTENCES[6:]
+        result = IncrementalAnalysisService(db).update_content(article, "".join(new))
+        assert result["mode"] == "full"
+
+        db.expire_all()
+        article = db.get(Article, article.id)
+        assert article.analysis_report.status == "pending"
+        assert article.meta_analysis.thinking_lens_results == []
+
+        # 只删除句子：调整编号即可
+        article.analysis_report.status = "completed"
+        db.commit()
+        result = IncrementalAnalysisService(db).update_content(article, "".join(new[:-1]))
+        assert result["mode"] == "remapped" and result["changed_sentences"] == []
+    finally:
+        db.close()
+    print("✅ 分析方式选择正确")
+
+
+if __name__ == "__main__":
+    test_align_sentences()
+    test_numbered_regions()
+    test_update_content_incremental()
+    test_update_content_full()
+    print("\n✅ 所有测试通过")
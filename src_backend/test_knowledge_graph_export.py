@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+测试知识图谱分页与 NDJSON 流式导出
+"""
+
+import json
+import random
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.models import Base, KnowledgeEdge, KnowledgeNode, User
+from app.services.knowledge_graph_service import KnowledgeGraphService
+
+
+def _make_graph(db, nodes: int = 30, edges: int = 60):
+    user = User(email="export@example.com")
+    db.add(user)
+    db.commit()
+
+    random.seed(3)
+    # size 有重复，验证游标按 (size, id) 排序
+    node_rows = [
+        KnowledgeNode(user_id=user.id, label=f"概念{i}", type="concept", size=random.randint(1, 5))
+        for i in range(nodes)
+    ]
+    db.add_all(node_rows)
+    db.flush()
+    pairs = set()
+    while len(pairs) < edges:
+        a, b = random.sample(range(nodes), 2)
+        pairs.add((min(a, b), max(a, b)))
+    db.add_all([
+        KnowledgeEdge(user_id=user.id, source_id=node_rows[a].id, target_id=node_rows[b].id, type="related", weight=0.2)
+        for a, b in pairs
+    ])
+    db.commit()
+    return user.id
+
+
+def test_pagination_covers_graph():
+    """测试逐页累加得到完整图谱，每条边只返回一次"""
+    print("=" * 50)
+    print("测试1: 视口分页")
+    print("=" * 50)
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    user_id = _make_graph(db)
+    service = KnowledgeGraphService(db)
+
+    full = service.get_knowledge_graph(user_id)
+    assert "nextCursor" not in full
+
+    seen_nodes, seen_edges, sizes = [], [], []
+    cursor, pages = None, 0
+    while True:
+        page = service.get_knowledge_graph(user_id, limit=7, cursor=cursor)
+        pages += 1
+        page_ids = {node["id"] for node in page["nodes"]}
+        seen_nodes.extend(page["nodes"])
+        sizes.extend(node["size"] for node in page["nodes"])
+        known = {node["id"] for node in seen_nodes}
+        for edge in page["edges"]:
+            # 两端都已返回，且至少一端在本页
+            assert edge["source"] in known and edge["target"] in known
+            assert edge["source"] in page_ids or edge["target"] in page_ids
+        seen_edges.extend(page["edges"])
+        cursor = page["nextCursor"]
+        if cursor is None:
+            break
+
+    print(f"{pages} 页，{len(seen_nodes)} 节点，{len(seen_edges)} 边")
+    assert pages == 5
+    assert sizes == sorted(sizes, reverse=True)
+    assert sorted(node["id"] for node in seen_nodes) == sorted(node["id"] for node in full["nodes"])
+    assert sorted(edge["id"] for edge in seen_edges) == sorted(edge["id"] for edge in full["edges"])
+
+    try:
+        service.get_knowledge_graph(user_id, limit=7, cursor="不是游标")
+        assert False, "无效游标应抛出 ValueError"
+    except ValueError:
+        pass
+    db.close()
+
+
+def test_ndjson_stream():
+    """测试 NDJSON 导出与完整结果一致"""
+    print("\n" + "=" * 50)
+    print("测试2: NDJSON 流式导出")
+    print("=" * 50)
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    user_id = _make_graph(db)
+    service = KnowledgeGraphService(db)
+
+    lines = [json.loads(line) for line in service.iter_knowledge_graph_ndjson(user_id, batch_size=8)]
+    kinds = [line.pop("kind") for line in lines]
+    print(f"共 {len(lines)} 行")
+    assert kinds == ["node"] * 30 + ["edge"] * 60 + ["stats"]
+
+    full = service.get_knowledge_graph(user_id)
+    assert lines[:30] == full["nodes"]
+    assert sorted(line["id"] for line in lines[30:90]) == sorted(edge["id"] for edge in full["edges"])
+    assert lines[-1] == full["stats"]
+    db.close()
+
+
+if __name__ == "__main__":
+    test_pagination_covers_graph()
+    test_ndjson_stream()
+    print("\n✅ 所有测试通过")
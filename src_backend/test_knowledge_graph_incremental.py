@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+测试知识图谱增量维护（点击写入时更新节点、共现与边）
+"""
+
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.click_buffer import ClickBuffer
+from app.models.models import Base, ConceptCooccurrence, KnowledgeEdge, KnowledgeNode, User
+from app.services.knowledge_graph_service import KnowledgeGraphService
+from app.utils.graph_algorithms import connected_components
+
+
+def _make_session_factory():
+    """创建内存数据库（后台线程共享同一连接）"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+def _click(user_id, text, article_id):
+    return {
+        "user_id": user_id,
+        "spark_type": "concept",
+        "spark_text": text,
+        "article_id": article_id,
+        "clicked_at": datetime.utcnow()
+    }
+
+
+def _graph(db, user_id):
+    """{label: size}, {(label_a, label_b): edge_label}"""
+    nodes = {node.id: node for node in db.query(KnowledgeNode).filter(KnowledgeNode.user_id == user_id)}
+    edges = {}
+    for edge in db.query(KnowledgeEdge).filter(KnowledgeEdge.user_id == user_id):
+        pair = tuple(sorted((nodes[edge.source_id].label, nodes[edge.target_id].label)))
+        edges[pair] = edge.label
+    return {node.label: node.size for node in nodes.values()}, edges
+
+
+def test_incremental_matches_rebuild():
+    """测试逐批增量更新的结果与全量重建一致，且重建保留节点 ID"""
+    print("=" * 50)
+    print("测试1: 增量更新与全量重建一致")
+    print("=" * 50)
+
+    Session = _make_session_factory()
+    db = Session()
+    user = User(email="graph@example.com")
+    db.add(user)
+    db.commit()
+
+    buffer = ClickBuffer(max_events=1000, flush_interval_ms=60000, session_factory=Session)
+    batches = [
+        [_click(user.id, "人工智能", 1), _click(user.id, "机器学习", 1)],
+        [_click(user.id, "人工智能", 2), _click(user.id, "神经网络", 2)],
+        # 同一批内：重复点击 + 第二次共现（达到阈值，建立边）
+        [_click(user.id, "机器学习", 2), _click(user.id, "人工智能", 1), _click(user.id, "量子计算", None)],
+    ]
+
+    for i, batch in enumerate(batches, 1):
+        buffer.enqueue(batch)
+        buffer.flush()
+        db.expire_all()
+        nodes, edges = _graph(db, user.id)
+        print(f"第 {i} 批后: 节点 {nodes}, 边 {edges}")
+
+    assert nodes == {"人工智能": 3, "机器学习": 2, "神经网络": 1, "量子计算": 1}
+    assert edges == {("人工智能", "机器学习"): "共现 2 次"}
+    # 连通分量随建边增量合并：人工智能-机器学习 构成一个孤岛
+    service = KnowledgeGraphService(db)
+    islands = service.get_blind_spots(user.id)["knowledgeIslands"]
+    print(f"知识孤岛: {islands}")
+    assert [sorted(island["concepts"]) for island in islands] == [["人工智能", "机器学习"]]
+
+    # 未达到阈值的概念对不存储
+    assert db.get(ConceptCooccurrence, (user.id, "人工智能", "神经网络")) is None
+    assert db.get(ConceptCooccurrence, (user.id, "人工智能", "机器学习")).count == 2
+
+    node_ids = {node.label: node.id for node in db.query(KnowledgeNode)}
+    result = KnowledgeGraphService(db).rebuild_graph(user.id)
+    print(f"全量重建: {result}")
+    db.expire_all()
+
+    assert _graph(db, user.id) == (nodes, edges)
+    assert {node.label: node.id for node in db.query(KnowledgeNode)} == node_ids
+    assert result["nodes_created"] == 4 and result["edges_created"] == 1
+
+    # 重建后继续增量更新：第二次共现从文章概念表统计
+    buffer.enqueue([_click(user.id, "人工智能", 3), _click(user.id, "神经网络", 3)])
+    buffer.flush()
+    db.expire_all()
+    nodes, edges = _graph(db, user.id)
+    print(f"重建后增量更新: 边 {edges}")
+    assert edges[("人工智能", "神经网络")] == "共现 2 次"
+    assert db.get(ConceptCooccurrence, (user.id, "人工智能", "神经网络")).count == 2
+
+    # 孤岛扩展为 3 个节点，与全量重建的分量一致
+    islands = service.get_blind_spots(user.id)["knowledgeIslands"]
+    assert [sorted(island["concepts"]) for island in islands] == [["人工智能", "机器学习", "神经网络"]]
+    components = {node.label: node.component_id for node in db.query(KnowledgeNode)}
+    service.rebuild_graph(user.id)
+    db.expire_all()
+    rebuilt = {node.label: node.component_id for node in db.query(KnowledgeNode)}
+    assert (components["机器学习"] == components["神经网络"]) and (rebuilt["机器学习"] == rebuilt["神经网络"])
+    assert service.count_knowledge_islands(user.id) == 1
+    db.close()
+
+
+def test_union_find_long_chain():
+    """测试并查集处理超长链（递归 DFS 会超出递归深度）"""
+    print("\n" + "=" * 50)
+    print("测试2: 并查集连通分量")
+    print("=" * 50)
+
+    n = 200000
+    sources = list(range(n - 1))
+    targets = list(range(1, n))
+    roots = connected_components(n + 2, sources + [n], targets + [n + 1])
+    print(f"分量数: {len(set(roots.tolist()))}")
+    assert len(set(roots[:n].tolist())) == 1
+    assert roots[n] == roots[n + 1] != roots[0]
+
+
+if __name__ == "__main__":
+    test_incremental_matches_rebuild()
+    test_union_find_long_chain()
+    print("\n✅ 所有测试通过")
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+测试近似重复文章检测（SimHash 指纹、分段多探测查找、分析结果复用）
+"""
+
+import asyncio
+import hashlib
+import random
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.models.models import AnalysisReport, Article, ArticleFingerprint, Base, MetaAnalysis, ThinkingLensResult, User
+from app.services.meta_analysis_service import MetaAnalysisService, meta_artifact_version
+from app.services.near_duplicate_service import NearDuplicateService
+from app.utils.simhash import (
+    bands, content_fingerprint, hamming_distance, normalize_text, probe_values, probes_for_distance,
+    to_signed, to_unsigned
+)
+
+VERSION = meta_artifact_version("测试", "未知作者", "", "zh")
+
+CHARS = "的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同工也能下过子说产种面而方后多定"
+
+
+def _sentences(seed, count=40):
+    rng = random.Random(seed)
+    return ["".join(rng.choice(CHARS) for _ in range(rng.randint(15, 40))) + "。" for _ in range(count)]
+
+
+SENTENCES = _sentences(1)
+CONTENT = "".join(SENTENCES)
+FOOTER = "\n\n本文来源：某某网，转载请注明出处。点击关注我们获取更多资讯！"
+
+
+def _make_session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+def _add_article(db, user, content):
+    article = Article(
+        user_id=user.id, title="测试", content=content,
+        content_hash=hashlib.md5(content.encode("utf-8")).hexdigest(), word_count=len(content)
+    )
+    db.add(article)
+    db.flush()
+    return article
+
+
+def test_fingerprint_distance():
+    """测试指纹距离：转载差异很小，不同文章接近 32"""
+    print("=" * 50)
+    print("测试1: SimHash 指纹")
+    print("=" * 50)
+
+    base = content_fingerprint(CONTENT)
+    assert normalize_text("Hello, World! 你好，世界。") == "helloworld你好世界"
+    assert content_fingerprint("  ".join(SENTENCES).replace("。", "．")) == base  # 空白、标点不同
+    assert content_fingerprint("。！") is None
+
+    footer = hamming_distance(base, content_fingerprint(CONTENT + FOOTER))
+    edited = hamming_distance(base, content_fingerprint("".join(SENTENCES[:38]) + "这是一个全新的段落内容并且相当长的句子。"))
+    different = hamming_distance(base, content_fingerprint("".join(_sentences(2))))
+    print(f"页脚: {footer}, 改写两句: {edited}, 不同文章: {different}")
+    assert footer <= 6 and edited <= 6
+    assert different > 16
+
+    value = (1 << 64) - 5
+    assert to_unsigned(to_signed(value)) == value and to_signed(5) == 5
+    print("✅ 指纹距离符合预期")
+
+
+def test_multi_probe():
+    """测试分段多探测：距离不超过 7 的指纹至少有一段相差不超过一位"""
+    print("=" * 50)
+    print("测试2: 分段多探测")
+    print("=" * 50)
+
+    rng = random.Random(7)
+    assert probes_for_distance(3) == 0 and probes_for_distance(7) == 1
+    for _ in range(2000):
+        fingerprint = rng.getrandbits(64)
+        distance = rng.randint(0, 7)
+        other = fingerprint
+        for bit in rng.sample(range(64), distance):
+            other ^= 1 << bit
+        flips = probes_for_distance(distance)
+        assert any(
+            stored in probe_values(probe, flips)
+            for stored, probe in zip(bands(other), bands(fingerprint))
+        )
+    print("✅ 多探测覆盖全部距离 ≤ 7 的指纹")
+
+
+def test_reuse_analysis():
+    """测试复用近似重复文章的报告、元信息分析和透镜结果"""
+    print("=" * 50)
+    print("测试3: 复用分析结果")
+    print("=" * 50)
+
+    db = _make_session()
+    try:
+        user = User(email="reader@example.com")
+        db.add(user)
+        db.flush()
+        service = NearDuplicateService(db)
+
+        source = _add_article(db, user, CONTENT)
+        service.fingerprint_article(source)
+        db.add(AnalysisReport(
+            article_id=source.id, status="completed", model_used="gpt-4o",
+            report_data={
+                "summary": "摘要", "tags": ["a", "b", "c"],
+                "concept_sparks": [{"text": "x", "sentence_index": 3, "importance_score": 8, "dom_path": "#sentence-3"}],
+                "argument_sparks": [{"type": "claim", "text": "y", "sentence_index": 39, "dom_path": "#sentence-39"}]
+            }
+        ))
+        meta = MetaAnalysis(
+            article_id=source.id, author_intent={"primary": "inform"}, timeliness_score=0.8,
+            timeliness_analysis={}, bias_analysis={}, knowledge_gaps={},
+            analysis_quality={"artifact_version": VERSION}
+        )
+        db.add(meta)
+        db.flush()
+        db.add(ThinkingLensResult(
+            meta_analysis_id=meta.id, lens_type="author_stance",
+            highlights=[{"sentence_index": 3, "text": SENTENCES[3]}]
+        ))
+        unrelated = _add_article(db, user, "".join(_sentences(3)))
+        service.fingerprint_article(unrelated)
+        db.commit()
+
+        # 转载：开头多一句导语，结尾多一段页脚
+        copy = _add_article(db, user, "转载导语一句话。" + CONTENT + FOOTER)
+        fingerprint = service.fingerprint_article(copy)
+        matches = service.find_near_duplicates(fingerprint, exclude_article_id=copy.id)
+        assert [article_id for article_id, _ in matches] == [source.id]
+
+        reuse = service.reuse_report(copy)
+        db.commit()
+        assert reuse["mode"] == "patched" and reuse["source_article_id"] == source.id
+        assert reuse["changed_sentences"] == [0, 41, 42]
+        report = db.query(AnalysisReport).filter(AnalysisReport.article_id == copy.id).one()
+        assert report.status == "completed" and report.tokens_used == 0
+        assert report.report_data["concept_sparks"][0]["sentence_index"] == 4
+        assert report.report_data["concept_sparks"][0]["dom_path"] == "#sentence-4"
+        assert report.report_data["argument_sparks"][0]["sentence_index"] == 40
+
+        # 元信息不同（版本键不同）时不复用元信息分析
+        assert service.reuse_meta_analysis(copy, meta_artifact_version("测试", "张三", "", "zh")) is None
+        reused = service.reuse_meta_analysis(copy, VERSION)
+        db.commit()
+        assert reused.article_id == copy.id and reused.author_intent == {"primary": "inform"}
+        assert reused.thinking_lens_results[0].highlights[0]["sentence_index"] == 4
+
+        # 不相关的文章不复用
+        other = _add_article(db, user, "".join(_sentences(4)))
+        assert service.reuse_report(other) is None
+
+        # 回填：删除指纹后重新计算
+        db.query(ArticleFingerprint).delete()
+        db.commit()
+        assert service.backfill(batch_size=2) == 4
+    finally:
+        db.close()
+    print("✅ 报告和元信息分析已复用")
+
+
+def test_meta_reuse_requires_same_metadata():
+    """测试通过 analyze_article 保存近似重复文章时，只在元信息相同时复用元信息分析"""
+    print("=" * 50)
+    print("测试4: 元信息分析按元信息复用")
+    print("=" * 50)
+
+    db = _make_session()
+    try:
+        users = [User(email=f"user{i}@example.com") for i in range(3)]
+        db.add_all(users)
+        db.commit()
+
+        service = MetaAnalysisService(db)
+        calls = []
+
+        async def fake_llm(**kwargs):
+            calls.append(kwargs)
+            return {
+                "author_intent": {"primary": "inform", "confidence": 0.9, "author": kwargs["author"]},
+                "timeliness": {"score": 0.7}, "bias": {}, "knowledge_gaps": {}
+            }
+
+        service._call_llm_for_meta_analysis = fake_llm
+
+        def analyze(user, author, content):
+            return asyncio.run(service.analyze_article(
+                title="测试", author=author, publish_date="", content=content, user_id=user.id
+            ))
+
+        analyze(users[0], "未知作者", CONTENT)
+        # 相同正文、作者不同：不复用，重新调用 LLM
+        result = analyze(users[1], "张三", CONTENT)
+        assert len(calls) == 2 and result["author_intent"]["author"] == "张三"
+        # 转载（正文近似）且元信息相同：复用，不调用 LLM
+        result = analyze(users[2], "未知作者", CONTENT + FOOTER)
+        assert len(calls) == 2 and result["author_intent"]["author"] == "未知作者"
+    finally:
+        db.close()
+    print("✅ 元信息不同不复用")
+
+
+if __name__ == "__main__":
+    test_fingerprint_distance()
+    test_multi_probe()
+    test_reuse_analysis()
+    test_meta_reuse_requires_same_metadata()
+    print("\n✅ 所有测试通过")
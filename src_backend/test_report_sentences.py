@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+测试分析报告与分句存储（article_sentences 表 + 报告接口）
+"""
+
+import asyncio
+import hashlib
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api.unified_analysis import get_analysis_report, get_article_sentences
+from app.models.models import AnalysisReport, Article, ArticleSentences, Base, User
+from app.services.article_sentence_service import ArticleSentenceService, segmentation_cache
+from app.utils.sentence_splitter import split_sentences
+
+CONTENT = "人工智能正在改变世界。它让我们的生活更加便捷！但同时也带来了新的挑战？"
+CONTENT_HASH = hashlib.md5(CONTENT.encode("utf-8")).hexdigest()
+
+
+def _make_session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+def _article_with_report(db, report_data):
+    user = User(email="reader@example.com")
+    db.add(user)
+    db.flush()
+    article = Article(user_id=user.id, title="AI", content=CONTENT, content_hash=CONTENT_HASH)
+    db.add(article)
+    db.flush()
+    db.add(AnalysisReport(article_id=article.id, status="completed", report_data=report_data))
+    db.commit()
+    return user, article
+
+
+def test_sentences_stored_once_per_content():
+    """测试同一内容的分句只保存一份"""
+    print("=" * 50)
+    print("测试1: 按内容哈希保存分句")
+    print("=" * 50)
+
+    db = _make_session()
+    segmentation_cache.invalidate(CONTENT_HASH)
+    try:
+        service = ArticleSentenceService(db)
+        assert service.get(CONTENT_HASH) is None
+
+        sentences = service.get_or_split(CONTENT_HASH, CONTENT)
+        service.get_or_split(CONTENT_HASH, CONTENT)
+        db.commit()
+        assert sentences == split_sentences(CONTENT)
+        assert db.query(ArticleSentences).count() == 1
+        assert db.get(ArticleSentences, CONTENT_HASH).sentence_count == 3
+
+        segmentation_cache.invalidate(CONTENT_HASH)
+        assert service.get(CONTENT_HASH) == sentences
+    finally:
+        db.close()
+    print("✅ 分句只保存一份")
+
+
+def test_report_inlines_sentences_by_default():
+    """测试报告接口默认附带分句（前端按其渲染），?exclude=sentences 时省略"""
+    print("=" * 50)
+    print("测试2: 报告接口中的分句")
+    print("=" * 50)
+
+    db = _make_session()
+    segmentation_cache.invalidate(CONTENT_HASH)
+    try:
+        legacy_sentences = ["人工智能正在改变世界。", "它让我们的生活更加便捷！", "但同时也带来了新的挑战？"]
+        user, article = _article_with_report(db, {"summary": "摘要", "sentences": legacy_sentences})
+
+        result = asyncio.run(get_analysis_report(article.id, exclude=None, current_user=user, db=db))
+        assert result["report_data"]["summary"] == "摘要"
+        assert result["report_data"]["sentences"] == legacy_sentences
+        assert result["sentences_ref"] == {"content_hash": CONTENT_HASH, "sentence_count": 3}
+
+        # 旧报告内嵌的分句已迁移到分句表，报告本身不再保存
+        db.expire_all()
+        report = db.query(AnalysisReport).one()
+        assert "sentences" not in report.report_data
+        assert db.get(ArticleSentences, CONTENT_HASH).sentences == legacy_sentences
+
+        slim = asyncio.run(get_analysis_report(article.id, exclude="sentences", current_user=user, db=db))
+        assert "sentences" not in slim["report_data"]
+        assert slim["sentences_ref"]["sentence_count"] == 3
+
+        separate = asyncio.run(get_article_sentences(article.id, current_user=user, db=db))
+        assert separate["sentences"] == legacy_sentences
+        assert len(separate["offsets"]) == 3
+    finally:
+        db.close()
+    print("✅ 默认附带分句，可选择省略")
+
+
+if __name__ == "__main__":
+    test_sentences_stored_once_per_content()
+    test_report_inlines_sentences_by_default()
+    print("\n✅ 所有测试通过")
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+测试洞察卡片全文检索（SQLite FTS5 + 中文二元组分词）
+"""
+
+import json
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.models import Base, User, InsightCard
+from app.services.search_service import InsightSearchService, init_search_index
+from app.utils.cjk_tokenizer import tokenize, tokenize_query
+
+
+def _make_session():
+    """创建内存数据库会话"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    init_search_index(engine)
+    return sessionmaker(bind=engine)()
+
+
+def test_tokenizer():
+    """测试中英文混合分词"""
+    print("=" * 50)
+    print("测试1: 检索分词")
+    print("=" * 50)
+
+    tokens = tokenize("人工智能 GPT-4")
+    print(f"索引词元: {tokens}")
+    assert tokens == ["人工", "工智", "智能", "能", "gpt", "4"]
+
+    terms = tokenize_query("智能 AI 人")
+    print(f"查询词元: {terms}")
+    assert terms == ["智能", "ai", "人"]
+
+
+def test_search_ranking_and_isolation():
+    """测试相关性检索、用户隔离和增量删除"""
+    print("\n" + "=" * 50)
+    print("测试2: 检索与用户隔离")
+    print("=" * 50)
+
+    db = _make_session()
+    service = InsightSearchService(db)
+
+    alice = User(email="alice@example.com")
+    bob = User(email="bob@example.com")
+    db.add_all([alice, bob])
+    db.flush()
+
+    samples = [
+        (alice.id, "人工智能正在改变世界", "深度学习是人工智能的核心"),
+        (alice.id, "经济学原理", "通货膨胀与人工成本"),
+        (bob.id, "人工智能", "别人的卡片"),
+    ]
+    for user_id, selected_text, insight in samples:
+        card = InsightCard(user_id=user_id, selected_text=selected_text, insight=insight, intent="explain")
+        db.add(card)
+        db.flush()
+        service.index_card(card)
+    db.commit()
+
+    total, results = service.search(alice.id, "人工智能")
+    for card, highlight in results:
+        print(f"  [{card.id}] {highlight}")
+    assert total == 1
+    assert results[0][1] == "<mark>人工智能</mark>正在改变世界"
+
+    total, _ = service.search(alice.id, "人")
+    assert total == 2
+
+    service.remove_card(results[0][0].id)
+    db.commit()
+    total, _ = service.search(alice.id, "人工智能")
+    assert total == 0
+
+
+def test_chinese_tags_searchable():
+    """测试中文标签可检索，旧数据中转义保存的标签在启动时修复"""
+    print("\n" + "=" * 50)
+    print("测试3: 中文标签检索")
+    print("=" * 50)
+
+    db = _make_session()
+    service = InsightSearchService(db)
+
+    user = User(email="tags@example.com")
+    db.add(user)
+    db.flush()
+
+    card = InsightCard(
+        user_id=user.id, selected_text="第一张卡片", insight="内容", intent="explain",
+        tags=json.dumps(["机器学习", "AI"], ensure_ascii=False)
+    )
+    legacy = InsightCard(
+        user_id=user.id, selected_text="第二张卡片", insight="内容", intent="explain",
+        tags=json.dumps(["机器学习"])
+    )
+    db.add_all([card, legacy])
+    db.flush()
+    service.index_card(card)
+    db.commit()
+
+    total, results = service.search(user.id, "机器学习")
+    assert total == 1 and results[0][0].id == card.id
+
+    # 旧数据：标签以 \\uXXXX 转义保存；启动时不扫描，由迁移脚本解码后索引
+    assert "\\u" in legacy.tags
+    init_search_index(db.get_bind())
+    db.expire_all()
+    assert "\\u" in db.get(InsightCard, legacy.id).tags
+    assert service.fix_escaped_tags() == 1
+    db.commit()
+    db.expire_all()
+    assert db.get(InsightCard, legacy.id).tags == '["机器学习"]'
+    total, _ = service.search(user.id, "机器学习")
+    assert total == 2
+    assert service.fix_escaped_tags() == 0
+
+
+if __name__ == "__main__":
+    print("\n[TEST] 开始测试全文检索\n")
+
+    test_tokenizer()
+    test_search_ranking_and_isolation()
+    test_chinese_tags_searchable()
+
+    print("\n" + "=" * 50)
+    print("[OK] 所有测试完成！")
+    print("=" * 50)
@@ -3,7 +3,7 @@
 测试新的句子拆分器
 """
 
-from app.utils.sentence_splitter import split_sentences, split_paragraphs
+from app.utils.sentence_splitter import split_sentences, split_sentences_with_offsets, split_paragraphs
 
 
 def test_chinese_sentences():
@@ -117,6 +117,62 @@ def test_ellipsis():
         print(f"{i}. {sent}")
 
 
+def test_expected_output():
+    """测试单遍扫描与此前实现的输出完全一致（上面各用例的结果）"""
+    print("\n" + "=" * 50)
+    print("测试8: 输出与旧实现一致")
+    print("=" * 50)
+
+    cases = {
+        "Dr. Smith works at U.S. Inc. He has a Ph.D. in Computer Science. His research focuses on AI.": [
+            "Dr. Smith works at U.S. Inc. He has a Ph.D. in Computer Science. His research focuses on AI."
+        ],
+        "OpenAI发布了GPT-4模型。这个模型在各项测试中表现优异！它可以处理多种语言，包括中文和English. The model shows great potential.": [
+            "OpenAI发布了GPT-4模型。",
+            "这个模型在各项测试中表现优异！",
+            "它可以处理多种语言，包括中文和English. The model shows great potential."
+        ],
+        '他说："人工智能将改变世界。"这是一个大胆的预测。有人认为（包括许多专家）这种说法言过其实。': [
+            '他说："人工智能将改变世界。',
+            '"这是一个大胆的预测。',
+            "有人认为（包括许多专家）这种说法言过其实。"
+        ],
+        "这个算法的准确率达到了98.5%。测试数据集包含10000个样本。每个样本的平均处理时间为0.05秒。": [
+            "这个算法的准确率达到了98.5%。",
+            "测试数据集包含10000个样本。",
+            "每个样本的平均处理时间为0.05秒。"
+        ],
+        '这个问题很复杂…我需要时间思考。他说："我不确定…但我会尽力。"最后他成功了！': [
+            "这个问题很复杂…", "我需要时间思考。", '他说："我不确定…', "但我会尽力。", '"最后他成功了！'
+        ],
+        # 「 的个数为奇数时不断句（与旧实现相同，即使已经闭合）
+        "他说：「我不确定。但我会尽力。」然后离开了。（注：这是真事。）完。": [
+            "他说：「我不确定。但我会尽力。」然后离开了。（注：这是真事。）完。"
+        ],
+        "（注：这是真事。）完。「甲。」「乙。」丙。": ["（注：这是真事。）完。", "「甲。」「乙。」丙。"],
+        "第一行\n第二行。\n\n\n第二段！！  \n": ["第一行\n第二行。", "第二段！！"],
+        "   \n\n ": [],
+    }
+    for text, expected in cases.items():
+        assert split_sentences(text) == expected, text
+    print("✅ 输出一致")
+
+
+def test_offsets():
+    """测试字符偏移（含 \\r\\n 换行）"""
+    print("\n" + "=" * 50)
+    print("测试9: 字符偏移")
+    print("=" * 50)
+
+    text = "  第一句。第二句！\r\n\r\n第三段\r\n继续。 Tail"
+    sentences = split_sentences_with_offsets(text)
+    assert [s.text for s in sentences] == split_sentences(text) == ["第一句。", "第二句！", "第三段\n继续。", "Tail"]
+    for sentence in sentences:
+        print(f"[{sentence.start}, {sentence.end}) {sentence.text!r}")
+        assert text[sentence.start:sentence.end].replace("\r\n", "\n") == sentence.text
+    assert (sentences[0].start, sentences[0].end) == (2, 6)
+
+
 if __name__ == "__main__":
     print("\n[TEST] 开始测试句子拆分器（零依赖，轻量级）\n")
 
@@ -127,6 +183,8 @@ if __name__ == "__main__":
     test_numbers()
     test_paragraphs()
     test_ellipsis()
+    test_expected_output()
+    test_offsets()
 
     print("\n" + "=" * 50)
     print("[OK] 所有测试完成！")
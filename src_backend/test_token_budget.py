@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+测试 LLM 调用的 token 预算控制（句子列表抽取、文本压缩、对话历史裁剪、发送前检查）
+"""
+
+import asyncio
+import random
+import re
+from types import SimpleNamespace
+
+import pytest
+
+from app.config import settings
+from app.services.article_sentence_service import SentenceSegmentation
+from app.services.unified_analysis_service import UnifiedAnalysisService
+from app.utils.token_budget import BUDGET_POLICIES, TokenBudgetExceeded, token_budget
+
+
+def _long_article(count=2000, seed=1):
+    rng = random.Random(seed)
+    return "".join(
+        "".join(chr(rng.randint(0x4e00, 0x9fa5)) for _ in range(rng.randint(15, 30))) + "。"
+        for _ in range(count)
+    )
+
+
+def test_context_limit_and_budget():
+    """测试上下文窗口查找和输入预算"""
+    print("=" * 50)
+    print("测试1: 上下文窗口与输入预算")
+    print("=" * 50)
+
+    assert token_budget.context_limit("gpt-4o") == 128000
+    assert token_budget.context_limit("gpt-4o-mini-2024-07-18") == settings.llm_context_tokens["gpt-4o-mini"]
+    assert token_budget.context_limit("unknown-model") == settings.llm_default_context_tokens
+
+    # 输入预算取配置上限和上下文窗口余量中较小的一个
+    assert token_budget.input_budget("unified_analysis", "gpt-4o") == BUDGET_POLICIES["unified_analysis"].max_input_tokens
+    assert token_budget.input_budget("follow_up", "deepseek-chat") < 64000 - settings.max_tokens
+    with pytest.raises(ValueError):
+        token_budget.policy("unknown")
+    print("✅ 预算计算正确")
+
+
+def test_fit_sentences_and_text():
+    """测试句子列表和普通文本超出预算时被压缩，句子编号与原文一致"""
+    print("=" * 50)
+    print("测试2: 句子列表与文本压缩")
+    print("=" * 50)
+
+    segmentation = SentenceSegmentation.from_text(_long_article())
+    sentence_list, note = token_budget.fit_sentences(segmentation, "unified_analysis", "gpt-4o", "系统提示词" * 100)
+    assert note and "……" in sentence_list
+    assert token_budget.estimate(sentence_list, "gpt-4o") <= token_budget.input_budget("unified_analysis", "gpt-4o")
+    for line in sentence_list.split("\n"):
+        if line != "……":
+            index, text = re.match(r"\[(\d+)\] (.*)", line).groups()
+            assert segmentation.sentences[int(index)] == text
+
+    short = SentenceSegmentation.from_text("第一句。第二句。")
+    assert token_budget.fit_sentences(short, "unified_analysis", "gpt-4o") == (short.numbered, "")
+
+    text = _long_article(1500)
+    fitted = token_budget.fit_text(text, "insight", "gpt-4o", "提示词")
+    assert len(fitted) < len(text)
+    assert token_budget.estimate(fitted, "gpt-4o") <= token_budget.input_budget("insight", "gpt-4o")
+    assert token_budget.fit_text("短文本", "insight", "gpt-4o") == "短文本"
+    print("✅ 压缩后不超过预算")
+
+
+def test_history_and_check():
+    """测试对话历史从最早的消息开始丢弃，发送前检查降低输出或拒绝请求"""
+    print("=" * 50)
+    print("测试3: 对话历史与发送前检查")
+    print("=" * 50)
+
+    model = "unknown-model"  # 按默认上下文窗口处理
+    long_message = "很长的回答" * 3000
+    messages = [
+        {"role": "system", "content": "系统"},
+        {"role": "user", "content": "原始文本"},
+    ] + [
+        {"role": "assistant" if i % 2 else "user", "content": f"第{i}条" + long_message}
+        for i in range(10)
+    ] + [{"role": "user", "content": "当前追问"}]
+
+    fitted = token_budget.fit_history(messages, "follow_up", model)
+    assert fitted[:2] == messages[:2] and fitted[-1] == messages[-1]
+    assert 2 < len(fitted) < len(messages)
+    assert fitted[2] == messages[len(messages) - len(fitted) + 2]  # 保留的是最近的消息
+    assert token_budget.estimate_messages(fitted, model) <= token_budget.input_budget("follow_up", model)
+
+    decision = token_budget.check(fitted, "follow_up", model)
+    assert decision.max_output_tokens == settings.max_tokens
+
+    # 输出预留放不下时减少输出 token
+    limit = settings.llm_default_context_tokens
+    chars_per_token = 1000 / token_budget.estimate("字" * 1000, model)
+    prompt = [{"role": "user", "content": "字" * int((limit * 0.95 - 600) * chars_per_token)}]
+    decision = token_budget.check(prompt, "unified_analysis", model)
+    assert 256 <= decision.max_output_tokens < 8000
+
+    # 连最少的输出都放不下时拒绝
+    with pytest.raises(TokenBudgetExceeded):
+        token_budget.check([{"role": "user", "content": "字" * int(limit * chars_per_token)}], "simple_response", model)
+    print("✅ 历史裁剪、降级和拒绝")
+
+
+def test_unified_analysis_prompt_bounded():
+    """测试统一分析发送给 LLM 的 Prompt 不超过预算，并设置输出上限"""
+    print("=" * 50)
+    print("测试4: 统一分析调用")
+    print("=" * 50)
+
+    calls = []
+
+    async def create(**kwargs):
+        calls.append(kwargs)
+        raise RuntimeError("stop")
+
+    service = UnifiedAnalysisService()
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    content = _long_article()
+    with pytest.raises(RuntimeError):
+        asyncio.run(service.analyze_article(content, "长文章"))
+
+    kwargs = calls[0]
+    prompt_tokens = token_budget.estimate_messages(kwargs["messages"], service.model)
+    print(f"原文≈{token_budget.estimate(content, service.model)} tokens, Prompt≈{prompt_tokens} tokens")
+    assert prompt_tokens <= BUDGET_POLICIES["unified_analysis"].max_input_tokens + 50
+    assert kwargs["max_tokens"] == BUDGET_POLICIES["unified_analysis"].max_output_tokens
+    assert "按重要性挑选" in kwargs["messages"][1]["content"]
+    print("✅ Prompt 在预算内")
+
+
+if __name__ == "__main__":
+    test_context_limit_and_budget()
+    test_fit_sentences_and_text()
+    test_history_and_check()
+    test_unified_analysis_prompt_bounded()
+    print("\n✅ 所有测试通过")
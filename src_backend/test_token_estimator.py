@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+测试按实际用量自校准的 token 估算器（TokenEstimator）
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.token_estimator import (
+    DEFAULT_COEFFICIENTS,
+    FEATURES,
+    REPLY_OVERHEAD_TOKENS,
+    TokenEstimator,
+    message_features,
+    script_counts,
+)
+from app.models.models import Base, TokenEstimatorStats
+from app.services.ai_service import AIService
+
+# 模拟的"真实"分词器：每个汉字 1.2 token，每个英文字母 0.22 token，每条消息 5 token
+TRUE_COEFFICIENTS = np.array([1.2, 0.22, 0.3, 0.6, 0.05, 1.0, 5.0])
+
+CHINESE = "人工智能正在改变世界它让我们的生活更加便捷"
+ENGLISH = "Artificial intelligence "
+
+
+def _make_session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+def _true_tokens(messages):
+    return float(message_features(messages) @ TRUE_COEFFICIENTS)
+
+
+def _random_messages(rng):
+    """各类字符比例随机的消息（比例固定时系数无法区分）"""
+    return [
+        {
+            "role": "user",
+            "content": (
+                CHINESE * int(rng.integers(0, 20)) + ENGLISH * int(rng.integers(0, 20))
+                + "2024" * int(rng.integers(0, 10)) + "，。!" * int(rng.integers(0, 10))
+                + " \n" * int(rng.integers(0, 10)) + "😀" * int(rng.integers(0, 5))
+            )
+        }
+        for _ in range(int(rng.integers(1, 5)))
+    ]
+
+
+def _train(estimator, model, rounds=60, seed=0):
+    rng = np.random.default_rng(seed)
+    for _ in range(rounds):
+        messages = _random_messages(rng)
+        estimator.observe(model, message_features(messages), _true_tokens(messages))
+
+
+def test_script_counts():
+    """测试按字符类别计数"""
+    print("=" * 50)
+    print("测试1: 字符类别计数")
+    print("=" * 50)
+
+    counts = dict(zip(FEATURES, script_counts("AI 改变世界，2024!")))
+    assert counts["cjk"] == 4
+    assert counts["latin"] == 2
+    assert counts["digit"] == 4
+    assert counts["punct"] == 2
+    assert counts["space"] == 1
+    assert counts["other"] == 0
+    assert script_counts("").sum() == 0
+    assert script_counts("😀")[-1] == 1
+    print("✅ 各类字符数正确")
+
+
+def test_calibration_converges():
+    """测试按观测到的用量收敛到真实系数，且不同模型互不影响"""
+    print("=" * 50)
+    print("测试2: 在线校准")
+    print("=" * 50)
+
+    estimator = TokenEstimator(save_every=0)
+    assert np.allclose(estimator.coefficients("m"), DEFAULT_COEFFICIENTS)
+
+    _train(estimator, "m")
+    coefficients = dict(zip(FEATURES, estimator.coefficients("m")))
+    print(f"拟合系数: { {k: round(v, 3) for k, v in coefficients.items()} }")
+    assert abs(coefficients["cjk"] - 1.2) < 0.05
+    assert abs(coefficients["latin"] - 0.22) < 0.02
+
+    messages = [{"role": "user", "content": CHINESE * 50}, {"role": "user", "content": ENGLISH * 40}]
+    expected = _true_tokens(messages) + REPLY_OVERHEAD_TOKENS
+    assert abs(estimator.estimate_messages(messages, "m") - expected) / expected < 0.03
+
+    # 未观测的模型仍使用默认系数
+    assert np.allclose(estimator.coefficients("other"), DEFAULT_COEFFICIENTS)
+    print("✅ 系数收敛")
+
+
+def test_persistence_shared_across_processes():
+    """测试增量累加到数据库，多个进程的观测合并"""
+    print("=" * 50)
+    print("测试3: 持久化与多进程合并")
+    print("=" * 50)
+
+    factory = _make_session_factory()
+    first = TokenEstimator(save_every=0, session_factory=factory)
+    second = TokenEstimator(save_every=0, session_factory=factory)
+
+    _train(first, "m", rounds=30, seed=1)
+    _train(second, "m", rounds=30, seed=2)
+    assert first.save() == 30
+    assert second.save() == 30
+    assert first.save() == 0
+
+    db = factory()
+    try:
+        row = db.query(TokenEstimatorStats).one()
+        assert row.sample_count == 60
+        assert set(row.coefficients) == set(FEATURES)
+    finally:
+        db.close()
+
+    # 第二个进程保存后读回了两边的合计
+    assert second._totals["m"].samples == 60
+
+    restarted = TokenEstimator(save_every=0, session_factory=factory)
+    assert restarted.load() == 1
+    assert np.allclose(restarted.coefficients("m"), second.coefficients("m"))
+    assert abs(restarted.coefficients("m")[0] - 1.2) < 0.05
+    print("✅ 统计量合并、重启后加载")
+
+
+def test_observe_response():
+    """测试从 LLM 响应的 usage 记录观测，缺少 usage 时忽略"""
+    print("=" * 50)
+    print("测试4: 记录响应用量")
+    print("=" * 50)
+
+    estimator = TokenEstimator(save_every=0)
+    messages = [{"role": "user", "content": CHINESE * 10}]
+    response = SimpleNamespace(
+        usage=SimpleNamespace(prompt_tokens=300, completion_tokens=40, completion_tokens_details=None),
+        choices=[SimpleNamespace(message=SimpleNamespace(content="好的" * 20))]
+    )
+    estimator.observe_response("m", messages, response)
+    assert estimator._pending["m"].samples == 2
+    assert estimator._pending["m"].xty[-1] == 300 - REPLY_OVERHEAD_TOKENS
+
+    # 推理模型：思考 token 不在返回文本里，只记录 Prompt
+    response.usage.completion_tokens_details = SimpleNamespace(reasoning_tokens=500)
+    estimator.observe_response("m", messages, response)
+    assert estimator._pending["m"].samples == 3
+
+    estimator.observe_response("m", messages, SimpleNamespace(usage=None))
+    estimator.observe_response("m", messages, object())
+    assert estimator._pending["m"].samples == 3
+    print("✅ 用量已记录")
+
+
+def test_observe_stream_usage():
+    """测试流式调用请求 usage，并用最后一个片段的 usage 校准"""
+    print("=" * 50)
+    print("测试5: 流式响应用量")
+    print("=" * 50)
+
+    estimator = TokenEstimator(save_every=0)
+    usage = SimpleNamespace(prompt_tokens=200, completion_tokens=12, completion_tokens_details=None)
+
+    def delta_chunk(content):
+        delta = SimpleNamespace(content=content, reasoning_content=None)
+        return SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+
+    calls = []
+
+    async def fake_stream():
+        for content in ("人工", "智能"):
+            yield delta_chunk(content)
+        yield SimpleNamespace(choices=[], usage=usage)
+
+    async def create(**kwargs):
+        calls.append(kwargs)
+        return fake_stream()
+
+    async def collect(service):
+        return [chunk async for chunk in service.generate_insight_stream(
+            selected_text="人工智能", context="", intent="explain"
+        )]
+
+    service = AIService()
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+    import app.services.ai_service as ai_service_module
+    original, ai_service_module.token_estimator = ai_service_module.token_estimator, estimator
+    try:
+        assert asyncio.run(collect(service)) == ["人工", "智能"]
+    finally:
+        ai_service_module.token_estimator = original
+
+    assert calls[0]["stream_options"] == {"include_usage": True}
+    assert service.last_usage is usage
+    assert estimator._pending[service.model_used].samples == 2
+    # 消息数特征为 2（系统提示词 + 用户消息）
+    assert estimator._pending[service.model_used].xty[-1] == 2 * (200 - REPLY_OVERHEAD_TOKENS)
+    print("✅ 流式用量已记录")
+
+
+def test_background_save():
+    """测试达到 save_every 时在后台线程中保存"""
+    print("=" * 50)
+    print("测试6: 后台保存")
+    print("=" * 50)
+
+    factory = _make_session_factory()
+    estimator = TokenEstimator(save_every=5, session_factory=factory)
+    _train(estimator, "m", rounds=5, seed=3)
+    assert estimator._save_thread is not None
+    estimator._save_thread.join(timeout=10)
+
+    db = factory()
+    try:
+        assert db.query(TokenEstimatorStats).one().sample_count == 5
+    finally:
+        db.close()
+    assert estimator._pending_samples == 0
+    print("✅ 后台线程已保存")
+
+
+if __name__ == "__main__":
+    test_script_counts()
+    test_calibration_converges()
+    test_persistence_shared_across_processes()
+    test_observe_response()
+    test_observe_stream_usage()
+    test_background_save()
+    print("\n✅ 所有测试通过")
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+测试话题提取（词典分词 + Space-Saving Top-K 草图）
+"""
+
+import random
+
+from app.utils.cjk_segmenter import extract_topics, get_dictionary, segment
+from app.utils.topk_sketch import SpaceSavingSketch
+
+
+def test_dictionary_segmentation():
+    """测试正向最大匹配分词与话题词过滤"""
+    print("=" * 50)
+    print("测试1: 词典分词")
+    print("=" * 50)
+
+    dictionary = get_dictionary()
+    assert dictionary.lookup("人工智能") == "n"
+    assert dictionary.lookup("机器学习") == "nz"
+    assert dictionary.lookup("不存在的词语") is None
+    assert get_dictionary() is dictionary
+
+    words = segment("人工智能的发展正在改变生活方式")
+    print(f"分词结果: {words}")
+    assert [word for word, _ in words][:3] == ["人工智能", "的", "发展"]
+
+    topics = extract_topics("机器学习与深度学习的区别")
+    print(f"话题词: {topics}")
+    assert topics == ["机器学习", "深度学习", "区别"]
+    assert extract_topics("GPT-4") == []
+
+
+def test_space_saving_guarantees():
+    """测试草图的高频项保留与误差上界"""
+    print("\n" + "=" * 50)
+    print("测试2: Space-Saving 草图")
+    print("=" * 50)
+
+    random.seed(7)
+    stream = ["热门"] * 500 + ["次热门"] * 300 + [f"长尾{i}" for i in range(2000)]
+    random.shuffle(stream)
+
+    sketch = SpaceSavingSketch(capacity=20)
+    sketch.update_many(stream)
+    top = sketch.top(2)
+    print(f"Top-2: {top}，计数器数量: {len(sketch.counters)}")
+    assert len(sketch.counters) == 20
+    assert [item for item, _ in top] == ["热门", "次热门"]
+
+    # count - error <= 真实频次 <= count
+    for item, true_count in (("热门", 500), ("次热门", 300)):
+        count, error = sketch.counters[item]
+        assert count - error <= true_count <= count
+
+    # 合并两个草图，序列化往返
+    other = SpaceSavingSketch(capacity=20)
+    other.update_many(["热门"] * 10 + ["新话题"] * 5)
+    merged = SpaceSavingSketch.from_dict(sketch.to_dict(), 20).merge(other)
+    assert merged.top(1)[0][0] == "热门"
+    assert len(merged.counters) <= 20
+
+    # 兼容旧格式 {"项": count}
+    legacy = SpaceSavingSketch.from_dict({"人工智能": 3})
+    assert legacy.counters == {"人工智能": [3, 0]}
+
+
+if __name__ == "__main__":
+    test_dictionary_segmentation()
+    test_space_saving_guarantees()
+    print("\n✅ 所有测试通过")